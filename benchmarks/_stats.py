@@ -0,0 +1,60 @@
+"""Timing and summary statistics shared by the benchmark scripts."""
+
+import statistics
+import time
+from collections import defaultdict
+from typing import Any, Optional
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+
+def percentile(values: list[float], pct: float) -> float:
+    """Return the nearest-rank percentile of a non-empty list."""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def summarize(values: list[float]) -> dict[str, float]:
+    """Return count, mean and p50/p95/p99 of a list of latencies."""
+    return {
+        "count": len(values),
+        "mean": round(statistics.fmean(values), 3),
+        "p50": round(percentile(values, 50), 3),
+        "p95": round(percentile(values, 95), 3),
+        "p99": round(percentile(values, 99), 3),
+    }
+
+
+class NodeTimer(BaseCallbackHandler):
+    """Record the wall time of every graph node run."""
+
+    run_inline = True
+
+    def __init__(self) -> None:
+        self.starts: dict[UUID, tuple[str, float]] = {}
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+
+    def on_chain_start(
+        self,
+        serialized: Optional[dict[str, Any]],
+        inputs: Any,
+        *,
+        run_id: UUID,
+        parent_run_id: Optional[UUID] = None,
+        metadata: Optional[dict[str, Any]] = None,
+        **kwargs: Any,
+    ) -> None:
+        node = (metadata or {}).get("langgraph_node")
+        if node is None or kwargs.get("name") != node:
+            return
+        parent = self.starts.get(parent_run_id) if parent_run_id else None
+        if parent is None or parent[0] != node:
+            self.starts[run_id] = (node, time.perf_counter())
+
+    def on_chain_end(self, outputs: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        started = self.starts.pop(run_id, None)
+        if started is not None:
+            self.latencies[started[0]].append((time.perf_counter() - started[1]) * 1000)
+
+    on_chain_error = on_chain_end  # type: ignore[assignment]
@@ -0,0 +1,135 @@
+"""Benchmark checkpoint write latency per node under concurrent threads.
+
+Runs a graph shaped like `retrieval_graph` (generate_query -> retrieve ->
+agent_reasoning) with realistic payload sizes against several checkpointer
+setups, many threads at a time, and reports `aput` latency per node.
+
+Usage:
+    python benchmarks/checkpointer_latency.py --threads 64 --turns 5
+    python benchmarks/checkpointer_latency.py --output bench_output.json
+"""
+
+import argparse
+import asyncio
+import json
+import operator
+import tempfile
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Annotated, Any, TypedDict
+
+from _stats import summarize
+from langgraph.checkpoint.memory import MemorySaver
+from langgraph.graph import StateGraph
+
+from retrieval_graph.checkpointer import SqliteCheckpointer
+
+# Roughly one retrieved 10-K chunk.
+CHUNK = "Revenue for fiscal year 2024 was $60.9 billion, up 126% from a year ago. " * 20
+
+
+class BenchState(TypedDict):
+    """State of the benchmark graph, sized like `retrieval_graph`'s."""
+
+    messages: Annotated[list[str], operator.add]
+    queries: Annotated[list[str], operator.add]
+    retrieved_docs: list[str]
+
+
+def _build_graph(checkpointer: Any, k: int) -> Any:
+    builder = StateGraph(BenchState)
+    builder.add_node("generate_query", lambda s: {"queries": [s["messages"][-1]]})
+    builder.add_node("retrieve", lambda s: {"retrieved_docs": [CHUNK] * k})
+    builder.add_node("agent_reasoning", lambda s: {"messages": [CHUNK]})
+    builder.add_edge("__start__", "generate_query")
+    builder.add_edge("generate_query", "retrieve")
+    builder.add_edge("retrieve", "agent_reasoning")
+    return builder.compile(checkpointer=checkpointer)
+
+
+def _timed(saver: Any, latencies: dict[str, list[float]]) -> Any:
+    """Wrap `aput` on a saver instance to record latency per writing node."""
+    aput = saver.aput
+
+    async def timed_aput(config, checkpoint, metadata, new_versions):  # type: ignore[no-untyped-def]
+        node = ",".join((metadata.get("writes") or {}).keys()) or "__loop__"
+        start = time.perf_counter()
+        result = await aput(config, checkpoint, metadata, new_versions)
+        latencies[node].append((time.perf_counter() - start) * 1000)
+        return result
+
+    saver.aput = timed_aput
+    return saver
+
+
+async def _run_setup(
+    name: str, saver: Any, threads: int, turns: int, k: int
+) -> dict[str, Any]:
+    latencies: dict[str, list[float]] = defaultdict(list)
+    graph = _build_graph(_timed(saver, latencies), k)
+
+    async def session(i: int) -> None:
+        config = {"configurable": {"thread_id": f"{name}-{i}"}}
+        for turn in range(turns):
+            await graph.ainvoke({"messages": [f"question {turn}"]}, config)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(session(i) for i in range(threads)))
+    elapsed = time.perf_counter() - start
+    if hasattr(saver, "close"):
+        saver.close()
+    return {
+        "setup": name,
+        "wall_seconds": round(elapsed, 3),
+        "runs_per_second": round(threads * turns / elapsed, 1),
+        "aput_ms": {
+            node: summarize(values) for node, values in sorted(latencies.items())
+        },
+    }
+
+
+async def main(args: argparse.Namespace) -> list[dict[str, Any]]:
+    """Run every checkpointer setup and return one result per setup."""
+    with tempfile.TemporaryDirectory() as tmp:
+        setups: list[tuple[str, Any]] = [
+            ("memory", MemorySaver()),
+            ("sqlite", SqliteCheckpointer(str(Path(tmp) / "a.db"), batch_size=1)),
+            ("sqlite-batched", SqliteCheckpointer(str(Path(tmp) / "b.db"))),
+            (
+                "sqlite-batched-compressed-keep5",
+                SqliteCheckpointer(
+                    str(Path(tmp) / "c.db"), compress=True, max_checkpoints_per_thread=5
+                ),
+            ),
+        ]
+        results = []
+        for name, saver in setups:
+            result = await _run_setup(name, saver, args.threads, args.turns, args.k)
+            if isinstance(saver, SqliteCheckpointer):
+                result["db_bytes"] = sum(
+                    p.stat().st_size for p in Path(tmp).glob(Path(saver.path).name + "*")
+                )
+            results.append(result)
+        return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--threads", type=int, default=32, help="Concurrent threads.")
+    parser.add_argument("--turns", type=int, default=3, help="Turns per thread.")
+    parser.add_argument("--k", type=int, default=8, help="Retrieved chunks per turn.")
+    parser.add_argument("--output", type=Path, help="Write results as JSON here.")
+    args = parser.parse_args()
+
+    results = asyncio.run(main(args))
+    for result in results:
+        size = f", {result['db_bytes'] / 1e6:.1f} MB on disk" if "db_bytes" in result else ""
+        print(f"{result['setup']}: {result['runs_per_second']} runs/s{size}")
+        for node, stats in result["aput_ms"].items():
+            print(
+                f"  {node:<16} n={stats['count']:<5} p50={stats['p50']:.3f}ms "
+                f"p95={stats['p95']:.3f}ms p99={stats['p99']:.3f}ms"
+            )
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2))
@@ -0,0 +1,193 @@
+"""Micro-benchmark the helpers that run on every turn or ingest, with regression gates.
+
+Times `graph.detect_companies`, `utils.format_docs`, `utils.get_message_text`,
+`state.reduce_docs` and `state.add_queries` on realistic payloads (50-chunk
+contexts, 10k-document reduces, long message and query histories). Each
+result is the best per-call time over several repeats, also expressed as a
+multiple of a fixed pure-Python calibration loop so runs on different machines
+stay comparable.
+
+Every run is appended to a JSONL history file. When a baseline exists, the run
+fails (exit status 1) if any helper's normalized time exceeds the baseline by
+more than --threshold.
+
+Usage:
+    python benchmarks/helper_microbench.py
+    python benchmarks/helper_microbench.py --update-baseline
+    python benchmarks/helper_microbench.py --threshold 1.25 --history /tmp/helpers.jsonl
+"""
+
+import argparse
+import importlib
+import json
+import subprocess
+import sys
+import time
+import timeit
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any
+
+from langchain_core.documents import Document
+from langchain_core.messages import AIMessage, AnyMessage, HumanMessage
+
+from retrieval_graph.state import add_queries, reduce_docs
+from retrieval_graph.synthetic import generate_corpus
+from retrieval_graph.utils import format_docs, get_message_text
+
+# The package re-exports the compiled graph as `retrieval_graph.graph`.
+graph_module = importlib.import_module("retrieval_graph.graph")
+
+ROOT = Path(__file__).resolve().parent.parent
+BASELINE = Path(__file__).resolve().parent / "data" / "helper_baseline.json"
+HISTORY = ROOT / ".benchmarks" / "helper_history.jsonl"
+
+
+def calibrate() -> None:
+    """Run the fixed pure-Python workload every helper time is divided by."""
+    total = 0
+    for i in range(20_000):
+        total += len(str(i)) * (i % 7)
+
+
+def make_chunks(count: int) -> list[Document]:
+    """Return `count` enriched chunks, the shape `retrieve` hands to the model."""
+    chunks = []
+    for filing in generate_corpus(4, 1, 40):
+        for page in filing.pages():
+            for paragraph in page.page_content.split("\n\n"):
+                chunks.append(
+                    Document(
+                        page_content=paragraph,
+                        metadata={
+                            **page.metadata,
+                            "user_id": "1111111111",
+                            "company_name": filing.company,
+                            "hierarchical_section": "Part II > Item 7",
+                            "section_title": "Management's Discussion and Analysis",
+                        },
+                    )
+                )
+                if len(chunks) == count:
+                    return chunks
+    return chunks
+
+
+def make_history(turns: int) -> list[AnyMessage]:
+    """Return a conversation mixing plain-string and content-block messages."""
+    messages: list[AnyMessage] = []
+    for i in range(turns):
+        messages.append(HumanMessage(content=f"Question {i}: how did NVIDIA revenue change?"))
+        messages.append(
+            AIMessage(
+                content=[
+                    {"type": "text", "text": "Revenue grew strongly. " * 20},
+                    {"type": "text", "text": f"See page {i}."},
+                ]
+            )
+        )
+    return messages
+
+
+def cases() -> dict[str, Callable[[], Any]]:
+    """Return the named payload-bound calls to time."""
+    questions = [
+        "What is NVIDIA's revenue for fiscal year 2024?",
+        "Compare R&D spending across NVIDIA, AMD, Intel, and Broadcom",
+        "How do profit margins compare across the semiconductor industry?",
+    ]
+    long_question = " ".join(questions * 40)
+    context = make_chunks(50)
+    history = make_history(100)
+    docs = make_chunks(10_000)
+    dicts = [{"page_content": d.page_content, "metadata": d.metadata} for d in docs]
+    texts = [d.page_content for d in docs]
+    queries = [f"query {i}" for i in range(1_000)]
+
+    return {
+        "detect_companies/questions": lambda: [graph_module.detect_companies(q) for q in questions],
+        "detect_companies/long_query": lambda: graph_module.detect_companies(long_question),
+        "format_docs/50_chunks": lambda: format_docs(context),
+        "get_message_text/200_messages": lambda: [get_message_text(m) for m in history],
+        "reduce_docs/10k_documents": lambda: reduce_docs([], docs),
+        "reduce_docs/10k_dicts": lambda: reduce_docs([], dicts),
+        "reduce_docs/10k_strings": lambda: reduce_docs([], texts),
+        "add_queries/1k_history": lambda: add_queries(queries, ["next query"]),
+    }
+
+
+def best_time(fn: Callable[[], Any], repeats: int) -> float:
+    """Return the best per-call time of `fn` in microseconds."""
+    timer = timeit.Timer(fn)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=repeats, number=number)) / number * 1e6
+
+
+def run(repeats: int) -> dict[str, Any]:
+    """Time the calibration loop and every case."""
+    calibration_us = best_time(calibrate, repeats)
+    helpers = {}
+    for name, fn in cases().items():
+        us = best_time(fn, repeats)
+        helpers[name] = {"us": round(us, 3), "normalized": round(us / calibration_us, 5)}
+    return {"calibration_us": round(calibration_us, 3), "helpers": helpers}
+
+
+def regressions(result: dict[str, Any], baseline: dict[str, Any], threshold: float) -> list[str]:
+    """Describe every helper slower than `threshold` times its baseline."""
+    failures = []
+    for name, current in result["helpers"].items():
+        reference = baseline["helpers"].get(name)
+        if reference is None:
+            continue
+        ratio = current["normalized"] / reference["normalized"]
+        if ratio > threshold:
+            failures.append(
+                f"{name}: {current['us']:.1f}us is {ratio:.2f}x baseline "
+                f"{reference['us']:.1f}us (threshold {threshold:.2f}x)"
+            )
+    return failures
+
+
+def git_revision() -> str:
+    """Return the current commit hash, or an empty string outside a checkout."""
+    try:
+        output = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, cwd=ROOT
+        )
+    except OSError:
+        return ""
+    return output.stdout.strip()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeats", type=int, default=5, help="Timing repeats per helper.")
+    parser.add_argument("--threshold", type=float, default=1.5, help="Fail above this multiple of the baseline.")
+    parser.add_argument("--baseline", type=Path, default=BASELINE, help="Baseline JSON to compare against.")
+    parser.add_argument("--history", type=Path, default=HISTORY, help="JSONL file every run is appended to.")
+    parser.add_argument("--update-baseline", action="store_true", help="Write this run as the new baseline.")
+    args = parser.parse_args()
+
+    result = run(args.repeats)
+    record = {"timestamp": round(time.time()), "revision": git_revision(), **result}
+    args.history.parent.mkdir(parents=True, exist_ok=True)
+    with args.history.open("a") as f:
+        f.write(json.dumps(record) + "\n")
+
+    baseline = json.loads(args.baseline.read_text()) if args.baseline.exists() else None
+    print(f"calibration: {result['calibration_us']:.1f}us")
+    for name, current in result["helpers"].items():
+        reference = baseline["helpers"].get(name) if baseline else None
+        change = f"{current['normalized'] / reference['normalized']:.2f}x" if reference else "-"
+        print(f"  {name:<32} {current['us']:>12.2f}us  vs baseline {change}")
+
+    if args.update_baseline:
+        args.baseline.write_text(json.dumps(record, indent=2) + "\n")
+        print(f"baseline written to {args.baseline}")
+    elif baseline:
+        failures = regressions(result, baseline, args.threshold)
+        for failure in failures:
+            print(f"REGRESSION {failure}")
+        if failures:
+            sys.exit(1)
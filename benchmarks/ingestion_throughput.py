@@ -0,0 +1,148 @@
+"""Benchmark the document processing pipeline without network access.
+
+Feeds synthetic 10-K filings from `retrieval_graph.synthetic` (and, optionally,
+pickled page lists written by `scripts/generate_synthetic_corpus.py`) through `docu_proc_graph`
+(load_pdf_docs -> split_documents -> enrich_metadata -> index_docs) with the
+`local/hashing` embeddings and the in-process "local" vector store. Reports
+pages/sec, chunks/sec, embedding calls, peak RSS, time per stage and event-loop
+stalls (see `retrieval_graph.loop_monitor`) longer than --stall-ms.
+
+Usage:
+    python benchmarks/ingestion_throughput.py --filings 4
+    python benchmarks/ingestion_throughput.py --scales 1 10 100 --output ingest.json
+    python benchmarks/ingestion_throughput.py --parsed corpus/*_parsed_docs.pkl
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import pickle
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any
+
+from _stats import NodeTimer
+from langchain_core.documents import Document
+
+from retrieval_graph import docu_proc_graph, loop_monitor, retrieval, telemetry
+from retrieval_graph.blob_store import BlobStore
+from retrieval_graph.local import get_local_store
+from retrieval_graph.synthetic import generate_corpus
+
+
+def load_filings(args: argparse.Namespace) -> list[Document]:
+    """Return the parsed pages of every filing in this run."""
+    documents: list[Document] = []
+    for path in args.parsed:
+        with open(path, "rb") as f:
+            documents.extend(pickle.load(f))
+    for filing in generate_corpus(args.filings, 1, args.pages, seed=args.seed):
+        documents.extend(filing.pages())
+    return documents
+
+
+async def run(args: argparse.Namespace) -> dict[str, Any]:
+    """Run the pipeline once and return its throughput figures."""
+    embedding_model = f"local/hashing?dim={args.dim}&latency={args.embed_latency}"
+    documents = load_filings(args)
+    timer = NodeTimer()
+    # Embedding calls are counted by the telemetry embeddings wrapper.
+    telemetry.enable()
+    with tempfile.TemporaryDirectory() as tmp:
+        # index_docs bumps the index generation under ./cache; keep that out of the repo.
+        os.chdir(tmp)
+        ref = BlobStore("blobs").put_documents(documents)
+        store = get_local_store(embedding_model, retrieval.make_text_encoder(embedding_model))
+        store.delete()
+        config = {
+            "configurable": {
+                "thread_id": "ingest-bench",
+                "user_id": "1111111111",
+                "retriever_provider": "local",
+                "embedding_model": embedding_model,
+                "chunking_embedding_model": embedding_model,
+                "blob_store_dir": "blobs",
+            },
+            "callbacks": [timer],
+        }
+        start = time.perf_counter()
+        async with loop_monitor.monitor(threshold=args.stall_ms / 1000) as monitor:
+            await docu_proc_graph.ainvoke({"doc_refs": [ref]}, config)
+        elapsed = time.perf_counter() - start
+
+    chunks = len(store)
+    counters = telemetry.registry.counters
+    embedding_calls = sum(counters.get("retrieval_graph_embedding_calls_total", {}).values())
+    embedded_texts = sum(counters.get("retrieval_graph_embedded_texts_total", {}).values())
+    return {
+        "filings": args.filings + len(args.parsed),
+        "pages": len(documents),
+        "chunks": chunks,
+        "wall_seconds": round(elapsed, 3),
+        "pages_per_second": round(len(documents) / elapsed, 1),
+        "chunks_per_second": round(chunks / elapsed, 1),
+        "embedding_calls": int(embedding_calls),
+        "embedded_texts": int(embedded_texts),
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "loop_stalls": len(monitor.stalls),
+        "max_stall_ms": round(max((s.duration for s in monitor.stalls), default=0.0) * 1000, 1),
+        "stage_seconds": {
+            node: round(sum(values) / 1000, 3)
+            for node, values in sorted(timer.latencies.items())
+        },
+    }
+
+
+def sweep(args: argparse.Namespace) -> list[dict[str, Any]]:
+    """Run each scale in a fresh process so peak RSS is measured per scale."""
+    results = []
+    for filings in args.scales:
+        command = [
+            sys.executable, __file__, "--json",
+            "--filings", str(filings),
+            "--pages", str(args.pages),
+            "--dim", str(args.dim),
+            "--embed-latency", str(args.embed_latency),
+            "--seed", str(args.seed),
+            "--stall-ms", str(args.stall_ms),
+        ]  # fmt: skip
+        output = subprocess.run(command, check=True, capture_output=True, text=True)
+        results.append(json.loads(output.stdout.strip().splitlines()[-1]))
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--filings", type=int, default=1, help="Synthetic filings to ingest.")
+    parser.add_argument("--pages", type=int, default=120, help="Pages per synthetic filing.")
+    parser.add_argument("--parsed", type=Path, nargs="*", default=[], help="Pickled parsed documents to ingest as well.")
+    parser.add_argument("--scales", type=int, nargs="+", help="Sweep these filing counts, one process each.")
+    parser.add_argument("--embed-latency", type=float, default=0.0, help="Seconds per embedding call.")
+    parser.add_argument("--dim", type=int, default=256, help="Embedding dimension.")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the synthetic text.")
+    parser.add_argument("--stall-ms", type=float, default=50, help="Report event-loop stalls longer than this.")
+    parser.add_argument("--json", action="store_true", help="Print a single JSON result line.")
+    parser.add_argument("--output", type=Path, help="Write results as JSON here.")
+    args = parser.parse_args()
+
+    results = sweep(args) if args.scales else [asyncio.run(run(args))]
+    if args.json:
+        print(json.dumps(results[0]))
+    else:
+        for result in results:
+            print(
+                f"{result['filings']} filings, {result['pages']} pages -> {result['chunks']} chunks "
+                f"in {result['wall_seconds']}s: {result['pages_per_second']} pages/s, "
+                f"{result['chunks_per_second']} chunks/s, {result['embedding_calls']} embedding "
+                f"calls, peak RSS {result['peak_rss_mb']} MB, {result['loop_stalls']} loop "
+                f"stalls (max {result['max_stall_ms']} ms)"
+            )
+            for node, seconds in result["stage_seconds"].items():
+                print(f"  {node:<16} {seconds:.3f}s")
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2))
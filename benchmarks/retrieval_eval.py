@@ -0,0 +1,259 @@
+"""Evaluate retrieval quality against latency across retriever configurations.
+
+Each question in `benchmarks/data/retrieval_eval_set.json` (the filing
+questions from `sample_test_questions.md`) is labelled with the 10-K items that
+answer it. Items resolve to (source_file, page) sets through a section index
+shaped like `nosql/*_sections.json`, so a retrieved chunk is relevant when its
+`source_file` and `page_number` metadata fall inside an expected item.
+
+For every configuration the harness reports:
+
+- recall@k: the fraction of a question's expected items hit by at least one
+  retrieved chunk, averaged over questions;
+- MRR: the mean reciprocal rank of the first relevant chunk;
+- p50/p95 search latency (embedding plus vector search) in milliseconds;
+
+and marks the configurations on the recall/latency Pareto front.
+
+By default the index is a synthetic corpus (`retrieval_graph.synthetic`) in the
+"local" store with `local/hashing` embeddings, so the sweep covers chunking,
+embedding dimension, k and company filtering offline. With `--configured` the
+sweep runs against the retriever named by the environment instead (e.g. a
+Pinecone index holding the real filings) and resolves pages from `nosql/`;
+only k and filtering are swept then.
+
+Filtering mirrors `graph.retrieve`: one detected company filters on its file,
+several split k across per-company searches, none searches unfiltered.
+
+Usage:
+    python benchmarks/retrieval_eval.py
+    python benchmarks/retrieval_eval.py --chunkings page paragraph --ks 4 8 --dims 256
+    python benchmarks/retrieval_eval.py --configured --sections-dir nosql --output eval.json
+"""
+
+import argparse
+import asyncio
+import importlib
+import json
+import time
+from pathlib import Path
+from typing import Any, Optional
+
+from _stats import summarize
+from langchain_core.documents import Document
+from langchain_core.runnables import RunnableConfig
+from langchain_core.vectorstores import VectorStoreRetriever
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from retrieval_graph import retrieval
+from retrieval_graph.local import get_local_store
+from retrieval_graph.synthetic import SyntheticFiling, generate_corpus
+
+# The package re-exports the compiled graph as `retrieval_graph.graph`.
+graph_module = importlib.import_module("retrieval_graph.graph")
+
+ROOT = Path(__file__).resolve().parent.parent
+EVAL_SET = Path(__file__).resolve().parent / "data" / "retrieval_eval_set.json"
+CHUNKINGS = ("page", "paragraph", "recursive-500")
+
+
+def section_pages(sections: dict[str, Any], num_pages: Optional[int] = None) -> dict[str, set[int]]:
+    """Map each section name to the pages it spans.
+
+    A section runs from its start page up to the page before the next section
+    that starts later; the last one runs to `num_pages` (or just its start).
+    """
+    entries = sections["sections"]
+    starts = sorted({entry["start_page_number"] for entry in entries})
+    pages = {}
+    for entry in entries:
+        start = entry["start_page_number"]
+        later = [page for page in starts if page > start]
+        end = later[0] - 1 if later else (num_pages or start)
+        pages[entry["section_name"]] = set(range(start, end + 1))
+    return pages
+
+
+def load_eval_set(
+    index: dict[str, dict[str, set[int]]], path: Path = EVAL_SET
+) -> list[dict[str, Any]]:
+    """Load the labelled questions with every expected item resolved to pages."""
+    questions = json.loads(path.read_text())["questions"]
+    for question in questions:
+        question["targets"] = [
+            (target["source_file"], index[target["source_file"]][target["section"]])
+            for target in question["expected"]
+        ]
+    return questions
+
+
+def chunk(filings: list[SyntheticFiling], chunking: str) -> tuple[list[str], list[dict[str, Any]]]:
+    """Split the pages of every filing with the named strategy."""
+    splitter = None
+    if chunking.startswith("recursive-"):
+        size = int(chunking.split("-", 1)[1])
+        splitter = RecursiveCharacterTextSplitter(chunk_size=size, chunk_overlap=size // 10)
+    texts, metadatas = [], []
+    for filing in filings:
+        for page in filing.pages():
+            if chunking == "page":
+                pieces = [page.page_content]
+            elif chunking == "paragraph":
+                pieces = page.page_content.split("\n\n")
+            elif splitter is not None:
+                pieces = splitter.split_text(page.page_content)
+            else:
+                raise ValueError(f"Unknown chunking: {chunking}")
+            texts.extend(pieces)
+            metadatas.extend({**page.metadata, "user_id": "1111111111"} for _ in pieces)
+    return texts, metadatas
+
+
+async def search(
+    retriever: VectorStoreRetriever, question: str, k: int, filtered: bool, config: RunnableConfig
+) -> list[Document]:
+    """Search the way `graph.retrieve` does, optionally without company filters."""
+    companies = graph_module.detect_companies(question) if filtered else []
+    if len(companies) > 1:
+        per_company = max(1, k // len(companies))
+        results = await asyncio.gather(
+            *(
+                retrieval.asearch(
+                    retriever, question, config, filter={"source_file": company}, k=per_company
+                )
+                for company in companies
+            )
+        )
+        return [doc for docs in results for doc in docs]
+    search_filter = {"source_file": companies[0]} if companies else None
+    return await retrieval.asearch(retriever, question, config, filter=search_filter, k=k)
+
+
+def score(docs: list[Document], targets: list[tuple[str, set[int]]]) -> tuple[float, float]:
+    """Return (recall, reciprocal rank) of one result list against its targets."""
+
+    def hits(doc: Document, target: tuple[str, set[int]]) -> bool:
+        source_file, pages = target
+        return doc.metadata.get("source_file") == source_file and doc.metadata.get("page_number") in pages
+
+    found = sum(any(hits(doc, target) for doc in docs) for target in targets)
+    rank = next(
+        (i for i, doc in enumerate(docs, 1) if any(hits(doc, target) for target in targets)),
+        None,
+    )
+    return found / len(targets), 1 / rank if rank else 0.0
+
+
+async def evaluate(
+    questions: list[dict[str, Any]], config: RunnableConfig, k: int, filtered: bool, repeats: int
+) -> dict[str, Any]:
+    """Score one configuration over every question."""
+    recalls, ranks, latencies = [], [], []
+    with retrieval.make_retriever(config) as retriever:
+        for question in questions:
+            for _ in range(repeats):
+                start = time.perf_counter()
+                docs = await search(retriever, question["question"], k, filtered, config)
+                latencies.append((time.perf_counter() - start) * 1000)
+            recall, reciprocal_rank = score(docs, question["targets"])
+            recalls.append(recall)
+            ranks.append(reciprocal_rank)
+    return {
+        "recall": round(sum(recalls) / len(recalls), 3),
+        "mrr": round(sum(ranks) / len(ranks), 3),
+        "latency_ms": summarize(latencies),
+    }
+
+
+def mark_pareto(results: list[dict[str, Any]]) -> None:
+    """Flag the results no other result beats on both recall and p50 latency."""
+    for result in results:
+        recall, latency = result["recall"], result["latency_ms"]["p50"]
+        result["pareto"] = not any(
+            other["recall"] >= recall
+            and other["latency_ms"]["p50"] <= latency
+            and (other["recall"] > recall or other["latency_ms"]["p50"] < latency)
+            for other in results
+        )
+
+
+def base_config(embedding_model: Optional[str] = None) -> RunnableConfig:
+    """Return a run config with the retrieval cache off, on the local store if given a model."""
+    configurable: dict[str, Any] = {"retrieval_cache_enabled": False}
+    if embedding_model:
+        configurable.update(retriever_provider="local", embedding_model=embedding_model)
+    return {"configurable": configurable}
+
+
+async def main(args: argparse.Namespace) -> list[dict[str, Any]]:
+    """Run the sweep and return one result per configuration."""
+    results = []
+    if args.configured:
+        index = {
+            path.name.replace("_sections.json", ".pdf"): section_pages(json.loads(path.read_text()))
+            for path in sorted(args.sections_dir.glob("*_sections.json"))
+        }
+        questions = load_eval_set(index)
+        for k in args.ks:
+            for filtered in args.filters:
+                result = await evaluate(questions, base_config(), k, filtered, args.repeats)
+                results.append({"chunking": "indexed", "dim": None, "k": k, "filter": filtered, **result})
+        return results
+
+    filings = list(generate_corpus(4, 1, args.pages, seed=args.seed))
+    index = {filing.source_file: section_pages(filing.sections(), filing.num_pages) for filing in filings}
+    questions = load_eval_set(index)
+    for dim in args.dims:
+        embedding_model = f"local/hashing?dim={dim}&latency={args.embed_latency}"
+        store = get_local_store(embedding_model, retrieval.make_text_encoder(embedding_model))
+        store.search_latency = args.search_latency
+        for chunking in args.chunkings:
+            store.delete()
+            texts, metadatas = chunk(filings, chunking)
+            store.add_texts(texts, metadatas)
+            for k in args.ks:
+                for filtered in args.filters:
+                    result = await evaluate(
+                        questions, base_config(embedding_model), k, filtered, args.repeats
+                    )
+                    results.append(
+                        {"chunking": chunking, "dim": dim, "k": k, "filter": filtered,
+                         "chunks": len(texts), **result}
+                    )  # fmt: skip
+    return results
+
+
+def print_table(results: list[dict[str, Any]]) -> None:
+    """Print the results as a markdown table, Pareto-optimal rows first."""
+    print("| pareto | chunking | dim | k | filter | recall@k | MRR | p50 ms | p95 ms |")
+    print("|---|---|---|---|---|---|---|---|---|")
+    ordered = sorted(results, key=lambda r: (not r["pareto"], r["latency_ms"]["p50"], -r["recall"]))
+    for r in ordered:
+        print(
+            f"| {'*' if r['pareto'] else ''} | {r['chunking']} | {r['dim'] or '-'} | {r['k']} "
+            f"| {'on' if r['filter'] else 'off'} | {r['recall']:.3f} | {r['mrr']:.3f} "
+            f"| {r['latency_ms']['p50']:.2f} | {r['latency_ms']['p95']:.2f} |"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chunkings", nargs="+", default=list(CHUNKINGS), help="Chunking strategies: page, paragraph, recursive-N.")
+    parser.add_argument("--dims", type=int, nargs="+", default=[128, 512], help="Embedding dimensions.")
+    parser.add_argument("--ks", type=int, nargs="+", default=[2, 4, 8], help="Chunks retrieved per question.")
+    parser.add_argument("--filters", type=lambda v: v == "on", nargs="+", default=[True, False], help="Company filtering: on, off.")
+    parser.add_argument("--pages", type=int, default=60, help="Pages per synthetic filing.")
+    parser.add_argument("--embed-latency", type=float, default=0.0, help="Seconds per embedding call.")
+    parser.add_argument("--search-latency", type=float, default=0.0, help="Seconds per vector search.")
+    parser.add_argument("--repeats", type=int, default=3, help="Timed searches per question.")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the synthetic text.")
+    parser.add_argument("--configured", action="store_true", help="Evaluate the retriever configured by the environment.")
+    parser.add_argument("--sections-dir", type=Path, default=ROOT / "nosql", help="Section indexes for --configured.")
+    parser.add_argument("--output", type=Path, help="Write results as JSON here.")
+    args = parser.parse_args()
+
+    results = asyncio.run(main(args))
+    mark_pareto(results)
+    print_table(results)
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2))
@@ -0,0 +1,140 @@
+"""Benchmark the retrieval graph end to end without network access.
+
+Runs `retrieval_graph.graph.graph` on the questions in
+`sample_test_questions.md` with the deterministic local providers
+(`local/scripted` chat model, `local/hashing` embeddings and the "local"
+retriever, seeded with paragraph chunks of a synthetic corpus for the four
+bundled companies; raise --years/--pages to test at 10k-1M chunks). Each provider sleeps for a configurable latency to
+emulate the remote call it replaces. Reports p50/p95/p99 per node and end to end, plus throughput with
+N concurrent sessions.
+
+Usage:
+    python benchmarks/retrieval_graph_latency.py --sessions 16 --rounds 2
+    python benchmarks/retrieval_graph_latency.py --llm-latency 0 --output bench.json
+"""
+
+import argparse
+import asyncio
+import importlib
+import json
+import random
+import re
+import time
+from pathlib import Path
+from typing import Any
+
+from _stats import NodeTimer, summarize
+
+from retrieval_graph import retrieval
+from retrieval_graph.local import get_local_store
+from retrieval_graph.synthetic import generate_corpus
+from retrieval_graph.tools import tool_cache
+
+# The package re-exports the compiled graph as `retrieval_graph.graph`.
+graph_module = importlib.import_module("retrieval_graph.graph")
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def load_questions(path: Path = ROOT / "sample_test_questions.md") -> list[str]:
+    """Return the numbered questions from the sample questions file."""
+    return re.findall(r"^\d+\.\s+(.+?)\s*$", path.read_text(), flags=re.M)
+
+
+def seed_store(args: argparse.Namespace, embedding_model: str) -> int:
+    """Fill the local store with paragraph chunks of a synthetic corpus."""
+    store = get_local_store(embedding_model, retrieval.make_text_encoder(embedding_model))
+    store.search_latency = args.search_latency
+    store.delete()
+    for filing in generate_corpus(4, args.years, args.pages, seed=args.seed):
+        texts, metadatas = [], []
+        for page in filing.pages():
+            for paragraph in page.page_content.split("\n\n"):
+                texts.append(paragraph)
+                metadatas.append({**page.metadata, "user_id": "1111111111"})
+        store.add_texts(texts, metadatas)
+    return len(store)
+
+
+async def main(args: argparse.Namespace) -> dict[str, Any]:
+    """Run every session and return the latency summary."""
+    embedding_model = f"local/hashing?dim={args.dim}&latency={args.embed_latency}"
+    # Web search needs network access, so only the industry tool is scripted.
+    chat_model = f"local/scripted?latency={args.llm_latency}&tools=industry_analysis_tool"
+    chunks = seed_store(args, embedding_model)
+    graph_module.answer_cache.clear()
+    retrieval.retrieval_cache.clear()
+    tool_cache.clear()
+
+    questions = load_questions()
+    timer = NodeTimer()
+    end_to_end: list[float] = []
+
+    async def session(i: int) -> None:
+        order = random.Random(args.seed + i).sample(questions, len(questions))
+        for round_ in range(args.rounds):
+            for j, question in enumerate(order):
+                config = {
+                    "configurable": {
+                        "thread_id": f"bench-{i}-{round_}-{j}",
+                        "retriever_provider": "local",
+                        "embedding_model": embedding_model,
+                        "query_model": chat_model,
+                        "response_model": chat_model,
+                        "answer_cache_enabled": args.cache,
+                        "retrieval_cache_enabled": args.cache,
+                        "tool_cache_enabled": args.cache,
+                    },
+                    "callbacks": [timer],
+                }
+                start = time.perf_counter()
+                await graph_module.graph.ainvoke(
+                    {"messages": [("user", question)]}, config
+                )
+                end_to_end.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(session(i) for i in range(args.sessions)))
+    elapsed = time.perf_counter() - start
+
+    return {
+        "settings": {k: v for k, v in vars(args).items() if k != "output"},
+        "indexed_chunks": chunks,
+        "runs": len(end_to_end),
+        "wall_seconds": round(elapsed, 3),
+        "runs_per_second": round(len(end_to_end) / elapsed, 1),
+        "end_to_end_ms": summarize(end_to_end),
+        "nodes_ms": {
+            node: summarize(values) for node, values in sorted(timer.latencies.items())
+        },
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=8, help="Concurrent sessions.")
+    parser.add_argument("--rounds", type=int, default=1, help="Passes over the questions per session.")
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="Seconds per chat call.")
+    parser.add_argument("--embed-latency", type=float, default=0.01, help="Seconds per embedding call.")
+    parser.add_argument("--search-latency", type=float, default=0.02, help="Seconds per vector search.")
+    parser.add_argument("--years", type=int, default=1, help="Synthetic filings per company.")
+    parser.add_argument("--pages", type=int, default=30, help="Pages per synthetic filing.")
+    parser.add_argument("--dim", type=int, default=256, help="Embedding dimension.")
+    parser.add_argument("--cache", action="store_true", help="Enable the answer, retrieval and tool caches.")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the question order.")
+    parser.add_argument("--output", type=Path, help="Write results as JSON here.")
+    args = parser.parse_args()
+
+    result = asyncio.run(main(args))
+    print(
+        f"{result['runs']} runs in {result['wall_seconds']}s "
+        f"({result['runs_per_second']} runs/s, {args.sessions} sessions, "
+        f"{result['indexed_chunks']} chunks indexed)"
+    )
+    for name, stats in [("end_to_end", result["end_to_end_ms"]), *result["nodes_ms"].items()]:
+        print(
+            f"  {name:<18} n={stats['count']:<5} p50={stats['p50']:.2f}ms "
+            f"p95={stats['p95']:.2f}ms p99={stats['p99']:.2f}ms"
+        )
+    if args.output:
+        args.output.write_text(json.dumps(result, indent=2))
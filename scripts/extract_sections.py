@@ -4,15 +4,15 @@ Simple two-step section processing script:
 2. Build 2-layer hierarchy from raw sections using LLM
 """
 import asyncio
-import pickle
 import json
-import os
 from pathlib import Path
 from pydantic import BaseModel, Field
 from typing import Optional
 from langchain_anthropic import ChatAnthropic
 from dotenv import load_dotenv
 
+from retrieval_graph.parse_cache import STREAMING_PARSE_OPTIONS, ParseCache, pdf_cache_key
+
 # Load environment variables
 load_dotenv()
 
@@ -63,13 +63,13 @@ async def extract_raw_sections(documents, source_file):
     
     for i in range(0, len(documents), chunk_size):
         chunk_docs = documents[i:i + chunk_size]
-        start_page = chunk_docs[0].metadata.get('page_number', 0)
-        end_page = chunk_docs[-1].metadata.get('page_number', 0)
+        start_page = chunk_docs[0].metadata.get('page', 0)
+        end_page = chunk_docs[-1].metadata.get('page', 0)
         
         # Combine chunk content
         chunk_content = ""
         for doc in chunk_docs:
-            page_num = doc.metadata.get('page_number', 0)
+            page_num = doc.metadata.get('page', 0)
             chunk_content += f"\n\n=== PAGE {page_num} ===\n{doc.page_content}"
         
         # Extract sections from this chunk
@@ -177,17 +177,17 @@ async def main():
     pdf_file = pdf_files[0]
     source_file = pdf_file.name
     
-    # Load parsed documents from cache
-    cache_file = f"cache/{pdf_file.stem}_parsed_docs.pkl"
+    # Load parsed documents from the parse cache
+    cache = ParseCache()
+    ref = cache.get(pdf_cache_key(pdf_file, STREAMING_PARSE_OPTIONS))
     
-    if not os.path.exists(cache_file):
-        print(f"❌ Parsed documents not found: {cache_file}")
+    if ref is None:
+        print(f"❌ Parsed documents not found for: {source_file}")
         print("Run scripts/save_parsed_docs.py first!")
         return
     
-    print(f"📋 Loading documents from cache: {cache_file}")
-    with open(cache_file, "rb") as f:
-        documents = pickle.load(f)
+    print(f"📋 Loading documents from the parse cache: {source_file}")
+    documents = cache.load_pages(ref)
     
     print(f"✅ Loaded {len(documents)} documents")
     
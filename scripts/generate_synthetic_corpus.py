@@ -0,0 +1,31 @@
+"""Generate a synthetic 10-K corpus for scaling tests and benchmarks.
+
+Writes <stem>_parsed_docs.pkl (a pickled list of parsed pages) and
+<stem>_sections.json (the format of nosql/) per filing.
+
+Example (about 4 x 5 x 300 x 3 = 18k chunks):
+    python scripts/generate_synthetic_corpus.py --companies 4 --years 5 --pages 300
+"""
+import argparse
+from pathlib import Path
+
+from retrieval_graph.synthetic import generate_corpus, write_corpus
+
+
+def main() -> None:
+    """Parse the command line and write the corpus."""
+    parser = argparse.ArgumentParser(description="Generate a synthetic 10-K corpus.")
+    parser.add_argument("--companies", type=int, default=4)
+    parser.add_argument("--years", type=int, default=1)
+    parser.add_argument("--pages", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", type=Path, default=Path("cache/synthetic"))
+    args = parser.parse_args()
+
+    filings = generate_corpus(args.companies, args.years, args.pages, seed=args.seed)
+    written = write_corpus(args.out, filings)
+    print(f"✅ Wrote {len(written) // 2} synthetic filings to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,55 +1,51 @@
 """
-Simple script to run UpstageDocumentParseLoader once and save results to local file.
+Simple script to run the Upstage document parser once and save results to the parse cache.
 This avoids repeated API calls during development/testing.
+
+Pages are stored in the content-addressed parse cache (cache/parsed, pages in
+cache/blobs), keyed by the PDF bytes and PARSE_OPTIONS, so a PDF that has not
+changed is never parsed twice and an amended one is always re-parsed. These are
+the options and parser of a streaming ingestion, and the pages are stored as
+the parser returns them, so the ingestion graph reuses the entries.
 """
 import asyncio
-import pickle
-import os
 from pathlib import Path
-from langchain_upstage import UpstageDocumentParseLoader
 from dotenv import load_dotenv
 
+from retrieval_graph.parse_cache import STREAMING_PARSE_OPTIONS, ParseCache, pdf_cache_key
+from retrieval_graph.parsing import UpstageParser, parse_pdf_ranges
+
 # Load environment variables
 load_dotenv()
 
+# One document per page, with `page` and `source_file` metadata
+PARSE_OPTIONS = STREAMING_PARSE_OPTIONS
+
+
 async def save_parsed_docs():
-    # Load the first PDF file from documents folder
     docs_folder = Path("documents")
-    pdf_files = list(docs_folder.glob("*.pdf"))
-    
+    pdf_files = sorted(docs_folder.glob("*.pdf"))
+
     if not pdf_files:
         print("No PDF files found in documents/ folder")
         return
-    
-    # Use the first PDF file found
-    pdf_file = pdf_files[0]
-    print(f"Parsing PDF: {pdf_file.name}")
-    
-    # Parse with UpstageDocumentParseLoader
-    loader = UpstageDocumentParseLoader(
-        str(pdf_file), 
-        ocr="force",
-        split="page"
-    )
-    documents = await loader.aload()
-    
-    # Add page numbers to each document
-    for i, doc in enumerate(documents):
-        doc.metadata.update({
-            "page_number": i + 1,
-            "source_file": pdf_file.name
-        })
-    
-    # Create cache directory
-    Path("cache").mkdir(exist_ok=True)
-    
-    # Save parsed documents
-    cache_file = f"cache/{pdf_file.stem}_parsed_docs.pkl"
-    with open(cache_file, "wb") as f:
-        pickle.dump(documents, f)
-    
-    print(f"✅ Saved {len(documents)} parsed documents to {cache_file}")
-    print(f"📄 Document has {len(documents)} pages")
+
+    cache = ParseCache()
+    for pdf_file in pdf_files:
+        key = pdf_cache_key(pdf_file, PARSE_OPTIONS)
+        if cache.get(key) is not None:
+            print(f"⏭️  Already cached: {pdf_file.name}")
+            continue
+
+        print(f"Parsing PDF: {pdf_file.name}")
+
+        # Parse 10-page ranges with the Upstage document parser, concurrently
+        documents = await parse_pdf_ranges(pdf_file, UpstageParser(), PARSE_OPTIONS)
+
+        ref = cache.put(key, documents, source_file=pdf_file.name, options=PARSE_OPTIONS)
+
+        print(f"✅ Saved {ref.count} parsed documents to the parse cache ({key[:12]})")
+        print(f"📄 Document has {ref.count} pages")
 
 if __name__ == "__main__":
-    asyncio.run(save_parsed_docs())
\ No newline at end of file
+    asyncio.run(save_parsed_docs())
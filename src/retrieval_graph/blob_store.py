@@ -0,0 +1,190 @@
+"""Content-addressed blob store for large document payloads.
+
+LangGraph checkpoints the full state after every node, so passing a parsed
+10-K (and then every one of its chunks) through `IndexState.docs` copies and
+serializes the whole payload at each transition. This module lets the
+document processing nodes write documents once to a local directory and keep
+only a small `DocumentRef` in the graph state.
+
+Blobs are gzip-compressed JSON lines, one document per line, stored under the
+SHA-256 of their uncompressed content. Writing identical content twice is a
+no-op, and refs are resolved lazily by streaming the blob line by line, so a
+node never has to hold more than one document in memory unless it wants to.
+
+Classes:
+    DocumentRef: Lightweight, checkpoint-friendly handle to a stored blob.
+    BlobStore: Local content-addressed store for document sequences.
+    DocumentWriter: Streaming writer returned by `BlobStore.writer`.
+"""
+
+from __future__ import annotations
+
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+from dataclasses import dataclass
+from pathlib import Path
+from types import TracebackType
+from typing import IO, Any, Iterable, Iterator, Optional, Type, Union
+
+from langchain_core.documents import Document
+
+
+@dataclass(frozen=True)
+class DocumentRef:
+    """Reference to a sequence of documents stored in a `BlobStore`.
+
+    Only the key and a couple of counters are stored, so checkpointing a ref
+    costs the same regardless of how large the underlying documents are.
+    """
+
+    key: str
+    """SHA-256 hex digest of the uncompressed blob content."""
+
+    count: int
+    """Number of documents in the blob."""
+
+    nbytes: int
+    """Size of the uncompressed blob content in bytes."""
+
+
+def _encode_document(doc: Document) -> bytes:
+    record: dict[str, Any] = {
+        "page_content": doc.page_content,
+        "metadata": doc.metadata,
+    }
+    doc_id = getattr(doc, "id", None)
+    if doc_id is not None:
+        record["id"] = doc_id
+    return json.dumps(record, ensure_ascii=False, default=str).encode("utf-8") + b"\n"
+
+
+def _decode_document(line: bytes) -> Document:
+    return Document(**json.loads(line))
+
+
+class DocumentWriter:
+    """Stream documents into a `BlobStore` without materializing them.
+
+    Documents are hashed and compressed as they are written. On close the
+    temporary file is moved to its content address, or discarded if a blob
+    with the same content already exists.
+
+    Examples:
+        >>> store = BlobStore("cache/blobs")  # doctest: +SKIP
+        >>> with store.writer() as writer:  # doctest: +SKIP
+        ...     for doc in docs:
+        ...         writer.write(doc)
+        >>> ref = writer.ref  # doctest: +SKIP
+    """
+
+    def __init__(self, store: BlobStore) -> None:
+        """Open a temporary file inside the store's root directory."""
+        self._store = store
+        self._hasher = hashlib.sha256()
+        self._count = 0
+        self._nbytes = 0
+        fd, tmp_path = tempfile.mkstemp(dir=store.root, suffix=".tmp")
+        self._tmp_path = Path(tmp_path)
+        self._raw: IO[bytes] = os.fdopen(fd, "wb")
+        self._gz = gzip.GzipFile(fileobj=self._raw, mode="wb", mtime=0)
+        self.ref: Optional[DocumentRef] = None
+
+    def write(self, doc: Document) -> None:
+        """Append a single document to the blob."""
+        line = _encode_document(doc)
+        self._hasher.update(line)
+        self._gz.write(line)
+        self._count += 1
+        self._nbytes += len(line)
+
+    def write_all(self, docs: Iterable[Document]) -> None:
+        """Append every document from an iterable to the blob."""
+        for doc in docs:
+            self.write(doc)
+
+    def close(self) -> DocumentRef:
+        """Finalize the blob and return its reference."""
+        if self.ref is not None:
+            return self.ref
+        self._gz.close()
+        self._raw.close()
+        key = self._hasher.hexdigest()
+        target = self._store.path(key)
+        if target.exists():
+            self._tmp_path.unlink()
+        else:
+            target.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(self._tmp_path, target)
+        self.ref = DocumentRef(key=key, count=self._count, nbytes=self._nbytes)
+        return self.ref
+
+    def abort(self) -> None:
+        """Discard everything written so far."""
+        self._gz.close()
+        self._raw.close()
+        self._tmp_path.unlink(missing_ok=True)
+
+    def __enter__(self) -> DocumentWriter:
+        """Return the writer itself."""
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc: Optional[BaseException],
+        tb: Optional[TracebackType],
+    ) -> None:
+        """Finalize the blob, or discard it if the block raised."""
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+class BlobStore:
+    """Local content-addressed store for sequences of documents.
+
+    Args:
+        root (Union[str, Path]): Directory that holds the blobs. Created on
+            first use.
+    """
+
+    def __init__(self, root: Union[str, Path] = "cache/blobs") -> None:
+        """Create the store rooted at the given directory."""
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def path(self, key: str) -> Path:
+        """Return the on-disk location of a blob key."""
+        return self.root / key[:2] / f"{key[2:]}.jsonl.gz"
+
+    def exists(self, ref: DocumentRef) -> bool:
+        """Check whether the blob behind a reference is present."""
+        return self.path(ref.key).exists()
+
+    def writer(self) -> DocumentWriter:
+        """Open a streaming writer for a new blob."""
+        return DocumentWriter(self)
+
+    def put_documents(self, docs: Iterable[Document]) -> DocumentRef:
+        """Store documents and return a reference to them."""
+        with self.writer() as writer:
+            writer.write_all(docs)
+        return writer.close()
+
+    def iter_documents(self, ref: DocumentRef) -> Iterator[Document]:
+        """Lazily yield the documents behind a reference, one at a time."""
+        with gzip.open(self.path(ref.key), "rb") as f:
+            for line in f:
+                yield _decode_document(line)
+
+    def load_documents(self, ref: DocumentRef) -> list[Document]:
+        """Load every document behind a reference into memory."""
+        return list(self.iter_documents(ref))
+
+    def delete(self, ref: DocumentRef) -> None:
+        """Remove a blob from the store if it exists."""
+        self.path(ref.key).unlink(missing_ok=True)
@@ -0,0 +1,359 @@
+"""Batched, concurrent, retrying bulk upserts into a vector store.
+
+A single `aadd_documents` call with a few hundred 4096-dimensional chunks can
+exceed a provider's request limits (Pinecone accepts at most 2 MB and 1000
+vectors per upsert), and one transient error used to fail the whole file.
+`BulkWriter` splits the chunks into batches bounded by both vector count and
+estimated payload size, upserts the batches concurrently under a limit,
+retries a failed batch with exponential backoff and full jitter, and reports
+the throughput of every batch.
+
+The destination is pluggable: `VectorStoreBackend` writes to any LangChain
+vector store with the limits of its provider, and `SimulatedBackend` is a
+local stand-in with configurable latency and transient failures for tests
+and benchmarks.
+
+Classes:
+    UpsertBackend: Protocol of the upsert destinations.
+    VectorStoreBackend: Upsert into a LangChain vector store.
+    SimulatedBackend: Local stand-in with latency and transient failures.
+    BatchResult: Outcome and throughput of one upserted batch.
+    BulkUpsertError: Raised when batches still fail after their retries.
+    BulkWriter: Split, upsert concurrently and retry.
+
+Functions:
+    make_upsert_backend: Create the backend for a retriever provider.
+    estimate_payload_bytes: Estimate the request bytes of a document and its vector.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import random
+import time
+from dataclasses import dataclass
+from typing import Optional, Protocol, Sequence
+
+from langchain_core.documents import Document
+from langchain_core.vectorstores import VectorStore
+
+from retrieval_graph import telemetry
+
+logger = logging.getLogger(__name__)
+
+# Estimated request bytes per vector: a 4096-dimensional embedding serialized
+# as JSON floats of about ten characters each.
+DEFAULT_VECTOR_BYTES = 4096 * 10
+
+# (max vectors, max bytes) per upsert request, by retriever provider.
+PROVIDER_LIMITS: dict[str, tuple[int, int]] = {
+    "pinecone": (1000, 2 * 1024 * 1024),
+    "elastic": (500, 10 * 1024 * 1024),
+    "elastic-local": (500, 10 * 1024 * 1024),
+    "mongodb": (1000, 16 * 1024 * 1024),
+    "local": (1000, 64 * 1024 * 1024),
+}
+
+
+class UpsertBackend(Protocol):
+    """Protocol of the destinations written by `BulkWriter`."""
+
+    max_batch_vectors: int
+    max_batch_bytes: int
+
+    async def upsert(self, docs: list[Document], ids: list[str]) -> None:
+        """Embed and upsert one batch of documents under the given IDs."""
+        ...
+
+
+class VectorStoreBackend:
+    """Upsert into a LangChain vector store.
+
+    Args:
+        vectorstore (VectorStore): The destination; it embeds the documents.
+        max_batch_vectors (int): Vectors per request.
+        max_batch_bytes (int): Estimated bytes per request.
+    """
+
+    def __init__(
+        self,
+        vectorstore: VectorStore,
+        *,
+        max_batch_vectors: int = 100,
+        max_batch_bytes: int = 2 * 1024 * 1024,
+    ) -> None:
+        """Create the backend."""
+        self.vectorstore = vectorstore
+        self.max_batch_vectors = max_batch_vectors
+        self.max_batch_bytes = max_batch_bytes
+
+    async def upsert(self, docs: list[Document], ids: list[str]) -> None:
+        """Embed and upsert one batch with `aadd_documents`."""
+        await self.vectorstore.aadd_documents(docs, ids=ids)
+
+
+class SimulatedBackend:
+    """Local stand-in with latency and transient failures.
+
+    Each call sleeps `latency` seconds; the first `failures` calls raise
+    `ConnectionError`. Successful batches are forwarded to `inner` if given
+    and kept in `written` otherwise.
+
+    Args:
+        inner (Optional[UpsertBackend]): Backend receiving successful batches.
+        latency (float): Seconds per call.
+        failures (int): Calls that fail before the backend recovers.
+        max_batch_vectors (int): Vectors per request.
+        max_batch_bytes (int): Estimated bytes per request.
+    """
+
+    def __init__(
+        self,
+        inner: Optional[UpsertBackend] = None,
+        *,
+        latency: float = 0.0,
+        failures: int = 0,
+        max_batch_vectors: int = 100,
+        max_batch_bytes: int = 2 * 1024 * 1024,
+    ) -> None:
+        """Create the backend."""
+        self.inner = inner
+        self.latency = latency
+        self.failures = failures
+        self.max_batch_vectors = max_batch_vectors
+        self.max_batch_bytes = max_batch_bytes
+        self.calls = 0
+        self.active = self.peak_active = 0
+        self.written: dict[str, Document] = {}
+
+    async def upsert(self, docs: list[Document], ids: list[str]) -> None:
+        """Simulate one upsert request."""
+        self.calls += 1
+        self.active += 1
+        self.peak_active = max(self.peak_active, self.active)
+        try:
+            if self.latency:
+                await asyncio.sleep(self.latency)
+            if self.failures > 0:
+                self.failures -= 1
+                raise ConnectionError("simulated transient upsert failure")
+            if self.inner is not None:
+                await self.inner.upsert(docs, ids)
+            else:
+                self.written.update(zip(ids, docs))
+        finally:
+            self.active -= 1
+
+
+def make_upsert_backend(provider: str, vectorstore: VectorStore) -> VectorStoreBackend:
+    """Create the backend for a retriever provider, with the provider's limits.
+
+    Args:
+        provider (str): `retriever_provider` from the configuration.
+        vectorstore (VectorStore): The provider's vector store.
+
+    Returns:
+        VectorStoreBackend: The backend.
+    """
+    max_vectors, max_bytes = PROVIDER_LIMITS.get(provider, (100, 2 * 1024 * 1024))
+    return VectorStoreBackend(
+        vectorstore, max_batch_vectors=max_vectors, max_batch_bytes=max_bytes
+    )
+
+
+@dataclass(frozen=True)
+class BatchResult:
+    """Outcome and throughput of one upserted batch."""
+
+    index: int
+    """Position of the batch in the write."""
+
+    vectors: int
+    """Documents in the batch."""
+
+    nbytes: int
+    """Estimated request size."""
+
+    seconds: float
+    """Time from the first attempt to success, including retries."""
+
+    attempts: int
+    """Requests made, 1 if the first one succeeded."""
+
+    @property
+    def vectors_per_second(self) -> float:
+        """Throughput of the batch."""
+        return self.vectors / self.seconds if self.seconds else float("inf")
+
+
+class BulkUpsertError(Exception):
+    """Raised when batches still fail after their retries.
+
+    Args:
+        errors (list[BaseException]): The last error of every failed batch.
+        written (list[str]): IDs of the documents in the batches that succeeded.
+    """
+
+    def __init__(self, errors: list[BaseException], written: list[str]) -> None:
+        """Create the error."""
+        super().__init__(
+            f"{len(errors)} upsert batch(es) failed; first error: {errors[0]!r}"
+        )
+        self.errors = errors
+        self.written = written
+
+
+def estimate_payload_bytes(doc: Document, vector_bytes: int = DEFAULT_VECTOR_BYTES) -> int:
+    """Estimate the request bytes of one document and its vector.
+
+    Args:
+        doc (Document): The document, with its text and metadata.
+        vector_bytes (int): Estimated bytes of its vector.
+
+    Returns:
+        int: Text and JSON metadata bytes plus `vector_bytes`.
+    """
+    metadata = json.dumps(doc.metadata, default=str)
+    return len(doc.page_content.encode("utf-8")) + len(metadata) + vector_bytes
+
+
+class BulkWriter:
+    """Split documents into batches, upsert them concurrently and retry failures.
+
+    Args:
+        backend (UpsertBackend): The destination.
+        max_concurrency (int): Batches in flight at the same time.
+        retries (int): Retries per batch after the first attempt.
+        backoff (float): Base delay in seconds of the exponential backoff.
+        vector_bytes (int): Estimated request bytes per vector.
+    """
+
+    def __init__(
+        self,
+        backend: UpsertBackend,
+        *,
+        max_concurrency: int = 4,
+        retries: int = 3,
+        backoff: float = 0.5,
+        vector_bytes: int = DEFAULT_VECTOR_BYTES,
+    ) -> None:
+        """Create the writer."""
+        self.backend = backend
+        self.retries = retries
+        self.backoff = backoff
+        self.vector_bytes = vector_bytes
+        self.max_concurrency = max(1, max_concurrency)
+        self.results: list[BatchResult] = []
+
+    def split(self, docs: Sequence[Document]) -> list[tuple[int, int, int]]:
+        """Split documents into batches within the backend's limits.
+
+        Returns:
+            list[tuple[int, int, int]]: (start, stop, estimated bytes) of each
+            batch. A document larger than the byte limit gets a batch of its own.
+        """
+        batches: list[tuple[int, int, int]] = []
+        start = nbytes = 0
+        for index, doc in enumerate(docs):
+            size = estimate_payload_bytes(doc, self.vector_bytes)
+            if index > start and (
+                index - start >= self.backend.max_batch_vectors
+                or nbytes + size > self.backend.max_batch_bytes
+            ):
+                batches.append((start, index, nbytes))
+                start, nbytes = index, 0
+            nbytes += size
+        if start < len(docs):
+            batches.append((start, len(docs), nbytes))
+        return batches
+
+    async def _upsert_batch(
+        self, index: int, docs: list[Document], ids: list[str], nbytes: int
+    ) -> BatchResult:
+        started = time.perf_counter()
+        attempt = 0
+        while True:
+            try:
+                with telemetry.span("upsert"):
+                    await self.backend.upsert(docs, ids)
+                break
+            except Exception as e:
+                if attempt == self.retries:
+                    raise
+                # Full jitter: sleep a random fraction of the exponential backoff.
+                delay = random.uniform(0, self.backoff * 2**attempt)
+                attempt += 1
+                logger.warning(
+                    "Upsert batch %d failed (%s); retry %d/%d in %.2fs",
+                    index,
+                    e,
+                    attempt,
+                    self.retries,
+                    delay,
+                )
+                telemetry.increment("retrieval_graph_upsert_retries_total")
+                await asyncio.sleep(delay)
+        result = BatchResult(
+            index=index,
+            vectors=len(docs),
+            nbytes=nbytes,
+            seconds=time.perf_counter() - started,
+            attempts=attempt + 1,
+        )
+        logger.info(
+            "Upserted batch %d: %d vectors, %.1f KB in %.3fs (%.0f vectors/s, %d attempts)",
+            index,
+            result.vectors,
+            nbytes / 1024,
+            result.seconds,
+            result.vectors_per_second,
+            result.attempts,
+        )
+        telemetry.observe("retrieval_graph_upsert_batch_seconds", result.seconds)
+        return result
+
+    async def write(self, docs: Sequence[Document], ids: Sequence[str]) -> list[BatchResult]:
+        """Upsert documents under the given IDs.
+
+        Every batch is attempted even if another one fails for good.
+
+        Args:
+            docs (Sequence[Document]): The documents.
+            ids (Sequence[str]): One ID per document.
+
+        Returns:
+            list[BatchResult]: The batches in order; also appended to `results`.
+
+        Raises:
+            BulkUpsertError: If any batch failed after its retries.
+        """
+        limit = asyncio.Semaphore(self.max_concurrency)
+        batches = self.split(docs)
+
+        async def run(index: int, start: int, stop: int, nbytes: int) -> BatchResult:
+            async with limit:
+                return await self._upsert_batch(
+                    index, list(docs[start:stop]), list(ids[start:stop]), nbytes
+                )
+
+        outcomes = await asyncio.gather(
+            *(run(i, *batch) for i, batch in enumerate(batches)),
+            return_exceptions=True,
+        )
+        results: list[BatchResult] = []
+        errors: list[BaseException] = []
+        written: list[str] = []
+        for (start, stop, _), outcome in zip(batches, outcomes):
+            if isinstance(outcome, BatchResult):
+                results.append(outcome)
+                written.extend(ids[start:stop])
+            elif isinstance(outcome, Exception):
+                errors.append(outcome)
+            else:
+                raise outcome
+        self.results.extend(results)
+        if errors:
+            raise BulkUpsertError(errors, written)
+        return results
@@ -0,0 +1,607 @@
+"""Caches that let repeated work skip the model and vector store round trips.
+
+All caches in this module are in-process and keyed on the *index generation*,
+a counter stored in a file (`IndexConfiguration.index_generation_path`) that
+`docu_proc_graph.index_docs` bumps whenever it writes new data. Entries
+created against an older generation are never served, so re-indexing
+invalidates them automatically, including across processes that share the
+file. The counter is kept in memory and the file only re-checked every
+`GENERATION_REFRESH_INTERVAL` seconds.
+
+Classes:
+    SemanticAnswerCache: First-turn answers keyed by query embedding.
+    RetrievalCache: Bounded, single-flight cache of vector store search results.
+    ToolResultCache: Tool outputs keyed by normalized arguments, with per-tool TTLs.
+    CacheStats: Snapshot of a cache's hit/miss counters.
+
+Functions:
+    current_index_generation: Read the current index generation.
+    bump_index_generation: Advance the index generation after new data is indexed.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import math
+import os
+import re
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Optional, Sequence, Union
+
+import numpy as np
+import numpy.typing as npt
+from langchain_core.documents import Document
+
+# Default location of the counter; see `IndexConfiguration.index_generation_path`.
+INDEX_GENERATION_FILE = Path("cache/index_generation")
+
+# Seconds a generation read from disk is served from memory before the file
+# is checked again for bumps by other processes.
+GENERATION_REFRESH_INTERVAL = 1.0
+
+
+class _GenerationFile:
+    """In-memory copy of an index generation file, refreshed when it changes."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.value = 0
+        self._signature: Optional[tuple[int, int]] = None
+        self._checked_at = -math.inf
+        self._lock = threading.Lock()
+
+    def get(self, max_age: float) -> int:
+        if time.monotonic() - self._checked_at < max_age:
+            return self.value
+        with self._lock:
+            self._checked_at = time.monotonic()
+            try:
+                st = os.stat(self.path)
+            except FileNotFoundError:
+                self._signature, self.value = None, 0
+            else:
+                signature = (st.st_mtime_ns, st.st_size)
+                if signature != self._signature:
+                    self._signature, self.value = signature, self._read()
+            return self.value
+
+    def _read(self) -> int:
+        try:
+            with open(self.path) as f:
+                return int(f.read().strip() or 0)
+        except (FileNotFoundError, ValueError):
+            return 0
+
+    def set(self, value: int) -> None:
+        with self._lock:
+            self.value = value
+            self._signature = None
+            self._checked_at = time.monotonic()
+
+
+_generations: dict[str, _GenerationFile] = {}
+_generation_lock = threading.Lock()
+
+
+def _generation_file(path: Union[str, Path]) -> _GenerationFile:
+    key = os.path.abspath(path)
+    tracked = _generations.get(key)
+    if tracked is None:
+        with _generation_lock:
+            tracked = _generations.setdefault(key, _GenerationFile(key))
+    return tracked
+
+
+def current_index_generation(
+    path: Union[str, Path] = INDEX_GENERATION_FILE,
+    *,
+    max_age: float = GENERATION_REFRESH_INTERVAL,
+) -> int:
+    """Return the current index generation.
+
+    The counter is kept in memory. Its file is stat'ed at most once every
+    `max_age` seconds and only read again when it changed, so this is cheap
+    enough to call on the event loop for every lookup. Bumps made by this
+    process are seen immediately, those of other processes within `max_age`.
+
+    Args:
+        path (Union[str, Path]): File holding the counter.
+        max_age (float): Maximum age in seconds of the in-memory value; 0
+            checks the file every time.
+
+    Returns:
+        int: The generation, or 0 if nothing has been indexed yet.
+    """
+    return _generation_file(path).get(max_age)
+
+
+def bump_index_generation(path: Union[str, Path] = INDEX_GENERATION_FILE) -> int:
+    """Advance the index generation, invalidating every cache keyed on it.
+
+    Args:
+        path (Union[str, Path]): File holding the counter.
+
+    Returns:
+        int: The new generation.
+    """
+    tracked = _generation_file(path)
+    with _generation_lock:
+        generation = tracked.get(0) + 1
+        target = Path(tracked.path)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        # A temporary file of our own, so concurrent bumps never share one.
+        fd, tmp = tempfile.mkstemp(dir=target.parent, prefix=target.name, suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            f.write(str(generation))
+        os.replace(tmp, target)
+        tracked.set(generation)
+    return generation
+
+
+def normalize_query(query: str) -> str:
+    """Normalize a query for exact-match cache keys.
+
+    Examples:
+        >>> normalize_query("  What is NVIDIA's   revenue? ")
+        "what is nvidia's revenue"
+    """
+    return re.sub(r"\s+", " ", query).strip().lower().rstrip("?.! ")
+
+
+@dataclass(frozen=True)
+class CacheStats:
+    """Snapshot of a cache's counters."""
+
+    hits: int
+    misses: int
+    coalesced: int
+    size: int
+
+    @property
+    def hit_rate(self) -> float:
+        """Fraction of lookups served without a backend call."""
+        total = self.hits + self.misses + self.coalesced
+        return (self.hits + self.coalesced) / total if total else 0.0
+
+
+############################  Answer cache  ###################################
+
+
+@dataclass
+class _AnswerEntry:
+    query: str
+    embedding: npt.NDArray[np.float32]
+    companies: tuple[str, ...]
+    generation: int
+    answer: str
+    created_at: float
+
+
+class SemanticAnswerCache:
+    """LRU/TTL cache of first-turn answers keyed by query embedding.
+
+    A lookup hits when an entry has exactly the same detected companies and
+    index generation and its embedding's cosine similarity with the query is
+    at or above the threshold. Normalized exact repeats are served without an
+    embedding at all via `lookup_exact`.
+
+    Args:
+        max_entries (int): Maximum number of cached answers.
+        max_pending (int): Maximum number of remembered misses awaiting `store`.
+    """
+
+    def __init__(self, *, max_entries: int = 1024, max_pending: int = 256) -> None:
+        """Create an empty cache."""
+        self.max_entries = max_entries
+        self.max_pending = max_pending
+        self._entries: OrderedDict[int, _AnswerEntry] = OrderedDict()
+        self._exact: dict[tuple[str, tuple[str, ...], int], int] = {}
+        self._pending: OrderedDict[
+            tuple[str, tuple[str, ...], int], npt.NDArray[np.float32]
+        ] = OrderedDict()
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        """Return the number of cached answers."""
+        return len(self._entries)
+
+    def stats(self) -> CacheStats:
+        """Return a snapshot of the cache counters."""
+        return CacheStats(
+            hits=self.hits, misses=self.misses, coalesced=0, size=len(self._entries)
+        )
+
+    def _expired(self, entry: _AnswerEntry, ttl: Optional[float], now: float) -> bool:
+        return ttl is not None and now - entry.created_at > ttl
+
+    def _evict(self, entry_id: int) -> None:
+        entry = self._entries.pop(entry_id)
+        key = (normalize_query(entry.query), entry.companies, entry.generation)
+        if self._exact.get(key) == entry_id:
+            del self._exact[key]
+
+    def _purge(self, generation: int, ttl: Optional[float], now: float) -> None:
+        for entry_id, entry in list(self._entries.items()):
+            if entry.generation != generation or self._expired(entry, ttl, now):
+                self._evict(entry_id)
+
+    def lookup_exact(
+        self,
+        query: str,
+        companies: Sequence[str],
+        generation: int,
+        *,
+        ttl: Optional[float] = None,
+    ) -> Optional[str]:
+        """Return the cached answer for a normalized exact repeat, if any."""
+        key = (normalize_query(query), tuple(companies), generation)
+        now = time.monotonic()
+        with self._lock:
+            entry_id = self._exact.get(key)
+            if entry_id is None:
+                return None
+            entry = self._entries[entry_id]
+            if self._expired(entry, ttl, now):
+                self._evict(entry_id)
+                return None
+            self._entries.move_to_end(entry_id)
+            self.hits += 1
+            return entry.answer
+
+    def lookup(
+        self,
+        query: str,
+        embedding: Sequence[float],
+        companies: Sequence[str],
+        generation: int,
+        *,
+        threshold: float = 0.95,
+        ttl: Optional[float] = None,
+    ) -> Optional[str]:
+        """Return the most similar cached answer above the threshold, if any.
+
+        On a miss the embedding is remembered so a later `store` for the same
+        query does not need to embed it again.
+
+        Args:
+            query (str): The user's question.
+            embedding (Sequence[float]): Embedding of the question.
+            companies (Sequence[str]): Source files detected in the question.
+            generation (int): Current index generation.
+            threshold (float): Minimum cosine similarity for a hit.
+            ttl (Optional[float]): Maximum entry age in seconds.
+
+        Returns:
+            Optional[str]: The cached answer, or None on a miss.
+        """
+        vector = np.asarray(embedding, dtype=np.float32)
+        vector = vector / (np.linalg.norm(vector) or 1.0)
+        companies = tuple(companies)
+        now = time.monotonic()
+        with self._lock:
+            self._purge(generation, ttl, now)
+            candidates = [
+                (entry_id, entry)
+                for entry_id, entry in self._entries.items()
+                if entry.companies == companies
+            ]
+            if candidates:
+                matrix = np.stack([entry.embedding for _, entry in candidates])
+                scores = matrix @ vector
+                best = int(np.argmax(scores))
+                if scores[best] >= threshold:
+                    entry_id, entry = candidates[best]
+                    self._entries.move_to_end(entry_id)
+                    self.hits += 1
+                    return entry.answer
+            self.misses += 1
+            self._pending[(normalize_query(query), companies, generation)] = vector
+            while len(self._pending) > self.max_pending:
+                self._pending.popitem(last=False)
+            return None
+
+    def store(
+        self,
+        query: str,
+        companies: Sequence[str],
+        generation: int,
+        answer: str,
+        embedding: Optional[Sequence[float]] = None,
+    ) -> bool:
+        """Cache the answer to a question that previously missed.
+
+        Args:
+            query (str): The user's question.
+            companies (Sequence[str]): Source files detected in the question.
+            generation (int): Index generation the answer was produced against.
+            answer (str): The final answer text.
+            embedding (Optional[Sequence[float]]): Embedding of the question. If
+                omitted, the one remembered by the missed `lookup` is used.
+
+        Returns:
+            bool: Whether the answer was cached.
+        """
+        companies = tuple(companies)
+        key = (normalize_query(query), companies, generation)
+        with self._lock:
+            if embedding is not None:
+                vector = np.asarray(embedding, dtype=np.float32)
+                vector = vector / (np.linalg.norm(vector) or 1.0)
+            elif (pending := self._pending.pop(key, None)) is not None:
+                vector = pending
+            else:
+                return False
+            if (existing := self._exact.get(key)) is not None:
+                self._evict(existing)
+            entry_id = self._next_id
+            self._next_id += 1
+            self._entries[entry_id] = _AnswerEntry(
+                query=query,
+                embedding=vector,
+                companies=companies,
+                generation=generation,
+                answer=answer,
+                created_at=time.monotonic(),
+            )
+            self._exact[key] = entry_id
+            while len(self._entries) > self.max_entries:
+                self._evict(next(iter(self._entries)))
+            return True
+
+    def clear(self) -> None:
+        """Drop every cached answer and remembered miss."""
+        with self._lock:
+            self._entries.clear()
+            self._exact.clear()
+            self._pending.clear()
+
+
+##########################  Retrieval cache  ##################################
+
+
+def search_key(
+    query: str,
+    search_kwargs: dict[str, Any],
+    *,
+    provider: str,
+    embedding_model: str,
+    generation: int,
+) -> str:
+    """Build the cache key of a normalized vector store search request.
+
+    Args:
+        query (str): The search query. Whitespace is collapsed; case is kept
+            because embeddings are case-sensitive.
+        search_kwargs (dict[str, Any]): Effective search kwargs, including
+            the metadata filter and k.
+        provider (str): The retriever provider.
+        embedding_model (str): The embedding model used for the query.
+        generation (int): Current index generation.
+
+    Returns:
+        str: A stable string key.
+    """
+    return json.dumps(
+        [
+            re.sub(r"\s+", " ", query).strip(),
+            search_kwargs,
+            provider,
+            embedding_model,
+            generation,
+        ],
+        sort_keys=True,
+        default=str,
+    )
+
+
+class _LeaderCancelled(Exception):
+    """The in-flight search was cancelled along with the lookup that started it."""
+
+
+class RetrievalCache:
+    """Bounded LRU cache of search results with single-flight coalescing.
+
+    Concurrent lookups for a key that is already being searched wait for the
+    in-flight search instead of issuing their own backend call. If the lookup
+    that started the search is cancelled, the waiting lookups retry rather
+    than being cancelled with it.
+
+    Args:
+        max_entries (int): Maximum number of cached result lists.
+        ttl (Optional[float]): Maximum age in seconds of a cached result.
+    """
+
+    def __init__(self, *, max_entries: int = 2048, ttl: Optional[float] = None) -> None:
+        """Create an empty cache."""
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: OrderedDict[str, tuple[float, list[Document]]] = OrderedDict()
+        self._inflight: dict[str, asyncio.Future[list[Document]]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def stats(self) -> CacheStats:
+        """Return a snapshot of the cache counters."""
+        return CacheStats(
+            hits=self.hits,
+            misses=self.misses,
+            coalesced=self.coalesced,
+            size=len(self._entries),
+        )
+
+    async def get_or_search(
+        self, key: str, search: Callable[[], Awaitable[list[Document]]]
+    ) -> list[Document]:
+        """Return cached results for a key, running the search at most once.
+
+        Args:
+            key (str): Key from `search_key`.
+            search (Callable[[], Awaitable[list[Document]]]): Performs the
+                backend search on a miss.
+
+        Returns:
+            list[Document]: The search results. Failed searches are not cached.
+        """
+        while True:
+            cached = self._entries.get(key)
+            if cached is not None:
+                created_at, docs = cached
+                if self.ttl is None or time.monotonic() - created_at <= self.ttl:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return list(docs)
+                del self._entries[key]
+
+            inflight = self._inflight.get(key)
+            if inflight is None:
+                return await self._search(key, search)
+            self.coalesced += 1
+            try:
+                return list(await asyncio.shield(inflight))
+            except _LeaderCancelled:
+                # The search was cancelled with its caller, not failed; try
+                # again, searching ourselves if nobody else has started.
+                self.coalesced -= 1
+
+    async def _search(
+        self, key: str, search: Callable[[], Awaitable[list[Document]]]
+    ) -> list[Document]:
+        """Run the search of a key as the leader of its coalesced lookups."""
+        self.misses += 1
+        future: asyncio.Future[list[Document]] = (
+            asyncio.get_running_loop().create_future()
+        )
+        self._inflight[key] = future
+        try:
+            docs = list(await search())
+        except asyncio.CancelledError:
+            # Wake the waiters to retry instead of cancelling them too.
+            future.set_exception(_LeaderCancelled())
+            future.exception()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Mark the exception as retrieved when nobody else was waiting.
+            future.exception()
+            raise
+        else:
+            future.set_result(docs)
+            self._entries[key] = (time.monotonic(), docs)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            return list(docs)
+        finally:
+            del self._inflight[key]
+
+    def clear(self) -> None:
+        """Drop every cached result."""
+        self._entries.clear()
+
+
+############################  Tool cache  #####################################
+
+
+def _normalize_args(value: Any) -> Any:
+    if isinstance(value, str):
+        return normalize_query(value)
+    if isinstance(value, dict):
+        return {k: _normalize_args(v) for k, v in sorted(value.items())}
+    if isinstance(value, (list, tuple)):
+        return [_normalize_args(v) for v in value]
+    return value
+
+
+class ToolResultCache:
+    """LRU cache of tool outputs with a TTL per tool.
+
+    Keys are the tool name plus its arguments, with string arguments normalized
+    like `normalize_query`. Tools listed in `generation_scoped` also key on the
+    index generation passed by the caller, so results built from indexed
+    filings are dropped when new data is indexed.
+
+    Args:
+        ttls (dict[str, float]): TTL in seconds per tool name. Tools that are
+            not listed are never cached.
+        generation_scoped (Sequence[str]): Tools whose results depend on the index.
+        max_entries (int): Maximum number of cached results across all tools.
+    """
+
+    def __init__(
+        self,
+        ttls: dict[str, float],
+        *,
+        generation_scoped: Sequence[str] = (),
+        max_entries: int = 1024,
+    ) -> None:
+        """Create an empty cache."""
+        self.ttls = dict(ttls)
+        self.generation_scoped = frozenset(generation_scoped)
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, tuple[float, str]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def key(
+        self, tool_name: str, args: dict[str, Any], generation: int = 0
+    ) -> Optional[str]:
+        """Return the cache key of a tool call, or None if the tool is not cached."""
+        if tool_name not in self.ttls:
+            return None
+        parts: list[Any] = [tool_name, _normalize_args(args)]
+        if tool_name in self.generation_scoped:
+            parts.append(generation)
+        return json.dumps(parts, sort_keys=True, default=str)
+
+    def get(
+        self, tool_name: str, args: dict[str, Any], generation: int = 0
+    ) -> Optional[str]:
+        """Return the cached output of a tool call, if fresh."""
+        key = self.key(tool_name, args, generation)
+        if key is None:
+            return None
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is not None:
+                created_at, output = cached
+                if time.monotonic() - created_at <= self.ttls[tool_name]:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return output
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(
+        self, tool_name: str, args: dict[str, Any], output: str, generation: int = 0
+    ) -> None:
+        """Cache the output of a tool call."""
+        key = self.key(tool_name, args, generation)
+        if key is None:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic(), output)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> CacheStats:
+        """Return a snapshot of the cache counters."""
+        return CacheStats(
+            hits=self.hits, misses=self.misses, coalesced=0, size=len(self._entries)
+        )
+
+    def clear(self) -> None:
+        """Drop every cached result."""
+        with self._lock:
+            self._entries.clear()
@@ -0,0 +1,627 @@
+"""Durable SQLite checkpointer for self-hosted graph runs.
+
+The LangGraph platform provides its own managed checkpointer, but self-hosted
+deployments of `retrieval_graph` and `docu_proc` need a durable one that stays
+fast when many threads write concurrently. `SqliteCheckpointer` is tuned for
+that workload:
+
+- The database runs in WAL mode with `synchronous=NORMAL`, so readers never
+  block the writer and commits do not fsync the main database file.
+- Checkpoints, channel blobs and pending writes are buffered and flushed in a
+  single transaction once `batch_size` rows are queued, a read needs them, or
+  at the latest `flush_interval` seconds after the oldest was queued, when a
+  background timer flushes them. Closing the checkpointer, or the process
+  exiting normally, flushes whatever is left.
+- Channel values are stored once per (channel, version), so a checkpoint only
+  writes the channels that changed in that step. This keeps per-thread state
+  compact even for long conversations.
+- An optional retention policy keeps only the newest checkpoints per thread
+  and deletes the writes and channel blobs nothing refers to any more.
+- Blobs larger than `compress_min_bytes` can be zlib-compressed.
+
+Set `SQLITE_CHECKPOINT_PATH` to compile both graphs with this checkpointer;
+see `checkpointer_from_env`.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import atexit
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import weakref
+import zlib
+from collections.abc import AsyncIterator, Iterator, Sequence
+from functools import lru_cache
+from typing import Any, Optional
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_id,
+    get_serializable_checkpoint_metadata,
+)
+from langgraph.checkpoint.serde.base import SerializerProtocol
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS checkpoints (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    checkpoint_id TEXT NOT NULL,
+    parent_checkpoint_id TEXT,
+    type TEXT,
+    checkpoint BLOB,
+    metadata TEXT,
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id)
+);
+CREATE TABLE IF NOT EXISTS blobs (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    channel TEXT NOT NULL,
+    version TEXT NOT NULL,
+    type TEXT NOT NULL,
+    blob BLOB,
+    PRIMARY KEY (thread_id, checkpoint_ns, channel, version)
+);
+CREATE TABLE IF NOT EXISTS writes (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    checkpoint_id TEXT NOT NULL,
+    task_id TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    channel TEXT NOT NULL,
+    type TEXT,
+    value BLOB,
+    task_path TEXT NOT NULL DEFAULT '',
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx)
+);
+"""
+
+# Prefix added to the serializer type of compressed blobs.
+_ZLIB_PREFIX = "zlib:"
+
+
+class SqliteCheckpointer(BaseCheckpointSaver[int]):
+    """SQLite-backed checkpoint saver with WAL, write batching and retention.
+
+    Args:
+        path (str): Path of the SQLite database file, or ":memory:".
+        batch_size (int): Number of queued rows that triggers a flush.
+        flush_interval (float): Maximum age in seconds of queued rows; a
+            background timer flushes them once it is reached.
+        max_checkpoints_per_thread (Optional[int]): Keep only this many of the
+            newest checkpoints per thread and namespace. None keeps everything.
+        compress (bool): Whether to zlib-compress large blobs.
+        compress_min_bytes (int): Blobs smaller than this are stored as-is.
+        serde (Optional[SerializerProtocol]): Serializer for checkpoint values.
+
+    Examples:
+        >>> saver = SqliteCheckpointer("checkpoints.db", max_checkpoints_per_thread=20)
+        >>> graph = builder.compile(checkpointer=saver)  # doctest: +SKIP
+    """
+
+    def __init__(
+        self,
+        path: str,
+        *,
+        batch_size: int = 64,
+        flush_interval: float = 0.05,
+        max_checkpoints_per_thread: Optional[int] = None,
+        compress: bool = False,
+        compress_min_bytes: int = 1024,
+        serde: Optional[SerializerProtocol] = None,
+    ) -> None:
+        """Open (and if needed create) the checkpoint database."""
+        super().__init__(serde=serde)
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_checkpoints_per_thread = max_checkpoints_per_thread
+        self.compress = compress
+        self.compress_min_bytes = compress_min_bytes
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA temp_store=MEMORY")
+        self._conn.executescript(_SCHEMA)
+        self._pending_checkpoints: list[tuple[Any, ...]] = []
+        self._pending_blobs: list[tuple[Any, ...]] = []
+        self._pending_writes: list[tuple[Any, ...]] = []
+        self._pending_special_writes: list[tuple[Any, ...]] = []
+        self._touched: set[tuple[str, str]] = set()
+        self._oldest_pending: Optional[float] = None
+        self._timer: Optional[threading.Timer] = None
+        self._closed = False
+        _open_checkpointers.add(self)
+
+    # Serialization helpers
+
+    def _dump(self, value: Any) -> tuple[str, bytes]:
+        type_, data = self.serde.dumps_typed(value)
+        if self.compress and len(data) >= self.compress_min_bytes:
+            return _ZLIB_PREFIX + type_, zlib.compress(data, 1)
+        return type_, data
+
+    def _load(self, type_: str, data: bytes) -> Any:
+        if type_.startswith(_ZLIB_PREFIX):
+            return self.serde.loads_typed(
+                (type_[len(_ZLIB_PREFIX) :], zlib.decompress(data))
+            )
+        return self.serde.loads_typed((type_, data))
+
+    # Write buffering
+
+    def _pending_count(self) -> int:
+        return (
+            len(self._pending_checkpoints)
+            + len(self._pending_blobs)
+            + len(self._pending_writes)
+            + len(self._pending_special_writes)
+        )
+
+    def _maybe_flush(self) -> None:
+        if self._oldest_pending is None:
+            self._oldest_pending = time.monotonic()
+        age = time.monotonic() - self._oldest_pending
+        if self._pending_count() >= self.batch_size or age >= self.flush_interval:
+            self.flush()
+        elif self._timer is None:
+            # Nothing may write after this, so flush from a timer instead of
+            # waiting for the next put.
+            self._schedule_flush(self.flush_interval - age)
+
+    def _schedule_flush(self, delay: float) -> None:
+        self._timer = threading.Timer(delay, self._timed_flush)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _timed_flush(self) -> None:
+        with self._lock:
+            if self._timer is threading.current_thread():
+                self._timer = None
+            if self._closed:
+                return
+            try:
+                self.flush()
+            except Exception:
+                # The rows stay queued; the next write or timer retries them.
+                logger.exception("Flushing checkpoints to %s failed", self.path)
+                if self._timer is None:
+                    self._schedule_flush(self.flush_interval)
+
+    def flush(self) -> None:
+        """Write every queued row to the database in a single transaction."""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if not self._pending_count():
+                return
+            cur = self._conn.cursor()
+            cur.execute("BEGIN")
+            try:
+                cur.executemany(
+                    "INSERT OR REPLACE INTO blobs VALUES (?, ?, ?, ?, ?, ?)",
+                    self._pending_blobs,
+                )
+                cur.executemany(
+                    "INSERT OR REPLACE INTO checkpoints VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    self._pending_checkpoints,
+                )
+                cur.executemany(
+                    "INSERT OR IGNORE INTO writes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    self._pending_writes,
+                )
+                cur.executemany(
+                    "INSERT OR REPLACE INTO writes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    self._pending_special_writes,
+                )
+                if self.max_checkpoints_per_thread is not None:
+                    for thread_id, checkpoint_ns in self._touched:
+                        self._prune(
+                            cur, thread_id, checkpoint_ns, self.max_checkpoints_per_thread
+                        )
+                cur.execute("COMMIT")
+            except BaseException:
+                cur.execute("ROLLBACK")
+                raise
+            self._pending_checkpoints.clear()
+            self._pending_blobs.clear()
+            self._pending_writes.clear()
+            self._pending_special_writes.clear()
+            self._touched.clear()
+            self._oldest_pending = None
+
+    # Retention
+
+    def _prune(
+        self, cur: sqlite3.Cursor, thread_id: str, checkpoint_ns: str, keep: int
+    ) -> int:
+        kept = cur.execute(
+            "SELECT checkpoint_id, type, checkpoint FROM checkpoints "
+            "WHERE thread_id = ? AND checkpoint_ns = ? "
+            "ORDER BY checkpoint_id DESC LIMIT ?",
+            (thread_id, checkpoint_ns, keep),
+        ).fetchall()
+        if kept and len(kept) < keep:
+            return 0
+        stale = "thread_id = ? AND checkpoint_ns = ?"
+        params: tuple[Any, ...] = (thread_id, checkpoint_ns)
+        if kept:
+            # Checkpoint ids sort by creation time, so everything older than
+            # the oldest kept checkpoint is stale.
+            stale += " AND checkpoint_id < ?"
+            params += (kept[-1][0],)
+        deleted = cur.execute(f"DELETE FROM checkpoints WHERE {stale}", params).rowcount
+        if not deleted:
+            return 0
+        cur.execute(f"DELETE FROM writes WHERE {stale}", params)
+        # Channel blobs are shared between checkpoints, so only drop the
+        # versions that no kept checkpoint refers to.
+        live: set[tuple[str, str]] = set()
+        for _, type_, data in kept:
+            checkpoint = self._load(type_, data)
+            live.update((k, str(v)) for k, v in checkpoint["channel_versions"].items())
+        dead = [
+            (thread_id, checkpoint_ns, channel, version)
+            for channel, version in cur.execute(
+                "SELECT channel, version FROM blobs WHERE thread_id = ? AND checkpoint_ns = ?",
+                (thread_id, checkpoint_ns),
+            ).fetchall()
+            if (channel, version) not in live
+        ]
+        cur.executemany(
+            "DELETE FROM blobs WHERE thread_id = ? AND checkpoint_ns = ? AND channel = ? AND version = ?",
+            dead,
+        )
+        return int(deleted)
+
+    def prune(self, keep: int, thread_id: Optional[str] = None) -> int:
+        """Delete all but the newest `keep` checkpoints per thread and namespace.
+
+        Args:
+            keep (int): Number of checkpoints to retain per thread and namespace.
+            thread_id (Optional[str]): Restrict pruning to a single thread.
+
+        Returns:
+            int: The number of checkpoints deleted.
+        """
+        self.flush()
+        with self._lock:
+            cur = self._conn.cursor()
+            query = "SELECT DISTINCT thread_id, checkpoint_ns FROM checkpoints"
+            params: tuple[Any, ...] = ()
+            if thread_id is not None:
+                query += " WHERE thread_id = ?"
+                params = (thread_id,)
+            targets = cur.execute(query, params).fetchall()
+            cur.execute("BEGIN")
+            try:
+                deleted = sum(self._prune(cur, t, ns, keep) for t, ns in targets)
+                cur.execute("COMMIT")
+            except BaseException:
+                cur.execute("ROLLBACK")
+                raise
+            return deleted
+
+    def compact(self) -> None:
+        """Fold the WAL back into the database file and reclaim free pages."""
+        self.flush()
+        with self._lock:
+            self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            self._conn.execute("VACUUM")
+
+    def close(self) -> None:
+        """Flush queued rows and close the database connection."""
+        with self._lock:
+            if self._closed:
+                return
+            self.flush()
+            self._closed = True
+            self._conn.close()
+        _open_checkpointers.discard(self)
+
+    # BaseCheckpointSaver interface
+
+    def _row_to_tuple(
+        self,
+        thread_id: str,
+        checkpoint_ns: str,
+        checkpoint_id: str,
+        parent_checkpoint_id: Optional[str],
+        type_: str,
+        data: bytes,
+        metadata: str,
+    ) -> CheckpointTuple:
+        checkpoint: Checkpoint = self._load(type_, data)
+        channel_values: dict[str, Any] = {}
+        for channel, version in checkpoint["channel_versions"].items():
+            row = self._conn.execute(
+                "SELECT type, blob FROM blobs WHERE thread_id = ? AND checkpoint_ns = ? AND channel = ? AND version = ?",
+                (thread_id, checkpoint_ns, channel, str(version)),
+            ).fetchone()
+            if row and row[0] != "empty":
+                channel_values[channel] = self._load(row[0], row[1])
+        writes = self._conn.execute(
+            "SELECT task_id, channel, type, value FROM writes "
+            "WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ? "
+            "ORDER BY task_id, idx",
+            (thread_id, checkpoint_ns, checkpoint_id),
+        ).fetchall()
+        return CheckpointTuple(
+            config={
+                "configurable": {
+                    "thread_id": thread_id,
+                    "checkpoint_ns": checkpoint_ns,
+                    "checkpoint_id": checkpoint_id,
+                }
+            },
+            checkpoint={**checkpoint, "channel_values": channel_values},
+            metadata=json.loads(metadata),
+            parent_config=(
+                {
+                    "configurable": {
+                        "thread_id": thread_id,
+                        "checkpoint_ns": checkpoint_ns,
+                        "checkpoint_id": parent_checkpoint_id,
+                    }
+                }
+                if parent_checkpoint_id
+                else None
+            ),
+            pending_writes=[
+                (task_id, channel, self._load(t, v)) for task_id, channel, t, v in writes
+            ],
+        )
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        """Get the checkpoint tuple for a config, or the latest one for its thread."""
+        self.flush()
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        with self._lock:
+            if checkpoint_id := get_checkpoint_id(config):
+                row = self._conn.execute(
+                    "SELECT checkpoint_id, parent_checkpoint_id, type, checkpoint, metadata "
+                    "FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+                    (thread_id, checkpoint_ns, checkpoint_id),
+                ).fetchone()
+            else:
+                row = self._conn.execute(
+                    "SELECT checkpoint_id, parent_checkpoint_id, type, checkpoint, metadata "
+                    "FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? "
+                    "ORDER BY checkpoint_id DESC LIMIT 1",
+                    (thread_id, checkpoint_ns),
+                ).fetchone()
+            if row is None:
+                return None
+            return self._row_to_tuple(thread_id, checkpoint_ns, *row)
+
+    def list(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[CheckpointTuple]:
+        """List checkpoints newest first, optionally filtered by thread and metadata."""
+        self.flush()
+        clauses: list[str] = []
+        params: list[Any] = []
+        if config:
+            clauses.append("thread_id = ?")
+            params.append(config["configurable"]["thread_id"])
+            if (checkpoint_ns := config["configurable"].get("checkpoint_ns")) is not None:
+                clauses.append("checkpoint_ns = ?")
+                params.append(checkpoint_ns)
+            if checkpoint_id := get_checkpoint_id(config):
+                clauses.append("checkpoint_id = ?")
+                params.append(checkpoint_id)
+        if before and (before_id := get_checkpoint_id(before)):
+            clauses.append("checkpoint_id < ?")
+            params.append(before_id)
+        query = (
+            "SELECT thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, "
+            "type, checkpoint, metadata FROM checkpoints"
+        )
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        query += " ORDER BY checkpoint_id DESC"
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+            results: list[CheckpointTuple] = []
+            for row in rows:
+                if filter:
+                    metadata = json.loads(row[6])
+                    if not all(metadata.get(k) == v for k, v in filter.items()):
+                        continue
+                results.append(self._row_to_tuple(*row))
+                if limit is not None and len(results) >= limit:
+                    break
+        yield from results
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        """Queue a checkpoint and the channel values that changed in it."""
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        c = checkpoint.copy()
+        values: dict[str, Any] = c.pop("channel_values")  # type: ignore[misc]
+        with self._lock:
+            for channel, version in new_versions.items():
+                type_, blob = (
+                    self._dump(values[channel]) if channel in values else ("empty", b"")
+                )
+                self._pending_blobs.append(
+                    (thread_id, checkpoint_ns, channel, str(version), type_, blob)
+                )
+            type_, data = self._dump(c)
+            self._pending_checkpoints.append(
+                (
+                    thread_id,
+                    checkpoint_ns,
+                    checkpoint["id"],
+                    config["configurable"].get("checkpoint_id"),
+                    type_,
+                    data,
+                    json.dumps(
+                        get_serializable_checkpoint_metadata(config, metadata),
+                        default=str,
+                    ),
+                )
+            )
+            self._touched.add((thread_id, checkpoint_ns))
+            self._maybe_flush()
+        return {
+            "configurable": {
+                "thread_id": thread_id,
+                "checkpoint_ns": checkpoint_ns,
+                "checkpoint_id": checkpoint["id"],
+            }
+        }
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        """Queue intermediate writes linked to a checkpoint."""
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+        with self._lock:
+            for idx, (channel, value) in enumerate(writes):
+                write_idx = WRITES_IDX_MAP.get(channel, idx)
+                type_, blob = self._dump(value)
+                row = (
+                    thread_id,
+                    checkpoint_ns,
+                    checkpoint_id,
+                    task_id,
+                    write_idx,
+                    channel,
+                    type_,
+                    blob,
+                    task_path,
+                )
+                if write_idx < 0:
+                    self._pending_special_writes.append(row)
+                else:
+                    self._pending_writes.append(row)
+            self._maybe_flush()
+
+    def delete_thread(self, thread_id: str) -> None:
+        """Delete every checkpoint, blob and write of a thread."""
+        self.flush()
+        with self._lock:
+            cur = self._conn.cursor()
+            cur.execute("BEGIN")
+            for table in ("checkpoints", "blobs", "writes"):
+                cur.execute(f"DELETE FROM {table} WHERE thread_id = ?", (thread_id,))
+            cur.execute("COMMIT")
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        """Asynchronous version of `get_tuple`, run in a worker thread."""
+        return await asyncio.to_thread(self.get_tuple, config)
+
+    async def alist(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        """Asynchronous version of `list`, run in a worker thread."""
+        results = await asyncio.to_thread(
+            lambda: list(self.list(config, filter=filter, before=before, limit=limit))
+        )
+        for item in results:
+            yield item
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        """Asynchronous version of `put`, run in a worker thread."""
+        return await asyncio.to_thread(
+            self.put, config, checkpoint, metadata, new_versions
+        )
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        """Asynchronous version of `put_writes`, run in a worker thread."""
+        await asyncio.to_thread(self.put_writes, config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        """Asynchronous version of `delete_thread`, run in a worker thread."""
+        await asyncio.to_thread(self.delete_thread, thread_id)
+
+
+# Checkpointers not closed yet; whatever they still queue is flushed at exit.
+_open_checkpointers: weakref.WeakSet[SqliteCheckpointer] = weakref.WeakSet()
+
+
+@atexit.register
+def _flush_open_checkpointers() -> None:
+    for saver in list(_open_checkpointers):
+        try:
+            saver.flush()
+        except Exception:
+            logger.exception("Flushing checkpoints to %s at exit failed", saver.path)
+
+
+@lru_cache(maxsize=1)
+def checkpointer_from_env() -> Optional[SqliteCheckpointer]:
+    """Build the SQLite checkpointer configured through environment variables.
+
+    The result is cached so every graph compiled in this process shares one
+    connection and one write buffer.
+
+    Reads:
+        SQLITE_CHECKPOINT_PATH: Database file. When unset, returns None so the
+            graphs keep using whatever checkpointer the runtime provides.
+        SQLITE_CHECKPOINT_KEEP: Checkpoints to retain per thread (optional).
+        SQLITE_CHECKPOINT_COMPRESS: "1"/"true" to compress large blobs.
+
+    Returns:
+        Optional[SqliteCheckpointer]: The configured checkpointer, or None.
+    """
+    path = os.environ.get("SQLITE_CHECKPOINT_PATH")
+    if not path:
+        return None
+    keep = os.environ.get("SQLITE_CHECKPOINT_KEEP")
+    return SqliteCheckpointer(
+        path,
+        max_checkpoints_per_thread=int(keep) if keep else None,
+        compress=os.environ.get("SQLITE_CHECKPOINT_COMPRESS", "").lower()
+        in ("1", "true", "yes"),
+    )
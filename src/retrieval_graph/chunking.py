@@ -0,0 +1,233 @@
+"""Batched semantic chunking.
+
+`SemanticChunker` from langchain-experimental splits one text at a time: it
+embeds the text's sentence windows in one request and compares neighbouring
+windows in a Python loop. Called once per pre-chunk of at most 3000
+characters, a 10-K costs hundreds of small embedding requests.
+
+`SemanticChunkingEngine` produces the same chunks as
+`SemanticChunker(embeddings)` with its default settings (percentile
+breakpoints, buffer size 1), but collects the sentence windows of every text
+it is given, embeds the distinct windows in large token-aware batches that
+run concurrently, and computes all cosine distances and per-text percentile
+thresholds with a few vectorized NumPy operations.
+
+Classes:
+    SemanticChunkingEngine: Semantic chunking of many texts with batched embeddings.
+"""
+
+from __future__ import annotations
+
+import contextvars
+import logging
+import math
+import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Sequence
+
+import numpy as np
+import numpy.typing as npt
+from langchain_core.embeddings import Embeddings
+
+from retrieval_graph.usage import CHARS_PER_TOKEN
+
+logger = logging.getLogger(__name__)
+
+
+class SemanticChunkingEngine:
+    """Semantic chunking of many texts with batched embeddings.
+
+    A text is split into sentences, each sentence is embedded together with
+    its `buffer_size` neighbours on either side, and the text is cut after
+    every sentence whose window is further (by cosine distance) from the next
+    one than the text's `breakpoint_percentile` percentile of distances.
+
+    Args:
+        embeddings (Embeddings): Model embedding the sentence windows.
+        breakpoint_percentile (float): Percentile of a text's distances above
+            which a distance is a breakpoint.
+        buffer_size (int): Neighbouring sentences on each side in a window.
+        sentence_split_regex (str): Pattern separating sentences.
+        max_batch_texts (int): Windows per embedding request.
+        max_batch_tokens (int): Estimated tokens per embedding request.
+        max_concurrency (int): Embedding requests in flight at the same time.
+    """
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        *,
+        breakpoint_percentile: float = 95.0,
+        buffer_size: int = 1,
+        sentence_split_regex: str = r"(?<=[.?!])\s+",
+        max_batch_texts: int = 100,
+        max_batch_tokens: int = 50_000,
+        max_concurrency: int = 4,
+    ) -> None:
+        """Create the engine."""
+        self.embeddings = embeddings
+        self.breakpoint_percentile = breakpoint_percentile
+        self.buffer_size = buffer_size
+        self.sentence_split_regex = sentence_split_regex
+        self.max_batch_texts = max_batch_texts
+        self.max_batch_tokens = max_batch_tokens
+        self.max_concurrency = max_concurrency
+
+    def _windows(self, sentences: list[str]) -> list[str]:
+        """Join every sentence with its neighbours, as `combine_sentences` does."""
+        b = self.buffer_size
+        return [
+            " ".join(sentences[max(0, i - b) : i + b + 1]) for i in range(len(sentences))
+        ]
+
+    def _batches(self, texts: list[str]) -> list[list[str]]:
+        """Group texts into requests bounded by count and estimated tokens."""
+        batches: list[list[str]] = []
+        batch: list[str] = []
+        tokens = 0
+        for text in texts:
+            text_tokens = math.ceil(len(text) / CHARS_PER_TOKEN)
+            if batch and (
+                len(batch) >= self.max_batch_texts
+                or tokens + text_tokens > self.max_batch_tokens
+            ):
+                batches.append(batch)
+                batch, tokens = [], 0
+            batch.append(text)
+            tokens += text_tokens
+        if batch:
+            batches.append(batch)
+        return batches
+
+    def _embed(
+        self, texts: list[str]
+    ) -> tuple[npt.NDArray[np.float64], npt.NDArray[np.bool_]]:
+        """Embed texts in concurrent batches.
+
+        Returns:
+            tuple[NDArray, NDArray]: The (len(texts), dim) embeddings, and a
+            mask of the texts whose batch failed (their rows are zero).
+        """
+
+        def embed(batch: list[str]) -> Optional[list[list[float]]]:
+            try:
+                return self.embeddings.embed_documents(batch)
+            except Exception as e:
+                logger.warning("Embedding %d sentence windows failed: %s", len(batch), e)
+                return None
+
+        batches = self._batches(texts)
+        if len(batches) <= 1 or self.max_concurrency <= 1:
+            embedded = [embed(batch) for batch in batches]
+        else:
+            workers = min(self.max_concurrency, len(batches))
+            with ThreadPoolExecutor(workers, thread_name_prefix="chunk-embed") as pool:
+                # Run each batch in a copy of the caller's context, so usage is
+                # attributed to the caller's node and thread.
+                futures = [
+                    pool.submit(contextvars.copy_context().run, embed, batch)
+                    for batch in batches
+                ]
+                embedded = [future.result() for future in futures]
+
+        dim = next((len(vectors[0]) for vectors in embedded if vectors), 0)
+        matrix = np.zeros((len(texts), dim))
+        failed = np.zeros(len(texts), dtype=bool)
+        start = 0
+        for batch, vectors in zip(batches, embedded):
+            stop = start + len(batch)
+            if vectors is None:
+                failed[start:stop] = True
+            else:
+                matrix[start:stop] = vectors
+            start = stop
+        return matrix, failed
+
+    def split_texts(self, texts: Sequence[str]) -> list[Optional[list[str]]]:
+        """Split texts into semantic chunks.
+
+        Args:
+            texts (Sequence[str]): The texts, e.g. every pre-chunk of a file.
+
+        Returns:
+            list[Optional[list[str]]]: Each text's chunks, or None for a text
+            whose sentence windows could not be embedded.
+        """
+        split = [re.split(self.sentence_split_regex, text) for text in texts]
+        # A single sentence is returned as-is, without embedding it.
+        results: list[Optional[list[str]]] = [
+            sentences if len(sentences) == 1 else None for sentences in split
+        ]
+        multi = [i for i, sentences in enumerate(split) if len(sentences) > 1]
+        if not multi:
+            return results
+
+        # Embed each distinct window once, whichever texts it occurs in.
+        rows: dict[str, int] = {}
+        flat = np.fromiter(
+            (
+                rows.setdefault(window, len(rows))
+                for i in multi
+                for window in self._windows(split[i])
+            ),
+            dtype=np.int64,
+        )
+        matrix, failed = self._embed(list(rows))
+
+        # Cosine distances between consecutive windows of every text at once;
+        # a text of n sentences has n - 1 of them.
+        counts = np.array([len(split[i]) - 1 for i in multi])
+        starts = np.cumsum(counts + 1) - (counts + 1)  # first window of each text
+        owner = np.repeat(np.arange(len(multi)), counts)
+        position = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        left = starts[owner] + position
+        distances = _cosine_distances(matrix[flat[left]], matrix[flat[left + 1]])
+
+        # Per-text percentile thresholds over a NaN-padded (texts, distances) matrix.
+        padded = np.full((len(multi), counts.max()), np.nan)
+        padded[owner, position] = distances
+        thresholds = np.nanpercentile(padded, self.breakpoint_percentile, axis=1)
+        is_break = distances > thresholds[owner]
+        text_failed = np.logical_or.reduceat(failed[flat], starts)
+
+        offsets = np.cumsum(counts)[:-1]
+        per_text = zip(np.split(position, offsets), np.split(is_break, offsets))
+        for i, (positions, breaks), bad in zip(multi, per_text, text_failed):
+            if bad:
+                continue
+            sentences = split[i]
+            chunks = []
+            begin = 0
+            for cut in positions[breaks]:
+                chunks.append(" ".join(sentences[begin : cut + 1]))
+                begin = cut + 1
+            if begin < len(sentences):
+                chunks.append(" ".join(sentences[begin:]))
+            results[i] = chunks
+        return results
+
+
+def _cosine_distances(
+    a: npt.NDArray[np.float64], b: npt.NDArray[np.float64]
+) -> npt.NDArray[np.float64]:
+    """Row-wise cosine distances, computed as `SemanticChunker` computes them.
+
+    `langchain_community.utils.math.cosine_similarity` uses SimSIMD's float32
+    kernels when the package is installed and NumPy otherwise, where it counts
+    the NaN similarity of a zero vector as 0. The same kernel is used here so
+    that ties with the percentile threshold break the same way.
+    """
+    try:
+        import simsimd
+    except ImportError:
+        norms = np.linalg.norm(a, axis=1) * np.linalg.norm(b, axis=1)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            similarity = np.einsum("ij,ij->i", a, b) / norms
+        similarity[~np.isfinite(similarity)] = 0.0
+    else:
+        cosine = simsimd.cosine(
+            a.astype(np.float32), b.astype(np.float32), out_dtype="float64"
+        )
+        similarity = 1.0 - np.asarray(cosine, dtype=np.float64)
+    distances: npt.NDArray[np.float64] = 1.0 - similarity
+    return distances
@@ -2,6 +2,7 @@
 
 from __future__ import annotations
 
+import os
 from dataclasses import dataclass, field, fields
 from typing import Annotated, Any, Literal, Optional, Type, TypeVar
 
@@ -34,14 +35,14 @@ class IndexConfiguration:
     )
 
     retriever_provider: Annotated[
-        Literal["elastic", "elastic-local", "pinecone", "mongodb"],
+        Literal["elastic", "elastic-local", "pinecone", "mongodb", "local"],
         {"__template_metadata__": {"kind": "retriever"}},
     ] = field(
         # default="elastic",
         default="pinecone",
         # default="mongodb",
         metadata={
-            "description": "The vector store provider to use for retrieval. Options are 'elastic', 'pinecone', or 'mongodb'."
+            "description": "The vector store provider to use for retrieval. Options are 'elastic', 'pinecone', 'mongodb', or 'local' (in-process, for offline testing)."
         },
     )
 
@@ -52,6 +53,170 @@ class IndexConfiguration:
         },
     )
 
+    retrieval_cache_enabled: bool = field(
+        default=True,
+        metadata={
+            "description": "Whether to serve repeated identical searches from the in-process retrieval cache."
+        },
+    )
+
+    chunking_embedding_model: Annotated[
+        str,
+        {"__template_metadata__": {"kind": "embeddings"}},
+    ] = field(
+        default="upstage/solar-embedding-1-large",
+        metadata={
+            "description": "Embedding model used to find semantic breakpoints when splitting documents for indexing."
+        },
+    )
+
+    embedding_cache_path: str = field(
+        default="cache/embeddings.db",
+        metadata={
+            "description": "SQLite file of the persistent embedding cache, keyed by model and text hash and shared by chunking, indexing and queries; empty to disable."
+        },
+    )
+
+    index_manifest_path: str = field(
+        default="cache/index_manifest.db",
+        metadata={
+            "description": "SQLite file recording the deterministic IDs of the chunks written to each index, used to upsert only new or changed chunks and delete stale ones."
+        },
+    )
+
+    index_generation_path: str = field(
+        default="cache/index_generation",
+        metadata={
+            "description": "File holding the index generation counter, bumped whenever indexing changes the index; answer, retrieval and tool caches only serve entries of the current generation."
+        },
+    )
+
+    dedup_chunks: bool = field(
+        default=False,
+        metadata={
+            "description": "Drop chunks that are near-duplicates of an earlier chunk of the same file (MinHash/LSH over word shingles) before they are embedded and stored; the kept copy records where its duplicates were. Off by default, so the index holds every chunk."
+        },
+    )
+
+    dedup_threshold: float = field(
+        default=0.9,
+        metadata={
+            "description": "Estimated Jaccard similarity of word shingles at or above which a chunk quoting the same figures as an earlier one is a near-duplicate."
+        },
+    )
+
+    upsert_max_concurrency: int = field(
+        default=4,
+        metadata={
+            "description": "Vector store upsert requests in flight at the same time per file; batches are sized to the provider's vector count and payload limits."
+        },
+    )
+
+    upsert_max_retries: int = field(
+        default=3,
+        metadata={
+            "description": "Retries, with exponential backoff and jitter, of an upsert batch that failed."
+        },
+    )
+
+    ingestion_journal_path: str = field(
+        default="cache/ingestion_journal.db",
+        metadata={
+            "description": "SQLite file recording the parsed page ranges, completed stages and upsert batches of every file being ingested, so an interrupted ingestion resumes where it stopped; empty to disable."
+        },
+    )
+
+    blob_store_dir: str = field(
+        default="cache/blobs",
+        metadata={
+            "description": "Directory of the content-addressed blob store that holds parsed documents and chunks during indexing."
+        },
+    )
+
+    document_parser: Literal["upstage", "local"] = field(
+        default="upstage",
+        metadata={
+            "description": "Parser for PDF page ranges: 'upstage' (Upstage document parser) or 'local' (offline PyPDF2 text extraction, for testing)."
+        },
+    )
+
+    parse_pages_per_range: int = field(
+        default=10,
+        metadata={
+            "description": "Pages per range when a PDF is split for concurrent parsing; each range is one parser request."
+        },
+    )
+
+    parse_max_retries: int = field(
+        default=3,
+        metadata={
+            "description": "Retries, with exponential backoff and jitter, of a page range whose parse failed."
+        },
+    )
+
+    parse_cache_dir: str = field(
+        default="cache/parsed",
+        metadata={
+            "description": "Directory of the parse cache, which maps a PDF's content and parser options to its parsed pages in the blob store."
+        },
+    )
+
+    documents_dir: str = field(
+        default="documents",
+        metadata={
+            "description": "Directory scanned for PDF filings to ingest; every PDF not yet indexed by the thread is processed."
+        },
+    )
+
+    max_concurrent_parses: int = field(
+        default=4,
+        metadata={
+            "description": "Maximum number of document parser requests (PDF page ranges) in flight at the same time, across all files."
+        },
+    )
+
+    max_concurrent_embeddings: int = field(
+        default=4,
+        metadata={
+            "description": "Maximum number of embedding-heavy steps (one file's semantic chunking, or one index upsert batch) running at the same time."
+        },
+    )
+
+    streaming_ingestion: bool = field(
+        default=False,
+        metadata={
+            "description": "Whether to ingest each PDF page by page, streaming pages through parse, split, enrich and upsert with bounded memory, so the first vectors are searchable before the file finishes."
+        },
+    )
+
+    stream_queue_size: int = field(
+        default=8,
+        metadata={
+            "description": "Items (page ranges, pages or chunks) a streaming ingestion stage may run ahead of the next stage before it waits."
+        },
+    )
+
+    stream_batch_size: int = field(
+        default=64,
+        metadata={
+            "description": "Chunks per vector store upsert in streaming ingestion."
+        },
+    )
+
+    profiling_enabled: bool = field(
+        default=False,
+        metadata={
+            "description": "Whether to profile each node of the run with cProfile and tracemalloc (see retrieval_graph.profiling)."
+        },
+    )
+
+    profile_dir: str = field(
+        default_factory=lambda: os.environ.get("RETRIEVAL_GRAPH_PROFILE_DIR", "cache/profiles"),
+        metadata={
+            "description": "Directory that profiled runs write their reports to, one subdirectory per thread."
+        },
+    )
+
     @classmethod
     def from_runnable_config(
         cls: Type[T], config: Optional[RunnableConfig] = None
@@ -105,3 +270,31 @@ class Configuration(IndexConfiguration):
             "description": "The language model used for processing and refining queries. Should be in the form: provider/model-name."
         },
     )
+
+    answer_cache_enabled: bool = field(
+        default=True,
+        metadata={
+            "description": "Whether to answer repeated and near-duplicate first-turn questions from the semantic answer cache."
+        },
+    )
+
+    answer_cache_threshold: float = field(
+        default=0.95,
+        metadata={
+            "description": "Minimum cosine similarity between query embeddings for an answer cache hit."
+        },
+    )
+
+    answer_cache_ttl: float = field(
+        default=3600.0,
+        metadata={
+            "description": "Maximum age in seconds of a cached answer."
+        },
+    )
+
+    tool_cache_enabled: bool = field(
+        default=True,
+        metadata={
+            "description": "Whether to reuse cached tool results for repeated tool calls."
+        },
+    )
@@ -0,0 +1,328 @@
+"""Near-duplicate chunk elimination with MinHash and LSH.
+
+10-K filings repeat a lot of boilerplate: forward-looking-statement
+disclaimers, risk-factor templates, the same table headers on every page.
+Every copy used to be embedded and stored, and the copies then crowded the
+search results. `NearDuplicateFilter` finds chunks that are near-duplicates of
+an earlier chunk before they are embedded, drops them, and keeps one
+canonical copy whose metadata records the places it stands for.
+
+Similarity is the Jaccard similarity of the chunks' word shingles, estimated
+from MinHash signatures (`MinHasher`). Candidate pairs are found with a banded
+LSH index (`LSHIndex`) instead of comparing every pair, with bands and rows
+chosen for the threshold (`lsh_parameters`). Two safeguards keep distinct
+facts apart: a candidate only counts as a duplicate if it quotes exactly the
+same figures, so two years of the same table row are both kept, and chunks of
+fewer than `min_words` words are never dropped, being cheap to embed and easy
+to confuse.
+
+Classes:
+    MinHasher: MinHash signatures of the word shingles of texts.
+    LSHIndex: Banded locality-sensitive hashing index of signatures.
+    DedupReport: What near-duplicate elimination dropped and saved.
+    NearDuplicateFilter: Drop near-duplicate chunks, keeping canonical copies.
+
+Functions:
+    lsh_parameters: Choose the bands and rows of an LSH index for a threshold.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import math
+import re
+from dataclasses import asdict, dataclass
+from functools import cache
+from typing import Any, Callable, Iterable, Iterator, Optional
+
+import numpy as np
+import numpy.typing as npt
+from langchain_core.documents import Document
+
+from retrieval_graph.bulk_upsert import DEFAULT_VECTOR_BYTES, estimate_payload_bytes
+from retrieval_graph.usage import CHARS_PER_TOKEN
+
+# Prime modulus of the MinHash permutations, and the range of the hashes.
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+
+_WORD = re.compile(r"\w+")
+_FIGURE = re.compile(r"\d(?:[\d,.]*\d)?")
+
+
+@cache
+def lsh_parameters(threshold: float, num_perm: int) -> tuple[int, int]:
+    """Choose the bands and rows of an LSH index for a similarity threshold.
+
+    Two signatures become candidates if they agree on every row of at least
+    one band, which happens with probability 1 - (1 - s**rows)**bands for
+    similarity s. The (bands, rows) with bands * rows <= num_perm minimizing
+    the false positive probability below the threshold plus the false
+    negative probability above it is returned.
+
+    Args:
+        threshold (float): Jaccard similarity of a near-duplicate.
+        num_perm (int): Signature length.
+
+    Returns:
+        tuple[int, int]: Bands and rows per band.
+    """
+    s = np.linspace(0.0, 1.0, 1001)
+    below = s < threshold
+    best, best_error = (1, num_perm), math.inf
+    for bands in range(1, num_perm + 1):
+        for rows in range(1, num_perm // bands + 1):
+            candidate = 1.0 - (1.0 - s**rows) ** bands
+            error = float(candidate[below].sum() + (1.0 - candidate[~below]).sum())
+            if error < best_error:
+                best, best_error = (bands, rows), error
+    return best
+
+
+class MinHasher:
+    """MinHash signatures of the word shingles of texts.
+
+    Args:
+        num_perm (int): Hash permutations, i.e. signature length.
+        shingle_size (int): Words per shingle.
+        seed (int): Seed of the permutations; signatures are comparable only
+            between hashers with the same seed and length.
+    """
+
+    def __init__(self, num_perm: int = 128, shingle_size: int = 3, seed: int = 1) -> None:
+        """Draw the permutations."""
+        rng = np.random.default_rng(seed)
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self._a = rng.integers(1, _MERSENNE_PRIME, num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, _MERSENNE_PRIME, num_perm, dtype=np.uint64)
+
+    def shingles(self, words: list[str]) -> npt.NDArray[np.uint64]:
+        """Hash the distinct shingles of a word sequence to 32 bits."""
+        k = min(self.shingle_size, len(words))
+        grams = {" ".join(words[i : i + k]) for i in range(len(words) - k + 1)} if k else set()
+        digests = (hashlib.blake2b(g.encode("utf-8"), digest_size=4).digest() for g in grams)
+        return np.fromiter(
+            (int.from_bytes(digest, "little") for digest in digests),
+            dtype=np.uint64,
+            count=len(grams),
+        )
+
+    def signature(self, words: list[str]) -> npt.NDArray[np.uint64]:
+        """Compute the MinHash signature of a word sequence.
+
+        Args:
+            words (list[str]): The text's words, e.g. lowercased.
+
+        Returns:
+            NDArray[uint64]: `num_perm` minimum hashes.
+        """
+        hashes = self.shingles(words)
+        if not hashes.size:
+            return np.full(self.num_perm, _MAX_HASH, dtype=np.uint64)
+        # (a * x + b) mod p, wrapping around in 64 bits as in datasketch.
+        permuted = (np.outer(hashes, self._a) + self._b) % _MERSENNE_PRIME & _MAX_HASH
+        signature: npt.NDArray[np.uint64] = permuted.min(axis=0)
+        return signature
+
+
+class LSHIndex:
+    """Banded locality-sensitive hashing index of MinHash signatures.
+
+    Args:
+        threshold (float): Jaccard similarity the bands are tuned for.
+        num_perm (int): Signature length.
+    """
+
+    def __init__(self, threshold: float, num_perm: int) -> None:
+        """Create an empty index."""
+        self.bands, self.rows = lsh_parameters(threshold, num_perm)
+        self._buckets: dict[tuple[int, bytes], list[int]] = {}
+
+    def _keys(self, signature: npt.NDArray[np.uint64]) -> Iterator[tuple[int, bytes]]:
+        for band in range(self.bands):
+            yield band, signature[band * self.rows : (band + 1) * self.rows].tobytes()
+
+    def insert(self, key: int, signature: npt.NDArray[np.uint64]) -> None:
+        """Add a signature under a key."""
+        for bucket in self._keys(signature):
+            self._buckets.setdefault(bucket, []).append(key)
+
+    def query(self, signature: npt.NDArray[np.uint64]) -> list[int]:
+        """Return the keys sharing a band with a signature, in insertion order."""
+        found: set[int] = set()
+        for bucket in self._keys(signature):
+            found.update(self._buckets.get(bucket, ()))
+        return sorted(found)
+
+
+@dataclass
+class DedupReport:
+    """What near-duplicate elimination dropped and saved."""
+
+    chunks: int = 0
+    """Chunks examined."""
+
+    duplicates: int = 0
+    """Chunks dropped as near-duplicates of a canonical chunk."""
+
+    embedding_tokens_saved: int = 0
+    """Estimated tokens of the dropped chunks, not sent to the embeddings model."""
+
+    storage_bytes_saved: int = 0
+    """Estimated vector store bytes of the dropped chunks."""
+
+    def as_dict(self) -> dict[str, int]:
+        """Return the counters."""
+        return asdict(self)
+
+
+def _location(doc: Document) -> str:
+    """Describe where a chunk comes from, e.g. "amd_10k.pdf#page=12"."""
+    source = str(doc.metadata.get("source_file", ""))
+    page = doc.metadata.get("page")
+    return f"{source}#page={page}" if page is not None else source
+
+
+class NearDuplicateFilter:
+    """Drop near-duplicate chunks, keeping one canonical copy of each.
+
+    The first chunk of a group of near-duplicates, in the order seen, is the
+    canonical copy. Its metadata gets the locations of the copies it stands
+    for (`duplicate_sources`, e.g. "amd_10k.pdf#page=12") and their number
+    (`duplicate_count`); chunks without duplicates are left as they are.
+
+    Args:
+        threshold (float): Estimated Jaccard similarity of the word shingles at
+            or above which a chunk is a near-duplicate.
+        num_perm (int): MinHash signature length.
+        shingle_size (int): Words per shingle.
+        min_words (int): Chunks with fewer words are always kept.
+        vector_bytes (int): Estimated bytes per stored vector, for the report.
+    """
+
+    def __init__(
+        self,
+        threshold: float = 0.9,
+        *,
+        num_perm: int = 128,
+        shingle_size: int = 3,
+        min_words: int = 8,
+        vector_bytes: int = DEFAULT_VECTOR_BYTES,
+    ) -> None:
+        """Create a filter that has seen no chunks."""
+        self.threshold = threshold
+        self.min_words = min_words
+        self.vector_bytes = vector_bytes
+        self.hasher = MinHasher(num_perm, shingle_size)
+        self.index = LSHIndex(threshold, num_perm)
+        self.report = DedupReport()
+        self._signatures: list[npt.NDArray[np.uint64]] = []
+        self._figures: list[list[str]] = []
+
+    def match(self, doc: Document) -> Optional[int]:
+        """Return the canonical chunk a chunk duplicates, or register it as canonical.
+
+        Args:
+            doc (Document): The next chunk.
+
+        Returns:
+            Optional[int]: Position of the canonical chunk among those
+            registered, or None if `doc` is kept (and now registered itself).
+        """
+        self.report.chunks += 1
+        words = _WORD.findall(doc.page_content.lower())
+        if len(words) < self.min_words:
+            return None
+        signature = self.hasher.signature(words)
+        figures = _FIGURE.findall(doc.page_content)
+        for candidate in self.index.query(signature):
+            similarity = float(np.mean(self._signatures[candidate] == signature))
+            if similarity >= self.threshold and self._figures[candidate] == figures:
+                self.report.duplicates += 1
+                self.report.embedding_tokens_saved += math.ceil(
+                    len(doc.page_content) / CHARS_PER_TOKEN
+                )
+                self.report.storage_bytes_saved += estimate_payload_bytes(
+                    doc, self.vector_bytes
+                )
+                return candidate
+        key = len(self._signatures)
+        self._signatures.append(signature)
+        self._figures.append(figures)
+        self.index.insert(key, signature)
+        return None
+
+    def deduplicate(
+        self, source: Callable[[], Iterable[Document]]
+    ) -> Iterator[Document]:
+        """Drop the near-duplicates among all the chunks of a source.
+
+        The source is read twice: once to find the duplicates, then again to
+        yield the canonical chunks with the locations of all their copies.
+        Only the signatures and locations are held in memory. Copies of
+        chunks registered by an earlier call are dropped without being
+        recorded.
+
+        Args:
+            source (Callable[[], Iterable[Document]]): Returns the chunks, in
+                the same order every time it is called.
+
+        Yields:
+            Document: The chunks that are not near-duplicates.
+        """
+        positions: dict[int, int] = {}  # canonical key -> position in the source
+        duplicates: set[int] = set()
+        copies: dict[int, list[str]] = {}  # canonical position -> copy locations
+        for position, doc in enumerate(source()):
+            registered = len(self._signatures)
+            canonical = self.match(doc)
+            if canonical is not None:
+                duplicates.add(position)
+                if canonical in positions:
+                    copies.setdefault(positions[canonical], []).append(_location(doc))
+            elif len(self._signatures) > registered:
+                positions[registered] = position
+
+        for position, doc in enumerate(source()):
+            if position in duplicates:
+                continue
+            if position in copies:
+                _annotate(doc, copies[position])
+            yield doc
+
+    def filter_batch(self, docs: list[Document]) -> list[Document]:
+        """Drop the near-duplicates in a batch, of it or of earlier batches.
+
+        Used when streaming: canonical chunks of earlier batches were already
+        written, so only copies found in the same batch are recorded in a
+        canonical chunk's metadata; later copies are dropped all the same.
+
+        Args:
+            docs (list[Document]): The next chunks, in order.
+
+        Returns:
+            list[Document]: The chunks that are not near-duplicates.
+        """
+        kept: list[Document] = []
+        batch_canonicals: dict[int, Document] = {}
+        copies: dict[int, list[str]] = {}
+        for doc in docs:
+            registered = len(self._signatures)
+            canonical = self.match(doc)
+            if canonical is None:
+                if len(self._signatures) > registered:
+                    batch_canonicals[registered] = doc
+                kept.append(doc)
+            elif canonical in batch_canonicals:
+                copies.setdefault(canonical, []).append(_location(doc))
+        for canonical, locations in copies.items():
+            _annotate(batch_canonicals[canonical], locations)
+        return kept
+
+
+def _annotate(doc: Document, locations: list[str]) -> None:
+    """Record the locations of a canonical chunk's copies in its metadata."""
+    metadata: dict[str, Any] = doc.metadata
+    metadata["duplicate_sources"] = list(dict.fromkeys(locations))
+    metadata["duplicate_count"] = len(locations)
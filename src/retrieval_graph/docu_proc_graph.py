@@ -1,170 +1,469 @@
-"""This "graph" simply exposes an endpoint for a user to upload docs to be indexed."""
+"""This "graph" simply exposes an endpoint for a user to upload docs to be indexed.
 
-from typing import Optional, Sequence
+Every pending PDF in the documents folder (or the documents supplied in the
+input) is ingested by its own run of `file_pipeline`
+(load_pdf_docs -> split_documents -> enrich_metadata -> index_docs), and
+with `dedup_chunks` enabled near-duplicate chunks such as repeated
+boilerplate are dropped before they are embedded (see
+`retrieval_graph.dedup`). The pipelines run concurrently,
+with at most `max_concurrent_parses` parser requests (one per PDF page range,
+see `retrieval_graph.parsing`) and `max_concurrent_embeddings`
+embedding-heavy steps in flight; a file that fails is reported in the `files`
+state and does not stop the others.
+Invoke the graph with `{"docs": []}` to ingest every pending PDF.
+
+With `streaming_ingestion` enabled a file is ingested by `stream_file`
+instead: its pages flow one at a time through parse -> split -> enrich ->
+embed and upsert as a chain of async generators joined by bounded queues (see
+`retrieval_graph.streaming`). Memory is bounded by the queue, lookahead and
+batch sizes rather than by the size of the filing, and each upsert batch is
+searchable as soon as it is written, before the rest of the file is parsed.
+
+Parsed documents and chunks are offloaded to a content-addressed blob store
+(see `retrieval_graph.blob_store`); the graph state only carries references
+to them, which each node resolves lazily. A node deletes the blobs it
+consumed once its output is written, and the file's last node deletes its
+chunks once they are indexed, except for blobs the parse cache or the
+ingestion journal still refers to.
+
+The progress of every PDF is recorded in the ingestion journal (see
+`retrieval_graph.journal`): its parsed page ranges, its chunks once split and
+enriched (per page when streaming) and its upsert batches. A file whose
+ingestion was interrupted resumes where it stopped on the next run, without
+repeating parser, embedding or upsert requests.
+
+Nodes run on the server's event loop, so blocking work (reading and writing
+blobs, hashing PDFs, chunking with synchronous embedding calls, metadata
+cleanup) runs in a worker thread via `asyncio.to_thread`.
+"""
+
+import asyncio
+import copy
+import itertools
+import logging
+import weakref
+from pathlib import Path
+from typing import Any, AsyncIterator, Iterator, Optional, Sequence, Union
 
 from langchain_core.documents import Document
 from langchain_core.runnables import RunnableConfig
-from langgraph.graph import StateGraph
+from langchain_core.vectorstores import VectorStoreRetriever
+from langgraph.graph import END, START, StateGraph
+from langgraph.types import Send
 
-from retrieval_graph import retrieval
+from retrieval_graph import parsing, retrieval, streaming, telemetry, usage
+from retrieval_graph.blob_store import BlobStore, DocumentRef
+from retrieval_graph.bulk_upsert import BulkWriter, make_upsert_backend
+from retrieval_graph.caching import bump_index_generation
+from retrieval_graph.checkpointer import checkpointer_from_env
+from retrieval_graph.chunking import SemanticChunkingEngine
 from retrieval_graph.configuration import IndexConfiguration
+from retrieval_graph.dedup import NearDuplicateFilter
+from retrieval_graph.indexing import IncrementalIndexer, open_index_manifest
+from retrieval_graph.journal import FileProgress, open_ingestion_journal, progress_key
+from retrieval_graph.parse_cache import (
+    DEFAULT_PARSE_OPTIONS,
+    STREAMING_PARSE_OPTIONS,
+    ParseCache,
+    pdf_cache_key,
+)
 from retrieval_graph.state import IndexState
 
+logger = logging.getLogger(__name__)
+
+# Chunks handed to the indexer at a time; its bulk writer splits them into
+# concurrent, provider-sized upsert requests.
+_INDEX_BATCH_SIZE = 1024
+
+# Pre-chunks whose sentences are embedded together by the semantic chunker;
+# bounds the text held in memory while splitting.
+_CHUNK_WINDOW = 512
+
+# `files` key for documents supplied in the input rather than read from a PDF.
+_INPUT_DOCS = "input"
+
+def _get_blob_store(config: Optional[RunnableConfig]) -> BlobStore:
+    """Open the blob store configured for this run."""
+    configuration = IndexConfiguration.from_runnable_config(config)
+    return BlobStore(configuration.blob_store_dir)
+
+
+async def _release_blobs(
+    refs: Sequence[DocumentRef],
+    config: Optional[RunnableConfig],
+    keep: Sequence[DocumentRef] = (),
+) -> None:
+    """Delete consumed intermediate blobs that nothing holds any more.
+
+    Blobs are content-addressed and may be shared, so those in `keep` (e.g.
+    the node's own output) and those an entry of the parse cache or of the
+    ingestion journal refers to are kept.
+    """
+    released = {ref.key for ref in refs} - {ref.key for ref in keep}
+    if not released:
+        return
+    configuration = IndexConfiguration.from_runnable_config(config)
+    store = _get_blob_store(config)
+
+    def release() -> None:
+        held = ParseCache(configuration.parse_cache_dir, store).holding(released)
+        if configuration.ingestion_journal_path:
+            journal = open_ingestion_journal(configuration.ingestion_journal_path)
+            held |= journal.holding(released - held)
+        for ref in refs:
+            if ref.key in released and ref.key not in held:
+                store.delete(ref)
+
+    await asyncio.to_thread(release)
+
+
+def _iter_docs(state: IndexState, store: BlobStore) -> Iterator[Document]:
+    """Yield inline documents followed by those behind the state's blob refs."""
+    yield from state.docs
+    for ref in state.doc_refs:
+        yield from store.iter_documents(ref)
+
+
+async def _file_progress(
+    source_file: Optional[str], config: Optional[RunnableConfig]
+) -> Optional[FileProgress]:
+    """Open the journal entry of a PDF being ingested.
+
+    Returns None for input documents, which are not journaled, and when the
+    journal is disabled.
+    """
+    configuration = IndexConfiguration.from_runnable_config(config)
+    if not source_file or not configuration.ingestion_journal_path:
+        return None
+    options = (
+        STREAMING_PARSE_OPTIONS
+        if configuration.streaming_ingestion
+        else DEFAULT_PARSE_OPTIONS
+    )
+    # Everything that changes the chunks or where they are indexed; chunks
+    # carry the file name in their metadata.
+    settings = {
+        "source_file": Path(source_file).name,
+        "chunking_embedding_model": configuration.chunking_embedding_model,
+        "retriever_provider": configuration.retriever_provider,
+        "embedding_model": configuration.embedding_model,
+        "user_id": configuration.user_id,
+        "dedup_threshold": (
+            configuration.dedup_threshold if configuration.dedup_chunks else None
+        ),
+        "stream_batch_size": configuration.stream_batch_size,
+    }
+    key = await asyncio.to_thread(
+        progress_key, source_file, options, configuration.document_parser, settings
+    )
+    return FileProgress(
+        open_ingestion_journal(configuration.ingestion_journal_path),
+        key,
+        _get_blob_store(config),
+        name=Path(source_file).name,
+    )
+
+
+def _take(docs: Iterator[Document], n: int) -> list[Document]:
+    """Read up to `n` documents from an iterator (blocking; run it off the loop)."""
+    return list(itertools.islice(docs, n))
+
+
+def _count_docs(state: IndexState) -> int:
+    """Count the documents in the state without resolving blob refs."""
+    return len(state.docs) + sum(ref.count for ref in state.doc_refs)
+
+
+# Semaphores per event loop, keyed by (kind, limit); see `concurrency_limit`.
+_limits: weakref.WeakKeyDictionary[
+    asyncio.AbstractEventLoop, dict[tuple[str, int], asyncio.Semaphore]
+] = weakref.WeakKeyDictionary()
+
+
+def concurrency_limit(kind: str, limit: int) -> asyncio.Semaphore:
+    """Return the semaphore bounding `kind` work (e.g. "parse") on the running loop.
+
+    Concurrent file pipelines share one semaphore per kind, so the limit holds
+    across the whole batch rather than per file.
+
+    Args:
+        kind (str): Name of the bounded resource.
+        limit (int): Maximum number of concurrent holders.
+
+    Returns:
+        asyncio.Semaphore: The shared semaphore.
+    """
+    per_loop = _limits.setdefault(asyncio.get_running_loop(), {})
+    return per_loop.setdefault((kind, limit), asyncio.Semaphore(max(1, limit)))
+
+
+def find_pending_pdfs(
+    state: IndexState, config: Optional[RunnableConfig] = None
+) -> list[Path]:
+    """List the PDFs in the documents folder that the thread has not indexed yet.
+
+    Args:
+        state (IndexState): Current state; its `files` results mark indexed files.
+        config (Optional[RunnableConfig]): Configuration naming the documents folder.
+
+    Returns:
+        list[Path]: Pending PDF files, sorted by name.
+    """
+    configuration = IndexConfiguration.from_runnable_config(config)
+    indexed = {
+        name for name, result in state.files.items() if result.get("status") == "indexed"
+    }
+    return [
+        path
+        for path in sorted(Path(configuration.documents_dir).glob("*.pdf"))
+        if path.name not in indexed
+    ]
+
+
+async def parse_pdf(
+    pdf_file: Path, config: Optional[RunnableConfig] = None
+) -> DocumentRef:
+    """Parse a PDF with the configured document parser, through the parse cache.
+
+    The cache is keyed by the PDF's bytes and the parser options (see
+    `retrieval_graph.parse_cache`). On a miss the PDF is split into page ranges
+    that are parsed concurrently (see `retrieval_graph.parsing`); parser
+    requests are bounded by `max_concurrent_parses` across all concurrent files,
+    and every parsed range is recorded in the ingestion journal, so a parse
+    that was interrupted resumes with the ranges still missing.
+
+    Args:
+        pdf_file (Path): The PDF to parse.
+        config (Optional[RunnableConfig]): Configuration for the parse.
+
+    Returns:
+        DocumentRef: Blob store reference to the parsed documents, which carry
+        `source_file` metadata.
+    """
+    configuration = IndexConfiguration.from_runnable_config(config)
+    cache = ParseCache(configuration.parse_cache_dir, _get_blob_store(config))
+    options = DEFAULT_PARSE_OPTIONS
+    key = await asyncio.to_thread(
+        pdf_cache_key, pdf_file, options, configuration.document_parser
+    )
+    
+    cached = await asyncio.to_thread(cache.get, key)
+    if cached is not None:
+        logger.info("Parse cache hit for %s (%d documents)", pdf_file.name, cached.count)
+        return cached
+    
+    logger.info("Parsing PDF with %s parser: %s", configuration.document_parser, pdf_file.name)
+    progress = await _file_progress(str(pdf_file), config)
+    with telemetry.span("parse", source_file=pdf_file.name):
+        documents = await parsing.parse_pdf_ranges(
+            pdf_file,
+            parsing.make_parser(configuration.document_parser),
+            options,
+            pages_per_range=configuration.parse_pages_per_range,
+            limit=concurrency_limit("parse", configuration.max_concurrent_parses),
+            retries=configuration.parse_max_retries,
+            checkpoint=progress,
+        )
+    
+    return await asyncio.to_thread(
+        cache.put, key, documents, source_file=pdf_file.name, options=options
+    )
+
 
 # Load PDF Node Start
+@telemetry.instrument_node
 async def load_pdf_docs(
     state: IndexState, *, config: Optional[RunnableConfig] = None
-) -> dict[str, Sequence[Document]]:
-    """Load PDF documents using UpstageDocumentParseLoader API with pickle caching.
+) -> dict[str, Any]:
+    """Load the pipeline's PDF using the Upstage parser, with parse caching.
     
     This function will:
-    - Check for cached parsed documents first
-    - Load PDF files from documents folder if no cache
-    - Parse documents using Upstage API with auto format
-    - Cache parsed documents to pickle file
-    - Return documents for further processing
+    - Pass through documents already supplied in the input state
+    - Otherwise parse `state.source_file` (see `parse_pdf`)
+    - Offload documents to the blob store for further processing
     
     Args:
-        state (IndexState): Current state (may contain file paths or be empty)
+        state (IndexState): Current state (may contain already-parsed documents or a PDF path)
         config (Optional[RunnableConfig]): Configuration for loading process
         
     Returns:
-        dict[str, Sequence[Document]]: Updated state with loaded documents
+        dict[str, Any]: Updated state with a blob reference to the loaded documents
     """
-    from langchain_upstage import UpstageDocumentParseLoader
-    from pathlib import Path
-    import pickle
-    
-    # Load the first PDF file from documents folder
-    docs_folder = Path("documents")
-    pdf_files = list(docs_folder.glob("*.pdf"))
+    store = _get_blob_store(config)
     
-    if not pdf_files:
-        return {"docs": []}
+    # Already-parsed documents were supplied by the caller; skip parsing.
+    if state.docs:
+        ref = await asyncio.to_thread(store.put_documents, state.docs)
+        return {"docs": "delete", "doc_refs": [*state.doc_refs, ref]}
+    if state.doc_refs:
+        return {}
+    if not state.source_file:
+        return {"docs": "delete", "doc_refs": "delete"}
     
-    # Use the first PDF file found
-    pdf_file = pdf_files[0]
-    
-    # Create cache directory and file path
-    cache_dir = Path("cache")
-    cache_dir.mkdir(exist_ok=True)
-    cache_file = cache_dir / f"{pdf_file.stem}_parsed_docs.pkl"
-    
-    # Check if cached version exists
-    if cache_file.exists():
-        print(f"📋 Loading cached documents: {cache_file.name}")
-        try:
-            with open(cache_file, "rb") as f:
-                documents = pickle.load(f)
-            print(f"✅ Loaded {len(documents)} documents from cache")
-            return {"docs": documents}
-        except Exception as e:
-            print(f"⚠️ Cache read failed ({e}), falling back to API parsing")
-    
-    print(f"📋 Parsing PDF with Upstage API: {pdf_file.name}")
-    
-    # Use UpstageDocumentParseLoader with auto format (no ocr or split params)
-    loader = UpstageDocumentParseLoader(str(pdf_file))
-    documents = await loader.aload()
-    
-    # Add source file metadata
-    for doc in documents:
-        doc.metadata.update({
-            "source_file": pdf_file.name
-        })
+    ref = await parse_pdf(Path(state.source_file), config)
+    return {"docs": "delete", "doc_refs": [ref]}
+# Load PDF Node End
+
+
+def _make_splitters(config: Optional[RunnableConfig]) -> tuple[Any, SemanticChunkingEngine]:
+    """Create the (pre-splitter, semantic chunking engine) pair used to split documents."""
+    from langchain.text_splitter import RecursiveCharacterTextSplitter
     
-    print(f"✅ Loaded {len(documents)} documents from API")
+    # Semantic chunking with the configured (Upstage by default) embeddings
+    configuration = IndexConfiguration.from_runnable_config(config)
+    embeddings = retrieval.make_embeddings(
+        configuration.chunking_embedding_model, configuration.embedding_cache_path
+    )
+    semantic_splitter = SemanticChunkingEngine(embeddings)
     
-    # Cache the parsed documents
-    try:
-        with open(cache_file, "wb") as f:
-            pickle.dump(documents, f)
-        print(f"💾 Cached documents to {cache_file.name}")
-    except Exception as e:
-        print(f"⚠️ Failed to cache documents: {e}")
+    # Pre-splitter to handle very large documents that exceed token limits
+    pre_splitter = RecursiveCharacterTextSplitter(
+        chunk_size=3000,  # Stay well below 4000 token limit
+        chunk_overlap=200,
+        length_function=len,
+        separators=["\n\n", "\n", " ", ""]
+    )
+    return pre_splitter, semantic_splitter
+
+
+def _pre_split(doc: Document, pre_splitter: Any) -> list[Document]:
+    """Pre-split a document if it is too large to chunk semantically in one piece."""
+    if len(doc.page_content) > 3000:
+        pre_chunks: list[Document] = pre_splitter.split_documents([doc])
+        logger.debug("Pre-split large document into %d parts", len(pre_chunks))
+        return pre_chunks
+    return [doc]
+
+
+def _split_documents(
+    docs: Sequence[Document], semantic_splitter: SemanticChunkingEngine
+) -> list[Document]:
+    """Split pre-chunks into semantic chunks (blocking; run it off the loop).
+
+    The sentences of all the pre-chunks are embedded together, in a few large
+    batches, instead of one request per pre-chunk.
+    """
+    with telemetry.span("chunk"):
+        texts = semantic_splitter.split_texts([doc.page_content for doc in docs])
     
-    return {"docs": documents}
-# Load PDF Node End
+    split: list[Document] = []
+    for pre_chunk, chunks in zip(docs, texts):
+        if chunks is None:
+            logger.warning("Semantic chunking failed for a document part")
+            # Fallback: use the pre-chunk as-is
+            pre_chunk.metadata.update({
+                "chunk_id": 0,
+                "total_chunks": 1,
+                "chunk_type": "fallback"
+            })
+            split.append(pre_chunk)
+            continue
+        for i, chunk in enumerate(chunks):
+            split.append(Document(
+                page_content=chunk,
+                metadata={
+                    **copy.deepcopy(pre_chunk.metadata),
+                    "chunk_id": i,
+                    "total_chunks": len(chunks),
+                    "chunk_type": "semantic"
+                },
+            ))
+    return split
 
 
 # Split Documents Node Start  
+@telemetry.instrument_node
 async def split_documents(
     state: IndexState, *, config: Optional[RunnableConfig] = None
-) -> dict[str, Sequence[Document]]:
+) -> dict[str, Any]:
     """Split large documents using semantic chunking for better retrieval.
     
     This function will:
-    - Take documents from state
+    - Stream documents from the blob store
     - Pre-split large documents to avoid token limits
-    - Use semantic chunking to split based on content meaning
+    - Use semantic chunking to split based on content meaning, embedding the
+      sentences of many pre-chunks together in large batches
     - Split documents into coherent semantic chunks
     - Preserve metadata and add chunk information
+    - Write chunks back to the blob store as they are produced
+    - Record the chunks in the ingestion journal, or reuse those recorded by
+      an interrupted ingestion of the same file
     
     Args:
         state (IndexState): Current state containing documents to split
         config (Optional[RunnableConfig]): Configuration for splitting
         
     Returns:
-        dict[str, Sequence[Document]]: Updated state with split documents
+        dict[str, Any]: Updated state with a blob reference to the split documents
     """
-    from langchain_experimental.text_splitter import SemanticChunker
-    from langchain_upstage import UpstageEmbeddings
-    from langchain.text_splitter import RecursiveCharacterTextSplitter
+    progress = await _file_progress(state.source_file, config)
+    if progress is not None:
+        ref = await progress.stage("split")
+        if ref is not None:
+            logger.info("Reusing %d journaled chunks of %s", ref.count, progress.name)
+            await _release_blobs(state.doc_refs, config, keep=[ref])
+            return {"docs": "delete", "doc_refs": [ref]}
     
-    # Initialize semantic chunker with Upstage embeddings
-    embeddings = UpstageEmbeddings(model="solar-embedding-1-large")
-    semantic_splitter = SemanticChunker(embeddings)
+    configuration = IndexConfiguration.from_runnable_config(config)
+    pre_splitter, semantic_splitter = _make_splitters(config)
+    store = _get_blob_store(config)
     
-    # Pre-splitter to handle very large documents that exceed token limits
-    pre_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=3000,  # Stay well below 4000 token limit
-        chunk_overlap=200,
-        length_function=len,
-        separators=["\n\n", "\n", " ", ""]
+    # Chunking is CPU work with synchronous embedding calls; keep it off the loop.
+    def split_all() -> DocumentRef:
+        with store.writer() as writer:
+            window: list[Document] = []
+            for doc in _iter_docs(state, store):
+                window.extend(_pre_split(doc, pre_splitter))
+                if len(window) >= _CHUNK_WINDOW:
+                    writer.write_all(_split_documents(window, semantic_splitter))
+                    window = []
+            writer.write_all(_split_documents(window, semantic_splitter))
+        return writer.close()
+
+    async with concurrency_limit("embed", configuration.max_concurrent_embeddings):
+        ref = await asyncio.to_thread(split_all)
+    
+    logger.info(
+        "Split %d documents into %d semantic chunks", _count_docs(state), ref.count
     )
+    telemetry.increment("retrieval_graph_chunks_split_total", ref.count)
+    if progress is not None:
+        await progress.record_stage("split", ref)
+    await _release_blobs(state.doc_refs, config, keep=[ref])
     
-    # Split all documents using semantic chunking
-    split_docs = []
-    for doc in state.docs:
-        # First, pre-split if document is too large
-        if len(doc.page_content) > 3000:
-            pre_chunks = pre_splitter.split_documents([doc])
-            print(f"📄 Pre-split large document into {len(pre_chunks)} parts")
-        else:
-            pre_chunks = [doc]
-        
-        # Then apply semantic chunking to each pre-chunk
-        for pre_chunk in pre_chunks:
-            try:
-                chunks = semantic_splitter.split_documents([pre_chunk])
-                
-                for i, chunk in enumerate(chunks):
-                    chunk.metadata.update({
-                        "chunk_id": i,
-                        "total_chunks": len(chunks),
-                        "chunk_type": "semantic"
-                    })
-                split_docs.extend(chunks)
-            except Exception as e:
-                print(f"⚠️ Semantic chunking failed for a document part: {e}")
-                # Fallback: use the pre-chunk as-is
-                pre_chunk.metadata.update({
-                    "chunk_id": 0,
-                    "total_chunks": 1,
-                    "chunk_type": "fallback"
-                })
-                split_docs.append(pre_chunk)
+    return {"docs": "delete", "doc_refs": [ref]}
+# Split Documents Node End
+
+
+def _enrich_document(doc: Document) -> Document:
+    """Keep only simple metadata values and add processing stats, in place."""
+    from datetime import datetime
     
-    print(f"✅ Split {len(state.docs)} documents into {len(split_docs)} semantic chunks")
+    # Clean metadata - only keep simple types (string, number, boolean)
+    clean_metadata = {}
+    for key, value in doc.metadata.items():
+        if isinstance(value, (str, int, float, bool)):
+            clean_metadata[key] = value
+        elif isinstance(value, list) and all(isinstance(item, str) for item in value):
+            clean_metadata[key] = value
+        # Skip complex objects like coordinates, nested dicts, etc.
     
-    return {"docs": split_docs}
-# Split Documents Node End
+    # Add processing timestamp and document stats
+    clean_metadata.update({
+        "processed_at": datetime.now().isoformat(),
+        "doc_length": len(doc.page_content),
+        "doc_type": "pdf_chunk"
+    })
+    
+    doc.metadata = clean_metadata
+    return doc
 
 
 # Enrich Metadata Node Start
+@telemetry.instrument_node
 async def enrich_metadata(
     state: IndexState, *, config: Optional[RunnableConfig] = None
-) -> dict[str, Sequence[Document]]:
+) -> dict[str, Any]:
     """Enrich document metadata with additional information.
     
     This function will:
@@ -172,41 +471,39 @@ async def enrich_metadata(
     - Add processing timestamps
     - Add document type and size information
     - Prepare documents for indexing
+    - Record them in the ingestion journal, so a resumed ingestion indexes
+      exactly the same chunks
     
     Args:
         state (IndexState): Current state containing documents to enrich
         config (Optional[RunnableConfig]): Configuration for metadata enrichment
         
     Returns:
-        dict[str, Sequence[Document]]: Updated state with enriched documents
+        dict[str, Any]: Updated state with a blob reference to the enriched documents
     """
-    from datetime import datetime
+    progress = await _file_progress(state.source_file, config)
+    if progress is not None:
+        ref = await progress.stage("enriched")
+        if ref is not None:
+            await _release_blobs(state.doc_refs, config, keep=[ref])
+            return {"docs": "delete", "doc_refs": [ref]}
+    store = _get_blob_store(config)
     
-    # Enrich each document with additional metadata
-    enriched_docs = []
-    for doc in state.docs:
-        # Clean metadata - only keep simple types (string, number, boolean)
-        clean_metadata = {}
-        for key, value in doc.metadata.items():
-            if isinstance(value, (str, int, float, bool)):
-                clean_metadata[key] = value
-            elif isinstance(value, list) and all(isinstance(item, str) for item in value):
-                clean_metadata[key] = value
-            # Skip complex objects like coordinates, nested dicts, etc.
-        
-        # Add processing timestamp and document stats
-        clean_metadata.update({
-            "processed_at": datetime.now().isoformat(),
-            "doc_length": len(doc.page_content),
-            "doc_type": "pdf_chunk"
-        })
-        
-        doc.metadata = clean_metadata
-        enriched_docs.append(doc)
+    # Enrich each document with additional metadata, off the event loop
+    def enrich_all() -> DocumentRef:
+        with store.writer() as writer:
+            for doc in _iter_docs(state, store):
+                writer.write(_enrich_document(doc))
+        return writer.close()
+
+    ref = await asyncio.to_thread(enrich_all)
     
-    print(f"✅ Enriched metadata for {len(enriched_docs)} documents")
+    logger.info("Enriched metadata for %d documents", ref.count)
+    if progress is not None:
+        await progress.record_stage("enriched", ref)
+    await _release_blobs(state.doc_refs, config, keep=[ref])
     
-    return {"docs": enriched_docs}  
+    return {"docs": "delete", "doc_refs": [ref]}
 # Enrich Metadata Node End
 
 
@@ -227,19 +524,104 @@ def ensure_docs_have_user_id(
     user_id = config["configurable"]["user_id"]
     return [
         Document(
-            page_content=doc.page_content, metadata={**doc.metadata, "user_id": user_id}
+            id=doc.id,
+            page_content=doc.page_content,
+            metadata={**doc.metadata, "user_id": user_id},
         )
         for doc in docs
     ]
 
+
+def _make_indexer(
+    retriever: VectorStoreRetriever, configuration: IndexConfiguration
+) -> IncrementalIndexer:
+    """Start an incremental indexing run against the retriever's vector store."""
+    backend = make_upsert_backend(configuration.retriever_provider, retriever.vectorstore)
+    return IncrementalIndexer(
+        retriever.vectorstore,
+        open_index_manifest(configuration.index_manifest_path),
+        namespace=f"{configuration.retriever_provider}/{configuration.embedding_model}",
+        writer=BulkWriter(
+            backend,
+            max_concurrency=configuration.upsert_max_concurrency,
+            retries=configuration.upsert_max_retries,
+        ),
+    )
+
+
+def _make_dedup(configuration: IndexConfiguration) -> Optional[NearDuplicateFilter]:
+    """Create the near-duplicate filter of a file's chunks, if enabled."""
+    if not configuration.dedup_chunks:
+        return None
+    return NearDuplicateFilter(configuration.dedup_threshold)
+
+
+def _dedup_result(dedup: Optional[NearDuplicateFilter], name: str) -> dict[str, int]:
+    """Log and count what near-duplicate elimination saved; return its report."""
+    if dedup is None:
+        return {}
+    report = dedup.report
+    if report.duplicates:
+        logger.info(
+            "Dropped %d of %d chunks of %s as near-duplicates"
+            " (~%d embedding tokens and ~%.1f KB of storage saved)",
+            report.duplicates,
+            report.chunks,
+            name,
+            report.embedding_tokens_saved,
+            report.storage_bytes_saved / 1024,
+        )
+    telemetry.increment("retrieval_graph_duplicate_chunks_total", report.duplicates)
+    telemetry.increment(
+        "retrieval_graph_embedding_tokens_saved_total", report.embedding_tokens_saved
+    )
+    return report.as_dict()
+
+
+async def _index_batch(
+    indexer: IncrementalIndexer,
+    batch: list[Document],
+    config: RunnableConfig,
+    progress: Optional[FileProgress] = None,
+) -> int:
+    """Upsert the new or changed chunks of a batch; return how many were written.
+
+    With a journal entry, chunks an interrupted run already upserted are only
+    skipped, and the rest of the batch is recorded once it is written.
+    """
+    if progress is not None and progress.resumed_chunks:
+        done, batch = batch[: progress.resumed_chunks], batch[progress.resumed_chunks :]
+        progress.resumed_chunks -= len(done)
+        await indexer.skip(done)
+    if not batch:
+        return 0
+    before = indexer.report.added + indexer.report.updated
+    await indexer.upsert(ensure_docs_have_user_id(batch, config))
+    written = indexer.report.added + indexer.report.updated - before
+    telemetry.increment("retrieval_graph_chunks_indexed_total", written)
+    if progress is not None:
+        await progress.record_batch(len(batch))
+    return written
+
+
+@telemetry.instrument_node
 async def index_docs(
     state: IndexState, *, config: Optional[RunnableConfig] = None
-) -> dict[str, str]:
+) -> dict[str, Any]:
     """Index documents in the vector store using the configured retriever.
 
-    This function takes the documents from the state, ensures they have a user ID,
-    adds them to the retriever's index, and then signals for the documents to be
-    deleted from the state.
+    This function streams the documents from the state, ensures they have a user ID,
+    and indexes them in batches under deterministic chunk IDs (see
+    `retrieval_graph.indexing`): near-duplicates of earlier chunks are dropped
+    if `dedup_chunks` is enabled (see `retrieval_graph.dedup`), only new or
+    changed chunks are embedded and upserted, and chunks of the file that no
+    longer occur are deleted. Upsert batches are recorded in the ingestion journal, and those recorded by an
+    interrupted ingestion of the file are skipped. If the index changed, it
+    bumps the index generation so cached answers are invalidated. It then
+    deletes the indexed chunks from the blob store and signals for the
+    documents and their blob references to be deleted from the state. What
+    was indexed is reported in `files` and the thread's estimated embedding
+    usage as `usage`.
 
     Args:
         state (IndexState): The current state containing documents and retriever.
@@ -247,33 +629,325 @@ async def index_docs(
     """
     if not config:
         raise ValueError("Configuration required to run index_docs.")
-    
-    with retrieval.make_retriever(config) as retriever:
-        stamped_docs = ensure_docs_have_user_id(state.docs, config)
-        await retriever.aadd_documents(stamped_docs)
-    
-    print(f"✅ Successfully indexed {len(state.docs)} documents to vector store")
-    
-    return {"docs": "delete"}
+
+    configuration = IndexConfiguration.from_runnable_config(config)
+    store = _get_blob_store(config)
+    limit = concurrency_limit("embed", configuration.max_concurrent_embeddings)
+    progress = await _file_progress(state.source_file, config)
+    if progress is not None:
+        await progress.upserted()
+    name = Path(state.source_file).name if state.source_file else _INPUT_DOCS
+
+    dedup = _make_dedup(configuration)
+    docs = _iter_docs(state, store)
+    intermediate: list[DocumentRef] = []
+    if dedup is not None:
+        # Two passes over the chunks, off the loop: find duplicates, then drop them.
+        def dedup_all() -> DocumentRef:
+            with store.writer() as writer:
+                writer.write_all(dedup.deduplicate(lambda: _iter_docs(state, store)))
+            return writer.close()
+
+        intermediate.append(await asyncio.to_thread(dedup_all))
+        docs = store.iter_documents(intermediate[0])
+
+    try:
+        with retrieval.make_retriever(config) as retriever:
+            indexer = _make_indexer(retriever, configuration)
+            # Blobs are decoded in a worker thread, a batch at a time.
+            while batch := await asyncio.to_thread(_take, docs, _INDEX_BATCH_SIZE):
+                async with limit:
+                    await _index_batch(indexer, batch, config, progress)
+            report = await indexer.finish()
+    finally:
+        # The deduplicated chunks are recomputed by a retry, never reused.
+        await _release_blobs(intermediate, config)
+    # The chunks are indexed: release them and what the journal recorded.
+    released = await progress.complete() if progress is not None else []
+    await _release_blobs([*state.doc_refs, *released], config)
+
+    if report.changed:
+        # Invalidate cached answers that were produced against the old index.
+        await asyncio.to_thread(
+            bump_index_generation, configuration.index_generation_path
+        )
+
+    result = {"status": "indexed", **report.as_dict(), "dedup": _dedup_result(dedup, name)}
+    return {
+        "docs": "delete",
+        "doc_refs": "delete",
+        "files": {name: result},
+        "usage": usage.thread_usage(config),
+    }
 # Index Node End
 
 
 
-builder = StateGraph(IndexState, config_schema=IndexConfiguration)
+async def _stream_pages(
+    state: IndexState,
+    config: Optional[RunnableConfig],
+    progress: Optional[FileProgress] = None,
+) -> AsyncIterator[Document]:
+    """Yield the pages of a streaming ingestion, parsing the PDF range by range.
+
+    Input documents and blob refs are passed through. A PDF is read from the
+    parse cache when it has been parsed before; otherwise its page ranges are
+    parsed with a bounded lookahead (reusing those recorded in `progress`) and
+    written to the blob store as they arrive, and the parse is recorded in the
+    cache once the file is complete.
+    """
+    configuration = IndexConfiguration.from_runnable_config(config)
+    store = _get_blob_store(config)
+    for doc in state.docs:
+        yield doc
+    for ref in state.doc_refs:
+        async for doc in streaming.aiter_blocking(store.iter_documents(ref)):
+            yield doc
+    if not state.source_file:
+        return
+
+    pdf_file = Path(state.source_file)
+    cache = ParseCache(configuration.parse_cache_dir, store)
+    options = STREAMING_PARSE_OPTIONS
+    key = await asyncio.to_thread(
+        pdf_cache_key, pdf_file, options, configuration.document_parser
+    )
+    cached = await asyncio.to_thread(cache.get, key)
+    if cached is not None:
+        logger.info("Parse cache hit for %s (%d pages)", pdf_file.name, cached.count)
+        async for doc in streaming.aiter_blocking(cache.iter_pages(cached)):
+            yield doc
+        return
+
+    logger.info("Streaming PDF with %s parser: %s", configuration.document_parser, pdf_file.name)
+    writer = store.writer()
+    try:
+        async for docs in parsing.stream_pdf_ranges(
+            pdf_file,
+            parsing.make_parser(configuration.document_parser),
+            options,
+            pages_per_range=configuration.parse_pages_per_range,
+            limit=concurrency_limit("parse", configuration.max_concurrent_parses),
+            lookahead=configuration.max_concurrent_parses,
+            retries=configuration.parse_max_retries,
+            checkpoint=progress,
+        ):
+            await asyncio.to_thread(writer.write_all, docs)
+            for doc in docs:
+                yield doc
+    except BaseException:
+        # Failed or stopped early: never cache a partial parse.
+        writer.abort()
+        raise
+    ref = await asyncio.to_thread(writer.close)
+    await asyncio.to_thread(
+        cache.record, key, ref, source_file=pdf_file.name, options=options
+    )
+
+
+@telemetry.instrument_node
+async def stream_file(
+    state: IndexState, *, config: Optional[RunnableConfig] = None
+) -> dict[str, Any]:
+    """Ingest one file page by page, with bounded memory.
+
+    Pages are split into semantic chunks and enriched as they are parsed, and
+    the chunks are indexed incrementally (see `index_docs`) in batches of
+    `stream_batch_size`. Every stage runs at most `stream_queue_size` items
+    ahead of the next one, and splitting and upserts share the
+    `max_concurrent_embeddings` limit with other files. The index generation
+    is bumped after every batch that wrote to the index, since its vectors are
+    searchable from then on. Near-duplicates of earlier chunks are dropped
+    before their batch is indexed. The parsed ranges, each page's chunks and the
+    upsert batches are recorded in the ingestion journal, and an interrupted
+    ingestion of the file resumes from them.
+
+    Args:
+        state (IndexState): The file to ingest (`source_file`), or input documents.
+        config (Optional[RunnableConfig]): Configuration for the ingestion.
+
+    Returns:
+        dict[str, Any]: The file's result in `files`.
+    """
+    if not config:
+        raise ValueError("Configuration required to run stream_file.")
+
+    configuration = IndexConfiguration.from_runnable_config(config)
+    pre_splitter, semantic_splitter = _make_splitters(config)
+    limit = concurrency_limit("embed", configuration.max_concurrent_embeddings)
+    queue_size = configuration.stream_queue_size
+    run_config: RunnableConfig = config
+    store = _get_blob_store(config)
+    progress = await _file_progress(state.source_file, config)
+    if progress is not None:
+        await progress.upserted()
+    dedup = _make_dedup(configuration)
+    pages = 0
+
+    def split_and_enrich(page: Document) -> list[Document]:
+        chunks = _split_documents(_pre_split(page, pre_splitter), semantic_splitter)
+        return [_enrich_document(chunk) for chunk in chunks]
+
+    async def page_chunks(page: Document) -> list[Document]:
+        """Split and enrich a page, or reuse its chunks from the journal."""
+        stage = f"chunks:{pages}"
+        if progress is not None:
+            ref = await progress.stage(stage)
+            if ref is not None:
+                return await asyncio.to_thread(store.load_documents, ref)
+        async with limit:
+            split = await asyncio.to_thread(split_and_enrich, page)
+        telemetry.increment("retrieval_graph_chunks_split_total", len(split))
+        if progress is not None:
+            ref = await asyncio.to_thread(store.put_documents, split)
+            await progress.record_stage(stage, ref)
+        return split
+
+    async def chunks() -> AsyncIterator[Document]:
+        nonlocal pages
+        pages_in = _stream_pages(state, config, progress)
+        async for page in streaming.buffered(pages_in, queue_size):
+            split = await page_chunks(page)
+            pages += 1
+            for chunk in split:
+                yield chunk
+
+    with retrieval.make_retriever(config) as retriever:
+        indexer = _make_indexer(retriever, configuration)
+        async for batch in streaming.batched(
+            streaming.buffered(chunks(), queue_size), configuration.stream_batch_size
+        ):
+            if dedup is not None:
+                batch = dedup.filter_batch(batch)
+            async with limit:
+                written = await _index_batch(indexer, batch, run_config, progress)
+            if written:
+                # The batch is searchable now; invalidate answers cached before it.
+                await asyncio.to_thread(
+                    bump_index_generation, configuration.index_generation_path
+                )
+        report = await indexer.finish()
+    released = await progress.complete() if progress is not None else []
+    await _release_blobs([*state.doc_refs, *released], config)
+    if report.deleted:
+        await asyncio.to_thread(
+            bump_index_generation, configuration.index_generation_path
+        )
+
+    logger.info("Streamed %d pages into %d chunks", pages, report.chunks)
+    name = Path(state.source_file).name if state.source_file else _INPUT_DOCS
+    result = {"status": "indexed", **report.as_dict(), "dedup": _dedup_result(dedup, name)}
+    return {
+        "docs": "delete",
+        "doc_refs": "delete",
+        "files": {name: result},
+    }
+
+
+# Per-file pipeline: one run per PDF (or per batch of input documents).
+file_builder = StateGraph(IndexState, config_schema=IndexConfiguration)
 
 # Add all nodes to the graph
-builder.add_node("load_pdf_docs", load_pdf_docs)
-builder.add_node("split_documents", split_documents)
-builder.add_node("enrich_metadata", enrich_metadata)
-builder.add_node("index_docs", index_docs)
+file_builder.add_node("load_pdf_docs", load_pdf_docs)
+file_builder.add_node("split_documents", split_documents)
+file_builder.add_node("enrich_metadata", enrich_metadata)
+file_builder.add_node("index_docs", index_docs)
 
 # Create the simplified document processing pipeline flow
-builder.add_edge("__start__", "load_pdf_docs")
-builder.add_edge("load_pdf_docs", "split_documents")
-builder.add_edge("split_documents", "enrich_metadata")
-builder.add_edge("enrich_metadata", "index_docs")
+file_builder.add_edge(START, "load_pdf_docs")
+file_builder.add_edge("load_pdf_docs", "split_documents")
+file_builder.add_edge("split_documents", "enrich_metadata")
+file_builder.add_edge("enrich_metadata", "index_docs")
+
+file_pipeline = file_builder.compile()
+file_pipeline.name = "FileIngestionPipeline"
+
+
+def route_files(state: IndexState, config: RunnableConfig) -> Union[list[Send], str]:
+    """Start one ingestion pipeline per pending PDF, or one for the input documents.
+
+    Args:
+        state (IndexState): The graph input.
+        config (RunnableConfig): Configuration naming the documents folder.
+
+    Returns:
+        Union[list[Send], str]: An `ingest_file` task per file, or END if
+        nothing is pending.
+    """
+    if state.docs or state.doc_refs:
+        return [Send("ingest_file", {"docs": state.docs, "doc_refs": state.doc_refs})]
+    pending = find_pending_pdfs(state, config)
+    logger.info("Found %d pending PDFs", len(pending))
+    if not pending:
+        return END
+    return [Send("ingest_file", {"source_file": str(path)}) for path in pending]
+
+
+@telemetry.instrument_node
+async def ingest_file(
+    state: dict[str, Any], *, config: RunnableConfig
+) -> dict[str, Any]:
+    """Ingest one file, isolating its failure from the batch.
+
+    The file runs through `file_pipeline`, or through `stream_file` when
+    `streaming_ingestion` is enabled.
+
+    Args:
+        state (dict[str, Any]): The `file_pipeline` input sent by `route_files`.
+        config (RunnableConfig): Configuration for the ingestion.
+
+    Returns:
+        dict[str, Any]: The file's result in `files`.
+    """
+    source_file = state.get("source_file")
+    name = Path(source_file).name if source_file else _INPUT_DOCS
+    try:
+        if IndexConfiguration.from_runnable_config(config).streaming_ingestion:
+            result = await stream_file(IndexState(**state), config=config)
+        else:
+            result = await file_pipeline.ainvoke(state, config)
+        files = result["files"]
+        telemetry.increment("retrieval_graph_files_ingested_total", status="indexed")
+    except Exception as e:
+        logger.exception("Ingestion failed for %s", name)
+        files = {name: {"status": "failed", "error": f"{type(e).__name__}: {e}"}}
+        telemetry.increment("retrieval_graph_files_ingested_total", status="failed")
+    return {"docs": "delete", "doc_refs": "delete", "files": files}
+
+
+@telemetry.instrument_node
+async def report_ingestion(
+    state: IndexState, *, config: RunnableConfig
+) -> dict[str, Any]:
+    """Log the batch outcome once every file has finished and report usage.
+
+    Args:
+        state (IndexState): State holding every file's result.
+        config (RunnableConfig): Configuration for the ingestion.
+
+    Returns:
+        dict[str, Any]: The thread's token usage.
+    """
+    failed = sorted(
+        name for name, result in state.files.items() if result["status"] == "failed"
+    )
+    logger.info(
+        "Ingested %d files, %d failed%s",
+        len(state.files) - len(failed),
+        len(failed),
+        f": {', '.join(failed)}" if failed else "",
+    )
+    return {"usage": usage.thread_usage(config)}
+
+
+builder = StateGraph(IndexState, config_schema=IndexConfiguration)
+builder.add_node("ingest_file", ingest_file)
+builder.add_node("report_ingestion", report_ingestion)
+builder.add_conditional_edges(START, route_files, ["ingest_file", END])  # type: ignore[arg-type]
+builder.add_edge("ingest_file", "report_ingestion")
+builder.add_edge("report_ingestion", END)
 
 # Finally, we compile it!
 # This compiles it into a graph you can invoke and deploy.
-graph = builder.compile()
+graph = builder.compile(checkpointer=checkpointer_from_env())
 graph.name = "DocumentProcessingGraph"
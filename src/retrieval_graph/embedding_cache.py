@@ -0,0 +1,248 @@
+"""Persistent, content-addressed embedding cache.
+
+Re-ingesting a filing embeds the same sentence windows (for semantic
+chunking) and the same chunks (for indexing) again, even when not a word of
+the text changed. `CachedEmbeddings` wraps an embeddings model and looks every
+text up in an `EmbeddingStore` first, so only texts the model has never seen
+are sent to it; a repeat ingestion does almost no embedding I/O.
+
+The store is a single SQLite file (WAL mode, shared by threads and processes)
+with one row per (model, text hash): the hash is a 16-byte BLAKE2b digest of
+the text and the vector is stored as raw float32 bytes, about 4 KB per
+1024-dimensional embedding. Vectors returned for cache misses are rounded to
+float32 as well, so an ingestion served from the cache reproduces the first
+one exactly.
+
+Classes:
+    EmbeddingStore: SQLite table of embeddings keyed by model and text hash.
+    CachedEmbeddings: Embeddings wrapper that serves repeated texts from a store.
+
+Functions:
+    text_key: Hash a text into its cache key.
+    open_embedding_store: Return the process-wide store for a path.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Union
+
+import numpy as np
+import numpy.typing as npt
+from langchain_core.embeddings import Embeddings
+
+from retrieval_graph import telemetry
+from retrieval_graph.caching import CacheStats
+
+# Keys per `IN (...)` lookup, below SQLite's bound parameter limit.
+_LOOKUP_BATCH = 500
+
+# Suffix of the model name under which query embeddings are stored; some
+# providers embed queries differently from documents.
+_QUERY = "#query"
+
+
+def text_key(text: str) -> bytes:
+    """Hash a text into its 16-byte cache key."""
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+
+
+class EmbeddingStore:
+    """SQLite table of embeddings keyed by model and text hash.
+
+    Safe to share between threads; concurrent writers in other processes are
+    serialized by SQLite.
+
+    Args:
+        path (Union[str, Path]): Database file, created if needed.
+    """
+
+    def __init__(self, path: Union[str, Path]) -> None:
+        """Open (or create) the database."""
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            self.path, check_same_thread=False, isolation_level=None, timeout=30
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " model TEXT NOT NULL, key BLOB NOT NULL, vector BLOB NOT NULL,"
+            " PRIMARY KEY (model, key)) WITHOUT ROWID"
+        )
+        self.hits = 0
+        self.misses = 0
+
+    def get_many(
+        self, model: str, keys: list[bytes]
+    ) -> dict[bytes, npt.NDArray[np.float32]]:
+        """Return the stored vectors of the keys that are present.
+
+        Args:
+            model (str): Embedding model name.
+            keys (list[bytes]): Keys from `text_key`.
+
+        Returns:
+            dict[bytes, NDArray[float32]]: Vector by key, for the keys found.
+        """
+        found: dict[bytes, npt.NDArray[np.float32]] = {}
+        with self._lock:
+            for start in range(0, len(keys), _LOOKUP_BATCH):
+                batch = keys[start : start + _LOOKUP_BATCH]
+                rows = self._conn.execute(
+                    "SELECT key, vector FROM embeddings WHERE model = ? AND key IN"
+                    f" ({', '.join('?' * len(batch))})",
+                    [model, *batch],
+                )
+                for key, vector in rows:
+                    found[key] = np.frombuffer(vector, dtype=np.float32)
+            self.hits += len(found)
+            self.misses += len(set(keys)) - len(found)
+        return found
+
+    def put_many(
+        self, model: str, vectors: dict[bytes, npt.NDArray[np.float32]]
+    ) -> None:
+        """Store vectors by key in one transaction, keeping existing rows.
+
+        Args:
+            model (str): Embedding model name.
+            vectors (dict[bytes, NDArray[float32]]): Vector by key.
+        """
+        with self._lock:
+            with self._conn:
+                self._conn.execute("BEGIN")
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO embeddings (model, key, vector) VALUES (?, ?, ?)",
+                    [
+                        (model, key, np.ascontiguousarray(vector, dtype=np.float32).tobytes())
+                        for key, vector in vectors.items()
+                    ],
+                )
+
+    def __len__(self) -> int:
+        """Return the number of stored vectors."""
+        with self._lock:
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+        return int(count)
+
+    def stats(self) -> CacheStats:
+        """Return the hit/miss counters of this process."""
+        return CacheStats(hits=self.hits, misses=self.misses, coalesced=0, size=len(self))
+
+    def close(self) -> None:
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
+
+
+# Stores opened in this process, by resolved path.
+_stores: dict[Path, EmbeddingStore] = {}
+_stores_lock = threading.Lock()
+
+
+def open_embedding_store(path: Union[str, Path]) -> EmbeddingStore:
+    """Return the process-wide store for a path, opening it on first use.
+
+    The first store opened is exported to telemetry as the "embedding" cache.
+
+    Args:
+        path (Union[str, Path]): Database file.
+
+    Returns:
+        EmbeddingStore: The shared store.
+    """
+    resolved = Path(path).resolve()
+    with _stores_lock:
+        store = _stores.get(resolved)
+        if store is None:
+            store = _stores[resolved] = EmbeddingStore(resolved)
+            if len(_stores) == 1:
+                telemetry.register_cache("embedding", store)
+        return store
+
+
+class CachedEmbeddings(Embeddings):
+    """Embeddings wrapper that serves repeated texts from an `EmbeddingStore`.
+
+    Only the distinct texts missing from the store are sent to the wrapped
+    model, in one call per request; wrap an `InstrumentedEmbeddings` to count
+    just those calls.
+
+    Args:
+        inner (Embeddings): The embeddings model.
+        model (str): Model name the vectors are stored under.
+        store (EmbeddingStore): The cache.
+    """
+
+    def __init__(self, inner: Embeddings, model: str, store: EmbeddingStore) -> None:
+        """Wrap an embeddings model."""
+        self.inner = inner
+        self.model = model
+        self.store = store
+
+    def _missing(
+        self, model: str, texts: list[str]
+    ) -> tuple[list[bytes], dict[bytes, npt.NDArray[np.float32]], dict[bytes, str]]:
+        """Look texts up; return their keys, the vectors found and the texts missing."""
+        keys = [text_key(text) for text in texts]
+        found = self.store.get_many(model, list(dict.fromkeys(keys)))
+        missing = {key: text for key, text in zip(keys, texts) if key not in found}
+        return keys, found, missing
+
+    def _complete(
+        self,
+        model: str,
+        keys: list[bytes],
+        found: dict[bytes, npt.NDArray[np.float32]],
+        missing: dict[bytes, str],
+        vectors: list[list[float]],
+    ) -> list[list[float]]:
+        """Store newly embedded vectors and return every text's vector in order."""
+        new = {key: np.asarray(v, dtype=np.float32) for key, v in zip(missing, vectors)}
+        if new:
+            self.store.put_many(model, new)
+        telemetry.increment(
+            "retrieval_graph_embedding_cache_hits_total", len(keys) - len(new), model=model
+        )
+        found.update(new)
+        return [found[key].tolist() for key in keys]
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        """Embed documents, calling the model only for uncached texts."""
+        keys, found, missing = self._missing(self.model, texts)
+        vectors = self.inner.embed_documents(list(missing.values())) if missing else []
+        return self._complete(self.model, keys, found, missing, vectors)
+
+    def embed_query(self, text: str) -> list[float]:
+        """Embed a query, calling the model only if it is uncached."""
+        model = self.model + _QUERY
+        keys, found, missing = self._missing(model, [text])
+        vectors = [self.inner.embed_query(text)] if missing else []
+        return self._complete(model, keys, found, missing, vectors)[0]
+
+    async def aembed_documents(self, texts: list[str]) -> list[list[float]]:
+        """Embed documents asynchronously, with store access off the event loop."""
+        keys, found, missing = await asyncio.to_thread(self._missing, self.model, texts)
+        vectors = (
+            await self.inner.aembed_documents(list(missing.values())) if missing else []
+        )
+        return await asyncio.to_thread(
+            self._complete, self.model, keys, found, missing, vectors
+        )
+
+    async def aembed_query(self, text: str) -> list[float]:
+        """Embed a query asynchronously, with store access off the event loop."""
+        model = self.model + _QUERY
+        keys, found, missing = await asyncio.to_thread(self._missing, model, [text])
+        vectors = [await self.inner.aembed_query(text)] if missing else []
+        result = await asyncio.to_thread(
+            self._complete, model, keys, found, missing, vectors
+        )
+        return result[0]
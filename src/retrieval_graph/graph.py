@@ -6,8 +6,9 @@ and key functions for processing user inputs, generating queries, retrieving
 relevant documents, and formulating responses.
 """
 
+import logging
 from datetime import datetime, timezone
-from typing import cast
+from typing import Any, cast
 import re
 
 from langchain_core.documents import Document
@@ -18,11 +19,15 @@ from langchain_core.runnables import RunnableConfig
 from langgraph.graph import StateGraph
 from langgraph.prebuilt import ToolNode
 
-from retrieval_graph import retrieval
+from retrieval_graph import retrieval, telemetry, usage
+from retrieval_graph.caching import SemanticAnswerCache, current_index_generation
+from retrieval_graph.checkpointer import checkpointer_from_env
 from retrieval_graph.configuration import Configuration
 from retrieval_graph.state import InputState, State
 from retrieval_graph.utils import format_docs, get_message_text, load_chat_model
 
+logger = logging.getLogger(__name__)
+
 # Company Detection and Filtering Functions
 
 def detect_companies(query: str) -> list[str]:
@@ -57,12 +62,91 @@ def detect_companies(query: str) -> list[str]:
     return list(dict.fromkeys(detected_files))
 
 
+# First-turn answers shared by every run in this process.
+answer_cache = SemanticAnswerCache()
+telemetry.register_cache("answer", answer_cache)
+
+
+@telemetry.instrument_node
+async def check_answer_cache(
+    state: State, *, config: RunnableConfig
+) -> dict[str, Any]:
+    """Serve repeated first-turn questions from the semantic answer cache.
+
+    Normalized exact repeats are answered without any remote call. Otherwise the
+    question is embedded and matched against cached answers with the same
+    detected companies and index generation.
+
+    Args:
+        state (State): The current state containing the user's question.
+        config (RunnableConfig): Configuration with the answer cache settings.
+
+    Returns:
+        dict[str, Any]: The cached answer as an AIMessage and the thread's token
+        usage on a hit, or no messages on a miss.
+    """
+    configuration = Configuration.from_runnable_config(config)
+    if not configuration.answer_cache_enabled or len(state.messages) != 1:
+        return {"messages": []}
+
+    query = get_message_text(state.messages[-1])
+    companies = detect_companies(query)
+    generation = current_index_generation(configuration.index_generation_path)
+    ttl = configuration.answer_cache_ttl
+
+    answer = answer_cache.lookup_exact(query, companies, generation, ttl=ttl)
+    if answer is None:
+        encoder = retrieval.make_embeddings(
+            configuration.embedding_model, configuration.embedding_cache_path
+        )
+        embedding = await encoder.aembed_query(query)
+        answer = answer_cache.lookup(
+            query,
+            embedding,
+            companies,
+            generation,
+            threshold=configuration.answer_cache_threshold,
+            ttl=ttl,
+        )
+    if answer is None:
+        return {"messages": []}
+
+    logger.info("Answer cache hit", extra={"companies": companies})
+    return {"messages": [AIMessage(content=answer)], "usage": usage.thread_usage(config)}
+
+
+def route_answer_cache(state: State) -> str:
+    """Skip the ReAct loop when the answer cache already replied."""
+    if isinstance(state.messages[-1], AIMessage):
+        return "__end__"
+    return "generate_query"
+
+
+@telemetry.instrument_node
+async def store_answer(
+    state: State, *, config: RunnableConfig
+) -> dict[str, Any]:
+    """Cache the final answer to a first-turn question and report token usage."""
+    configuration = Configuration.from_runnable_config(config)
+    questions = [m for m in state.messages if m.type == "human"]
+    if configuration.answer_cache_enabled and len(questions) == 1:
+        query = get_message_text(questions[0])
+        answer_cache.store(
+            query,
+            detect_companies(query),
+            current_index_generation(configuration.index_generation_path),
+            get_message_text(state.messages[-1]),
+        )
+    return {"messages": [], "usage": usage.thread_usage(config)}
+
+
 class SearchQuery(BaseModel):
     """Search the indexed documents for a query."""
 
     query: str
 
 
+@telemetry.instrument_node
 async def generate_query(
     state: State, *, config: RunnableConfig
 ) -> dict[str, list[str]]:
@@ -93,9 +177,9 @@ async def generate_query(
         # Log detected companies for debugging
         detected_companies = detect_companies(human_input)
         if detected_companies:
-            print(f"🔍 Query contains companies: {detected_companies}")
+            logger.debug("Query contains companies: %s", detected_companies)
         else:
-            print("🔍 Industry-wide query detected")
+            logger.debug("Industry-wide query detected")
             
         return {"queries": [human_input]}
     else:
@@ -119,12 +203,14 @@ async def generate_query(
             },
             config,
         )
-        generated = cast(SearchQuery, await model.ainvoke(message_value, config))
+        with telemetry.span("llm", model=configuration.query_model):
+            generated = cast(SearchQuery, await model.ainvoke(message_value, config))
         return {
             "queries": [generated.query],
         }
 
 
+@telemetry.instrument_node
 async def retrieve(
     state: State, *, config: RunnableConfig
 ) -> dict[str, list[Document]]:
@@ -150,76 +236,61 @@ async def retrieve(
     with retrieval.make_retriever(config) as retriever:
         if len(company_files) > 1:
             # Multi-company query: retrieve 2 chunks per company for balanced results
-            print(f"🏢 Multi-company query detected: {company_files}")
-            print(f"📊 Retrieving 2 chunks per company for balanced representation")
+            logger.info(
+                "Multi-company query, retrieving 2 chunks per company: %s", company_files
+            )
             
             all_results = []
             
             for company_file in company_files:
                 try:
-                    print(f"🔍 Retrieving from {company_file}")
-                    
-                    # Create filter for this specific company
-                    company_filter = {"source_file": company_file}
-                    
-                    # Apply the filter if the retriever supports it
-                    if hasattr(retriever, 'search_kwargs'):
-                        # Update search kwargs with company filter and k=2
-                        original_kwargs = getattr(retriever, 'search_kwargs', {})
-                        retriever.search_kwargs = {
-                            **original_kwargs,
-                            "filter": company_filter,
-                            "k": 2  # Get exactly 2 chunks from this company
-                        }
-                    
-                    company_results = await retriever.ainvoke(query, config)
-                    
-                    # Restore original search kwargs
-                    if hasattr(retriever, 'search_kwargs'):
-                        retriever.search_kwargs = original_kwargs
+                    # Get exactly 2 chunks from this company
+                    company_results = await retrieval.asearch(
+                        retriever,
+                        query,
+                        config,
+                        filter={"source_file": company_file},
+                        k=2,
+                    )
                     
                     all_results.extend(company_results)
-                    print(f"✅ Retrieved {len(company_results)} chunks from {company_file}")
+                    logger.debug(
+                        "Retrieved %d chunks from %s", len(company_results), company_file
+                    )
                     
                 except Exception as e:
-                    print(f"⚠️ Failed to retrieve from {company_file}: {e}")
+                    logger.warning("Failed to retrieve from %s: %s", company_file, e)
                     continue
             
-            print(f"📈 Total chunks retrieved: {len(all_results)} from {len(company_files)} companies")
+            logger.info(
+                "Retrieved %d chunks from %d companies",
+                len(all_results),
+                len(company_files),
+            )
             response = all_results
             
         elif len(company_files) == 1:
             # Single company query: use normal retrieval with filtering
-            print(f"🏢 Single company query: {company_files[0]}")
-            
-            metadata_filter = {"source_file": company_files[0]}
+            logger.info("Single company query: %s", company_files[0])
             
             try:
-                if hasattr(retriever, 'search_kwargs'):
-                    # Update search kwargs with metadata filter
-                    original_kwargs = getattr(retriever, 'search_kwargs', {})
-                    retriever.search_kwargs = {
-                        **original_kwargs,
-                        "filter": metadata_filter
-                    }
-                
-                response = await retriever.ainvoke(query, config)
-                
-                # Restore original search kwargs
-                if hasattr(retriever, 'search_kwargs'):
-                    retriever.search_kwargs = original_kwargs
-                    
+                response = await retrieval.asearch(
+                    retriever, query, config, filter={"source_file": company_files[0]}
+                )
             except Exception as e:
-                print(f"⚠️ Company filtering failed, falling back to unfiltered search: {e}")
-                response = await retriever.ainvoke(query, config)
+                logger.warning(
+                    "Company filtering failed, falling back to unfiltered search: %s", e
+                )
+                response = await retrieval.asearch(retriever, query, config)
         else:
             # No specific companies detected, search all documents
-            print("🌐 Industry-wide query: searching across all companies")
-            response = await retriever.ainvoke(query, config)
+            logger.info("Industry-wide query: searching across all companies")
+            response = await retrieval.asearch(retriever, query, config)
         
         return {"retrieved_docs": response}
 
 
+@telemetry.instrument_node
 async def agent_reasoning(
     state: State, *, config: RunnableConfig
 ) -> dict[str, list[BaseMessage]]:
@@ -241,7 +312,8 @@ async def agent_reasoning(
     model = load_chat_model(configuration.response_model)
     model_with_tools = model.bind_tools(AVAILABLE_TOOLS)
 
-    retrieved_docs = format_docs(state.retrieved_docs)
+    with telemetry.span("format", node="agent_reasoning"):
+        retrieved_docs = format_docs(state.retrieved_docs)
     message_value = await prompt.ainvoke(
         {
             "messages": state.messages,
@@ -251,8 +323,8 @@ async def agent_reasoning(
         config,
     )
     
-    print("🤔 Agent reasoning about the query and available tools...")
-    response = await model_with_tools.ainvoke(message_value, config)
+    with telemetry.span("llm", model=configuration.response_model):
+        response = await model_with_tools.ainvoke(message_value, config)
     
     return {"messages": [response]}
 
@@ -264,10 +336,10 @@ def should_continue_react(state: State) -> str:
     
     # Check if the last message has tool calls
     if hasattr(last_message, 'tool_calls') and last_message.tool_calls:
-        print(f"🔧 Agent decided to use {len(last_message.tool_calls)} tool(s)")
+        logger.info("Agent decided to use %d tool(s)", len(last_message.tool_calls))
         return "execute_tools"
     else:
-        print("✅ Agent provided final response without tools")
+        logger.info("Agent provided final response without tools")
         return "__end__"
 
 
@@ -283,16 +355,28 @@ def should_continue_react(state: State) -> str:
 builder = StateGraph(State, input=InputState, config_schema=Configuration)
 
 # Import tools for ToolNode
-from retrieval_graph.tools import AVAILABLE_TOOLS
+from retrieval_graph.tools import AVAILABLE_TOOLS, cached_tool
 
 # Add nodes for ReAct pattern
+builder.add_node(check_answer_cache)
 builder.add_node(generate_query)
 builder.add_node(retrieve)
 builder.add_node(agent_reasoning)
-builder.add_node("execute_tools", ToolNode(AVAILABLE_TOOLS))
+builder.add_node(
+    "execute_tools", ToolNode([cached_tool(tool) for tool in AVAILABLE_TOOLS])
+)
+builder.add_node(store_answer)
 
 # Define the ReAct flow
-builder.add_edge("__start__", "generate_query")
+builder.add_edge("__start__", "check_answer_cache")
+builder.add_conditional_edges(
+    "check_answer_cache",
+    route_answer_cache,
+    {
+        "generate_query": "generate_query",
+        "__end__": "__end__"
+    }
+)
 builder.add_edge("generate_query", "retrieve")
 builder.add_edge("retrieve", "agent_reasoning")
 
@@ -302,16 +386,18 @@ builder.add_conditional_edges(
     should_continue_react,
     {
         "execute_tools": "execute_tools",
-        "__end__": "__end__"
+        "__end__": "store_answer"
     }
 )
 
 # After tool execution, go back to agent reasoning for continued ReAct loop
 builder.add_edge("execute_tools", "agent_reasoning")
+builder.add_edge("store_answer", "__end__")
 
 # Finally, we compile it!
 # This compiles it into a graph you can invoke and deploy.
 graph = builder.compile(
+    checkpointer=checkpointer_from_env(),
     interrupt_before=[],  # if you want to update the state before calling the tools
     interrupt_after=[],
 )
@@ -0,0 +1,381 @@
+"""Incremental indexing with deterministic chunk IDs.
+
+Chunks used to be added to the vector store under random IDs, so every
+re-ingestion of a filing added a second copy of every vector. Here each chunk
+gets an ID derived from its `source_file`, the hash of its content and its
+position among the file's chunks with that same content (0 unless the file
+repeats a passage verbatim). Editing one passage therefore changes the IDs of
+that passage's chunks only, not of everything after it.
+
+An `IndexManifest` remembers, per index and source file, the IDs written and a
+fingerprint of each chunk's metadata. `IncrementalIndexer` diffs the chunks of
+an ingestion against it: new chunks and chunks whose metadata changed are
+upserted under their IDs, unchanged chunks are skipped (no embedding, no
+write), and chunks of the file that no longer occur are deleted once the file
+is complete, in requests of at most the backend's batch size. Chunks without
+a `source_file` belong to no file that could be complete, so they are never
+deleted as stale. Stores that can look documents up by ID are also checked for
+unchanged chunks that went missing from the index (for instance the
+in-process "local" store after a restart), which are upserted again.
+Re-ingesting an unchanged filing is then close to a no-op.
+
+Classes:
+    IndexReport: What an incremental indexing run did.
+    IndexManifest: SQLite record of the chunks written to each index.
+    IncrementalIndexer: Upsert only new or changed chunks and delete stale ones.
+
+Functions:
+    chunk_id: Compute a chunk's deterministic ID.
+    metadata_fingerprint: Hash the metadata that decides whether a chunk changed.
+    open_index_manifest: Return the process-wide manifest for a path.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import uuid
+from collections import Counter
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Optional, Union
+
+from langchain_core.documents import Document
+from langchain_core.vectorstores import VectorStore
+
+from retrieval_graph.bulk_upsert import BulkUpsertError, BulkWriter, VectorStoreBackend
+
+logger = logging.getLogger(__name__)
+
+# Namespace of the UUIDv5 chunk IDs; IDs are UUIDs so every provider accepts them.
+_CHUNK_NAMESPACE = uuid.UUID("6f2b8a52-3c1e-4d7a-9b0f-5e8c2d4a1b73")
+
+# Metadata that differs on every run without the chunk changing.
+_VOLATILE_METADATA = frozenset({"processed_at"})
+
+# `source_file` of chunks that have none.
+_NO_SOURCE = ""
+
+
+def _content_hash(content: str) -> str:
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def chunk_id(source_file: str, content: str, occurrence: int = 0) -> str:
+    """Compute a chunk's deterministic ID.
+
+    Args:
+        source_file (str): File the chunk was split from.
+        content (str): The chunk's text.
+        occurrence (int): Position of the chunk among the file's chunks with
+            identical content, in file order.
+
+    Returns:
+        str: A UUIDv5 string.
+    """
+    name = f"{source_file}\n{_content_hash(content)}\n{occurrence}"
+    return str(uuid.uuid5(_CHUNK_NAMESPACE, name))
+
+
+def metadata_fingerprint(metadata: dict[str, Any]) -> str:
+    """Hash the metadata that decides whether an indexed chunk changed.
+
+    Args:
+        metadata (dict[str, Any]): The chunk's metadata.
+
+    Returns:
+        str: Hex digest of the metadata, without volatile keys like `processed_at`.
+    """
+    stable = {k: v for k, v in metadata.items() if k not in _VOLATILE_METADATA}
+    encoded = json.dumps(stable, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()[:32]
+
+
+@dataclass
+class IndexReport:
+    """What an incremental indexing run did."""
+
+    added: int = 0
+    """Chunks that were not in the index."""
+
+    updated: int = 0
+    """Chunks whose metadata changed, upserted under their existing IDs."""
+
+    unchanged: int = 0
+    """Chunks already indexed as they are, skipped."""
+
+    deleted: int = 0
+    """Chunks of the indexed files that no longer occur, removed."""
+
+    resumed: int = 0
+    """Chunks upserted by an interrupted earlier run, skipped (see `skip`)."""
+
+    batches: int = 0
+    """Upsert requests that succeeded (see `retrieval_graph.bulk_upsert`)."""
+
+    retries: int = 0
+    """Upsert requests retried after a failure."""
+
+    @property
+    def chunks(self) -> int:
+        """Chunks the files consist of now."""
+        return self.added + self.updated + self.unchanged + self.resumed
+
+    @property
+    def changed(self) -> bool:
+        """Whether the index was written to, by this run or the one it resumed."""
+        return bool(self.added or self.updated or self.deleted or self.resumed)
+
+    def as_dict(self) -> dict[str, int]:
+        """Return the counters, with the total number of chunks."""
+        return {"chunks": self.chunks, **asdict(self)}
+
+
+class IndexManifest:
+    """SQLite record of the chunks written to each index.
+
+    Safe to share between threads.
+
+    Args:
+        path (Union[str, Path]): Database file, created if needed.
+    """
+
+    def __init__(self, path: Union[str, Path]) -> None:
+        """Open (or create) the database."""
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            self.path, check_same_thread=False, isolation_level=None, timeout=30
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS chunks ("
+            " namespace TEXT NOT NULL, source_file TEXT NOT NULL, id TEXT NOT NULL,"
+            " fingerprint TEXT NOT NULL, PRIMARY KEY (namespace, source_file, id))"
+            " WITHOUT ROWID"
+        )
+
+    def fingerprints(self, namespace: str, source_file: str) -> dict[str, str]:
+        """Return the fingerprint of every chunk recorded for a file, by ID."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, fingerprint FROM chunks WHERE namespace = ? AND source_file = ?",
+                (namespace, source_file),
+            ).fetchall()
+        return dict(rows)
+
+    def record(self, namespace: str, source_file: str, chunks: dict[str, str]) -> None:
+        """Record chunks written to the index, as fingerprint by ID."""
+        with self._lock, self._conn:
+            self._conn.execute("BEGIN")
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO chunks (namespace, source_file, id, fingerprint)"
+                " VALUES (?, ?, ?, ?)",
+                [(namespace, source_file, i, fp) for i, fp in chunks.items()],
+            )
+
+    def remove(self, namespace: str, source_file: str, ids: list[str]) -> None:
+        """Forget chunks deleted from the index."""
+        with self._lock, self._conn:
+            self._conn.execute("BEGIN")
+            self._conn.executemany(
+                "DELETE FROM chunks WHERE namespace = ? AND source_file = ? AND id = ?",
+                [(namespace, source_file, i) for i in ids],
+            )
+
+    def close(self) -> None:
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
+
+
+# Manifests opened in this process, by resolved path.
+_manifests: dict[Path, IndexManifest] = {}
+_manifests_lock = threading.Lock()
+
+
+def open_index_manifest(path: Union[str, Path]) -> IndexManifest:
+    """Return the process-wide manifest for a path, opening it on first use."""
+    resolved = Path(path).resolve()
+    with _manifests_lock:
+        manifest = _manifests.get(resolved)
+        if manifest is None:
+            manifest = _manifests[resolved] = IndexManifest(resolved)
+        return manifest
+
+
+class IncrementalIndexer:
+    """Upsert only new or changed chunks and delete stale ones.
+
+    Feed every chunk of one or more complete files through `upsert` (or
+    `skip`, for chunks an interrupted run already wrote), in file order and in
+    batches of any size, then call `finish` to delete the chunks of those
+    files that were not seen. Chunks without a `source_file` are only ever
+    added or updated, since later uploads do not repeat earlier ones.
+
+    Args:
+        vectorstore (VectorStore): The index.
+        manifest (IndexManifest): Record of the chunks in the index.
+        namespace (str): Name of the index in the manifest, e.g. provider and
+            embedding model.
+        writer (Optional[BulkWriter]): Writer of the upserts; one writing to
+            `vectorstore` with default limits if None.
+    """
+
+    def __init__(
+        self,
+        vectorstore: VectorStore,
+        manifest: IndexManifest,
+        namespace: str,
+        writer: Optional[BulkWriter] = None,
+    ) -> None:
+        """Start an indexing run."""
+        self.vectorstore = vectorstore
+        self.manifest = manifest
+        self.namespace = namespace
+        self.writer = writer or BulkWriter(VectorStoreBackend(vectorstore))
+        self.report = IndexReport()
+        self._recorded: dict[str, dict[str, str]] = {}
+        self._seen: dict[str, set[str]] = {}
+        self._occurrences: Counter[tuple[str, str]] = Counter()
+        self._can_get_by_ids = True
+
+    def _assign_id(self, doc: Document) -> str:
+        source_file = str(doc.metadata.get("source_file", _NO_SOURCE))
+        key = (source_file, _content_hash(doc.page_content))
+        occurrence = self._occurrences[key]
+        self._occurrences[key] += 1
+        return chunk_id(source_file, doc.page_content, occurrence)
+
+    async def _missing_from_index(self, ids: list[str]) -> set[str]:
+        """Return the IDs the store does not hold, if it can tell."""
+        if not ids or not self._can_get_by_ids:
+            return set()
+        try:
+            found = await self.vectorstore.aget_by_ids(ids)
+        except NotImplementedError:
+            self._can_get_by_ids = False
+            return set()
+        return set(ids) - {doc.id for doc in found}
+
+    async def _recorded_for(self, source_file: str) -> dict[str, str]:
+        """Return the manifest's fingerprints for a file, loading them on first use."""
+        recorded = self._recorded.get(source_file)
+        if recorded is None:
+            recorded = self._recorded[source_file] = await asyncio.to_thread(
+                self.manifest.fingerprints, self.namespace, source_file
+            )
+        return recorded
+
+    async def skip(self, docs: list[Document]) -> None:
+        """Pass over chunks that an interrupted run already upserted.
+
+        The chunks get their IDs and count as seen, so `finish` keeps them,
+        but the index is neither queried nor written.
+
+        Args:
+            docs (list[Document]): The next chunks, in file order.
+        """
+        for doc in docs:
+            doc.id = self._assign_id(doc)
+            source_file = str(doc.metadata.get("source_file", _NO_SOURCE))
+            await self._recorded_for(source_file)
+            self._seen.setdefault(source_file, set()).add(doc.id)
+        self.report.resumed += len(docs)
+
+    async def upsert(self, docs: list[Document]) -> None:
+        """Write the new or changed chunks of a batch under their deterministic IDs.
+
+        Args:
+            docs (list[Document]): The next chunks, in file order.
+
+        Raises:
+            BulkUpsertError: If some chunks could not be written; those that
+                were are recorded in the manifest.
+        """
+        by_source: dict[str, list[tuple[str, Document, str]]] = {}
+        for doc in docs:
+            doc.id = self._assign_id(doc)
+            source_file = str(doc.metadata.get("source_file", _NO_SOURCE))
+            entry = (doc.id, doc, metadata_fingerprint(doc.metadata))
+            by_source.setdefault(source_file, []).append(entry)
+
+        pending: list[tuple[str, str, Document, str]] = []
+        for source_file, entries in by_source.items():
+            recorded = await self._recorded_for(source_file)
+            self._seen.setdefault(source_file, set()).update(i for i, _, _ in entries)
+            unchanged = [i for i, _, fp in entries if recorded.get(i) == fp]
+            missing = await self._missing_from_index(unchanged)
+            write = [
+                (i, doc, fp)
+                for i, doc, fp in entries
+                if recorded.get(i) != fp or i in missing
+            ]
+            added = sum(1 for i, _, _ in write if i not in recorded or i in missing)
+            self.report.added += added
+            self.report.updated += len(write) - added
+            self.report.unchanged += len(entries) - len(write)
+            pending.extend((source_file, i, doc, fp) for i, doc, fp in write)
+        if not pending:
+            return
+
+        try:
+            results = await self.writer.write(
+                [doc for _, _, doc, _ in pending], [i for _, i, _, _ in pending]
+            )
+        except BulkUpsertError as e:
+            # Keep the manifest in step with the batches that did get written.
+            written = set(e.written)
+            await self._record([entry for entry in pending if entry[1] in written])
+            raise
+        self.report.batches += len(results)
+        self.report.retries += sum(result.attempts - 1 for result in results)
+        await self._record(pending)
+
+    async def _record(self, entries: list[tuple[str, str, Document, str]]) -> None:
+        """Record written (source_file, id, doc, fingerprint) entries in the manifest."""
+        by_source: dict[str, dict[str, str]] = {}
+        for source_file, i, _, fp in entries:
+            by_source.setdefault(source_file, {})[i] = fp
+        for source_file, written in by_source.items():
+            await asyncio.to_thread(
+                self.manifest.record, self.namespace, source_file, written
+            )
+            self._recorded[source_file].update(written)
+
+    async def finish(self) -> IndexReport:
+        """Delete the chunks of the indexed files that were not seen.
+
+        Returns:
+            IndexReport: What the run did.
+        """
+        batch_size = max(1, self.writer.backend.max_batch_vectors)
+        for source_file, seen in self._seen.items():
+            if source_file == _NO_SOURCE:
+                continue
+            stale = [i for i in self._recorded.get(source_file, {}) if i not in seen]
+            for start in range(0, len(stale), batch_size):
+                ids = stale[start : start + batch_size]
+                await self.vectorstore.adelete(ids)
+                await asyncio.to_thread(
+                    self.manifest.remove, self.namespace, source_file, ids
+                )
+                self.report.deleted += len(ids)
+        logger.info(
+            "Indexed %d chunks: %d added, %d updated, %d unchanged, %d deleted,"
+            " %d resumed (%d upsert batches, %d retries)",
+            self.report.chunks,
+            self.report.added,
+            self.report.updated,
+            self.report.unchanged,
+            self.report.deleted,
+            self.report.resumed,
+            self.report.batches,
+            self.report.retries,
+        )
+        return self.report
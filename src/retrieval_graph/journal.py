@@ -0,0 +1,355 @@
+"""Durable progress journal for resumable ingestion.
+
+Ingesting a large filing takes dozens of document parser requests, hundreds
+of embedding requests and many upserts. If the process died halfway through,
+the next ingestion started the file over, parse included. The caches cover a
+part of that (a complete parse is in the parse cache, embedded texts are in
+the embedding cache), but not a parse that was cut short, not chunking with
+the embedding cache disabled, and not the lookups needed to find out which
+chunks already reached the index.
+
+`IngestionJournal` is a SQLite file that records, per file, how far its
+ingestion got:
+
+- the page ranges the document parser returned, as blob store refs;
+- the completed stages, e.g. the file's chunks after "split" and "enriched",
+  or the chunks of every page when streaming, as blob store refs;
+- the upsert batches written to the vector store, with their chunk counts.
+
+`FileProgress` is the journal entry of one file. Its key covers the PDF's
+bytes and name and every setting that changes what is produced (parser and
+options, chunking and embedding models, retriever provider, user), so a
+changed file or configuration starts afresh instead of resuming stale
+progress. A file's entry is removed once it is indexed; a failed or
+interrupted ingestion keeps it, and the next one resumes where it stopped:
+recorded ranges are not parsed again, recorded stages are read back from the
+blob store, and the chunks of recorded batches are only marked as seen by the
+indexer, without being looked up, embedded or upserted again. The blobs a
+journal entry refers to are kept until it is removed, and then released by
+the ingestion graph.
+
+Classes:
+    IngestionJournal: SQLite record of the ingestion progress of each file.
+    FileProgress: The journal entry of one file.
+
+Functions:
+    progress_key: Compute the journal key of a file ingested with given settings.
+    open_ingestion_journal: Return the process-wide journal for a path.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+from dataclasses import asdict
+from pathlib import Path
+from typing import Any, Iterable, Optional, Union
+
+from langchain_core.documents import Document
+
+from retrieval_graph import telemetry
+from retrieval_graph.blob_store import BlobStore, DocumentRef
+from retrieval_graph.parse_cache import pdf_cache_key
+from retrieval_graph.parsing import PageRange
+
+logger = logging.getLogger(__name__)
+
+_TABLES = ("ranges", "stages", "batches")
+
+
+def progress_key(
+    pdf_file: Union[str, Path],
+    options: dict[str, Any],
+    parser: str,
+    settings: dict[str, Any],
+) -> str:
+    """Compute the journal key of a file ingested with the given settings.
+
+    Args:
+        pdf_file (Union[str, Path]): The PDF; its bytes are hashed, not its name.
+        options (dict[str, Any]): Parser options.
+        parser (str): Name of the parser.
+        settings (dict[str, Any]): Other settings that change the chunks or
+            where they are indexed, e.g. the file name.
+
+    Returns:
+        str: SHA-256 hex digest.
+    """
+    hasher = hashlib.sha256(pdf_cache_key(pdf_file, options, parser).encode())
+    hasher.update(json.dumps(settings, sort_keys=True, default=str).encode())
+    return hasher.hexdigest()
+
+
+def _encode_ref(ref: DocumentRef) -> str:
+    return json.dumps(asdict(ref))
+
+
+def _decode_ref(value: str) -> DocumentRef:
+    return DocumentRef(**json.loads(value))
+
+
+class IngestionJournal:
+    """SQLite record of the ingestion progress of each file.
+
+    Safe to share between threads.
+
+    Args:
+        path (Union[str, Path]): Database file, created if needed.
+    """
+
+    def __init__(self, path: Union[str, Path]) -> None:
+        """Open (or create) the database."""
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            self.path, check_same_thread=False, isolation_level=None, timeout=30
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS ranges ("
+            " file_key TEXT NOT NULL, start INTEGER NOT NULL, stop INTEGER NOT NULL,"
+            " ref TEXT NOT NULL, PRIMARY KEY (file_key, start, stop)) WITHOUT ROWID"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS stages ("
+            " file_key TEXT NOT NULL, stage TEXT NOT NULL, ref TEXT NOT NULL,"
+            " PRIMARY KEY (file_key, stage)) WITHOUT ROWID"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS batches ("
+            " file_key TEXT NOT NULL, batch INTEGER NOT NULL, chunks INTEGER NOT NULL,"
+            " PRIMARY KEY (file_key, batch)) WITHOUT ROWID"
+        )
+
+    def range_ref(self, file_key: str, start: int, stop: int) -> Optional[DocumentRef]:
+        """Return the ref of a parsed page range, if recorded."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT ref FROM ranges WHERE file_key = ? AND start = ? AND stop = ?",
+                (file_key, start, stop),
+            ).fetchone()
+        return _decode_ref(row[0]) if row else None
+
+    def record_range(
+        self, file_key: str, start: int, stop: int, ref: DocumentRef
+    ) -> None:
+        """Record a parsed page range."""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO ranges (file_key, start, stop, ref) VALUES (?, ?, ?, ?)",
+                (file_key, start, stop, _encode_ref(ref)),
+            )
+
+    def stage_ref(self, file_key: str, stage: str) -> Optional[DocumentRef]:
+        """Return the ref of a completed stage's output, if recorded."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT ref FROM stages WHERE file_key = ? AND stage = ?",
+                (file_key, stage),
+            ).fetchone()
+        return _decode_ref(row[0]) if row else None
+
+    def record_stage(self, file_key: str, stage: str, ref: DocumentRef) -> None:
+        """Record a completed stage's output."""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO stages (file_key, stage, ref) VALUES (?, ?, ?)",
+                (file_key, stage, _encode_ref(ref)),
+            )
+
+    def upserted(self, file_key: str) -> tuple[int, int]:
+        """Return the number of recorded upsert batches and of their chunks."""
+        with self._lock:
+            batches, chunks = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(chunks), 0) FROM batches WHERE file_key = ?",
+                (file_key,),
+            ).fetchone()
+        return int(batches), int(chunks)
+
+    def record_batch(self, file_key: str, batch: int, chunks: int) -> None:
+        """Record an upsert batch of the file's next `chunks` chunks."""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO batches (file_key, batch, chunks) VALUES (?, ?, ?)",
+                (file_key, batch, chunks),
+            )
+
+    def _refs(self, file_key: str) -> list[DocumentRef]:
+        rows = self._conn.execute(
+            "SELECT ref FROM ranges WHERE file_key = ?"
+            " UNION SELECT ref FROM stages WHERE file_key = ?",
+            (file_key, file_key),
+        ).fetchall()
+        return [_decode_ref(value) for (value,) in rows]
+
+    def holding(self, keys: Iterable[str]) -> set[str]:
+        """Return those of the given blob keys that a recorded range or stage refers to."""
+        keys = list(keys)
+        if not keys:
+            return set()
+        marks = ", ".join("?" * len(keys))
+        query = " UNION ".join(
+            f"SELECT json_extract(ref, '$.key') FROM {table}"
+            f" WHERE json_extract(ref, '$.key') IN ({marks})"
+            for table in ("ranges", "stages")
+        )
+        with self._lock:
+            rows = self._conn.execute(query, keys * 2).fetchall()
+        return {key for (key,) in rows}
+
+    def complete(self, file_key: str) -> list[DocumentRef]:
+        """Forget a file's progress once it is indexed; return its recorded refs."""
+        with self._lock, self._conn:
+            refs = self._refs(file_key)
+            self._conn.execute("BEGIN")
+            for table in _TABLES:
+                self._conn.execute(f"DELETE FROM {table} WHERE file_key = ?", (file_key,))
+        return refs
+
+    def pending(self) -> list[str]:
+        """Return the keys of the files with an unfinished ingestion."""
+        with self._lock:
+            rows = self._conn.execute(
+                " UNION ".join(f"SELECT file_key FROM {table}" for table in _TABLES)
+            ).fetchall()
+        return sorted(key for (key,) in rows)
+
+    def close(self) -> None:
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
+
+
+# Journals opened in this process, by resolved path.
+_journals: dict[Path, IngestionJournal] = {}
+_journals_lock = threading.Lock()
+
+
+def open_ingestion_journal(path: Union[str, Path]) -> IngestionJournal:
+    """Return the process-wide journal for a path, opening it on first use."""
+    resolved = Path(path).resolve()
+    with _journals_lock:
+        journal = _journals.get(resolved)
+        if journal is None:
+            journal = _journals[resolved] = IngestionJournal(resolved)
+        return journal
+
+
+class FileProgress:
+    """The journal entry of one file.
+
+    Implements `parsing.RangeCheckpoint`, so parsed page ranges are recorded
+    and reused by `parsing.parse_pdf_ranges` and `parsing.stream_pdf_ranges`.
+    Database and blob store access runs in worker threads.
+
+    Args:
+        journal (IngestionJournal): The journal.
+        key (str): The file's key from `progress_key`.
+        store (BlobStore): Blob store holding the recorded documents.
+        name (str): File name, for logs.
+    """
+
+    def __init__(
+        self, journal: IngestionJournal, key: str, store: BlobStore, name: str = ""
+    ) -> None:
+        """Open the entry."""
+        self.journal = journal
+        self.key = key
+        self.store = store
+        self.name = name
+        self._batches: Optional[int] = None
+        # Chunks at the head of the file that an interrupted run upserted and
+        # that have not been skipped yet; set by `upserted`.
+        self.resumed_chunks = 0
+
+    def _ref(self, ref: Optional[DocumentRef]) -> Optional[DocumentRef]:
+        """Return a recorded ref if its blob is still in the store."""
+        return ref if ref is not None and self.store.exists(ref) else None
+
+    async def load_range(self, page_range: PageRange) -> Optional[list[Document]]:
+        """Return the recorded documents of a parsed page range, if any."""
+
+        def load() -> Optional[list[Document]]:
+            ref = self._ref(
+                self.journal.range_ref(self.key, page_range.start, page_range.stop)
+            )
+            return self.store.load_documents(ref) if ref is not None else None
+
+        docs = await asyncio.to_thread(load)
+        if docs is not None:
+            logger.info(
+                "Resuming %s: pages %d-%d were parsed before",
+                self.name,
+                page_range.start + 1,
+                page_range.stop,
+            )
+            telemetry.increment("retrieval_graph_journal_resumed_total", stage="parse")
+        return docs
+
+    async def save_range(self, page_range: PageRange, docs: list[Document]) -> None:
+        """Record the documents of a parsed page range."""
+
+        def save() -> None:
+            ref = self.store.put_documents(docs)
+            self.journal.record_range(self.key, page_range.start, page_range.stop, ref)
+
+        await asyncio.to_thread(save)
+
+    async def stage(self, name: str) -> Optional[DocumentRef]:
+        """Return the recorded output of a completed stage, if any."""
+        ref = await asyncio.to_thread(
+            lambda: self._ref(self.journal.stage_ref(self.key, name))
+        )
+        if ref is not None:
+            logger.debug("Resuming %s: stage %s was completed before", self.name, name)
+            telemetry.increment(
+                "retrieval_graph_journal_resumed_total", stage=name.split(":")[0]
+            )
+        return ref
+
+    async def record_stage(self, name: str, ref: DocumentRef) -> None:
+        """Record the output of a completed stage."""
+        await asyncio.to_thread(self.journal.record_stage, self.key, name, ref)
+
+    async def upserted(self) -> int:
+        """Load the recorded upsert batches; return the number of their chunks.
+
+        The chunks are also counted in `resumed_chunks`.
+        """
+        self._batches, chunks = await asyncio.to_thread(self.journal.upserted, self.key)
+        if chunks:
+            logger.info(
+                "Resuming %s: %d chunks were upserted in %d batches before",
+                self.name,
+                chunks,
+                self._batches,
+            )
+            telemetry.increment(
+                "retrieval_graph_journal_resumed_total", chunks, stage="upsert"
+            )
+        self.resumed_chunks = chunks
+        return chunks
+
+    async def record_batch(self, chunks: int) -> None:
+        """Record an upsert batch of the file's next `chunks` chunks."""
+        if self._batches is None:
+            batches, _ = await asyncio.to_thread(self.journal.upserted, self.key)
+            self._batches = batches
+        await asyncio.to_thread(
+            self.journal.record_batch, self.key, self._batches, chunks
+        )
+        self._batches += 1
+
+    async def complete(self) -> list[DocumentRef]:
+        """Forget the file's progress once it is indexed.
+
+        Returns:
+            list[DocumentRef]: The recorded page ranges and stage outputs, which
+            the journal no longer holds.
+        """
+        return await asyncio.to_thread(self.journal.complete, self.key)
@@ -0,0 +1,575 @@
+"""In-process stand-ins for the remote services used by the graphs.
+
+These providers let the retrieval and indexing graphs run, be profiled and be
+benchmarked without network access:
+
+- Retriever provider "local" keeps vectors in a numpy matrix inside the
+  current process. An optional injected latency emulates the network round
+  trip of a hosted index.
+- Embedding model "local/hashing" is a deterministic feature-hashing encoder
+  that embeds a whole batch with a handful of numpy operations.
+- Chat model "local/scripted" answers after a configurable delay and calls
+  tools according to simple keyword rules.
+
+Local model names accept URL-style options, e.g.
+"local/hashing?dim=256&latency=0.01" or
+"local/scripted?latency=0.05&tools=none".
+
+Classes:
+    LocalVectorStore: Brute-force cosine-similarity vector store with metadata filters.
+    HashingEmbeddings: Deterministic bag-of-words feature-hashing embeddings.
+    ScriptedChatModel: Chat model with scripted answers, tool calls and latency.
+
+Functions:
+    get_local_store: Return the process-wide store for an index name.
+    make_local_embeddings: Build a local embedding model from its name.
+    make_local_chat_model: Build a local chat model from its name.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import re
+import threading
+import time
+import uuid
+import zlib
+from typing import Any, Iterable, Optional, Sequence
+from urllib.parse import parse_qsl
+
+import numpy as np
+import numpy.typing as npt
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+from langchain_core.vectorstores import VectorStore
+
+
+class LocalVectorStore(VectorStore):
+    """Vector store that keeps normalized embeddings in a numpy matrix.
+
+    Search is an exact dot product against every stored vector, so results are
+    deterministic for a deterministic embedding model. Documents are upserted
+    by id, matching the semantics of the hosted providers.
+
+    New vectors are buffered as blocks and concatenated once at the next
+    search, and metadata filters are evaluated against cached per-key columns,
+    so the store stays usable at a million chunks.
+
+    Args:
+        embedding (Embeddings): Model used to embed documents and queries.
+        search_latency (float): Seconds to sleep per async search, emulating
+            the round trip to a hosted index.
+    """
+
+    def __init__(self, embedding: Embeddings, search_latency: float = 0.0) -> None:
+        """Create an empty store."""
+        self.embedding = embedding
+        self.search_latency = search_latency
+        self._lock = threading.Lock()
+        self._ids: list[str] = []
+        self._positions: dict[str, int] = {}
+        self._texts: list[str] = []
+        self._metadatas: list[dict[str, Any]] = []
+        self._matrix: npt.NDArray[np.float32] = np.zeros((0, 0), dtype=np.float32)
+        self._blocks: list[npt.NDArray[np.float32]] = []
+        self._columns: dict[str, npt.NDArray[Any]] = {}
+
+    @property
+    def embeddings(self) -> Embeddings:
+        """The embedding model of this store."""
+        return self.embedding
+
+    def __len__(self) -> int:
+        """Return the number of stored documents."""
+        return len(self._ids)
+
+    @staticmethod
+    def _normalize(vectors: Any) -> npt.NDArray[np.float32]:
+        matrix = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+        normalized: npt.NDArray[np.float32] = matrix / np.where(norms == 0, 1.0, norms)
+        return normalized
+
+    def add_embeddings(
+        self,
+        texts: Sequence[str],
+        embeddings: Sequence[Sequence[float]],
+        metadatas: Optional[Sequence[dict[str, Any]]] = None,
+        ids: Optional[Sequence[str]] = None,
+    ) -> list[str]:
+        """Upsert texts with precomputed embeddings.
+
+        Args:
+            texts (Sequence[str]): Document contents.
+            embeddings (Sequence[Sequence[float]]): One vector per text.
+            metadatas (Optional[Sequence[dict[str, Any]]]): One metadata dict per text.
+            ids (Optional[Sequence[str]]): Document ids; random UUIDs when omitted.
+
+        Returns:
+            list[str]: The ids of the upserted documents.
+        """
+        if not texts:
+            return []
+        ids = list(ids) if ids is not None else [str(uuid.uuid4()) for _ in texts]
+        metadatas = list(metadatas) if metadatas is not None else [{} for _ in texts]
+        vectors = self._normalize(embeddings)
+        with self._lock:
+            if self._matrix.shape[0] == 0 and not self._blocks:
+                self._matrix = np.zeros((0, vectors.shape[1]), dtype=np.float32)
+            if any(doc_id in self._positions for doc_id in ids):
+                self._consolidate()
+            self._columns.clear()
+            base = len(self._ids)
+            appended = []
+            for text, metadata, doc_id, vector in zip(texts, metadatas, ids, vectors):
+                position = self._positions.get(doc_id)
+                if position is None:
+                    self._positions[doc_id] = len(self._ids)
+                    self._ids.append(doc_id)
+                    self._texts.append(text)
+                    self._metadatas.append(dict(metadata))
+                    appended.append(vector)
+                    continue
+                self._texts[position] = text
+                self._metadatas[position] = dict(metadata)
+                if position >= base:
+                    appended[position - base] = vector
+                else:
+                    self._matrix[position] = vector
+            if appended:
+                self._blocks.append(np.stack(appended))
+        return ids
+
+    def _consolidate(self) -> npt.NDArray[np.float32]:
+        """Fold buffered blocks into the matrix; the caller holds the lock."""
+        if self._blocks:
+            self._matrix = np.concatenate([self._matrix, *self._blocks])
+            self._blocks = []
+        return self._matrix
+
+    def _column(self, key: str) -> npt.NDArray[Any]:
+        """Return the values of one metadata key as a cached object array."""
+        column = self._columns.get(key)
+        if column is None:
+            column = np.empty(len(self._metadatas), dtype=object)
+            column[:] = [m.get(key) for m in self._metadatas]
+            self._columns[key] = column
+        return column
+
+    def _mask(self, filter: dict[str, Any]) -> npt.NDArray[np.bool_]:
+        """Evaluate a Pinecone-style filter over every document.
+
+        Supports plain equality as well as the `$eq`, `$ne`, `$in` and `$nin`
+        operators, which covers every filter the graphs build.
+        """
+        mask = np.ones(len(self._ids), dtype=bool)
+        for key, condition in filter.items():
+            column = self._column(key)
+            if not isinstance(condition, dict):
+                condition = {"$eq": condition}
+            for op, operand in condition.items():
+                if op in ("$eq", "$ne"):
+                    hit = column == operand
+                else:
+                    hit = np.zeros(len(column), dtype=bool)
+                    for value in operand:
+                        hit |= column == value
+                mask &= ~hit if op in ("$ne", "$nin") else hit
+        return mask
+
+    def add_texts(
+        self,
+        texts: Iterable[str],
+        metadatas: Optional[list[dict[str, Any]]] = None,
+        *,
+        ids: Optional[list[str]] = None,
+        **kwargs: Any,
+    ) -> list[str]:
+        """Embed and upsert texts."""
+        texts = list(texts)
+        return self.add_embeddings(
+            texts, self.embedding.embed_documents(texts), metadatas, ids
+        )
+
+    async def aadd_texts(
+        self,
+        texts: Iterable[str],
+        metadatas: Optional[list[dict[str, Any]]] = None,
+        *,
+        ids: Optional[list[str]] = None,
+        **kwargs: Any,
+    ) -> list[str]:
+        """Embed and upsert texts asynchronously."""
+        texts = list(texts)
+        vectors = await self.embedding.aembed_documents(texts)
+        return self.add_embeddings(texts, vectors, metadatas, ids)
+
+    def delete(self, ids: Optional[list[str]] = None, **kwargs: Any) -> Optional[bool]:
+        """Delete documents by id; delete everything when ids is None."""
+        with self._lock:
+            if ids is None:
+                keep = []
+            else:
+                drop = {self._positions[i] for i in ids if i in self._positions}
+                keep = [p for p in range(len(self._ids)) if p not in drop]
+            self._ids = [self._ids[p] for p in keep]
+            self._texts = [self._texts[p] for p in keep]
+            self._metadatas = [self._metadatas[p] for p in keep]
+            matrix = self._consolidate()
+            self._matrix = matrix[keep] if keep else matrix[:0]
+            self._columns.clear()
+            self._positions = {doc_id: p for p, doc_id in enumerate(self._ids)}
+        return True
+
+    def get_by_ids(self, ids: Sequence[str], /) -> list[Document]:
+        """Return the stored documents with the given ids."""
+        with self._lock:
+            return [
+                Document(
+                    id=i,
+                    page_content=self._texts[self._positions[i]],
+                    metadata=dict(self._metadatas[self._positions[i]]),
+                )
+                for i in ids
+                if i in self._positions
+            ]
+
+    def similarity_search_by_vector_with_score(
+        self,
+        embedding: Sequence[float],
+        k: int = 4,
+        filter: Optional[dict[str, Any]] = None,
+    ) -> list[tuple[Document, float]]:
+        """Return the k most similar documents passing the filter, with scores."""
+        with self._lock:
+            if not self._ids:
+                return []
+            scores = self._consolidate() @ self._normalize(embedding)
+            if filter:
+                scores = np.where(self._mask(filter), scores, -np.inf)
+            k = min(k, len(scores))
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top], kind="stable")]
+            return [
+                (
+                    Document(
+                        id=self._ids[p],
+                        page_content=self._texts[p],
+                        metadata=dict(self._metadatas[p]),
+                    ),
+                    float(scores[p]),
+                )
+                for p in top
+                if np.isfinite(scores[p])
+            ]
+
+    def similarity_search_with_score(
+        self,
+        query: str,
+        k: int = 4,
+        filter: Optional[dict[str, Any]] = None,
+        **kwargs: Any,
+    ) -> list[tuple[Document, float]]:
+        """Embed the query and return the k most similar documents with scores."""
+        if self.search_latency:
+            time.sleep(self.search_latency)
+        return self.similarity_search_by_vector_with_score(
+            self.embedding.embed_query(query), k, filter
+        )
+
+    def similarity_search(
+        self,
+        query: str,
+        k: int = 4,
+        filter: Optional[dict[str, Any]] = None,
+        **kwargs: Any,
+    ) -> list[Document]:
+        """Return the k most similar documents passing the filter."""
+        return [
+            doc for doc, _ in self.similarity_search_with_score(query, k, filter)
+        ]
+
+    async def asimilarity_search(
+        self,
+        query: str,
+        k: int = 4,
+        filter: Optional[dict[str, Any]] = None,
+        **kwargs: Any,
+    ) -> list[Document]:
+        """Return the k most similar documents, sleeping for `search_latency`."""
+        vector = await self.embedding.aembed_query(query)
+        if self.search_latency:
+            await asyncio.sleep(self.search_latency)
+        return [
+            doc
+            for doc, _ in self.similarity_search_by_vector_with_score(vector, k, filter)
+        ]
+
+    @classmethod
+    def from_texts(
+        cls,
+        texts: list[str],
+        embedding: Embeddings,
+        metadatas: Optional[list[dict[str, Any]]] = None,
+        *,
+        ids: Optional[list[str]] = None,
+        **kwargs: Any,
+    ) -> LocalVectorStore:
+        """Create a store and upsert the given texts."""
+        store = cls(embedding, **kwargs)
+        store.add_texts(texts, metadatas, ids=ids)
+        return store
+
+
+_stores: dict[str, LocalVectorStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_local_store(name: str, embedding: Embeddings) -> LocalVectorStore:
+    """Return the process-wide store for an index name, creating it if needed.
+
+    Every retriever created for the same name shares one store, so documents
+    indexed by `docu_proc_graph` are visible to `retrieval_graph` runs in the
+    same process.
+
+    Args:
+        name (str): Index name; the retriever uses the embedding model name.
+        embedding (Embeddings): Model used when the store is first created.
+
+    Returns:
+        LocalVectorStore: The shared store.
+    """
+    with _stores_lock:
+        store = _stores.get(name)
+        if store is None:
+            store = _stores[name] = LocalVectorStore(embedding)
+        return store
+
+
+def _parse_model_name(name: str) -> tuple[str, dict[str, str]]:
+    """Split "hashing?dim=256" into ("hashing", {"dim": "256"})."""
+    base, _, query = name.partition("?")
+    return base, dict(parse_qsl(query))
+
+
+##########################  Hashing embeddings  ###############################
+
+
+_TOKEN = re.compile(r"[a-z0-9]+(?:[.'][a-z0-9]+)*")
+_MAX_CACHED_TOKENS = 1 << 20
+# Larger batches are embedded in a worker thread by the async methods.
+_INLINE_EMBED_TEXTS = 32
+
+
+class HashingEmbeddings(Embeddings):
+    """Deterministic feature-hashing embeddings.
+
+    Each lowercase word (and each pair of adjacent words) is hashed with CRC32
+    into one of `dim` buckets with a +1/-1 sign. Term counts are log-scaled and
+    rows L2-normalized, so texts sharing vocabulary get high cosine similarity.
+    Token hashes are memoized and a batch is assembled with a single
+    `np.bincount`, so a batch costs little more than tokenizing it.
+
+    Args:
+        dim (int): Output dimension.
+        latency (float): Seconds to sleep per call, emulating a remote API.
+    """
+
+    # CRC32 of each token seen so far, shared by every instance.
+    _hashes: dict[str, int] = {}
+
+    def __init__(self, dim: int = 384, latency: float = 0.0) -> None:
+        """Create an encoder."""
+        self.dim = dim
+        self.latency = latency
+
+    def _token_hashes(self, text: str) -> list[int]:
+        words = _TOKEN.findall(text.lower())
+        tokens = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+        hashes = self._hashes
+        if len(hashes) > _MAX_CACHED_TOKENS:
+            hashes.clear()
+        missing = [t for t in set(tokens) if t not in hashes]
+        for token in missing:
+            hashes[token] = zlib.crc32(token.encode("utf-8"))
+        return [hashes[t] for t in tokens]
+
+    def embed_array(self, texts: Sequence[str]) -> npt.NDArray[np.float32]:
+        """Embed a batch of texts into an L2-normalized (len(texts), dim) array."""
+        per_text = [self._token_hashes(text) for text in texts]
+        lengths = np.fromiter(map(len, per_text), dtype=np.int64, count=len(texts))
+        hashes = np.fromiter(
+            (h for row in per_text for h in row), dtype=np.int64, count=int(lengths.sum())
+        )
+        rows = np.repeat(np.arange(len(texts)), lengths)
+        # The low bits pick the bucket and the top bit the sign.
+        signs = np.where(hashes & 0x80000000, 1.0, -1.0)
+        cells = rows * self.dim + hashes % self.dim
+        counts = np.bincount(cells, weights=signs, minlength=len(texts) * self.dim)
+        matrix = counts.reshape(len(texts), self.dim)
+        matrix = np.sign(matrix) * np.log1p(np.abs(matrix))
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        normalized: npt.NDArray[np.float32] = (
+            matrix / np.where(norms == 0, 1.0, norms)
+        ).astype(np.float32)
+        return normalized
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        """Embed a batch of documents."""
+        if self.latency:
+            time.sleep(self.latency)
+        return self.embed_array(texts).tolist()  # type: ignore[no-any-return]
+
+    def embed_query(self, text: str) -> list[float]:
+        """Embed a single query."""
+        return self.embed_documents([text])[0]
+
+    async def aembed_documents(self, texts: list[str]) -> list[list[float]]:
+        """Embed a batch of documents without blocking the event loop."""
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if len(texts) > _INLINE_EMBED_TEXTS:
+            # Indexing batches take long enough to stall other sessions.
+            array = await asyncio.to_thread(self.embed_array, texts)
+            return array.tolist()  # type: ignore[no-any-return]
+        return self.embed_array(texts).tolist()  # type: ignore[no-any-return]
+
+    async def aembed_query(self, text: str) -> list[float]:
+        """Embed a single query without blocking the event loop."""
+        return (await self.aembed_documents([text]))[0]
+
+
+def make_local_embeddings(model: str) -> Embeddings:
+    """Build a local embedding model from the part of its name after "local/".
+
+    Args:
+        model (str): "hashing", optionally with `dim` and `latency` options.
+
+    Returns:
+        Embeddings: The configured encoder.
+    """
+    base, options = _parse_model_name(model)
+    if base != "hashing":
+        raise ValueError(f"Unsupported local embedding model: {base}")
+    return HashingEmbeddings(
+        dim=int(options.get("dim", 384)), latency=float(options.get("latency", 0.0))
+    )
+
+
+##########################  Scripted chat model  ##############################
+
+
+# Keyword rules deciding which tool the scripted model calls for a question.
+DEFAULT_TOOL_RULES: tuple[tuple[str, str], ...] = (
+    (r"\b(current|latest|recent|news|stock price|today)\b", "web_search_tool"),
+    (r"\b(compare|across|industry|all major|companies|firms)\b", "industry_analysis_tool"),
+)
+
+
+class ScriptedChatModel(BaseChatModel):
+    """Chat model that replies deterministically after a fixed delay.
+
+    When tools are bound and the latest human message matches one of
+    `tool_rules`, the first reply is a call to that tool; once the tool has
+    answered, the model gives a final answer. Structured output requests
+    (`with_structured_output`) are answered by filling every string field
+    with the latest human message. Replies carry usage metadata estimated at
+    four characters per token.
+    """
+
+    latency: float = 0.0
+    """Seconds to sleep per call."""
+
+    tool_rules: Sequence[tuple[str, str]] = DEFAULT_TOOL_RULES
+    """(regex, tool name) pairs checked in order against the question."""
+
+    bound_tools: list[dict[str, Any]] = []
+    tool_choice: Optional[str] = None
+
+    @property
+    def _llm_type(self) -> str:
+        return "local-scripted"
+
+    def bind_tools(
+        self, tools: Sequence[Any], *, tool_choice: Optional[str] = None, **kwargs: Any
+    ) -> ScriptedChatModel:
+        """Return a copy of this model that may call the given tools."""
+        return self.model_copy(
+            update={
+                "bound_tools": [convert_to_openai_tool(t)["function"] for t in tools],
+                "tool_choice": tool_choice,
+            }
+        )
+
+    def _tool_call(self, name: str, args: dict[str, Any]) -> AIMessage:
+        return AIMessage(
+            content="",
+            tool_calls=[{"name": name, "args": args, "id": f"call_{uuid.uuid4().hex[:12]}"}],
+        )
+
+    def _reply(self, messages: list[BaseMessage]) -> AIMessage:
+        human = [m for m in messages if m.type == "human"]
+        question = str(human[-1].content) if human else ""
+        if self.tool_choice and self.bound_tools:
+            # Structured output: fill every string field with the question.
+            schema = self.bound_tools[0]
+            properties = schema.get("parameters", {}).get("properties", {})
+            args = {k: question for k, v in properties.items() if v.get("type") == "string"}
+            return self._tool_call(schema["name"], args)
+        if self.bound_tools and not isinstance(messages[-1], ToolMessage):
+            names = {tool["name"] for tool in self.bound_tools}
+            for pattern, tool_name in self.tool_rules:
+                if tool_name in names and re.search(pattern, question, re.I):
+                    return self._tool_call(tool_name, {"query": question})
+        prompt_chars = sum(len(str(m.content)) for m in messages)
+        answer = f"Based on the retrieved filings: {question}"
+        input_tokens, output_tokens = prompt_chars // 4, len(answer) // 4
+        return AIMessage(
+            content=answer,
+            usage_metadata={
+                "input_tokens": input_tokens,
+                "output_tokens": output_tokens,
+                "total_tokens": input_tokens + output_tokens,
+            },
+        )
+
+    def _generate(
+        self, messages: list[BaseMessage], *args: Any, **kwargs: Any
+    ) -> ChatResult:
+        if self.latency:
+            time.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=self._reply(messages))])
+
+    async def _agenerate(
+        self, messages: list[BaseMessage], *args: Any, **kwargs: Any
+    ) -> ChatResult:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=self._reply(messages))])
+
+
+def make_local_chat_model(model: str) -> BaseChatModel:
+    """Build a local chat model from the part of its name after "local/".
+
+    Args:
+        model (str): "scripted", optionally with `latency` and `tools`:
+            "auto" (default) follows every keyword rule, "none" never calls
+            tools, and a comma-separated list of tool names keeps only the
+            rules for those tools.
+
+    Returns:
+        BaseChatModel: The configured model.
+    """
+    base, options = _parse_model_name(model)
+    if base != "scripted":
+        raise ValueError(f"Unsupported local chat model: {base}")
+    tools = options.get("tools", "auto")
+    rules = DEFAULT_TOOL_RULES
+    if tools != "auto":
+        allowed = set(tools.split(","))
+        rules = tuple(rule for rule in DEFAULT_TOOL_RULES if rule[1] in allowed)
+    return ScriptedChatModel(latency=float(options.get("latency", 0.0)), tool_rules=rules)
@@ -0,0 +1,198 @@
+"""Detect event-loop stalls and attribute them to the graph node that caused them.
+
+One blocking call in an async node (a synchronous HTTP request, a large
+`pickle.load`, CPU-heavy chunking) stalls every other session served by the
+same event loop. The monitor runs a heartbeat task that sleeps for `interval`
+and measures how late it wakes up; a watchdog thread samples the loop thread's
+stack while a stall is in progress, so each stall is reported with the node
+(any function decorated with `telemetry.instrument_node`) and the line that
+was executing.
+
+Stalls longer than `threshold` are logged as warnings on the
+"retrieval_graph.loop_monitor" logger, kept in `LoopMonitor.stalls`, and
+recorded as `retrieval_graph_event_loop_stall_seconds{node}` and
+`retrieval_graph_event_loop_stalls_total{node}` when telemetry is enabled.
+
+Set `RETRIEVAL_GRAPH_LOOP_MONITOR=1` to start a monitor on the running loop
+the first time a node runs (threshold from `RETRIEVAL_GRAPH_LOOP_STALL_MS`,
+100 ms by default), or use `monitor()` around a block of async code.
+
+Classes:
+    Stall: One detected stall.
+    LoopMonitor: Heartbeat task and watchdog thread for one event loop.
+
+Functions:
+    monitor: Async context manager that runs a LoopMonitor.
+    ensure_started: Start the environment-configured monitor on the running loop.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from types import FrameType
+from typing import AsyncIterator, Optional
+
+from retrieval_graph import telemetry
+
+logger = logging.getLogger(__name__)
+
+# Stack frames kept per stall, innermost first.
+_MAX_FRAMES = 30
+
+
+@dataclass(frozen=True)
+class Stall:
+    """One detected stall.
+
+    Args:
+        duration (float): Seconds the loop was unable to run other tasks.
+        node (Optional[str]): Graph node running when the stall was sampled.
+        location (str): Innermost frame while stalled, "function (file:line)".
+        stack (tuple[str, ...]): Sampled frames, innermost first.
+    """
+
+    duration: float
+    node: Optional[str]
+    location: str
+    stack: tuple[str, ...]
+
+
+def _describe(frame: Optional[FrameType]) -> tuple[Optional[str], tuple[str, ...]]:
+    """Return (node, frames) for a sampled stack, innermost frame first."""
+    node = None
+    frames: list[str] = []
+    while frame is not None:
+        code = frame.f_code
+        if node is None:
+            node = telemetry.node_code_names.get(code)
+        if len(frames) < _MAX_FRAMES:
+            frames.append(
+                f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})"
+            )
+        frame = frame.f_back
+    return node, tuple(frames)
+
+
+class LoopMonitor:
+    """Heartbeat task and watchdog thread for one event loop.
+
+    Args:
+        threshold (float): Report stalls at least this long, in seconds.
+        interval (float): Heartbeat period in seconds.
+        history (int): Number of recent stalls kept in `stalls`.
+    """
+
+    def __init__(
+        self, threshold: float = 0.1, interval: float = 0.02, history: int = 100
+    ) -> None:
+        """Configure the monitor; call `start` from the loop to be watched."""
+        self.threshold = threshold
+        self.interval = interval
+        self.stalls: deque[Stall] = deque(maxlen=history)
+        self._beat = time.monotonic()
+        self._sample: Optional[tuple[float, Optional[str], tuple[str, ...]]] = None
+        self._task: Optional[asyncio.Task[None]] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """Start watching the running event loop."""
+        loop_thread_id = threading.get_ident()
+        self._beat = time.monotonic()
+        self._stop.clear()
+        self._task = asyncio.get_running_loop().create_task(self._heartbeat())
+        self._thread = threading.Thread(
+            target=self._watch, args=(loop_thread_id,), name="loop-monitor", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the heartbeat task and the watchdog thread."""
+        self._stop.set()
+        if self._task is not None:
+            if not self._task.get_loop().is_closed():
+                self._task.cancel()
+            self._task = None
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    async def _heartbeat(self) -> None:
+        while True:
+            self._beat = time.monotonic()
+            await asyncio.sleep(self.interval)
+            lag = time.monotonic() - self._beat - self.interval
+            if lag >= self.threshold:
+                self._report(lag)
+
+    def _watch(self, loop_thread_id: int) -> None:
+        # Sample often enough to catch a stall that barely exceeds the threshold.
+        while not self._stop.wait(self.threshold / 4):
+            beat = self._beat
+            late = time.monotonic() - beat - self.interval
+            if late < self.threshold or (self._sample and self._sample[0] == beat):
+                continue
+            frame = sys._current_frames().get(loop_thread_id)
+            node, stack = _describe(frame)
+            self._sample = (beat, node, stack)
+
+    def _report(self, lag: float) -> None:
+        node: Optional[str] = None
+        stack: tuple[str, ...] = ()
+        if self._sample and self._sample[0] == self._beat:
+            _, node, stack = self._sample
+        stall = Stall(lag, node, stack[0] if stack else "unknown", stack)
+        self.stalls.append(stall)
+        logger.warning(
+            "Event loop stalled for %.0f ms in node %s at %s",
+            lag * 1000,
+            node or "unknown",
+            stall.location,
+            extra={"node": node, "duration_ms": round(lag * 1000, 3), "stack": stack},
+        )
+        telemetry.observe("retrieval_graph_event_loop_stall_seconds", lag, node=node or "unknown")
+        telemetry.increment("retrieval_graph_event_loop_stalls_total", node=node or "unknown")
+
+
+@asynccontextmanager
+async def monitor(threshold: float = 0.1, interval: float = 0.02) -> AsyncIterator[LoopMonitor]:
+    """Run a LoopMonitor on the running loop for the duration of a block.
+
+    Args:
+        threshold (float): Report stalls at least this long, in seconds.
+        interval (float): Heartbeat period in seconds.
+
+    Yields:
+        LoopMonitor: The running monitor; inspect `stalls` afterwards.
+    """
+    loop_monitor = LoopMonitor(threshold, interval)
+    loop_monitor.start()
+    try:
+        yield loop_monitor
+    finally:
+        # Let the heartbeat wake up once more to report a stall at the end of the block.
+        await asyncio.sleep(interval)
+        loop_monitor.stop()
+
+
+_monitors: dict[asyncio.AbstractEventLoop, LoopMonitor] = {}
+
+
+def ensure_started() -> None:
+    """Start the environment-configured monitor on the running loop, once."""
+    loop = asyncio.get_running_loop()
+    if loop in _monitors:
+        return
+    for stale in [other for other in _monitors if other.is_closed()]:
+        _monitors.pop(stale).stop()
+    threshold = float(os.environ.get("RETRIEVAL_GRAPH_LOOP_STALL_MS", "100")) / 1000
+    _monitors[loop] = LoopMonitor(threshold)
+    _monitors[loop].start()
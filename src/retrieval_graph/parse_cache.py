@@ -0,0 +1,213 @@
+"""Content-addressed cache of parsed PDFs.
+
+Parsing a filing with the Upstage document parser is the slowest and the only
+paid step of ingestion, so its output is cached. Entries are keyed by the
+SHA-256 of the PDF bytes together with the parser options: a PDF that changed
+under the same name, or a parse with different options (`split`, `ocr`,
+output format), misses the cache instead of serving stale pages.
+
+The parsed pages themselves live in a `BlobStore` as gzip-compressed JSON
+lines, one page per line; an entry is a small JSON file under `root` that maps
+the key to the blob's `DocumentRef`. A hit therefore costs one small file read
+and yields a ref the ingestion graph can put straight into its state; pages
+are decoded lazily, one at a time, only when a consumer iterates them.
+
+Classes:
+    ParseCache: Parsed pages of PDFs, keyed by PDF content and parser options.
+
+Functions:
+    pdf_cache_key: Compute the cache key of a PDF parsed with given options.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from dataclasses import asdict
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Iterable, Iterator, Optional, Union
+
+from langchain_core.documents import Document
+
+from retrieval_graph.blob_store import BlobStore, DocumentRef
+
+logger = logging.getLogger(__name__)
+
+# Bump when the stored page format changes, to invalidate every entry.
+FORMAT_VERSION = 1
+
+# Options passed to `UpstageDocumentParseLoader` by the ingestion graph.
+DEFAULT_PARSE_OPTIONS: dict[str, Any] = {
+    "model": "document-parse",
+    "split": "none",
+    "ocr": "auto",
+    "output_format": "html",
+    "coordinates": True,
+}
+
+# Options of a streaming ingestion: one document per page, so pages can be
+# chunked and indexed as soon as their range is parsed.
+STREAMING_PARSE_OPTIONS: dict[str, Any] = {**DEFAULT_PARSE_OPTIONS, "split": "page"}
+
+_READ_BLOCK = 1 << 20
+
+# Blob keys of the entries under each cache root, by resolved path. Loaded
+# once per process and kept current by `get` and `record`, so `refs` does not
+# read every entry.
+_entry_refs: dict[Path, set[str]] = {}
+_entry_refs_lock = threading.Lock()
+
+
+def pdf_cache_key(
+    pdf_file: Union[str, Path], options: dict[str, Any], parser: str = "upstage"
+) -> str:
+    """Compute the cache key of a PDF parsed with the given options.
+
+    Args:
+        pdf_file (Union[str, Path]): The PDF; its bytes are hashed, not its name.
+        options (dict[str, Any]): Parser options that affect the output.
+        parser (str): Name of the parser (see `parsing.make_parser`).
+
+    Returns:
+        str: SHA-256 hex digest of the format version, parser, options and PDF bytes.
+    """
+    hasher = hashlib.sha256()
+    hasher.update(f"v{FORMAT_VERSION}\n{parser}\n".encode())
+    hasher.update(json.dumps(options, sort_keys=True, default=str).encode())
+    hasher.update(b"\n")
+    with open(pdf_file, "rb") as f:
+        for block in iter(lambda: f.read(_READ_BLOCK), b""):
+            hasher.update(block)
+    return hasher.hexdigest()
+
+
+class ParseCache:
+    """Parsed pages of PDFs, keyed by PDF content and parser options.
+
+    Args:
+        root (Union[str, Path]): Directory of the entry files.
+        store (Optional[BlobStore]): Blob store holding the pages; the
+            ingestion graph's default store (`cache/blobs`) if None, so cached
+            refs can be used by the graph directly.
+    """
+
+    def __init__(
+        self, root: Union[str, Path] = "cache/parsed", store: Optional[BlobStore] = None
+    ) -> None:
+        """Open the cache, creating its directory if needed."""
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.store = store or BlobStore()
+
+    def _entry_path(self, key: str) -> Path:
+        return self.root / key[:2] / f"{key[2:]}.json"
+
+    def _held(self) -> set[str]:
+        """Return the process-wide set of the root's blob keys; hold the lock."""
+        root = self.root.resolve()
+        keys = _entry_refs.get(root)
+        if keys is None:
+            keys = _entry_refs[root] = set()
+            for path in self.root.glob("*/*.json"):
+                try:
+                    keys.add(json.loads(path.read_text(encoding="utf-8"))["ref"]["key"])
+                except (OSError, ValueError, KeyError, TypeError):
+                    continue
+        return keys
+
+    def get(self, key: str) -> Optional[DocumentRef]:
+        """Return the ref of the cached pages, or None on a miss.
+
+        An entry whose blob has been removed from the store counts as a miss.
+        """
+        try:
+            entry = json.loads(self._entry_path(key).read_text(encoding="utf-8"))
+            ref = DocumentRef(**entry["ref"])
+        except FileNotFoundError:
+            return None
+        except (ValueError, KeyError, TypeError) as e:
+            logger.warning("Ignoring unreadable parse cache entry %s: %s", key, e)
+            return None
+        if not self.store.exists(ref):
+            return None
+        with _entry_refs_lock:
+            self._held().add(ref.key)
+        return ref
+
+    def put(
+        self,
+        key: str,
+        pages: Iterable[Document],
+        *,
+        source_file: str,
+        options: dict[str, Any],
+    ) -> DocumentRef:
+        """Store parsed pages under a key and return their ref.
+
+        Args:
+            key (str): Key from `pdf_cache_key`.
+            pages (Iterable[Document]): The parsed pages, streamed to the store.
+            source_file (str): PDF file name, recorded for inspection.
+            options (dict[str, Any]): Parser options, recorded for inspection.
+
+        Returns:
+            DocumentRef: Reference to the stored pages.
+        """
+        ref = self.store.put_documents(pages)
+        self.record(key, ref, source_file=source_file, options=options)
+        return ref
+
+    def record(
+        self,
+        key: str,
+        ref: DocumentRef,
+        *,
+        source_file: str,
+        options: dict[str, Any],
+    ) -> None:
+        """Map a key to pages already written to the store, e.g. while streaming.
+
+        Args:
+            key (str): Key from `pdf_cache_key`.
+            ref (DocumentRef): Reference to the parsed pages in `store`.
+            source_file (str): PDF file name, recorded for inspection.
+            options (dict[str, Any]): Parser options, recorded for inspection.
+        """
+        entry = {
+            "ref": asdict(ref),
+            "source_file": source_file,
+            "options": options,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+        }
+        path = self._entry_path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Write atomically so concurrent readers never see a partial entry.
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(entry, f, default=str)
+        os.replace(tmp_path, path)
+        with _entry_refs_lock:
+            self._held().add(ref.key)
+
+    def holding(self, keys: Iterable[str]) -> set[str]:
+        """Return those of the given blob keys that an entry refers to.
+
+        The entries are read on the first call in a process only; later calls
+        see the entries written or hit through this process since. An entry
+        another process wrote meanwhile may lose its blob, and is then a miss.
+        """
+        with _entry_refs_lock:
+            return self._held().intersection(keys)
+
+    def iter_pages(self, ref: DocumentRef) -> Iterator[Document]:
+        """Lazily yield the cached pages behind a ref, one at a time."""
+        return self.store.iter_documents(ref)
+
+    def load_pages(self, ref: DocumentRef) -> list[Document]:
+        """Load every cached page behind a ref into memory."""
+        return self.store.load_documents(ref)
@@ -0,0 +1,422 @@
+"""Concurrent page-range parsing of PDFs.
+
+`UpstageDocumentParseLoader` sends a PDF to the document parser ten pages per
+request, one request after another, so parsing a 100+ page 10-K takes a dozen
+sequential round trips. `parse_pdf_ranges` instead splits the PDF into page
+ranges (ten pages by default, one request each), parses the ranges
+concurrently under a shared semaphore, retries failed ranges with exponential
+backoff and jitter, and merges the results back into what a single parse of
+the whole file would have returned:
+
+- with `split="none"` one document whose content is the ranges' content in
+  page order and whose `total_pages` covers the whole file;
+- with `split="page"` or `"element"` the ranges' documents in order, with
+  their `page` metadata shifted to global page numbers.
+
+Every merged document gets `source_file` metadata. The parser behind the
+ranges is pluggable: "upstage" calls the Upstage document parser, "local" is
+an offline stand-in that extracts text with PyPDF2, for tests and benchmarks.
+With a `RangeCheckpoint` (see `retrieval_graph.journal`) every parsed range is
+recorded, and ranges recorded by an interrupted parse are not parsed again.
+
+Classes:
+    PageRange: A contiguous range of pages of a PDF.
+    DocumentParser: Protocol of the per-range parsers.
+    RangeCheckpoint: Protocol of the records of parsed ranges, for resuming.
+    UpstageParser: Parse with the Upstage document parser.
+    LocalParser: Offline stand-in parser using PyPDF2 text extraction.
+
+Functions:
+    make_parser: Create the configured parser.
+    split_pdf: Write each page range of a PDF to its own file.
+    parse_pdf_ranges: Parse a PDF's page ranges concurrently and merge them.
+    stream_pdf_ranges: Parse a PDF's page ranges concurrently, yielding them in order.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import random
+import tempfile
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, AsyncIterator, Literal, Optional, Protocol, Union
+
+from langchain_core.documents import Document
+
+from retrieval_graph import telemetry
+
+logger = logging.getLogger(__name__)
+
+# Pages per document parser request in `UpstageDocumentParseLoader`.
+DEFAULT_PAGES_PER_RANGE = 10
+
+
+@dataclass(frozen=True)
+class PageRange:
+    """A contiguous range of pages of a PDF.
+
+    Args:
+        start (int): Index of the first page, 0-based.
+        stop (int): Index one past the last page.
+        path (Path): File holding only these pages.
+    """
+
+    start: int
+    stop: int
+    path: Path
+
+
+class DocumentParser(Protocol):
+    """Protocol of the per-range parsers used by `parse_pdf_ranges`."""
+
+    async def parse(self, path: Path, options: dict[str, Any]) -> list[Document]:
+        """Parse one PDF file with the given `UpstageDocumentParseLoader` options."""
+        ...
+
+
+class RangeCheckpoint(Protocol):
+    """Protocol of the records of parsed ranges used to resume a parse."""
+
+    async def load_range(self, page_range: PageRange) -> Optional[list[Document]]:
+        """Return the parser's documents for a range parsed before, if any."""
+        ...
+
+    async def save_range(self, page_range: PageRange, docs: list[Document]) -> None:
+        """Record the parser's documents for a range."""
+        ...
+
+
+class UpstageParser:
+    """Parse with the Upstage document parser."""
+
+    async def parse(self, path: Path, options: dict[str, Any]) -> list[Document]:
+        """Parse one PDF file with `UpstageDocumentParseLoader`."""
+        from langchain_upstage import UpstageDocumentParseLoader
+
+        loader = UpstageDocumentParseLoader(str(path), **options)
+        return await loader.aload()
+
+
+class LocalParser:
+    """Offline stand-in parser using PyPDF2 text extraction.
+
+    Returns documents shaped like the Upstage parser's for the same options,
+    with plain text content.
+
+    Args:
+        latency (float): Seconds to sleep per call, to simulate the API.
+    """
+
+    def __init__(self, latency: float = 0.0) -> None:
+        """Create the parser."""
+        self.latency = latency
+        self.calls = 0
+
+    async def parse(self, path: Path, options: dict[str, Any]) -> list[Document]:
+        """Extract the text of each page of one PDF file."""
+        self.calls += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        pages = await asyncio.to_thread(_extract_text, path)
+        if options.get("split", "none") == "none":
+            return [Document(page_content="".join(pages), metadata={"total_pages": len(pages)})]
+        return [
+            Document(page_content=text, metadata={"page": number})
+            for number, text in enumerate(pages, start=1)
+        ]
+
+
+def _extract_text(path: Path) -> list[str]:
+    from PyPDF2 import PdfReader
+
+    return [page.extract_text() or "" for page in PdfReader(str(path)).pages]
+
+
+def make_parser(name: Literal["upstage", "local"]) -> DocumentParser:
+    """Create the configured parser.
+
+    Args:
+        name (Literal["upstage", "local"]): Parser name from the configuration.
+
+    Returns:
+        DocumentParser: The parser.
+    """
+    match name:
+        case "upstage":
+            return UpstageParser()
+        case "local":
+            return LocalParser()
+        case _:
+            raise ValueError(f"Unsupported document parser: {name}")
+
+
+def split_pdf(
+    pdf_file: Union[str, Path], out_dir: Union[str, Path], pages_per_range: int
+) -> Optional[list[PageRange]]:
+    """Write each page range of a PDF to its own file.
+
+    Args:
+        pdf_file (Union[str, Path]): The PDF to split.
+        out_dir (Union[str, Path]): Directory for the range files.
+        pages_per_range (int): Pages per range.
+
+    Returns:
+        Optional[list[PageRange]]: The ranges in page order, or None if the
+        file cannot be read as a PDF and should be parsed whole.
+    """
+    from PyPDF2 import PdfReader, PdfWriter
+    from PyPDF2.errors import PdfReadError
+
+    try:
+        reader = PdfReader(str(pdf_file))
+        num_pages = len(reader.pages)
+    except PdfReadError:
+        return None
+    ranges = []
+    for start in range(0, num_pages, pages_per_range):
+        stop = min(start + pages_per_range, num_pages)
+        writer = PdfWriter()
+        for index in range(start, stop):
+            writer.add_page(reader.pages[index])
+        path = Path(out_dir) / f"pages-{start + 1:05d}-{stop:05d}.pdf"
+        with open(path, "wb") as f:
+            writer.write(f)
+        ranges.append(PageRange(start, stop, path))
+    return ranges
+
+
+async def _parse_with_retry(
+    parser: DocumentParser,
+    path: Path,
+    options: dict[str, Any],
+    *,
+    limit: asyncio.Semaphore,
+    retries: int,
+    backoff: float,
+) -> list[Document]:
+    attempt = 0
+    while True:
+        try:
+            async with limit:
+                return await parser.parse(path, options)
+        except Exception as e:
+            if attempt == retries:
+                raise
+            # Full jitter: sleep a random fraction of the exponential backoff.
+            delay = random.uniform(0, backoff * 2**attempt)
+            attempt += 1
+            logger.warning(
+                "Parsing %s failed (%s); retry %d/%d in %.2fs",
+                path.name,
+                e,
+                attempt,
+                retries,
+                delay,
+            )
+            telemetry.increment("retrieval_graph_parse_retries_total")
+            await asyncio.sleep(delay)
+
+
+async def _parse_range(
+    parser: DocumentParser,
+    page_range: PageRange,
+    options: dict[str, Any],
+    *,
+    limit: asyncio.Semaphore,
+    retries: int,
+    backoff: float,
+    checkpoint: Optional[RangeCheckpoint],
+) -> list[Document]:
+    if checkpoint is not None:
+        docs = await checkpoint.load_range(page_range)
+        if docs is not None:
+            return docs
+    docs = await _parse_with_retry(
+        parser, page_range.path, options, limit=limit, retries=retries, backoff=backoff
+    )
+    if checkpoint is not None:
+        await checkpoint.save_range(page_range, docs)
+    return docs
+
+
+def _merge(
+    results: list[tuple[PageRange, list[Document]]],
+    options: dict[str, Any],
+    total_pages: Optional[int] = None,
+) -> list[Document]:
+    """Merge the parsed ranges into what a single parse would have returned.
+
+    Unsplit documents are joined into one that keeps the parser's metadata:
+    per-element lists are concatenated, other values are those of the first
+    range, and `total_pages` is replaced when the page count is known.
+    """
+    if options.get("split", "none") == "none":
+        docs = [doc for _, range_docs in results for doc in range_docs]
+        metadata: dict[str, Any] = {}
+        for doc in docs:
+            for key, value in doc.metadata.items():
+                metadata.setdefault(key, value)
+        for key in ("coordinates", "base64_encodings"):
+            if any(key in doc.metadata for doc in docs):
+                metadata[key] = [v for doc in docs for v in doc.metadata.get(key, [])]
+        if total_pages is not None:
+            metadata["total_pages"] = total_pages
+        content = "".join(doc.page_content for doc in docs)
+        return [Document(page_content=content, metadata=metadata)]
+    return [doc for page_range, docs in results for doc in _renumber(page_range, docs)]
+
+
+def _renumber(page_range: PageRange, docs: list[Document]) -> list[Document]:
+    """Shift range-local `page` metadata to global page numbers, in place."""
+    for doc in docs:
+        if isinstance(doc.metadata.get("page"), int):
+            doc.metadata["page"] += page_range.start
+    return docs
+
+
+async def parse_pdf_ranges(
+    pdf_file: Union[str, Path],
+    parser: DocumentParser,
+    options: dict[str, Any],
+    *,
+    pages_per_range: int = DEFAULT_PAGES_PER_RANGE,
+    limit: Optional[asyncio.Semaphore] = None,
+    max_concurrency: int = 4,
+    retries: int = 3,
+    backoff: float = 1.0,
+    checkpoint: Optional[RangeCheckpoint] = None,
+) -> list[Document]:
+    """Parse a PDF's page ranges concurrently and merge them.
+
+    Args:
+        pdf_file (Union[str, Path]): The PDF to parse.
+        parser (DocumentParser): Parser called once per range.
+        options (dict[str, Any]): `UpstageDocumentParseLoader` options.
+        pages_per_range (int): Pages per range.
+        limit (Optional[asyncio.Semaphore]): Semaphore bounding parser calls,
+            shared with other files; a new one of `max_concurrency` if None.
+        max_concurrency (int): Concurrent parser calls when `limit` is None.
+        retries (int): Retries per range after the first attempt.
+        backoff (float): Base delay in seconds of the exponential backoff.
+        checkpoint (Optional[RangeCheckpoint]): Record of the parsed ranges;
+            ranges it holds are not parsed again.
+
+    Returns:
+        list[Document]: The merged documents, with `source_file` metadata.
+    """
+    pdf_file = Path(pdf_file)
+    limit = limit or asyncio.Semaphore(max_concurrency)
+    with tempfile.TemporaryDirectory(prefix="parse-") as tmp:
+        ranges = await asyncio.to_thread(split_pdf, pdf_file, tmp, pages_per_range)
+        # Unreadable by PyPDF2: parse the file whole and trust the parser's
+        # own page count.
+        total_pages = None if ranges is None else (ranges[-1].stop if ranges else 0)
+        if ranges is None:
+            ranges = [PageRange(0, 1, pdf_file)]
+        tasks = [
+            asyncio.ensure_future(
+                _parse_range(
+                    parser,
+                    r,
+                    options,
+                    limit=limit,
+                    retries=retries,
+                    backoff=backoff,
+                    checkpoint=checkpoint,
+                )
+            )
+            for r in ranges
+        ]
+        try:
+            parsed = await asyncio.gather(*tasks)
+        except BaseException:
+            # One range failed for good: stop the others before the range files go away.
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+    documents = _merge(list(zip(ranges, parsed)), options, total_pages)
+    for doc in documents:
+        doc.metadata["source_file"] = pdf_file.name
+    logger.info(
+        "Parsed %s in %d page ranges into %d documents",
+        pdf_file.name,
+        len(ranges),
+        len(documents),
+    )
+    return documents
+
+
+async def stream_pdf_ranges(
+    pdf_file: Union[str, Path],
+    parser: DocumentParser,
+    options: dict[str, Any],
+    *,
+    pages_per_range: int = DEFAULT_PAGES_PER_RANGE,
+    limit: Optional[asyncio.Semaphore] = None,
+    lookahead: int = 4,
+    retries: int = 3,
+    backoff: float = 1.0,
+    checkpoint: Optional[RangeCheckpoint] = None,
+) -> AsyncIterator[list[Document]]:
+    """Parse a PDF's page ranges concurrently and yield them in page order.
+
+    At most `lookahead` ranges are parsed ahead of the consumer, so memory
+    stays bounded by the window rather than by the size of the PDF. Use a
+    `split` of "page" or "element" to get per-page documents.
+
+    Args:
+        pdf_file (Union[str, Path]): The PDF to parse.
+        parser (DocumentParser): Parser called once per range.
+        options (dict[str, Any]): `UpstageDocumentParseLoader` options.
+        pages_per_range (int): Pages per range.
+        limit (Optional[asyncio.Semaphore]): Semaphore bounding parser calls,
+            shared with other files; a new one of `lookahead` if None.
+        lookahead (int): Ranges parsed ahead of the consumer.
+        retries (int): Retries per range after the first attempt.
+        backoff (float): Base delay in seconds of the exponential backoff.
+        checkpoint (Optional[RangeCheckpoint]): Record of the parsed ranges;
+            ranges it holds are not parsed again.
+
+    Yields:
+        list[Document]: Each range's documents, with global `page` numbers and
+        `source_file` metadata.
+    """
+    pdf_file = Path(pdf_file)
+    limit = limit or asyncio.Semaphore(lookahead)
+    with tempfile.TemporaryDirectory(prefix="parse-") as tmp:
+        ranges = await asyncio.to_thread(split_pdf, pdf_file, tmp, pages_per_range)
+        if ranges is None:
+            ranges = [PageRange(0, 1, pdf_file)]
+        tasks: list[asyncio.Future[list[Document]]] = []
+
+        def schedule(upto: int) -> None:
+            for page_range in ranges[len(tasks) : upto]:
+                tasks.append(
+                    asyncio.ensure_future(
+                        _parse_range(
+                            parser,
+                            page_range,
+                            options,
+                            limit=limit,
+                            retries=retries,
+                            backoff=backoff,
+                            checkpoint=checkpoint,
+                        )
+                    )
+                )
+
+        try:
+            for index, page_range in enumerate(ranges):
+                schedule(index + max(1, lookahead))
+                docs = await tasks[index]
+                for doc in _renumber(page_range, docs):
+                    doc.metadata["source_file"] = pdf_file.name
+                yield docs
+        finally:
+            # Stop ranges parsed ahead if the consumer stopped or a range failed.
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
@@ -0,0 +1,255 @@
+"""Opt-in CPU and allocation profiling of graph runs, per node.
+
+Profiling answers "where did the time go" for a specific slow question or
+ingest: each node decorated with `telemetry.instrument_node` (every node of
+`retrieval_graph` and `docu_proc`) runs under `cProfile` and `tracemalloc`, and
+the results are written to a profile directory as:
+
+- `report.txt`: per node, wall time, peak traced memory, the top functions by
+  cumulative time and the top allocation sites;
+- `stacks.collapsed`: collapsed stacks (`node;caller;callee microseconds`)
+  for `flamegraph.pl`, speedscope or inferno;
+- `NN-<node>.pstats`: the raw profile of each node, for `snakeviz` or `pstats`.
+
+Profiling is off by default. Turn it on for a block of code with
+`profile_run(out_dir)`, for a run with the `profiling_enabled` configuration
+field, or for every run with `RETRIEVAL_GRAPH_PROFILE=1`. Configured and
+environment-enabled runs write to `<profile_dir>/<thread_id>/`, where
+`profile_dir` defaults to `RETRIEVAL_GRAPH_PROFILE_DIR` or `cache/profiles`.
+Expect runs to be several times slower while profiling, mostly from
+`tracemalloc`.
+
+Only one node is profiled at a time: work of nodes that run concurrently with
+an already-profiled node is attributed to that node. cProfile only sees the
+event-loop thread, so work a node hands to `asyncio.to_thread` shows up as
+time spent awaiting it.
+
+Classes:
+    RunProfile: Writes node profiles into one profile directory.
+
+Functions:
+    profile_run: Profile every node that runs inside a block.
+    profile_node: Profile one node if profiling is on for its run.
+    collapsed_stacks: Convert a cProfile profile into collapsed stacks.
+"""
+
+from __future__ import annotations
+
+import contextvars
+import cProfile
+import io
+import logging
+import os
+import pstats
+import time
+import tracemalloc
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Iterator, Optional
+
+from langchain_core.runnables import RunnableConfig
+
+from retrieval_graph.configuration import IndexConfiguration
+
+logger = logging.getLogger(__name__)
+
+_active_run: contextvars.ContextVar[Optional[RunProfile]] = contextvars.ContextVar(
+    "retrieval_graph_profile_run", default=None
+)
+# cProfile and tracemalloc are process-wide, so only one node is profiled at a time.
+_busy = False
+
+
+def _env_enabled() -> bool:
+    return os.environ.get("RETRIEVAL_GRAPH_PROFILE", "").lower() in {"1", "true", "yes", "on"}
+
+
+class RunProfile:
+    """Writes node profiles into one profile directory.
+
+    Args:
+        out_dir (Path): Directory for `report.txt`, `stacks.collapsed` and the
+            per-node `.pstats` files; created if missing.
+        top (int): Number of functions and allocation sites listed per node.
+    """
+
+    def __init__(self, out_dir: Path, top: int = 25) -> None:
+        """Create the profile directory."""
+        self.out_dir = Path(out_dir)
+        self.top = top
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+
+    def add(
+        self,
+        node: str,
+        profiler: cProfile.Profile,
+        allocations: list[tracemalloc.StatisticDiff],
+        wall_seconds: float,
+        peak_bytes: int,
+    ) -> None:
+        """Append one node's profile to the report, stacks and pstats files."""
+        sequence = len(list(self.out_dir.glob("*.pstats"))) + 1
+        profiler.dump_stats(self.out_dir / f"{sequence:02d}-{node}.pstats")
+
+        buffer = io.StringIO()
+        stats = pstats.Stats(profiler, stream=buffer)
+        stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(self.top)
+        lines = [
+            f"== {sequence:02d} {node}: {wall_seconds * 1000:.1f} ms wall, "
+            f"{peak_bytes / 1024:.1f} KiB peak traced memory ==",
+            "",
+            "Top functions by cumulative time:",
+            buffer.getvalue().strip(),
+            "",
+            "Top allocations (net new memory while the node ran):",
+        ]
+        for diff in allocations[: self.top]:
+            frame = diff.traceback[0]
+            lines.append(
+                f"  {frame.filename}:{frame.lineno}: {diff.size_diff / 1024:+.1f} KiB "
+                f"in {diff.count_diff:+d} blocks"
+            )
+        with open(self.out_dir / "report.txt", "a") as f:
+            f.write("\n".join(lines) + "\n\n")
+        with open(self.out_dir / "stacks.collapsed", "a") as f:
+            f.writelines(f"{line}\n" for line in collapsed_stacks(stats, node))
+
+
+def _label(func: tuple[str, int, str]) -> str:
+    filename, lineno, name = func
+    if filename == "~":
+        return name.replace(";", ",")
+    return f"{name} ({os.path.basename(filename)}:{lineno})".replace(";", ",")
+
+
+def collapsed_stacks(stats: pstats.Stats, root: str, max_depth: int = 64) -> list[str]:
+    """Convert a cProfile profile into collapsed stacks.
+
+    cProfile records caller/callee pairs rather than full stacks, so stacks are
+    rebuilt from the call graph and each function's self time is split between
+    its callers in proportion to the time each caller spent in it.
+
+    Args:
+        stats (pstats.Stats): The profile.
+        root (str): Frame placed at the bottom of every stack, e.g. the node name.
+        max_depth (int): Deepest stack to emit; recursion is cut at the first repeat.
+
+    Returns:
+        list[str]: Lines of `frame;frame;... microseconds`, one per distinct stack.
+    """
+    entries: dict[Any, Any] = stats.stats  # type: ignore[attr-defined]
+    callees: dict[Any, dict[Any, float]] = {}
+    for func, (_, _, _, _, callers) in entries.items():
+        for caller, (_, _, _, cumulative) in callers.items():
+            callees.setdefault(caller, {})[func] = cumulative
+
+    totals: dict[str, float] = {}
+    # Paths multiply through the call graph; skip those below 0.01% of the profile.
+    min_seconds = max(1e-6, sum(entry[2] for entry in entries.values()) * 1e-4)
+
+    def walk(func: Any, path: tuple[Any, ...], scale: float) -> None:
+        self_time = entries[func][2]
+        stack = (*path, func)
+        key = ";".join([root, *(_label(f) for f in stack)])
+        totals[key] = totals.get(key, 0.0) + self_time * scale
+        if len(stack) >= max_depth:
+            return
+        for callee, edge_time in callees.get(func, {}).items():
+            callee_total = entries[callee][3]
+            if callee in stack or callee_total <= 0 or edge_time * scale < min_seconds:
+                continue
+            walk(callee, stack, scale * edge_time / callee_total)
+
+    roots = [
+        func
+        for func, (_, _, _, _, callers) in entries.items()
+        if not any(caller in entries for caller in callers)
+    ]
+    for func in roots:
+        walk(func, (), 1.0)
+    return [
+        f"{stack} {round(seconds * 1e6)}"
+        for stack, seconds in totals.items()
+        if round(seconds * 1e6) > 0
+    ]
+
+
+def _run_for(config: Optional[RunnableConfig]) -> Optional[RunProfile]:
+    """Return the profile a node should write to, or None if profiling is off."""
+    run = _active_run.get()
+    if run is not None:
+        return run
+    configurable = (config or {}).get("configurable") or {}
+    # Checked before building the configuration: this runs for every node.
+    if not (configurable.get("profiling_enabled") or _env_enabled()):
+        return None
+    configuration = IndexConfiguration.from_runnable_config(config)
+    thread_id = configurable.get("thread_id") or "default"
+    return RunProfile(Path(configuration.profile_dir) / str(thread_id))
+
+
+@contextmanager
+def profile_node(name: str, config: Optional[RunnableConfig] = None) -> Iterator[None]:
+    """Profile one node if profiling is on for its run.
+
+    Args:
+        name (str): Node name, used in file names and as the stack root.
+        config (Optional[RunnableConfig]): The node's run configuration.
+    """
+    global _busy
+    run = _run_for(config) if not _busy else None
+    if run is None:
+        yield
+        return
+
+    _busy = True
+    started_tracing = not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+    tracemalloc.reset_peak()
+    before = tracemalloc.take_snapshot()
+    profiler = cProfile.Profile()
+    start = time.perf_counter()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        wall_seconds = time.perf_counter() - start
+        peak_bytes = tracemalloc.get_traced_memory()[1]
+        after = tracemalloc.take_snapshot()
+        if started_tracing:
+            tracemalloc.stop()
+        _busy = False
+        allocations = [
+            diff
+            for diff in after.compare_to(before, "lineno")
+            if diff.size_diff > 0
+        ]
+        try:
+            run.add(name, profiler, allocations, wall_seconds, peak_bytes)
+        except OSError:
+            logger.exception("Failed to write the profile of node %s", name)
+
+
+@contextmanager
+def profile_run(out_dir: Path | str, top: int = 25) -> Iterator[RunProfile]:
+    """Profile every node that runs inside a block.
+
+    Args:
+        out_dir (Path | str): Directory for the report and stack files.
+        top (int): Number of functions and allocation sites listed per node.
+
+    Yields:
+        RunProfile: The profile being written.
+
+    Examples:
+        >>> with profile_run("cache/profiles/slow-question"):  # doctest: +SKIP
+        ...     await graph.ainvoke({"messages": [("user", question)]}, config)
+    """
+    run = RunProfile(Path(out_dir), top)
+    token = _active_run.set(run)
+    try:
+        yield run
+    finally:
+        _active_run.reset(token)
@@ -1,21 +1,37 @@
 """Manage the configuration of various retrievers.
 
 This module provides functionality to create and manage retrievers for different
-vector store backends, specifically Elasticsearch, Pinecone, and MongoDB.
+vector store backends, specifically Elasticsearch, Pinecone, and MongoDB, plus
+an in-process store ("local") for offline tests and benchmarks.
 
 The retrievers support filtering results by user_id to ensure data isolation between users.
+
+Encoders from `make_embeddings` record their token usage, are instrumented and,
+unless disabled, go through the persistent embedding cache (see
+`retrieval_graph.embedding_cache`).
+
+Searches issued through `asearch` go through a shared `RetrievalCache`, keyed by
+the normalized request and the index generation. When telemetry is enabled,
+embedding calls and backend searches are timed per company.
 """
 
 import os
 from contextlib import contextmanager
-from typing import Generator
+from typing import Any, Generator, Optional
 
+from langchain_core.documents import Document
 from langchain_core.embeddings import Embeddings
 from langchain_core.runnables import RunnableConfig
 from langchain_core.vectorstores import VectorStoreRetriever
 
+from retrieval_graph import telemetry, usage
+from retrieval_graph.caching import RetrievalCache, current_index_generation, search_key
 from retrieval_graph.configuration import Configuration, IndexConfiguration
 
+# Search results shared by every run in this process.
+retrieval_cache = RetrievalCache()
+telemetry.register_cache("retrieval", retrieval_cache)
+
 ## Encoder constructors
 
 
@@ -35,10 +51,36 @@ def make_text_encoder(model: str) -> Embeddings:
             from langchain_upstage import UpstageEmbeddings
 
             return UpstageEmbeddings(model=model)
+        case "local":
+            from retrieval_graph.local import make_local_embeddings
+
+            return make_local_embeddings(model)
         case _:
             raise ValueError(f"Unsupported embedding provider: {provider}")
 
 
+def make_embeddings(model: str, cache_path: str = "") -> Embeddings:
+    """Connect to a text encoder, accounted, instrumented and behind the embedding cache.
+
+    Args:
+        model (str): Embedding model name, e.g. "upstage/embedding-query".
+        cache_path (str): SQLite file of the embedding cache; no cache if empty.
+
+    Returns:
+        Embeddings: The encoder. Usage accounting, which is always on, and
+        telemetry count only the texts that missed the cache and were sent
+        to the model.
+    """
+    embeddings = telemetry.instrument_embeddings(
+        usage.UsageEmbeddings(make_text_encoder(model), model), model
+    )
+    if not cache_path:
+        return embeddings
+    from retrieval_graph.embedding_cache import CachedEmbeddings, open_embedding_store
+
+    return CachedEmbeddings(embeddings, model, open_embedding_store(cache_path))
+
+
 ## Retriever constructors
 
 
@@ -109,13 +151,30 @@ def make_mongodb_retriever(
     yield vstore.as_retriever(search_kwargs=search_kwargs)
 
 
+@contextmanager
+def make_local_retriever(
+    configuration: IndexConfiguration, embedding_model: Embeddings
+) -> Generator[VectorStoreRetriever, None, None]:
+    """Configure this agent to use the in-process vector store."""
+    from retrieval_graph.local import get_local_store
+
+    vstore = get_local_store(configuration.embedding_model, embedding_model)
+    search_kwargs = configuration.search_kwargs
+
+    search_filter = search_kwargs.setdefault("filter", {})
+    search_filter.update({"user_id": "1111111111"})
+    yield vstore.as_retriever(search_kwargs=search_kwargs)
+
+
 @contextmanager
 def make_retriever(
     config: RunnableConfig,
 ) -> Generator[VectorStoreRetriever, None, None]:
     """Create a retriever for the agent, based on the current configuration."""
     configuration = IndexConfiguration.from_runnable_config(config)
-    embedding_model = make_text_encoder(configuration.embedding_model)
+    embedding_model = make_embeddings(
+        configuration.embedding_model, configuration.embedding_cache_path
+    )
     user_id = "1111111111"
     if not user_id:
         raise ValueError("Please provide a valid user_id in the configuration.")
@@ -132,9 +191,75 @@ def make_retriever(
             with make_mongodb_retriever(configuration, embedding_model) as retriever:
                 yield retriever
 
+        case "local":
+            with make_local_retriever(configuration, embedding_model) as retriever:
+                yield retriever
+
         case _:
             raise ValueError(
                 "Unrecognized retriever_provider in configuration. "
                 f"Expected one of: {', '.join(Configuration.__annotations__['retriever_provider'].__args__)}\n"
                 f"Got: {configuration.retriever_provider}"
             )
+
+
+## Cached search
+
+
+async def asearch(
+    retriever: VectorStoreRetriever,
+    query: str,
+    config: RunnableConfig,
+    *,
+    filter: Optional[dict[str, Any]] = None,
+    k: Optional[int] = None,
+) -> list[Document]:
+    """Search with optional per-call filter and k, through the retrieval cache.
+
+    Identical requests (same normalized query, effective search kwargs, provider,
+    embedding model and index generation) are served from `retrieval_cache`, and
+    concurrent identical requests share a single backend call.
+
+    Args:
+        retriever (VectorStoreRetriever): Retriever from `make_retriever`.
+        query (str): The search query.
+        config (RunnableConfig): Configuration of the current run.
+        filter (Optional[dict[str, Any]]): Metadata filter replacing the
+            retriever's default filter for this call.
+        k (Optional[int]): Number of documents to return for this call.
+
+    Returns:
+        list[Document]: The retrieved documents.
+    """
+    configuration = IndexConfiguration.from_runnable_config(config)
+    search_kwargs = dict(retriever.search_kwargs)
+    if filter is not None:
+        search_kwargs["filter"] = filter
+    if k is not None:
+        search_kwargs["k"] = k
+    company = (filter or {}).get("source_file", "all")
+
+    async def search() -> list[Document]:
+        original_kwargs = retriever.search_kwargs
+        retriever.search_kwargs = search_kwargs
+        try:
+            with telemetry.span("search", company=company):
+                return await retriever.ainvoke(query, config)
+        finally:
+            retriever.search_kwargs = original_kwargs
+
+    if not configuration.retrieval_cache_enabled:
+        docs = await search()
+    else:
+        key = search_key(
+            query,
+            search_kwargs,
+            provider=configuration.retriever_provider,
+            embedding_model=configuration.embedding_model,
+            generation=current_index_generation(configuration.index_generation_path),
+        )
+        docs = await retrieval_cache.get_or_search(key, search)
+    telemetry.increment(
+        "retrieval_graph_chunks_retrieved_total", len(docs), company=company
+    )
+    return docs
@@ -1,6 +1,11 @@
-"""Simple Section Building Graph - Bare minimum functionality."""
+"""Simple Section Building Graph - Bare minimum functionality.
 
-from typing import Optional, Sequence
+Every PDF in the documents folder is parsed (concurrently, through
+`docu_proc_graph.parse_pdf`) and gets its own `nosql/<stem>_sections.json`.
+"""
+
+from typing import Any, Optional, Sequence
+import asyncio
 import json
 from pathlib import Path
 
@@ -8,76 +13,74 @@ from langchain_core.documents import Document
 from langchain_core.runnables import RunnableConfig
 from langgraph.graph import StateGraph
 
+from retrieval_graph.blob_store import BlobStore
 from retrieval_graph.configuration import IndexConfiguration
+from retrieval_graph.docu_proc_graph import find_pending_pdfs, parse_pdf
 from retrieval_graph.state import IndexState
 
 
+def _read_json(path: str) -> Any:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _write_json(path: str, data: Any) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+
+
 async def load_docs_for_sections(
     state: IndexState, *, config: Optional[RunnableConfig] = None
-) -> dict[str, Sequence[Document]]:
-    """Load PDF documents using UpstageDocumentParseLoader API for section building."""
-    from langchain_upstage import UpstageDocumentParseLoader
-    
-    # Load the first PDF file from documents folder
-    docs_folder = Path("documents")
-    pdf_files = list(docs_folder.glob("*.pdf"))
+) -> dict[str, Any]:
+    """Parse every PDF in the documents folder concurrently for section building."""
+    pdf_files = find_pending_pdfs(IndexState(), config)
     
     if not pdf_files:
         return {"docs": []}
     
-    # Use the first PDF file found
-    pdf_file = pdf_files[0]
+    print(f"📋 Parsing {len(pdf_files)} PDFs with Upstage API for sections")
     
-    print(f"📋 Parsing PDF with Upstage API for sections: {pdf_file.name}")
+    store = BlobStore(IndexConfiguration.from_runnable_config(config).blob_store_dir)
     
-    # Use UpstageDocumentParseLoader with auto format (no ocr or split params)
-    loader = UpstageDocumentParseLoader(str(pdf_file))
-    documents = await loader.aload()
+    async def load(pdf_file: Path) -> list[Document]:
+        ref = await parse_pdf(pdf_file, config)
+        return await asyncio.to_thread(store.load_documents, ref)
     
-    # Add source file metadata
-    for doc in documents:
-        doc.metadata.update({
-            "source_file": pdf_file.name
-        })
+    # Parses share the `max_concurrent_parses` limit; one bad file does not stop the rest.
+    results = await asyncio.gather(
+        *(load(pdf_file) for pdf_file in pdf_files), return_exceptions=True
+    )
+    
+    documents: list[Document] = []
+    files: dict[str, dict[str, Any]] = {}
+    for pdf_file, result in zip(pdf_files, results):
+        if isinstance(result, BaseException):
+            if not isinstance(result, Exception):
+                raise result
+            print(f"❌ Failed to parse {pdf_file.name}: {result}")
+            files[pdf_file.name] = {"status": "failed", "error": f"{type(result).__name__}: {result}"}
+            continue
+        documents.extend(result)
+        files[pdf_file.name] = {"status": "parsed", "pages": len(result)}
     
     print(f"✅ Loaded {len(documents)} documents from API for section building")
     
-    return {"docs": documents}
+    return {"docs": documents, "files": files}
 
 
-async def create_sections(
-    state: IndexState, *, config: Optional[RunnableConfig] = None
-) -> dict[str, Sequence[Document]]:
-    """Extract sections using LLM and save to file."""
-    from pydantic import BaseModel, Field
-    from langchain_upstage import ChatUpstage
-    
-    # Define section schema
-    class SectionOutput(BaseModel):
-        section_name: str = Field(description="Section identifier")
-        section_title: str = Field(description="Full section title")
-        level: int = Field(description="Hierarchy level: 1 (top), 2 (sub)")
-        parent_section: Optional[str] = Field(description="Parent section name")
-        description: Optional[str] = Field(description="Section description")
-    
-    class DocumentSectionsOutput(BaseModel):
-        sections: list[SectionOutput]
-    
-    # Initialize LLM
-    llm = ChatUpstage(model="solar-pro2")
-    structured_llm = llm.with_structured_output(DocumentSectionsOutput)
-    
-    # Check if sections already exist
-    source_file = "Nvidia_10k.pdf"
-    sections_file = f"nosql/{source_file}_sections.json"
+async def _sections_for_file(
+    source_file: str, docs: Sequence[Document], structured_llm: Any
+) -> list[dict[str, Any]]:
+    """Load or extract the sections of one filing and save them to nosql/."""
+    sections_file = f"nosql/{Path(source_file).stem}_sections.json"
     
     try:
-        with open(sections_file, "r", encoding="utf-8") as f:
-            existing_sections = json.load(f)
-            print(f"✅ Found existing sections file with {len(existing_sections)} sections")
-            sections = existing_sections
+        # File I/O runs in a worker thread so it does not block the event loop.
+        existing_sections = await asyncio.to_thread(_read_json, sections_file)
+        print(f"✅ Found existing sections file with {len(existing_sections)} sections")
+        sections: list[dict[str, Any]] = existing_sections
     except (FileNotFoundError, json.JSONDecodeError):
-        print("📄 No existing sections found, extracting from document...")
+        print(f"📄 No existing sections found for {source_file}, extracting from document...")
         
         # Process document in chunks of 45 pages
         chunk_size = 45
@@ -88,16 +91,15 @@ async def create_sections(
         processed_chunks = set()
         
         try:
-            with open(cache_file, "r", encoding="utf-8") as f:
-                cache_data = json.load(f)
-                all_sections = cache_data.get("sections", [])
-                processed_chunks = set(cache_data.get("processed_chunks", []))
-                print(f"📄 Resuming from cache: {len(all_sections)} sections, {len(processed_chunks)} chunks done")
+            cache_data = await asyncio.to_thread(_read_json, cache_file)
+            all_sections = cache_data.get("sections", [])
+            processed_chunks = set(cache_data.get("processed_chunks", []))
+            print(f"📄 Resuming from cache: {len(all_sections)} sections, {len(processed_chunks)} chunks done")
         except (FileNotFoundError, json.JSONDecodeError):
             print("📄 No cache found, starting fresh")
         
-        for i in range(0, len(state.docs), chunk_size):
-            chunk_docs = state.docs[i:i + chunk_size]
+        for i in range(0, len(docs), chunk_size):
+            chunk_docs = docs[i:i + chunk_size]
             chunk_id = f"{i}-{i+chunk_size-1}"
             
             # Skip if this chunk was already processed
@@ -131,7 +133,7 @@ async def create_sections(
             {chunk_content}
             """
             
-            print(f"🔍 Extracting sections from chunk {chunk_id}...")
+            print(f"🔍 Extracting sections from {source_file} chunk {chunk_id}...")
             result = await structured_llm.ainvoke(prompt)
             chunk_sections = [s.model_dump() for s in result.sections]
             all_sections.extend(chunk_sections)
@@ -144,8 +146,7 @@ async def create_sections(
                 "sections": all_sections,
                 "processed_chunks": list(processed_chunks)
             }
-            with open(cache_file, "w", encoding="utf-8") as f:
-                json.dump(cache_data, f, indent=2)
+            await asyncio.to_thread(_write_json, cache_file, cache_data)
             print(f"💾 Saved progress: {len(all_sections)} sections, chunk {chunk_id} completed")
         
         sections = all_sections
@@ -153,8 +154,7 @@ async def create_sections(
         
         # Save final sections to nosql
         Path("nosql").mkdir(exist_ok=True)
-        with open(sections_file, "w", encoding="utf-8") as f:
-            json.dump(sections, f, indent=2)
+        await asyncio.to_thread(_write_json, sections_file, sections)
         print(f"💾 Saved final sections to {sections_file}")
         
         # Clean up cache
@@ -170,22 +170,63 @@ async def create_sections(
     Path("nosql").mkdir(exist_ok=True)
     
     # Save sections to file
-    with open(sections_file, "w", encoding="utf-8") as f:
-        json.dump(sections, f, indent=2)
+    await asyncio.to_thread(_write_json, sections_file, sections)
     
     print(f"✅ Created {len(sections)} sections and saved to {sections_file}")
     
     # Update document metadata
-    processed_docs = []
-    for doc in state.docs:
+    for doc in docs:
         doc.metadata.update({
             "has_sections": True,
             "num_sections": len(sections),
             "sections_file": sections_file
         })
-        processed_docs.append(doc)
+    return sections
+
+
+async def create_sections(
+    state: IndexState, *, config: Optional[RunnableConfig] = None
+) -> dict[str, Any]:
+    """Extract sections of every parsed filing concurrently using the LLM and save them."""
+    from pydantic import BaseModel, Field
+    from langchain_upstage import ChatUpstage
+    
+    # Define section schema
+    class SectionOutput(BaseModel):
+        section_name: str = Field(description="Section identifier")
+        section_title: str = Field(description="Full section title")
+        level: int = Field(description="Hierarchy level: 1 (top), 2 (sub)")
+        parent_section: Optional[str] = Field(description="Parent section name")
+        description: Optional[str] = Field(description="Section description")
     
-    return {"docs": processed_docs}
+    class DocumentSectionsOutput(BaseModel):
+        sections: list[SectionOutput]
+    
+    # Initialize LLM
+    llm = ChatUpstage(model="solar-pro2")
+    structured_llm = llm.with_structured_output(DocumentSectionsOutput)
+    
+    # Group pages by filing; each filing gets its own sections file.
+    by_file: dict[str, list[Document]] = {}
+    for doc in state.docs:
+        by_file.setdefault(doc.metadata.get("source_file", "unknown.pdf"), []).append(doc)
+    
+    results = await asyncio.gather(
+        *(_sections_for_file(name, docs, structured_llm) for name, docs in by_file.items()),
+        return_exceptions=True,
+    )
+    
+    files: dict[str, dict[str, Any]] = {}
+    for name, result in zip(by_file, results):
+        if isinstance(result, BaseException):
+            if not isinstance(result, Exception):
+                raise result
+            print(f"❌ Section extraction failed for {name}: {result}")
+            files[name] = {"status": "failed", "error": f"{type(result).__name__}: {result}"}
+        else:
+            files[name] = {"status": "sectioned", "sections": len(result)}
+    
+    return {"docs": list(state.docs), "files": files}
 
 
 # Build the simple section graph
@@ -11,6 +11,8 @@ Classes:
 
 Functions:
     reduce_docs: Processes and reduces document inputs into a sequence of Documents.
+    reduce_doc_refs: Replaces or clears the blob store references in the index state.
+    reduce_files: Merges per-file ingestion results into the index state.
     reduce_retriever: Updates the retriever in the state.
     reduce_messages: Manages the addition of new messages to the conversation state.
     reduce_retrieved_docs: Handles the updating of retrieved documents in the state.
@@ -27,6 +29,8 @@ from langchain_core.documents import Document
 from langchain_core.messages import AnyMessage
 from langgraph.graph import add_messages
 
+from retrieval_graph.blob_store import DocumentRef
+
 ############################  Doc Indexing State  #############################
 
 
@@ -72,6 +76,41 @@ def reduce_docs(
     return existing or []
 
 
+def reduce_doc_refs(
+    existing: Optional[Sequence[DocumentRef]],
+    new: Union[Sequence[DocumentRef], Literal["delete"]],
+) -> list[DocumentRef]:
+    """Replace the document references held in the index state.
+
+    Each document processing node rewrites the whole payload, so new references
+    replace the existing ones rather than being appended.
+
+    Args:
+        existing (Optional[Sequence[DocumentRef]]): The existing references, if any.
+        new (Union[Sequence[DocumentRef], Literal["delete"]]): The new references,
+            or the literal "delete" to clear them.
+    """
+    if new == "delete":
+        return []
+    return list(new)
+
+
+def reduce_files(
+    existing: Optional[dict[str, dict[str, Any]]],
+    new: dict[str, dict[str, Any]],
+) -> dict[str, dict[str, Any]]:
+    """Merge per-file ingestion results, keyed by file name.
+
+    Files are processed concurrently and each reports only its own result, so
+    results are merged; a newer result for the same file replaces the older one.
+
+    Args:
+        existing (Optional[dict[str, dict[str, Any]]]): The results so far, if any.
+        new (dict[str, dict[str, Any]]): Results reported by one or more files.
+    """
+    return {**(existing or {}), **new}
+
+
 # The index state defines the simple IO for the single-node index graph
 @dataclass(kw_only=True)
 class IndexState:
@@ -82,9 +121,31 @@ class IndexState:
     these documents.
     """
 
-    docs: Annotated[Sequence[Document], reduce_docs]
+    docs: Annotated[Sequence[Document], reduce_docs] = field(default_factory=list)
     """A list of documents that the agent can index."""
 
+    doc_refs: Annotated[list[DocumentRef], reduce_doc_refs] = field(
+        default_factory=list
+    )
+    """References to documents offloaded to the blob store.
+
+    Large payloads (parsed PDFs and their chunks) are written once to the
+    blob store and only these lightweight references travel through the
+    graph, so checkpoint size stays flat as filings grow."""
+
+    source_file: Optional[str] = None
+    """Path of the PDF processed by a per-file ingestion pipeline, if any."""
+
+    files: Annotated[dict[str, dict[str, Any]], reduce_files] = field(
+        default_factory=dict
+    )
+    """Ingestion result per file name: `{"status": "indexed", "chunks": n}` or
+    `{"status": "failed", "error": ...}`. Files already indexed by the thread
+    are skipped when it runs again."""
+
+    usage: dict[str, Any] = field(default_factory=dict)
+    """Token and cost usage of the indexing thread (see `usage.UsageLedger.summary`)."""
+
 
 #############################  Agent State  ###################################
 
@@ -159,5 +220,10 @@ class State(InputState):
     retrieved_docs: list[Document] = field(default_factory=list)
     """Populated by the retriever. This is a list of documents that the agent can reference."""
 
+    usage: dict[str, Any] = field(default_factory=dict)
+    """Token and cost usage of the conversation thread, by node, tool and model.
+
+    Written when the run finishes; see `usage.UsageLedger.summary`."""
+
     # Feel free to add additional attributes to your state as needed.
     # Common examples include retrieved documents, extracted entities, API connections, etc.
@@ -0,0 +1,112 @@
+"""Async generator plumbing for the streaming ingestion pipeline.
+
+A streaming pipeline is a chain of async generators, one per stage. Chained
+directly, the stages run in lockstep: the consumer pulls one item through
+every stage before the producer starts on the next. `buffered` runs a stage
+in its own task instead and hands its items over through a bounded queue, so
+adjacent stages overlap (a page range is parsed while the previous page is
+being chunked) while a slow consumer still pushes back on its producer once
+the queue is full. The queue sizes, not the size of the input, bound how many
+items are in flight.
+
+Functions:
+    buffered: Run an async iterable ahead of its consumer through a bounded queue.
+    batched: Group the items of an async iterable into lists.
+    aiter_blocking: Iterate a blocking iterator without blocking the event loop.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from typing import AsyncIterable, AsyncIterator, Iterator, TypeVar
+
+T = TypeVar("T")
+
+# Marks the end of a buffered stream.
+_DONE = object()
+
+
+class _Failed:
+    """Carries a producer's exception across the queue to the consumer."""
+
+    def __init__(self, error: BaseException) -> None:
+        self.error = error
+
+
+async def buffered(source: AsyncIterable[T], maxsize: int) -> AsyncIterator[T]:
+    """Run an async iterable ahead of its consumer through a bounded queue.
+
+    The producer stops when `maxsize` items are waiting, and is cancelled if
+    the consumer stops early. An exception raised by the source is re-raised
+    to the consumer after the items produced before it.
+
+    Args:
+        source (AsyncIterable[T]): The producing stage.
+        maxsize (int): Items the producer may run ahead of the consumer.
+
+    Yields:
+        T: The source's items, in order.
+    """
+    queue: asyncio.Queue[object] = asyncio.Queue(max(1, maxsize))
+
+    async def produce() -> None:
+        try:
+            async for item in source:
+                await queue.put(item)
+        except Exception as e:
+            await queue.put(_Failed(e))
+        else:
+            await queue.put(_DONE)
+
+    producer = asyncio.ensure_future(produce())
+    try:
+        while True:
+            item = await queue.get()
+            if item is _DONE:
+                break
+            if isinstance(item, _Failed):
+                raise item.error
+            yield item  # type: ignore[misc]
+    finally:
+        producer.cancel()
+        await asyncio.gather(producer, return_exceptions=True)
+
+
+async def batched(source: AsyncIterable[T], size: int) -> AsyncIterator[list[T]]:
+    """Group the items of an async iterable into lists of up to `size` items.
+
+    Args:
+        source (AsyncIterable[T]): Items to group.
+        size (int): Items per batch; the last batch may be smaller.
+
+    Yields:
+        list[T]: The batches, in order.
+    """
+    batch: list[T] = []
+    async for item in source:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+async def aiter_blocking(iterator: Iterator[T]) -> AsyncIterator[T]:
+    """Iterate a blocking iterator (e.g. blob decoding) in a worker thread.
+
+    Each `next` call runs via `asyncio.to_thread`, so the event loop is free
+    while an item is read.
+
+    Args:
+        iterator (Iterator[T]): The blocking iterator.
+
+    Yields:
+        T: The iterator's items, in order.
+    """
+    done = object()
+    while True:
+        item = await asyncio.to_thread(next, iterator, done)
+        if item is done:
+            return
+        yield item  # type: ignore[misc]
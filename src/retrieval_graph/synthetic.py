@@ -0,0 +1,292 @@
+"""Synthetic 10-K filings for scaling tests and benchmarks.
+
+The bundled corpus (four filings) is too small to show how retrieval and
+ingestion behave at 10k-1M chunks. This module generates filings at any scale
+(companies x years x pages) in the same shapes the pipeline produces:
+
+- pages as parsed `Document` objects with `page_number` and `source_file`
+  metadata, like `load_pdf_docs` / `scripts/save_parsed_docs.py` output;
+- a sections dict like `nosql/*_sections.json`, with the standard 10-K items
+  laid out proportionally over the pages.
+
+Every page is generated from its own seed, so output is deterministic and
+pages can be produced lazily, in any order, without holding a whole corpus in
+memory. The most recent filing of each company is named `<company>_10k.pdf`,
+matching the bundled files that `detect_companies` filters on; older years
+get a `<company>_<year>_10k.pdf` suffix.
+
+Classes:
+    SyntheticFiling: One generated filing; pages are produced on demand.
+
+Functions:
+    generate_corpus: Yield the filings of a companies x years corpus.
+    write_corpus: Write parsed-document pickles and section JSONs to disk.
+"""
+
+from __future__ import annotations
+
+import json
+import pickle
+import random
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Iterator, Union
+
+from langchain_core.documents import Document
+
+# (ticker, display name) of the companies used first; more are numbered.
+COMPANIES: tuple[tuple[str, str], ...] = (
+    ("nvidia", "NVIDIA Corporation"),
+    ("amd", "AMD Corporation"),
+    ("intel", "Intel Corporation"),
+    ("broadcom", "Broadcom Inc."),
+    ("qualcomm", "QUALCOMM Incorporated"),
+    ("micron", "Micron Technology, Inc."),
+    ("texas_instruments", "Texas Instruments Incorporated"),
+    ("marvell", "Marvell Technology, Inc."),
+    ("analog_devices", "Analog Devices, Inc."),
+    ("nxp", "NXP Semiconductors N.V."),
+    ("microchip", "Microchip Technology Incorporated"),
+    ("on_semi", "ON Semiconductor Corporation"),
+)
+
+# (section_name, section_title, description, is_subsection, start as a
+# fraction of the filing) following the standard Form 10-K layout.
+SECTION_LAYOUT: tuple[tuple[str, str, str, bool, float], ...] = (
+    ("Part I", "Part I", "Main Part I section header", False, 0.03),
+    ("Item 1", "Business", "Company business overview and operations", True, 0.03),
+    ("Item 1A", "Risk Factors", "Risk factors affecting the business", True, 0.15),
+    ("Item 1B", "Unresolved Staff Comments", "SEC staff comments and responses", True, 0.40),
+    ("Item 1C", "Cybersecurity", "Cybersecurity policies and procedures", True, 0.40),
+    ("Item 2", "Properties", "Company properties and facilities", True, 0.41),
+    ("Item 3", "Legal Proceedings", "Current legal proceedings and litigation", True, 0.41),
+    ("Item 4", "Mine Safety Disclosures", "Mine safety-related disclosures", True, 0.41),
+    ("Part II", "Part II", "Main Part II section header", False, 0.42),
+    ("Item 5", "Market for Registrant's Common Equity, Related Stockholder Matters and Issuer Purchases of Equity Securities", "Stock market information and equity details", True, 0.42),
+    ("Item 6", "[Reserved]", "Reserved section (not used)", True, 0.43),
+    ("Item 7", "Management's Discussion and Analysis of Financial Condition and Results of Operations", "MD&A section with financial analysis", True, 0.44),
+    ("Item 7A", "Quantitative and Qualitative Disclosure About Market Risk", "Market risk disclosures and analysis", True, 0.53),
+    ("Item 8", "Financial Statements and Supplementary Data", "Audited financial statements and notes", True, 0.54),
+    ("Item 9", "Changes in and Disagreements with Accountants on Accounting and Financial Disclosure", "Accountant changes and disagreements", True, 0.89),
+    ("Item 9A", "Controls and Procedures", "Internal controls and disclosure procedures", True, 0.90),
+    ("Item 9B", "Other Information", "Additional material information", True, 0.91),
+    ("Part III", "Part III", "Main Part III section header", False, 0.92),
+    ("Item 10", "Directors, Executive Officers and Corporate Governance", "Board of directors and governance information", True, 0.92),
+    ("Item 11", "Executive Compensation", "Executive compensation details and analysis", True, 0.92),
+    ("Item 12", "Security Ownership of Certain Beneficial Owners and Management and Related Stockholder Matters", "Stock ownership by management and major shareholders", True, 0.92),
+    ("Item 13", "Certain Relationships and Related Transactions and Director Independence", "Related party transactions and director independence", True, 0.92),
+    ("Item 14", "Principal Accountant Fees and Services", "Auditor fees and services information", True, 0.92),
+    ("Part IV", "Part IV", "Main Part IV section header", False, 0.93),
+    ("Item 15", "Exhibits and Financial Statement Schedules", "List of exhibits and financial statement schedules", True, 0.93),
+    ("Item 16", "Form 10-K Summary", "Summary of Form 10-K filing", True, 0.99),
+    ("Signatures", "Signatures", "Required signatures for the filing", False, 1.00),
+)  # fmt: skip
+
+# Sentence templates per section kind. Placeholders: {company}, {year},
+# {prior}, {pct}, {amount}, {segment}, {region}, {product}.
+SENTENCES: dict[str, tuple[str, ...]] = {
+    "Business": (
+        "{company} designs and sells {product} for the {segment} market.",
+        "Our {segment} segment accounted for {pct}% of revenue in fiscal {year}.",
+        "We sell our products through distributors and directly to original equipment manufacturers in {region}.",
+        "In fiscal {year} we introduced a new generation of {product} built on an advanced process node.",
+        "As of the end of fiscal {year}, we had approximately {amount} thousand employees worldwide.",
+        "We rely on third-party foundries and assembly partners located primarily in {region}.",
+    ),
+    "Risk Factors": (
+        "Export controls could limit our ability to sell {product} to customers in {region}.",
+        "We depend on a limited number of suppliers, and supply constraints could harm our {segment} business.",
+        "Our operating results may fluctuate significantly from quarter to quarter.",
+        "Competition in the {segment} market is intense, and we may fail to keep pace with technological change.",
+        "A significant portion of our revenue comes from a small number of customers.",
+        "Cybersecurity incidents could disrupt our operations and damage our reputation.",
+    ),
+    "Management's Discussion and Analysis of Financial Condition and Results of Operations": (
+        "Revenue for fiscal {year} was ${amount} billion, up {pct}% from fiscal {prior}.",
+        "Gross margin was {pct}.{amount_small}%, reflecting a favorable mix of {product}.",
+        "Research and development expenses increased {pct}% to ${amount} billion.",
+        "{segment} revenue grew {pct}% year over year, driven by demand in {region}.",
+        "Operating income for fiscal {year} was ${amount} billion.",
+        "We returned ${amount} billion to shareholders through share repurchases and dividends.",
+    ),
+    "Financial Statements and Supplementary Data": (
+        "The accompanying notes are an integral part of these consolidated financial statements.",
+        "Inventories are stated at the lower of cost or net realizable value.",
+        "Revenue is recognized when control of {product} is transferred to the customer.",
+        "Goodwill related to the {segment} reporting unit was ${amount} billion as of fiscal {year} year end.",
+        "Income tax expense for fiscal {year} was ${amount} million, an effective rate of {pct}%.",
+    ),
+    "default": (
+        "{company} maintains policies and procedures overseen by the Board of Directors.",
+        "Information required by this item is incorporated by reference to our proxy statement for fiscal {year}.",
+        "Management assessed the effectiveness of internal control over financial reporting as of fiscal {year} year end.",
+        "Our principal facilities are located in {region}.",
+    ),
+}
+
+SEGMENTS = ("Data Center", "Client", "Gaming", "Embedded", "Automotive", "Networking", "Wireless", "Industrial")
+PRODUCTS = ("GPUs", "CPUs", "accelerators", "networking chips", "memory products", "FPGAs", "modems", "analog ICs")
+REGIONS = ("Taiwan", "China", "the United States", "Europe", "Japan", "South Korea", "Singapore", "Israel")
+
+
+def _company(index: int) -> tuple[str, str]:
+    if index < len(COMPANIES):
+        return COMPANIES[index]
+    return f"company{index:04d}", f"Company {index:04d} Holdings, Inc."
+
+
+@dataclass(frozen=True)
+class SyntheticFiling:
+    """One generated annual report.
+
+    Args:
+        ticker (str): Short company name used in file names, e.g. "nvidia".
+        company (str): Display name, e.g. "NVIDIA Corporation".
+        year (int): Fiscal year.
+        num_pages (int): Number of pages.
+        source_file (str): PDF file name the pages claim to come from.
+        seed (int): Corpus seed; combined with the file name and page number.
+    """
+
+    ticker: str
+    company: str
+    year: int
+    num_pages: int
+    source_file: str
+    seed: int = 0
+
+    def sections(self) -> dict[str, Any]:
+        """Return the section index in the shape of `nosql/*_sections.json`."""
+        return {
+            "document_title": f"{self.company} Annual Report",
+            "sections": [
+                {
+                    "section_name": name,
+                    "section_title": title,
+                    "start_page_number": self._start_page(fraction),
+                    "is_subsection": is_subsection,
+                    "description": description,
+                }
+                for name, title, description, is_subsection, fraction in SECTION_LAYOUT
+            ],
+        }
+
+    def _start_page(self, fraction: float) -> int:
+        return max(1, min(self.num_pages, round(fraction * self.num_pages)))
+
+    def _section_at(self, page: int) -> tuple[str, str, list[str]]:
+        """Return (item name, title, headings starting on this page) for a page."""
+        current = SECTION_LAYOUT[0]
+        headings = []
+        for entry in SECTION_LAYOUT:
+            start = self._start_page(entry[4])
+            if start > page:
+                break
+            current = entry
+            if start == page:
+                headings.append(f"{entry[0]}. {entry[1]}" if entry[3] else entry[1])
+        return current[0], current[1], headings
+
+    def page(self, page: int) -> Document:
+        """Generate one page (1-based) as a parsed Document."""
+        rng = random.Random(f"{self.seed}:{self.source_file}:{page}")
+        _, title, headings = self._section_at(page)
+        templates = SENTENCES.get(title, SENTENCES["default"])
+        values = {
+            "company": self.company,
+            "year": self.year,
+            "prior": self.year - 1,
+        }
+        blocks = [f"# {heading}" for heading in headings]
+        for _ in range(rng.randint(4, 6)):
+            sentences = [
+                template.format(
+                    **values,
+                    pct=rng.randint(2, 95),
+                    amount=rng.randint(1, 60),
+                    amount_small=rng.randint(0, 9),
+                    segment=rng.choice(SEGMENTS),
+                    product=rng.choice(PRODUCTS),
+                    region=rng.choice(REGIONS),
+                )
+                for template in rng.sample(templates, min(len(templates), rng.randint(3, 5)))
+            ]
+            blocks.append(" ".join(sentences))
+        if title.startswith("Financial Statements") and rng.random() < 0.5:
+            rows = "\n".join(
+                f"| {segment} | {rng.randint(100, 30000):,} | {rng.randint(100, 30000):,} |"
+                for segment in rng.sample(SEGMENTS, 4)
+            )
+            blocks.append(
+                f"| Segment | Fiscal {self.year} | Fiscal {self.year - 1} |\n"
+                f"|---|---|---|\n{rows}"
+            )
+        blocks.append(f"{self.company} | {self.year} Form 10-K | {page}")
+        return Document(
+            page_content="\n\n".join(blocks),
+            metadata={"page_number": page, "source_file": self.source_file},
+        )
+
+    def pages(self) -> Iterator[Document]:
+        """Yield every page of the filing in order."""
+        for page in range(1, self.num_pages + 1):
+            yield self.page(page)
+
+
+def generate_corpus(
+    companies: int = 4,
+    years: int = 1,
+    pages: int = 100,
+    *,
+    latest_year: int = 2024,
+    seed: int = 0,
+) -> Iterator[SyntheticFiling]:
+    """Yield the filings of a companies x years corpus.
+
+    Args:
+        companies (int): Number of companies; the first twelve are real
+            semiconductor names, later ones are numbered.
+        years (int): Annual reports per company, ending at `latest_year`.
+        pages (int): Pages per filing. At roughly three semantic chunks per
+            page, companies x years x pages x 3 approximates the chunk count.
+        latest_year (int): Fiscal year of the most recent filing.
+        seed (int): Seed for the generated text.
+
+    Returns:
+        Iterator[SyntheticFiling]: The filings, newest year first per company.
+    """
+    for index in range(companies):
+        ticker, company = _company(index)
+        for offset in range(years):
+            year = latest_year - offset
+            source_file = f"{ticker}_10k.pdf" if offset == 0 else f"{ticker}_{year}_10k.pdf"
+            yield SyntheticFiling(ticker, company, year, pages, source_file, seed)
+
+
+def write_corpus(
+    out_dir: Union[str, Path], filings: Iterator[SyntheticFiling]
+) -> list[Path]:
+    """Write parsed pages and section indexes for each filing.
+
+    Produces `<stem>_parsed_docs.pkl` (a pickled list of page documents) and
+    `<stem>_sections.json` (the format of `nosql/`) per filing.
+
+    Args:
+        out_dir (Union[str, Path]): Output directory, created if needed.
+        filings (Iterator[SyntheticFiling]): Filings from `generate_corpus`.
+
+    Returns:
+        list[Path]: The files written.
+    """
+    out = Path(out_dir)
+    out.mkdir(parents=True, exist_ok=True)
+    written = []
+    for filing in filings:
+        stem = Path(filing.source_file).stem
+        docs_path = out / f"{stem}_parsed_docs.pkl"
+        with open(docs_path, "wb") as f:
+            pickle.dump(list(filing.pages()), f)
+        sections_path = out / f"{stem}_sections.json"
+        sections_path.write_text(json.dumps(filing.sections(), indent=2))
+        written.extend([docs_path, sections_path])
+    return written
@@ -1,19 +1,32 @@
 """Tools for the retrieval graph.
 
 This module contains tool definitions that can be used by the agent
-to perform specialized tasks like industry-wide analysis and web search.
+to perform specialized tasks like industry-wide analysis and web search,
+and `cached_tool`, which wraps them so a plain `ToolNode` answers repeated
+calls from `tool_cache`. Tools return errors, partial and empty results as
+`IncompleteResult`, which is never cached.
 """
 
+import logging
 import os
-from typing import List, Dict, Any
-from langchain_core.tools import tool
+from contextlib import contextmanager
+from typing import List, Dict, Any, Awaitable, Callable, Iterator, Optional, get_type_hints
+from langchain_core.tools import BaseTool, StructuredTool, tool
 from langchain_core.documents import Document
 from langchain_core.runnables import RunnableConfig
 from langchain_community.tools.tavily_search import TavilySearchResults
 
-from retrieval_graph import retrieval
+from retrieval_graph import retrieval, telemetry
+from retrieval_graph.caching import ToolResultCache, current_index_generation
+from retrieval_graph.configuration import Configuration
 from retrieval_graph.utils import format_docs
 
+logger = logging.getLogger(__name__)
+
+
+class IncompleteResult(str):
+    """Tool output that is an error, partial or empty: shown to the agent, never cached."""
+
 
 @tool
 async def industry_analysis_tool(
@@ -33,50 +46,48 @@ async def industry_analysis_tool(
         str: Formatted documents from all companies for comparative analysis
     """
     
-    print(f"🏭 Industry Analysis Tool: Retrieving from all companies for '{query}'")
+    logger.info("Industry analysis: retrieving from all companies for %r", query)
     
     # Define all company files
     company_files = ["nvidia_10k.pdf", "amd_10k.pdf", "intel_10k.pdf", "broadcom_10k.pdf"]
     all_results = []
+    failed_files = []
     
     try:
         with retrieval.make_retriever(config) as retriever:
             for company_file in company_files:
                 try:
-                    print(f"🔍 Retrieving 2 chunks from {company_file}")
-                    
-                    # Create filter for this specific company
-                    company_filter = {"source_file": company_file}
-                    
-                    # Apply the filter and limit to 2 chunks per company
-                    if hasattr(retriever, 'search_kwargs'):
-                        original_kwargs = getattr(retriever, 'search_kwargs', {})
-                        retriever.search_kwargs = {
-                            **original_kwargs,
-                            "filter": company_filter,
-                            "k": 2  # Exactly 2 chunks from each company
-                        }
-                    
-                    company_results = await retriever.ainvoke(query, config)
-                    
-                    # Restore original search kwargs
-                    if hasattr(retriever, 'search_kwargs'):
-                        retriever.search_kwargs = original_kwargs
+                    # Exactly 2 chunks from each company
+                    company_results = await retrieval.asearch(
+                        retriever,
+                        query,
+                        config,
+                        filter={"source_file": company_file},
+                        k=2,
+                    )
                     
                     all_results.extend(company_results)
-                    print(f"✅ Retrieved {len(company_results)} chunks from {company_file}")
+                    logger.debug(
+                        "Retrieved %d chunks from %s", len(company_results), company_file
+                    )
                     
                 except Exception as e:
-                    print(f"⚠️ Failed to retrieve from {company_file}: {e}")
+                    logger.warning("Failed to retrieve from %s: %s", company_file, e)
+                    failed_files.append(company_file)
                     continue
             
-            print(f"📊 Total industry analysis chunks: {len(all_results)} from {len(company_files)} companies")
+            logger.info(
+                "Industry analysis retrieved %d chunks from %d companies",
+                len(all_results),
+                len(company_files),
+            )
             
             if not all_results:
-                return "No industry-wide documents found for this query."
+                return IncompleteResult("No industry-wide documents found for this query.")
             
             # Format the results for the agent
-            formatted_docs = format_docs(all_results)
+            with telemetry.span("format", node="industry_analysis_tool"):
+                formatted_docs = format_docs(all_results)
             
             # Add analysis context
             analysis_context = f"""
@@ -90,16 +101,51 @@ Use these documents to provide comparative analysis and industry perspective:
 {formatted_docs}
 """
             
+            if failed_files:
+                # Partial: tell the agent, and let the next call try again.
+                return IncompleteResult(
+                    analysis_context
+                    + f"\nRetrieval failed for: {', '.join(failed_files)}\n"
+                )
             return analysis_context
             
     except Exception as e:
-        error_msg = f"⚠️ Industry analysis failed: {e}"
-        print(error_msg)
-        return f"Error performing industry analysis: {str(e)}"
+        logger.warning("Industry analysis failed: %s", e)
+        return IncompleteResult(f"Error performing industry analysis: {str(e)}")
 
 
-@tool
-def web_search_tool(query: str) -> str:
+def _tavily_search() -> TavilySearchResults:
+    """Create the Tavily search client (API key from the environment)."""
+    return TavilySearchResults(
+        max_results=5,
+        search_depth="advanced",
+        include_answer=True,
+        include_raw_content=False
+    )
+
+
+def _format_web_results(query: str, results: Any) -> str:
+    """Format Tavily results for the agent."""
+    if not results:
+        return IncompleteResult(f"No current web information found for: {query}")
+    
+    formatted_results = f"Web Search Results for: '{query}'\n\n"
+    
+    for i, result in enumerate(results, 1):
+        title = result.get('title', 'No title')
+        content = result.get('content', 'No content available')
+        url = result.get('url', 'No URL')
+        
+        formatted_results += f"Result {i}:\n"
+        formatted_results += f"Title: {title}\n"
+        formatted_results += f"Content: {content}\n"
+        formatted_results += f"Source: {url}\n\n"
+    
+    logger.debug("Found %d web search results", len(results))
+    return formatted_results
+
+
+def _web_search(query: str) -> str:
     """Search the web for current information about semiconductor industry topics.
     
     This tool searches for real-time information, recent news, current market data,
@@ -120,45 +166,154 @@ def web_search_tool(query: str) -> str:
         - New product launches and partnerships
         - Latest industry trends and forecasts
     """
-    
-    print(f"🔍 Web Search: Searching for current information about '{query}'")
-    
+    logger.info("Web search for %r", query)
     try:
-        # Initialize Tavily search with API key from environment
-        search = TavilySearchResults(
-            max_results=5,
-            search_depth="advanced",
-            include_answer=True,
-            include_raw_content=False
-        )
-        
-        # Perform the search
-        results = search.invoke({"query": query})
-        
-        if not results:
-            return f"No current web information found for: {query}"
-        
-        # Format the results
-        formatted_results = f"Web Search Results for: '{query}'\n\n"
-        
-        for i, result in enumerate(results, 1):
-            title = result.get('title', 'No title')
-            content = result.get('content', 'No content available')
-            url = result.get('url', 'No URL')
-            
-            formatted_results += f"Result {i}:\n"
-            formatted_results += f"Title: {title}\n"
-            formatted_results += f"Content: {content}\n"
-            formatted_results += f"Source: {url}\n\n"
-        
-        print(f"✅ Found {len(results)} web search results")
-        return formatted_results
-        
+        return _format_web_results(query, _tavily_search().invoke({"query": query}))
+    except Exception as e:
+        logger.warning("Web search failed: %s", e)
+        return IncompleteResult(f"Error performing web search: {str(e)}")
+
+
+async def _aweb_search(query: str) -> str:
+    """Async variant of `_web_search`, so tool calls never block the event loop."""
+    logger.info("Web search for %r", query)
+    try:
+        results = await _tavily_search().ainvoke({"query": query})
+        return _format_web_results(query, results)
     except Exception as e:
-        error_msg = f"⚠️ Web search failed: {e}"
-        print(error_msg)
-        return f"Error performing web search: {str(e)}"
+        logger.warning("Web search failed: %s", e)
+        return IncompleteResult(f"Error performing web search: {str(e)}")
+
+
+web_search_tool = StructuredTool.from_function(
+    func=_web_search, coroutine=_aweb_search, name="web_search_tool"
+)
 
 
 # List of available tools for the agent
-AVAILABLE_TOOLS = [industry_analysis_tool, web_search_tool]
\ No newline at end of file
+AVAILABLE_TOOLS = [industry_analysis_tool, web_search_tool]
+
+
+# Tool results shared by every run in this process. Filings only change when
+# they are re-indexed (which also invalidates the cache), while web results
+# go stale within minutes.
+tool_cache = ToolResultCache(
+    {
+        "industry_analysis_tool": 24 * 60 * 60,
+        "web_search_tool": 5 * 60,
+    },
+    generation_scoped=["industry_analysis_tool"],
+)
+telemetry.register_cache("tool", tool_cache)
+
+
+def _config_param(func: Callable[..., Any]) -> Optional[str]:
+    """Return the name of the parameter a tool function takes its config in."""
+    hints = get_type_hints(func)
+    return next((name for name, hint in hints.items() if hint is RunnableConfig), None)
+
+
+@contextmanager
+def _attributed(tool_name: str, config: RunnableConfig) -> Iterator[None]:
+    """Account model and embedding calls made by a tool to it and the run's thread.
+
+    See `usage`; the tool call is also timed as a "tool" span.
+    """
+    thread_id = (config.get("configurable") or {}).get("thread_id")
+    tool_token = telemetry.current_tool.set(tool_name)
+    thread_token = telemetry.current_thread.set(
+        str(thread_id) if thread_id is not None else None
+    )
+    try:
+        with telemetry.span("tool", tool=tool_name):
+            yield
+    finally:
+        telemetry.current_thread.reset(thread_token)
+        telemetry.current_tool.reset(tool_token)
+
+
+def cached_tool(tool: BaseTool) -> StructuredTool:
+    """Wrap a tool so repeated calls are answered from `tool_cache`.
+
+    The returned tool has the same name and arguments; its function and
+    coroutine look the call up before running the original and cache what it
+    returns, so it works with a plain `ToolNode`. Cache hits finish without
+    invoking the original function or doing any network I/O. Only complete
+    results are cached; the tools return errors, partial results and empty
+    results as `IncompleteResult`. Tools in `tool_cache.generation_scoped`
+    are cached per index generation, so indexing new data invalidates them.
+
+    Args:
+        tool (BaseTool): The tool, e.g. one of `AVAILABLE_TOOLS`; it must be a
+            `StructuredTool`, as made by `@tool`.
+
+    Returns:
+        StructuredTool: The caching tool.
+
+    Raises:
+        TypeError: If the tool is not a `StructuredTool`.
+    """
+    if not isinstance(tool, StructuredTool):
+        raise TypeError(f"Cannot cache {tool.name}: not a StructuredTool")
+    name = tool.name
+
+    def lookup(
+        args: dict[str, Any], config: RunnableConfig
+    ) -> tuple[Optional[str], int]:
+        configuration = Configuration.from_runnable_config(config)
+        if not configuration.tool_cache_enabled:
+            return None, -1
+        generation = current_index_generation(configuration.index_generation_path)
+        output = tool_cache.get(name, args, generation)
+        if output is not None:
+            logger.info("Tool cache hit for %s", name)
+        return output, generation
+
+    def remember(args: dict[str, Any], output: Any, generation: int) -> None:
+        # A negative generation means the cache is disabled for the run.
+        complete = isinstance(output, str) and not isinstance(output, IncompleteResult)
+        if generation >= 0 and complete and output:
+            tool_cache.put(name, args, output, generation)
+
+    def call_args(
+        func: Callable[..., Any], kwargs: dict[str, Any], config: RunnableConfig
+    ) -> dict[str, Any]:
+        if (param := _config_param(func)) is not None:
+            return {**kwargs, param: config}
+        return kwargs
+
+    def wrap_func(original: Callable[..., Any]) -> Callable[..., Any]:
+        def func(config: RunnableConfig, **kwargs: Any) -> Any:
+            cached, generation = lookup(kwargs, config)
+            if cached is not None:
+                return cached
+            with _attributed(name, config):
+                output = original(**call_args(original, kwargs, config))
+            remember(kwargs, output, generation)
+            return output
+
+        return func
+
+    def wrap_coroutine(
+        original: Callable[..., Awaitable[Any]],
+    ) -> Callable[..., Awaitable[Any]]:
+        async def coroutine(config: RunnableConfig, **kwargs: Any) -> Any:
+            cached, generation = lookup(kwargs, config)
+            if cached is not None:
+                return cached
+            with _attributed(name, config):
+                output = await original(**call_args(original, kwargs, config))
+            remember(kwargs, output, generation)
+            return output
+
+        return coroutine
+
+    return StructuredTool(
+        name=name,
+        description=tool.description,
+        args_schema=tool.args_schema,
+        func=wrap_func(tool.func) if tool.func is not None else None,
+        coroutine=wrap_coroutine(tool.coroutine) if tool.coroutine is not None else None,
+        return_direct=tool.return_direct,
+        response_format=tool.response_format,
+    )
@@ -0,0 +1,383 @@
+"""Token and cost accounting for LLM and embedding calls.
+
+Every chat-model call made while this module is loaded (query rewriting,
+each ReAct reasoning iteration, section extraction, structured-output calls)
+is seen by `UsageCallbackHandler`, which LangChain adds to every callback
+manager through a configure hook, so no call site has to pass it. Embedding
+calls are recorded by `UsageEmbeddings`, which `retrieval.make_embeddings`
+wraps around every encoder whether or not telemetry is enabled; providers do
+not report embedding usage through LangChain, so those tokens are estimated
+at `CHARS_PER_TOKEN` characters per token.
+
+Each call is attributed to the graph node (`langgraph_node` metadata, or
+`telemetry.current_node`), the tool being executed (`telemetry.current_tool`)
+and the conversation thread (`thread_id`), and aggregated in `ledger`:
+
+- process-wide totals per (node, tool, model), exported as
+  `retrieval_graph_llm_tokens_total{kind,model,node,tool}`,
+  `retrieval_graph_embedding_tokens_total{model,node,tool}` and
+  `retrieval_graph_llm_cost_usd_total{model,node,tool}` when telemetry is on;
+- per-thread totals for the most recent `max_threads` threads, which the
+  graphs write to their output state as `usage`.
+
+Costs are computed from `RETRIEVAL_GRAPH_MODEL_PRICES`, a JSON object mapping
+model names to USD per million tokens, e.g.
+`{"solar-pro2": {"input": 0.15, "output": 0.6}, "embedding-query": {"embedding": 0.1}}`.
+Models without a price cost 0.
+
+Classes:
+    Usage: Token, call and cost totals.
+    UsageLedger: Usage aggregated per node, tool, model and thread.
+    UsageCallbackHandler: Callback handler recording LLM token usage.
+    UsageEmbeddings: Embeddings wrapper recording embedding token usage.
+
+Functions:
+    record_embedding: Record the estimated tokens of an embedding call.
+    thread_usage: Usage summary of a run's thread, for the graph output.
+    set_prices: Replace the model price table.
+"""
+
+from __future__ import annotations
+
+import contextvars
+import json
+import logging
+import math
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from typing import Any, Optional
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.embeddings import Embeddings
+from langchain_core.messages import BaseMessage
+from langchain_core.outputs import LLMResult
+from langchain_core.runnables import RunnableConfig
+from langchain_core.tracers.context import register_configure_hook
+
+from retrieval_graph import telemetry
+
+logger = logging.getLogger(__name__)
+
+CHARS_PER_TOKEN = 4
+
+UsageKey = tuple[str, str, str]  # (node, tool, model)
+
+
+@dataclass
+class Usage:
+    """Token, call and cost totals."""
+
+    calls: int = 0
+    input_tokens: int = 0
+    output_tokens: int = 0
+    embedding_tokens: int = 0
+    cost_usd: float = 0.0
+
+    def add(self, other: Usage) -> None:
+        """Add another total into this one."""
+        self.calls += other.calls
+        self.input_tokens += other.input_tokens
+        self.output_tokens += other.output_tokens
+        self.embedding_tokens += other.embedding_tokens
+        self.cost_usd += other.cost_usd
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the totals as a JSON-friendly dict."""
+        totals = asdict(self)
+        totals["cost_usd"] = round(self.cost_usd, 6)
+        return totals
+
+
+def _load_prices() -> dict[str, dict[str, float]]:
+    raw = os.environ.get("RETRIEVAL_GRAPH_MODEL_PRICES")
+    if not raw:
+        return {}
+    try:
+        return dict(json.loads(raw))
+    except ValueError:
+        logger.warning("Ignoring RETRIEVAL_GRAPH_MODEL_PRICES: not valid JSON")
+        return {}
+
+
+_prices = _load_prices()
+
+
+def set_prices(prices: dict[str, dict[str, float]]) -> None:
+    """Replace the model price table (USD per million tokens by kind)."""
+    global _prices
+    _prices = dict(prices)
+
+
+def _cost(model: str, usage: Usage) -> float:
+    # Price tables usually name the model without the "provider/" prefix.
+    price = _prices.get(model) or _prices.get(model.split("/", 1)[-1]) or {}
+    return (
+        usage.input_tokens * price.get("input", 0.0)
+        + usage.output_tokens * price.get("output", 0.0)
+        + usage.embedding_tokens * price.get("embedding", 0.0)
+    ) / 1_000_000
+
+
+class UsageLedger:
+    """Usage aggregated per node, tool, model and thread.
+
+    Args:
+        max_threads (int): Number of most recently active threads whose
+            totals are kept.
+    """
+
+    def __init__(self, max_threads: int = 10_000) -> None:
+        """Create an empty ledger."""
+        self.max_threads = max_threads
+        self.totals: dict[UsageKey, Usage] = {}
+        self.threads: OrderedDict[str, dict[UsageKey, Usage]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def record(
+        self,
+        usage: Usage,
+        *,
+        model: str,
+        node: Optional[str] = None,
+        tool: Optional[str] = None,
+        thread: Optional[str] = None,
+    ) -> None:
+        """Add one call's usage, pricing it and exporting it as metrics."""
+        usage.cost_usd = _cost(model, usage)
+        key = (node or "-", tool or "-", model)
+        with self._lock:
+            self.totals.setdefault(key, Usage()).add(usage)
+            if thread is not None:
+                per_thread = self.threads.setdefault(thread, {})
+                self.threads.move_to_end(thread)
+                per_thread.setdefault(key, Usage()).add(usage)
+                if len(self.threads) > self.max_threads:
+                    self.threads.popitem(last=False)
+
+        labels = {"model": model, "node": key[0], "tool": key[1]}
+        if usage.input_tokens or usage.output_tokens:
+            telemetry.increment(
+                "retrieval_graph_llm_tokens_total", usage.input_tokens, kind="input", **labels
+            )
+            telemetry.increment(
+                "retrieval_graph_llm_tokens_total", usage.output_tokens, kind="output", **labels
+            )
+        if usage.embedding_tokens:
+            telemetry.increment(
+                "retrieval_graph_embedding_tokens_total", usage.embedding_tokens, **labels
+            )
+        if usage.cost_usd:
+            telemetry.increment("retrieval_graph_llm_cost_usd_total", usage.cost_usd, **labels)
+
+    def summary(self, thread: Optional[str] = None) -> dict[str, Any]:
+        """Summarize usage in total and by node, tool and model.
+
+        Args:
+            thread (Optional[str]): Summarize this thread only; all threads if None.
+
+        Returns:
+            dict[str, Any]: `{"total": ..., "by_node": ..., "by_tool": ..., "by_model": ...}`
+            where every value is a `Usage.as_dict()`.
+        """
+        with self._lock:
+            if thread is None:
+                entries = list(self.totals.items())
+            else:
+                entries = list(self.threads.get(thread, {}).items())
+        total = Usage()
+        groups: dict[str, dict[str, Usage]] = {"by_node": {}, "by_tool": {}, "by_model": {}}
+        for (node, tool, model), usage in entries:
+            total.add(usage)
+            groups["by_node"].setdefault(node, Usage()).add(usage)
+            groups["by_tool"].setdefault(tool, Usage()).add(usage)
+            groups["by_model"].setdefault(model, Usage()).add(usage)
+        return {
+            "total": total.as_dict(),
+            **{
+                name: {key: usage.as_dict() for key, usage in sorted(group.items())}
+                for name, group in groups.items()
+            },
+        }
+
+    def reset(self) -> None:
+        """Forget all recorded usage."""
+        with self._lock:
+            self.totals.clear()
+            self.threads.clear()
+
+
+ledger = UsageLedger()
+
+
+def _attribution(metadata: Optional[dict[str, Any]] = None) -> dict[str, Optional[str]]:
+    metadata = metadata or {}
+    thread = metadata.get("thread_id") or telemetry.current_thread.get()
+    return {
+        "node": metadata.get("langgraph_node") or telemetry.current_node.get(),
+        "tool": telemetry.current_tool.get(),
+        "thread": str(thread) if thread is not None else None,
+    }
+
+
+def thread_usage(config: Optional[RunnableConfig]) -> dict[str, Any]:
+    """Return the usage summary of the run's thread, for the graph output.
+
+    Args:
+        config (Optional[RunnableConfig]): The run configuration.
+
+    Returns:
+        dict[str, Any]: `UsageLedger.summary` for the thread, or an empty dict
+        when the run has no thread id.
+    """
+    thread_id = ((config or {}).get("configurable") or {}).get("thread_id")
+    return ledger.summary(str(thread_id)) if thread_id is not None else {}
+
+
+def record_embedding(model: str, texts: list[str]) -> None:
+    """Record the estimated tokens of an embedding call.
+
+    Args:
+        model (str): Embedding model name as configured, e.g. "upstage/embedding-query".
+        texts (list[str]): The embedded texts.
+    """
+    tokens = sum(math.ceil(len(text) / CHARS_PER_TOKEN) for text in texts)
+    ledger.record(Usage(calls=1, embedding_tokens=tokens), model=model, **_attribution())
+
+
+class UsageEmbeddings(Embeddings):
+    """Embeddings wrapper that records the estimated tokens of every call.
+
+    Args:
+        inner (Embeddings): The embeddings model.
+        model (str): Model name the usage is recorded under.
+    """
+
+    def __init__(self, inner: Embeddings, model: str) -> None:
+        """Wrap an embeddings model."""
+        self.inner = inner
+        self.model = model
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        """Embed documents, recording their tokens."""
+        record_embedding(self.model, texts)
+        return self.inner.embed_documents(texts)
+
+    def embed_query(self, text: str) -> list[float]:
+        """Embed a query, recording its tokens."""
+        record_embedding(self.model, [text])
+        return self.inner.embed_query(text)
+
+    async def aembed_documents(self, texts: list[str]) -> list[list[float]]:
+        """Embed documents asynchronously, recording their tokens."""
+        record_embedding(self.model, texts)
+        return await self.inner.aembed_documents(texts)
+
+    async def aembed_query(self, text: str) -> list[float]:
+        """Embed a query asynchronously, recording its tokens."""
+        record_embedding(self.model, [text])
+        return await self.inner.aembed_query(text)
+
+
+def _token_usage(response: LLMResult) -> tuple[int, int]:
+    """Return (input, output) tokens reported by an LLM response."""
+    input_tokens = output_tokens = 0
+    found = False
+    for generations in response.generations:
+        for generation in generations:
+            message = getattr(generation, "message", None)
+            usage = getattr(message, "usage_metadata", None)
+            if usage:
+                found = True
+                input_tokens += usage.get("input_tokens", 0)
+                output_tokens += usage.get("output_tokens", 0)
+    if not found:
+        reported = (response.llm_output or {}).get("token_usage") or {}
+        input_tokens = reported.get("prompt_tokens", 0)
+        output_tokens = reported.get("completion_tokens", 0)
+    return input_tokens, output_tokens
+
+
+class UsageCallbackHandler(BaseCallbackHandler):
+    """Callback handler recording LLM token usage into `ledger`.
+
+    Attribution is captured when a call starts, since only the start event
+    carries run metadata, and recorded when the call ends.
+    """
+
+    # Run in the caller's context so the node/tool context variables are visible.
+    run_inline = True
+
+    def __init__(self, usage_ledger: Optional[UsageLedger] = None) -> None:
+        """Record into `usage_ledger` (the module ledger by default)."""
+        self.ledger = usage_ledger or ledger
+        self._pending: dict[UUID, dict[str, Optional[str]]] = {}
+
+    def _start(
+        self,
+        serialized: Optional[dict[str, Any]],
+        run_id: UUID,
+        metadata: Optional[dict[str, Any]],
+        kwargs: dict[str, Any],
+    ) -> None:
+        params = kwargs.get("invocation_params") or {}
+        model = (
+            (metadata or {}).get("ls_model_name")
+            or params.get("model")
+            or params.get("model_name")
+            or (serialized or {}).get("name")
+            or params.get("_type")
+            or "unknown"
+        )
+        self._pending[run_id] = {"model": str(model), **_attribution(metadata)}
+
+    def on_chat_model_start(
+        self,
+        serialized: dict[str, Any],
+        messages: list[list[BaseMessage]],
+        *,
+        run_id: UUID,
+        metadata: Optional[dict[str, Any]] = None,
+        **kwargs: Any,
+    ) -> None:
+        """Remember who made this chat-model call."""
+        self._start(serialized, run_id, metadata, kwargs)
+
+    def on_llm_start(
+        self,
+        serialized: dict[str, Any],
+        prompts: list[str],
+        *,
+        run_id: UUID,
+        metadata: Optional[dict[str, Any]] = None,
+        **kwargs: Any,
+    ) -> None:
+        """Remember who made this completion-model call."""
+        self._start(serialized, run_id, metadata, kwargs)
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any) -> None:
+        """Record the tokens the provider reported for the call."""
+        attribution = self._pending.pop(run_id, None)
+        if attribution is None:
+            return
+        input_tokens, output_tokens = _token_usage(response)
+        model = attribution.pop("model") or "unknown"
+        self.ledger.record(
+            Usage(calls=1, input_tokens=input_tokens, output_tokens=output_tokens),
+            model=model,
+            **attribution,
+        )
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        """Forget a failed call."""
+        self._pending.pop(run_id, None)
+
+
+# LangChain adds the handler held by this variable to every callback manager it
+# configures, so all model calls are accounted for without passing callbacks.
+usage_handler: contextvars.ContextVar[Optional[UsageCallbackHandler]] = contextvars.ContextVar(
+    "retrieval_graph_usage_handler", default=UsageCallbackHandler()
+)
+register_configure_hook(usage_handler, inheritable=True)
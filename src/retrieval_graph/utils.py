@@ -134,4 +134,9 @@ def load_chat_model(fully_specified_name: str) -> BaseChatModel:
             reasoning_effort="high"
         )
     
+    if provider == "local":
+        from retrieval_graph.local import make_local_chat_model
+
+        return make_local_chat_model(model)
+    
     return init_chat_model(model, model_provider=provider)
\ No newline at end of file
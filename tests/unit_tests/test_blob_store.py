@@ -0,0 +1,89 @@
+import asyncio
+
+from langchain_core.documents import Document
+
+from retrieval_graph.blob_store import BlobStore
+from retrieval_graph.docu_proc_graph import enrich_metadata, load_pdf_docs
+from retrieval_graph.state import IndexState, reduce_doc_refs
+
+
+def _docs(n: int) -> list[Document]:
+    return [
+        Document(page_content=f"page {i}", metadata={"page": i, "source_file": "a.pdf"})
+        for i in range(n)
+    ]
+
+
+def _config(tmp_path) -> dict:
+    return {
+        "configurable": {
+            "blob_store_dir": str(tmp_path / "blobs"),
+            "parse_cache_dir": str(tmp_path / "parsed"),
+            "ingestion_journal_path": str(tmp_path / "journal.db"),
+        }
+    }
+
+
+def test_round_trip_preserves_documents(tmp_path) -> None:
+    store = BlobStore(tmp_path)
+    docs = _docs(5)
+
+    ref = store.put_documents(docs)
+
+    assert ref.count == 5
+    assert store.load_documents(ref) == docs
+
+
+def test_identical_content_shares_one_blob(tmp_path) -> None:
+    store = BlobStore(tmp_path)
+
+    first = store.put_documents(_docs(3))
+    second = store.put_documents(_docs(3))
+
+    assert first == second
+    assert len(list(tmp_path.rglob("*.jsonl.gz"))) == 1
+    assert not list(tmp_path.glob("*.tmp"))
+
+
+def test_writer_discards_blob_on_error(tmp_path) -> None:
+    store = BlobStore(tmp_path)
+
+    try:
+        with store.writer() as writer:
+            writer.write_all(_docs(2))
+            raise RuntimeError("boom")
+    except RuntimeError:
+        pass
+
+    assert not list(tmp_path.rglob("*.gz"))
+    assert not list(tmp_path.glob("*.tmp"))
+
+
+def test_reduce_doc_refs_replaces_and_deletes(tmp_path) -> None:
+    ref = BlobStore(tmp_path).put_documents(_docs(1))
+
+    assert reduce_doc_refs([], [ref]) == [ref]
+    assert reduce_doc_refs([ref], "delete") == []
+
+
+def test_node_resolves_refs_and_returns_new_ref(tmp_path) -> None:
+    store = BlobStore(tmp_path / "blobs")
+    ref = store.put_documents(_docs(4))
+    config = _config(tmp_path)
+
+    result = asyncio.run(enrich_metadata(IndexState(doc_refs=[ref]), config=config))
+
+    [new_ref] = result["doc_refs"]
+    enriched = store.load_documents(new_ref)
+    assert new_ref.count == 4
+    assert all(doc.metadata["doc_type"] == "pdf_chunk" for doc in enriched)
+
+
+def test_load_passes_supplied_documents_through(tmp_path) -> None:
+    config = _config(tmp_path)
+
+    result = asyncio.run(load_pdf_docs(IndexState(docs=_docs(3)), config=config))
+
+    [ref] = result["doc_refs"]
+    assert BlobStore(tmp_path / "blobs").load_documents(ref) == _docs(3)
+    assert asyncio.run(load_pdf_docs(IndexState(doc_refs=[ref]), config=config)) == {}
@@ -0,0 +1,57 @@
+import asyncio
+
+import pytest
+from langchain_core.documents import Document
+
+from retrieval_graph.bulk_upsert import BulkUpsertError, BulkWriter, SimulatedBackend
+
+
+def _docs(n: int, size: int = 10) -> list[Document]:
+    return [Document(page_content="x" * size, metadata={"i": i}) for i in range(n)]
+
+
+def test_split_respects_vector_and_byte_limits() -> None:
+    backend = SimulatedBackend(max_batch_vectors=4, max_batch_bytes=1000)
+    writer = BulkWriter(backend, vector_bytes=0)
+
+    # Ten small documents: bounded by the vector count.
+    assert [(a, b) for a, b, _ in writer.split(_docs(10))] == [(0, 4), (4, 8), (8, 10)]
+
+    # Documents of about 300 bytes: three fit in 1000 bytes.
+    batches = writer.split(_docs(7, size=290))
+    assert [(a, b) for a, b, _ in batches] == [(0, 3), (3, 6), (6, 7)]
+    assert all(nbytes <= 1000 for _, _, nbytes in batches)
+
+    # A document over the byte limit still gets a batch of its own.
+    assert [(a, b) for a, b, _ in writer.split(_docs(2, size=5000))] == [(0, 1), (1, 2)]
+
+
+def test_write_retries_transient_failures_under_concurrency_limit() -> None:
+    backend = SimulatedBackend(
+        latency=0.01, failures=2, max_batch_vectors=5, max_batch_bytes=10**9
+    )
+    writer = BulkWriter(backend, max_concurrency=3, retries=3, backoff=0)
+    docs = _docs(40)
+    ids = [f"id-{i}" for i in range(40)]
+
+    results = asyncio.run(writer.write(docs, ids))
+
+    assert [result.index for result in results] == list(range(8))
+    assert sum(result.vectors for result in results) == 40
+    assert sum(result.attempts - 1 for result in results) == 2
+    assert backend.calls == 10
+    assert backend.peak_active <= 3
+    assert sorted(backend.written) == sorted(ids)
+
+
+def test_write_reports_the_batches_written_when_some_fail() -> None:
+    backend = SimulatedBackend(failures=1, max_batch_vectors=2, max_batch_bytes=10**9)
+    writer = BulkWriter(backend, max_concurrency=1, retries=0, backoff=0)
+    ids = ["a", "b", "c", "d"]
+
+    with pytest.raises(BulkUpsertError) as raised:
+        asyncio.run(writer.write(_docs(4), ids))
+
+    assert len(raised.value.errors) == 1
+    assert raised.value.written == ["c", "d"]
+    assert sorted(backend.written) == ["c", "d"]
@@ -0,0 +1,147 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from langchain_core.documents import Document
+
+from retrieval_graph.caching import (
+    RetrievalCache,
+    SemanticAnswerCache,
+    bump_index_generation,
+    current_index_generation,
+    search_key,
+)
+
+NVDA = ["nvidia_10k.pdf"]
+
+
+def test_near_duplicate_hits_above_threshold() -> None:
+    cache = SemanticAnswerCache()
+    assert cache.lookup("What is NVIDIA's revenue?", [1.0, 0.0], NVDA, 0) is None
+    assert cache.store("What is NVIDIA's revenue?", NVDA, 0, "$60.9B")
+
+    assert cache.lookup("NVIDIA revenue?", [0.99, 0.05], NVDA, 0) == "$60.9B"
+    assert cache.lookup("NVIDIA margins?", [0.0, 1.0], NVDA, 0) is None
+
+
+def test_hit_requires_same_companies_and_generation() -> None:
+    cache = SemanticAnswerCache()
+    cache.store("q", NVDA, 0, "answer", embedding=[1.0, 0.0])
+
+    assert cache.lookup("q", [1.0, 0.0], ["amd_10k.pdf"], 0) is None
+    assert cache.lookup("q", [1.0, 0.0], NVDA, 1) is None
+    # The stale generation was purged by the lookup above.
+    assert len(cache) == 0
+
+
+def test_exact_repeat_needs_no_embedding() -> None:
+    cache = SemanticAnswerCache()
+    cache.store("What is NVIDIA's revenue?", NVDA, 0, "answer", embedding=[1.0])
+
+    assert cache.lookup_exact("  what is nvidia's   REVENUE ", NVDA, 0) == "answer"
+
+
+def test_ttl_and_lru_eviction() -> None:
+    cache = SemanticAnswerCache(max_entries=2)
+    for i, vector in enumerate(([1.0, 0.0, 0.0], [0.0, 1.0, 0.0], [0.0, 0.0, 1.0])):
+        cache.store(f"q{i}", [], 0, f"a{i}", embedding=vector)
+
+    assert len(cache) == 2
+    assert cache.lookup("q0", [1.0, 0.0, 0.0], [], 0) is None
+    assert cache.lookup_exact("q2", [], 0, ttl=-1) is None
+
+
+def test_bump_index_generation(tmp_path) -> None:
+    path = tmp_path / "generation"
+
+    assert current_index_generation(path) == 0
+    assert bump_index_generation(path) == 1
+    assert current_index_generation(path) == 1
+
+    # Another process's bump is seen once the in-memory value is refreshed.
+    path.write_text("7")
+    assert current_index_generation(path, max_age=60) == 1
+    assert current_index_generation(path, max_age=0) == 7
+
+    with ThreadPoolExecutor(8) as pool:
+        list(pool.map(lambda _: bump_index_generation(path), range(32)))
+    assert current_index_generation(path, max_age=0) == 7 + 32
+    assert not list(tmp_path.glob("*.tmp"))
+
+
+def _key(query: str, generation: int = 0, k: int = 4) -> str:
+    return search_key(
+        query,
+        {"filter": {"source_file": "amd_10k.pdf"}, "k": k},
+        provider="pinecone",
+        embedding_model="upstage/embedding-query",
+        generation=generation,
+    )
+
+
+def test_search_key_normalizes_query_and_tracks_generation() -> None:
+    assert _key("AMD  risk factors ") == _key("AMD risk factors")
+    assert _key("AMD risk factors") != _key("AMD risk factors", generation=1)
+    assert _key("AMD risk factors") != _key("AMD risk factors", k=2)
+
+
+def test_concurrent_identical_searches_share_one_call() -> None:
+    cache = RetrievalCache()
+    calls = 0
+
+    async def search() -> list[Document]:
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return [Document(page_content="chunk")]
+
+    async def run() -> list[list[Document]]:
+        results = await asyncio.gather(
+            *(cache.get_or_search("k", search) for _ in range(5))
+        )
+        results.append(await cache.get_or_search("k", search))
+        return results
+
+    results = asyncio.run(run())
+
+    assert calls == 1
+    assert all(r == [Document(page_content="chunk")] for r in results)
+    stats = cache.stats()
+    assert (stats.misses, stats.coalesced, stats.hits) == (1, 4, 1)
+    assert stats.hit_rate == pytest.approx(5 / 6)
+
+
+def test_failed_searches_are_not_cached() -> None:
+    cache = RetrievalCache()
+
+    async def fail() -> list[Document]:
+        raise RuntimeError("backend down")
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(cache.get_or_search("k", fail))
+    assert cache.stats().size == 0
+
+
+def test_cancelled_leader_does_not_cancel_waiters() -> None:
+    cache = RetrievalCache()
+    calls = 0
+
+    async def search() -> list[Document]:
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        return [Document(page_content="chunk")]
+
+    async def run() -> list[Document]:
+        leader = asyncio.create_task(cache.get_or_search("k", search))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(cache.get_or_search("k", search))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await waiter
+
+    assert asyncio.run(run()) == [Document(page_content="chunk")]
+    assert calls == 2  # the waiter searched again
+    assert (cache.stats().misses, cache.stats().coalesced) == (2, 0)
@@ -0,0 +1,79 @@
+import asyncio
+import operator
+import sqlite3
+import time
+from typing import Annotated, TypedDict
+
+from langgraph.graph import StateGraph
+
+from retrieval_graph.checkpointer import SqliteCheckpointer
+
+
+class _State(TypedDict):
+    items: Annotated[list[str], operator.add]
+
+
+def _build(saver: SqliteCheckpointer):
+    builder = StateGraph(_State)
+    builder.add_node("a", lambda s: {"items": ["a" * 4096]})
+    builder.add_node("b", lambda s: {"items": ["b"]})
+    builder.add_edge("__start__", "a")
+    builder.add_edge("a", "b")
+    return builder.compile(checkpointer=saver)
+
+
+def test_state_survives_reopen(tmp_path) -> None:
+    path = str(tmp_path / "cp.db")
+    config = {"configurable": {"thread_id": "t1"}}
+    saver = SqliteCheckpointer(path, compress=True)
+    asyncio.run(_build(saver).ainvoke({"items": []}, config))
+    saver.close()
+
+    reopened = SqliteCheckpointer(path)
+    state = _build(reopened).get_state(config)
+
+    assert state.values["items"] == ["a" * 4096, "b"]
+    assert reopened._conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+
+def test_retention_prunes_old_checkpoints(tmp_path) -> None:
+    saver = SqliteCheckpointer(str(tmp_path / "cp.db"), max_checkpoints_per_thread=2)
+    graph = _build(saver)
+    config = {"configurable": {"thread_id": "t1"}}
+    for _ in range(3):
+        graph.invoke({"items": []}, config)
+
+    history = list(saver.list(config))
+
+    assert len(history) == 2
+    assert graph.get_state(config).values["items"][-1] == "b"
+
+
+def test_delete_thread_only_touches_that_thread(tmp_path) -> None:
+    saver = SqliteCheckpointer(str(tmp_path / "cp.db"))
+    graph = _build(saver)
+    graph.invoke({"items": []}, {"configurable": {"thread_id": "keep"}})
+    graph.invoke({"items": []}, {"configurable": {"thread_id": "drop"}})
+
+    saver.delete_thread("drop")
+
+    assert list(saver.list({"configurable": {"thread_id": "drop"}})) == []
+    assert list(saver.list({"configurable": {"thread_id": "keep"}}))
+
+
+def test_ainvoke_result_is_durable_for_other_connections(tmp_path) -> None:
+    path = str(tmp_path / "cp.db")
+    config = {"configurable": {"thread_id": "t1"}}
+    saver = SqliteCheckpointer(path, batch_size=1000, flush_interval=0.05)
+    asyncio.run(_build(saver).ainvoke({"items": []}, config))
+
+    reader = sqlite3.connect(path)
+    deadline = time.monotonic() + 5
+    while saver._pending_count() and time.monotonic() < deadline:
+        time.sleep(0.02)
+    (count,) = reader.execute("SELECT COUNT(*) FROM checkpoints").fetchone()
+
+    assert count == 4  # input, loop steps of "a" and "b", and the final one
+    reopened = SqliteCheckpointer(path)
+    assert _build(reopened).get_state(config).values["items"] == ["a" * 4096, "b"]
+    saver.close()
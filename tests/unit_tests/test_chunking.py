@@ -0,0 +1,69 @@
+from langchain_experimental.text_splitter import SemanticChunker
+
+from retrieval_graph import telemetry, usage
+from retrieval_graph.chunking import SemanticChunkingEngine
+from retrieval_graph.local import HashingEmbeddings
+from retrieval_graph.synthetic import generate_corpus
+
+
+class CountingEmbeddings(HashingEmbeddings):
+    def __init__(self, fail_on: str = "") -> None:
+        super().__init__(dim=256)
+        self.calls = 0
+        self.fail_on = fail_on
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        self.calls += 1
+        if self.fail_on and any(self.fail_on in text for text in texts):
+            raise RuntimeError("rate limited")
+        return super().embed_documents(texts)
+
+
+def _texts() -> list[str]:
+    # Some of these pages have distances within float32 rounding of their threshold.
+    texts = [
+        page.page_content
+        for filing in generate_corpus(2, 1, 120, seed=0)
+        for page in filing.pages()
+    ]
+    return texts + ["One sentence only", "", "Same. Same. Same."]
+
+
+def test_chunks_match_semantic_chunker_with_fewer_requests() -> None:
+    texts = _texts()
+    reference = CountingEmbeddings()
+    expected = [SemanticChunker(reference).split_text(text) for text in texts]
+
+    embeddings = CountingEmbeddings()
+    engine = SemanticChunkingEngine(embeddings, max_batch_texts=100)
+
+    assert engine.split_texts(texts) == expected
+    assert embeddings.calls < reference.calls / 3
+
+
+def test_failed_batch_marks_only_its_texts() -> None:
+    texts = ["Alpha one. Alpha two. Alpha three.", "Beta one. Beta two. Beta three."]
+    engine = SemanticChunkingEngine(CountingEmbeddings(fail_on="Beta"), max_batch_texts=3)
+
+    alpha, beta = engine.split_texts(texts)
+
+    assert alpha is not None and " ".join(alpha) == texts[0]
+    assert beta is None
+
+
+def test_concurrent_batches_attribute_usage_to_the_caller() -> None:
+    texts = [f"Part {i} one. Part {i} two. Part {i} three." for i in range(8)]
+    embeddings = usage.UsageEmbeddings(HashingEmbeddings(dim=64), "local/hashing")
+    engine = SemanticChunkingEngine(embeddings, max_batch_texts=4, max_concurrency=4)
+    node = telemetry.current_node.set("split_documents")
+    thread = telemetry.current_thread.set("chunking-usage")
+    try:
+        engine.split_texts(texts)
+    finally:
+        telemetry.current_thread.reset(thread)
+        telemetry.current_node.reset(node)
+
+    summary = usage.ledger.summary("chunking-usage")
+    assert summary["total"]["calls"] == 6
+    assert summary["total"]["embedding_tokens"] > 0
+    assert list(summary["by_node"]) == ["split_documents"]
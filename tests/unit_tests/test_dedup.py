@@ -0,0 +1,98 @@
+import asyncio
+import importlib
+
+from langchain_core.documents import Document
+
+from retrieval_graph.dedup import NearDuplicateFilter, lsh_parameters
+from retrieval_graph.local import HashingEmbeddings, get_local_store
+
+docu_proc_graph = importlib.import_module("retrieval_graph.docu_proc_graph")
+
+MODEL = "local/hashing?dim=72"
+
+DISCLAIMER = (
+    "This annual report contains forward-looking statements within the meaning "
+    "of the Private Securities Litigation Reform Act that involve risks and "
+    "uncertainties, including those described under Risk Factors."
+)
+REVENUE = (
+    "Net revenue for fiscal {year} was ${amount} billion, driven by higher "
+    "demand for data center products and improved pricing across segments."
+)
+
+
+def _chunk(text: str, page: int) -> Document:
+    return Document(page_content=text, metadata={"source_file": "amd_10k.pdf", "page": page})
+
+
+def test_near_duplicates_dropped_but_figures_and_short_chunks_kept() -> None:
+    bands, rows = lsh_parameters(0.9, 128)
+    assert bands * rows <= 128
+
+    docs = [
+        _chunk(DISCLAIMER, 1),
+        _chunk(REVENUE.format(year=2023, amount="22.7"), 2),
+        _chunk(DISCLAIMER.replace("annual report", "Annual Report"), 3),  # same words
+        _chunk(REVENUE.format(year=2022, amount="23.6"), 4),  # other figures
+        _chunk("Risk factors.", 5),
+        _chunk("Risk factors.", 6),  # too short to drop
+        _chunk(DISCLAIMER + " (Continued)", 7),  # near-duplicate
+    ]
+    dedup = NearDuplicateFilter()
+
+    kept = list(dedup.deduplicate(lambda: [d.model_copy(deep=True) for d in docs]))
+
+    assert [doc.metadata["page"] for doc in kept] == [1, 2, 4, 5, 6]
+    assert kept[0].metadata["duplicate_sources"] == [
+        "amd_10k.pdf#page=3",
+        "amd_10k.pdf#page=7",
+    ]
+    assert kept[0].metadata["duplicate_count"] == 2
+    assert "duplicate_sources" not in kept[1].metadata
+    assert dedup.report.chunks == 7 and dedup.report.duplicates == 2
+    assert dedup.report.embedding_tokens_saved > 0
+    assert dedup.report.storage_bytes_saved > 2 * len(DISCLAIMER)
+
+    # Streaming: copies of a canonical chunk of an earlier batch are dropped too.
+    streamed = NearDuplicateFilter()
+    first = streamed.filter_batch([_chunk(DISCLAIMER, 1), _chunk(DISCLAIMER, 2)])
+    second = streamed.filter_batch([_chunk(DISCLAIMER, 3), _chunk("Other text.", 4)])
+    assert [doc.metadata["page"] for doc in first + second] == [1, 4]
+    assert first[0].metadata["duplicate_sources"] == ["amd_10k.pdf#page=2"]
+    assert streamed.report.duplicates == 2
+
+
+def test_ingestion_drops_boilerplate_before_indexing(tmp_path, monkeypatch) -> None:
+    monkeypatch.chdir(tmp_path)
+    store = get_local_store(MODEL, HashingEmbeddings())
+    store.delete()
+    config = {
+        "configurable": {
+            "thread_id": "dedup",
+            "user_id": "1111111111",
+            "retriever_provider": "local",
+            "embedding_model": MODEL,
+            "chunking_embedding_model": MODEL,
+            "embedding_cache_path": "",
+            "dedup_chunks": True,
+            "index_manifest_path": str(tmp_path / "manifest.db"),
+            "blob_store_dir": str(tmp_path / "blobs"),
+        }
+    }
+    docs = [_chunk(DISCLAIMER, page) for page in (1, 2, 3)]
+    docs.append(_chunk(REVENUE.format(year=2023, amount="22.7"), 4))
+
+    try:
+        result = asyncio.run(docu_proc_graph.graph.ainvoke({"docs": docs}, config))
+
+        files = result["files"]["input"]
+        assert files["status"] == "indexed" and files["added"] == 2
+        assert files["dedup"]["duplicates"] == 2
+        assert len(store) == 2
+        (canonical,) = store.similarity_search("forward-looking statements", k=1)
+        assert canonical.metadata["duplicate_sources"] == [
+            "amd_10k.pdf#page=2",
+            "amd_10k.pdf#page=3",
+        ]
+    finally:
+        store.delete()
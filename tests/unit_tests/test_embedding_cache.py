@@ -0,0 +1,84 @@
+import asyncio
+import importlib
+
+from langchain_core.documents import Document
+
+from retrieval_graph import telemetry
+from retrieval_graph.embedding_cache import CachedEmbeddings, EmbeddingStore
+from retrieval_graph.local import HashingEmbeddings, get_local_store
+
+docu_proc_graph = importlib.import_module("retrieval_graph.docu_proc_graph")
+
+
+class CountingEmbeddings(HashingEmbeddings):
+    def __init__(self) -> None:
+        super().__init__(dim=16)
+        self.texts: list[str] = []
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        self.texts.extend(texts)
+        return super().embed_documents(texts)
+
+    async def aembed_documents(self, texts: list[str]) -> list[list[float]]:
+        return self.embed_documents(texts)
+
+
+def test_repeated_texts_are_served_from_disk(tmp_path) -> None:
+    inner = CountingEmbeddings()
+    path = tmp_path / "embeddings.db"
+    cached = CachedEmbeddings(inner, "local/hashing", EmbeddingStore(path))
+
+    first = cached.embed_documents(["alpha", "beta", "alpha"])
+    assert inner.texts == ["alpha", "beta"]
+    assert first[0] == first[2]
+
+    reopened = CachedEmbeddings(inner, "local/hashing", EmbeddingStore(path))
+    second = asyncio.run(reopened.aembed_documents(["beta", "alpha", "gamma"]))
+    assert second[:2] == [first[1], first[0]]
+    assert inner.texts == ["alpha", "beta", "gamma"]
+    # Queries and another model's vectors are cached separately.
+    reopened.embed_query("alpha")
+    CachedEmbeddings(inner, "other", reopened.store).embed_documents(["alpha"])
+    assert len(reopened.store) == 5
+    assert reopened.store.stats().hits == 2
+
+
+def test_repeat_ingestion_does_not_call_the_model(tmp_path, monkeypatch) -> None:
+    monkeypatch.chdir(tmp_path)
+    model = "local/hashing?dim=24"
+    config = {
+        "configurable": {
+            "thread_id": "first",
+            "user_id": "1111111111",
+            "retriever_provider": "local",
+            "embedding_model": model,
+            "chunking_embedding_model": model,
+            "embedding_cache_path": str(tmp_path / "embeddings.db"),
+            "blob_store_dir": str(tmp_path / "blobs"),
+        }
+    }
+    docs = [
+        Document(
+            page_content="Revenue grew 12%. Margins improved. Cash rose. Debt fell.",
+            metadata={"source_file": "amd_10k.pdf"},
+        )
+    ]
+    telemetry.registry.reset()
+    telemetry.enable()
+    try:
+        result = asyncio.run(docu_proc_graph.graph.ainvoke({"docs": docs}, config))
+        assert result["files"]["input"]["status"] == "indexed"
+        calls = telemetry.registry.counters["retrieval_graph_embedding_calls_total"]
+        assert sum(calls.values()) > 0
+
+        telemetry.registry.reset()
+        config["configurable"]["thread_id"] = "second"
+        result = asyncio.run(docu_proc_graph.graph.ainvoke({"docs": docs}, config))
+        assert result["files"]["input"]["status"] == "indexed"
+        counters = telemetry.registry.counters
+        assert "retrieval_graph_embedding_calls_total" not in counters
+        assert sum(counters["retrieval_graph_embedding_cache_hits_total"].values()) > 0
+    finally:
+        telemetry.disable()
+        telemetry.registry.reset()
+        get_local_store(model, HashingEmbeddings()).delete()
@@ -0,0 +1,136 @@
+import asyncio
+import importlib
+
+from langchain_core.documents import Document
+
+from retrieval_graph.bulk_upsert import BulkWriter, VectorStoreBackend
+from retrieval_graph.indexing import IncrementalIndexer, chunk_id, open_index_manifest
+from retrieval_graph.local import HashingEmbeddings, get_local_store
+
+docu_proc_graph = importlib.import_module("retrieval_graph.docu_proc_graph")
+
+MODEL = "local/hashing?dim=40"
+
+
+def _pages(*texts: str) -> list[Document]:
+    return [
+        Document(page_content=text, metadata={"source_file": "amd_10k.pdf", "page": i})
+        for i, text in enumerate(texts, start=1)
+    ]
+
+
+def _ingest(tmp_path, thread_id: str, docs: list[Document]) -> dict:
+    config = {
+        "configurable": {
+            "thread_id": thread_id,
+            "user_id": "1111111111",
+            "retriever_provider": "local",
+            "embedding_model": MODEL,
+            "chunking_embedding_model": MODEL,
+            "embedding_cache_path": "",
+            "index_manifest_path": str(tmp_path / "manifest.db"),
+            "blob_store_dir": str(tmp_path / "blobs"),
+        }
+    }
+    result = asyncio.run(docu_proc_graph.graph.ainvoke({"docs": docs}, config))
+    return result["files"]["input"]
+
+
+def test_chunk_ids_are_deterministic() -> None:
+    first = chunk_id("amd_10k.pdf", "Revenue grew.")
+    assert first == chunk_id("amd_10k.pdf", "Revenue grew.")
+    assert first != chunk_id("amd_10k.pdf", "Revenue grew.", 1)
+    assert first != chunk_id("nvidia_10k.pdf", "Revenue grew.")
+
+
+def test_reingestion_upserts_only_changes(tmp_path, monkeypatch) -> None:
+    monkeypatch.chdir(tmp_path)
+    store = get_local_store(MODEL, HashingEmbeddings())
+    store.delete()
+    try:
+        pages = ("Revenue grew.", "Margins fell.", "Risk factors.", "Risk factors.")
+        first = _ingest(tmp_path, "first", _pages(*pages))
+        assert first["added"] == 4 and first["deleted"] == 0
+        assert len(store) == 4
+
+        again = _ingest(tmp_path, "again", _pages(*pages))
+        assert again == {
+            "status": "indexed",
+            "chunks": 4,
+            "added": 0,
+            "updated": 0,
+            "unchanged": 4,
+            "deleted": 0,
+            "resumed": 0,
+            "batches": 0,
+            "retries": 0,
+            "dedup": {},
+        }
+        assert len(store) == 4
+
+        # Page 2 is rewritten and swapped with page 3, whose chunk keeps its ID
+        # but moves to another page.
+        edited_pages = _pages(
+            "Revenue grew.", "Risk factors.", "Margins rose.", "Risk factors."
+        )
+        edited = _ingest(tmp_path, "edited", edited_pages)
+        counts = ("added", "updated", "unchanged", "deleted")
+        assert [edited[key] for key in counts] == [1, 1, 2, 1]
+        assert sorted(doc.page_content for doc in store.similarity_search("x", k=10)) == [
+            "Margins rose.",
+            "Revenue grew.",
+            "Risk factors.",
+            "Risk factors.",
+        ]
+
+        # Chunks recorded in the manifest but missing from the index are restored.
+        store.delete()
+        restored = _ingest(tmp_path, "restored", edited_pages)
+        assert restored["added"] == 4 and len(store) == 4
+    finally:
+        store.delete()
+
+
+def test_uploads_without_source_keep_earlier_ones(tmp_path, monkeypatch) -> None:
+    monkeypatch.chdir(tmp_path)
+    store = get_local_store(MODEL, HashingEmbeddings())
+    store.delete()
+    try:
+        first = [Document(page_content="Revenue grew."), Document(page_content="Margins fell.")]
+        assert _ingest(tmp_path, "upload-1", first)["added"] == 2
+
+        second = _ingest(tmp_path, "upload-2", [Document(page_content="Risk factors.")])
+
+        assert (second["added"], second["deleted"]) == (1, 0)
+        assert len(store) == 3
+    finally:
+        store.delete()
+
+
+def test_stale_chunks_are_deleted_in_batches(tmp_path, monkeypatch) -> None:
+    store = get_local_store(MODEL, HashingEmbeddings())
+    store.delete()
+    deletes: list[int] = []
+    delete = store.adelete
+
+    async def counting_delete(ids: list[str]) -> None:
+        deletes.append(len(ids))
+        await delete(ids)
+
+    monkeypatch.setattr(store, "adelete", counting_delete)
+    manifest = open_index_manifest(tmp_path / "manifest.db")
+
+    async def index(docs: list[Document]) -> dict[str, int]:
+        writer = BulkWriter(VectorStoreBackend(store, max_batch_vectors=2))
+        indexer = IncrementalIndexer(store, manifest, "local", writer=writer)
+        await indexer.upsert(docs)
+        return (await indexer.finish()).as_dict()
+
+    try:
+        asyncio.run(index(_pages(*(f"Section {i}." for i in range(5)))))
+        report = asyncio.run(index(_pages("Section 0.")))
+
+        assert report["deleted"] == 4 and deletes == [2, 2]
+        assert len(store) == 1
+    finally:
+        store.delete()
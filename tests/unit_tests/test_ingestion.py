@@ -0,0 +1,195 @@
+import asyncio
+import importlib
+from pathlib import Path
+
+from langchain_core.documents import Document
+
+from retrieval_graph import retrieval
+from retrieval_graph.blob_store import BlobStore, DocumentRef
+from retrieval_graph.local import get_local_store
+from retrieval_graph.state import IndexState
+
+# The package re-exports the compiled graph under the module's name.
+docu_proc_graph = importlib.import_module("retrieval_graph.docu_proc_graph")
+
+EMBEDDING_MODEL = "local/hashing?dim=32"
+
+
+def _config(tmp_path: Path, **configurable: object) -> dict:
+    return {
+        "configurable": {
+            "thread_id": "batch",
+            "user_id": "1111111111",
+            "retriever_provider": "local",
+            "embedding_model": EMBEDDING_MODEL,
+            "chunking_embedding_model": EMBEDDING_MODEL,
+            "blob_store_dir": str(tmp_path / "blobs"),
+            "documents_dir": str(tmp_path / "documents"),
+            **configurable,
+        }
+    }
+
+
+def test_pending_pdfs_ingested_concurrently_and_failures_isolated(
+    tmp_path, monkeypatch
+) -> None:
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "documents").mkdir()
+    for name in ("amd_10k.pdf", "broken_10k.pdf", "intel_10k.pdf"):
+        (tmp_path / "documents" / name).write_bytes(b"%PDF")
+    store = get_local_store(
+        EMBEDDING_MODEL, retrieval.make_text_encoder(EMBEDDING_MODEL)
+    )
+    store.delete()
+
+    active = peak = 0
+
+    blobs = BlobStore(tmp_path / "blobs")
+
+    async def fake_parse(pdf_file: Path, config: dict) -> DocumentRef:
+        nonlocal active, peak
+        if pdf_file.name.startswith("broken"):
+            raise ValueError("unreadable PDF")
+        active += 1
+        peak = max(peak, active)
+        await asyncio.sleep(0.05)
+        active -= 1
+        return blobs.put_documents(
+            Document(
+                page_content=f"{pdf_file.stem} page {i}. Revenue grew.",
+                metadata={"source_file": pdf_file.name, "page": i},
+            )
+            for i in range(3)
+        )
+
+    monkeypatch.setattr(docu_proc_graph, "parse_pdf", fake_parse)
+    config = _config(tmp_path)
+
+    result = asyncio.run(docu_proc_graph.graph.ainvoke({"docs": []}, config))
+
+    files = result["files"]
+    assert files["amd_10k.pdf"]["status"] == "indexed"
+    assert files["intel_10k.pdf"]["status"] == "indexed"
+    assert files["broken_10k.pdf"] == {
+        "status": "failed",
+        "error": "ValueError: unreadable PDF",
+    }
+    assert peak == 2
+    indexed = store.similarity_search("page", k=10)
+    assert len(indexed) == len(store)
+    assert {doc.metadata["source_file"] for doc in indexed} == {
+        "amd_10k.pdf",
+        "intel_10k.pdf",
+    }
+
+    state = IndexState(files=files)
+    assert [p.name for p in docu_proc_graph.find_pending_pdfs(state, config)] == [
+        "broken_10k.pdf"
+    ]
+    store.delete()
+
+
+def _write_pdf(path: Path, pages: int) -> None:
+    from PyPDF2 import PdfWriter
+
+    writer = PdfWriter()
+    for _ in range(pages):
+        writer.add_blank_page(width=200, height=200)
+    with open(path, "wb") as f:
+        writer.write(f)
+
+
+def test_streaming_ingestion_indexes_pages_before_file_finishes(
+    tmp_path, monkeypatch
+) -> None:
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "documents").mkdir()
+    _write_pdf(tmp_path / "documents" / "amd_10k.pdf", pages=3)
+    store = get_local_store(
+        EMBEDDING_MODEL, retrieval.make_text_encoder(EMBEDDING_MODEL)
+    )
+    store.delete()
+
+    class FakeParser:
+        calls = 0
+
+        async def parse(self, path: Path, options: dict) -> list[Document]:
+            FakeParser.calls += 1
+            if not path.name.startswith("pages-00001"):
+                # Later pages wait until the first page's vectors are searchable.
+                for _ in range(200):
+                    if len(store):
+                        break
+                    await asyncio.sleep(0.01)
+                else:
+                    raise TimeoutError("first page was not indexed while streaming")
+            return [
+                Document(
+                    page_content=f"{path.stem}. Revenue grew.", metadata={"page": 1}
+                )
+            ]
+
+    monkeypatch.setattr(docu_proc_graph.parsing, "make_parser", lambda _: FakeParser())
+    config = _config(
+        tmp_path,
+        streaming_ingestion=True,
+        parse_pages_per_range=1,
+        parse_max_retries=0,
+        parse_cache_dir=str(tmp_path / "parsed"),
+        stream_batch_size=1,
+    )
+
+    result = asyncio.run(docu_proc_graph.graph.ainvoke({"docs": []}, config))
+
+    assert result["files"]["amd_10k.pdf"] == {
+        "status": "indexed",
+        "chunks": 3,
+        "added": 3,
+        "updated": 0,
+        "unchanged": 0,
+        "deleted": 0,
+        "resumed": 0,
+        "batches": 3,
+        "retries": 0,
+        "dedup": {},
+    }
+    indexed = store.similarity_search("Revenue", k=10)
+    assert sorted(doc.metadata["page"] for doc in indexed) == [1, 2, 3]
+    assert FakeParser.calls == 3
+    blobs = len(list((tmp_path / "blobs").rglob("*.jsonl.gz")))
+
+    # The streamed parse was cached: a new thread re-indexes without parsing.
+    config["configurable"]["thread_id"] = "again"
+    result = asyncio.run(docu_proc_graph.graph.ainvoke({"docs": []}, config))
+    assert result["files"]["amd_10k.pdf"]["status"] == "indexed"
+    assert FakeParser.calls == 3
+    assert len(list((tmp_path / "blobs").rglob("*.jsonl.gz"))) == blobs
+    store.delete()
+
+
+def test_reingestion_releases_intermediate_blobs(tmp_path, monkeypatch) -> None:
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "documents").mkdir()
+    _write_pdf(tmp_path / "documents" / "nvidia_10k.pdf", pages=2)
+    store = get_local_store(
+        EMBEDDING_MODEL, retrieval.make_text_encoder(EMBEDDING_MODEL)
+    )
+    store.delete()
+
+    class FakeParser:
+        async def parse(self, path: Path, options: dict) -> list[Document]:
+            return [Document(page_content="Data center revenue grew.", metadata={})]
+
+    monkeypatch.setattr(docu_proc_graph.parsing, "make_parser", lambda _: FakeParser())
+    config = _config(tmp_path, parse_cache_dir=str(tmp_path / "parsed"))
+
+    counts = []
+    for thread_id in ("first", "second"):
+        config["configurable"]["thread_id"] = thread_id
+        result = asyncio.run(docu_proc_graph.graph.ainvoke({"docs": []}, config))
+        assert result["files"]["nvidia_10k.pdf"]["status"] == "indexed"
+        counts.append(len(list((tmp_path / "blobs").rglob("*.jsonl.gz"))))
+
+    # Only the cached parse is left; split and enriched chunks are released.
+    assert counts == [1, 1]
+    store.delete()
@@ -0,0 +1,152 @@
+import asyncio
+import importlib
+from pathlib import Path
+
+import pytest
+from langchain_core.documents import Document
+from PyPDF2 import PdfWriter
+
+from retrieval_graph import parsing
+from retrieval_graph.blob_store import BlobStore, DocumentRef
+from retrieval_graph.bulk_upsert import VectorStoreBackend
+from retrieval_graph.journal import open_ingestion_journal
+from retrieval_graph.local import HashingEmbeddings, get_local_store
+
+docu_proc_graph = importlib.import_module("retrieval_graph.docu_proc_graph")
+
+MODEL = "local/hashing?dim=56"
+
+
+class InterruptedParser(parsing.LocalParser):
+    """Fail the second page range until `interrupted` is cleared."""
+
+    interrupted = True
+
+    async def parse(self, path: Path, options: dict) -> list[Document]:
+        if self.interrupted and path.name.startswith("pages-00011"):
+            await asyncio.sleep(0.05)
+            raise ConnectionError("process killed")
+        return await super().parse(path, options)
+
+
+def test_interrupted_parse_resumes_with_missing_ranges(tmp_path, monkeypatch) -> None:
+    pdf = tmp_path / "qualcomm_10k.pdf"
+    writer = PdfWriter()
+    for _ in range(12):
+        writer.add_blank_page(width=200, height=200)
+    with open(pdf, "wb") as f:
+        writer.write(f)
+    parser = InterruptedParser()
+    monkeypatch.setattr(parsing, "make_parser", lambda name: parser)
+    config = {
+        "configurable": {
+            "document_parser": "local",
+            "parse_max_retries": 0,
+            "parse_cache_dir": str(tmp_path / "parsed"),
+            "blob_store_dir": str(tmp_path / "blobs"),
+            "ingestion_journal_path": str(tmp_path / "journal.db"),
+        }
+    }
+
+    with pytest.raises(ConnectionError):
+        asyncio.run(docu_proc_graph.parse_pdf(pdf, config))
+    assert parser.calls == 1  # pages 1-10 were parsed before the crash
+
+    parser.interrupted = False
+    ref = asyncio.run(docu_proc_graph.parse_pdf(pdf, config))
+
+    assert parser.calls == 2  # only pages 11-12 were parsed again
+    (doc,) = BlobStore(tmp_path / "blobs").load_documents(ref)
+    assert doc.metadata["total_pages"] == 12
+
+
+class CrashingBackend(VectorStoreBackend):
+    """Upsert `budget` batches, then fail as if the process died."""
+
+    budget = 1
+    written: list[str] = []
+
+    async def upsert(self, docs: list[Document], ids: list[str]) -> None:
+        if CrashingBackend.budget == 0:
+            raise ConnectionError("process killed")
+        CrashingBackend.budget -= 1
+        CrashingBackend.written.extend(ids)
+        await super().upsert(docs, ids)
+
+
+def test_interrupted_ingestion_resumes_after_last_upsert_batch(
+    tmp_path, monkeypatch
+) -> None:
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "documents").mkdir()
+    (tmp_path / "documents" / "amd_10k.pdf").write_bytes(b"%PDF")
+    store = get_local_store(MODEL, HashingEmbeddings())
+    store.delete()
+    blobs = BlobStore(tmp_path / "blobs")
+
+    async def fake_parse(pdf_file: Path, config: dict) -> DocumentRef:
+        return blobs.put_documents(
+            Document(
+                page_content=f"Section {i} of the filing.",
+                metadata={"source_file": pdf_file.name, "page": i},
+            )
+            for i in range(1, 5)
+        )
+
+    splits = 0
+    split_documents = docu_proc_graph._split_documents
+
+    def counting_split(docs, semantic_splitter):
+        nonlocal splits
+        splits += 1
+        return split_documents(docs, semantic_splitter)
+
+    monkeypatch.setattr(docu_proc_graph, "parse_pdf", fake_parse)
+    monkeypatch.setattr(docu_proc_graph, "_split_documents", counting_split)
+    monkeypatch.setattr(docu_proc_graph, "_INDEX_BATCH_SIZE", 2)
+    monkeypatch.setattr(
+        docu_proc_graph,
+        "make_upsert_backend",
+        lambda provider, vectorstore: CrashingBackend(vectorstore),
+    )
+    journal_path = tmp_path / "journal.db"
+
+    def ingest(thread_id: str) -> dict:
+        config = {
+            "configurable": {
+                "thread_id": thread_id,
+                "user_id": "1111111111",
+                "retriever_provider": "local",
+                "embedding_model": MODEL,
+                "chunking_embedding_model": MODEL,
+                "embedding_cache_path": "",
+                "index_manifest_path": str(tmp_path / "manifest.db"),
+                "ingestion_journal_path": str(journal_path),
+                "upsert_max_retries": 0,
+                "blob_store_dir": str(tmp_path / "blobs"),
+                "documents_dir": str(tmp_path / "documents"),
+            }
+        }
+        result = asyncio.run(docu_proc_graph.graph.ainvoke({"docs": []}, config))
+        return result["files"]["amd_10k.pdf"]
+
+    try:
+        CrashingBackend.written = []
+        assert ingest("crash")["status"] == "failed"
+        first = list(CrashingBackend.written)
+        assert len(first) == 2 and splits == 1
+        assert len(open_ingestion_journal(journal_path).pending()) == 1
+
+        CrashingBackend.budget = 10
+        resumed = ingest("resume")
+
+        assert resumed["status"] == "indexed"
+        assert (resumed["resumed"], resumed["added"], resumed["batches"]) == (2, 2, 1)
+        assert splits == 1  # the journaled chunks were reused
+        assert len(CrashingBackend.written) == 4
+        assert not set(first) & set(CrashingBackend.written[2:])
+        assert len(store) == 4
+        assert open_ingestion_journal(journal_path).pending() == []
+    finally:
+        CrashingBackend.budget = 1
+        store.delete()
@@ -0,0 +1,83 @@
+import asyncio
+
+import numpy as np
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from langchain_core.messages import HumanMessage, ToolMessage
+from pydantic import BaseModel
+
+from retrieval_graph.local import LocalVectorStore
+from retrieval_graph.retrieval import make_text_encoder
+from retrieval_graph.tools import industry_analysis_tool, web_search_tool
+from retrieval_graph.utils import load_chat_model
+
+
+def _store() -> LocalVectorStore:
+    return LocalVectorStore.from_texts(
+        ["nvidia revenue", "amd revenue", "intel risk factors"],
+        DeterministicFakeEmbedding(size=32),
+        metadatas=[
+            {"source_file": "nvidia_10k.pdf", "user_id": "1"},
+            {"source_file": "amd_10k.pdf", "user_id": "1"},
+            {"source_file": "intel_10k.pdf", "user_id": "2"},
+        ],
+        ids=["n", "a", "i"],
+    )
+
+
+def test_exact_match_ranks_first_and_filters_apply() -> None:
+    store = _store()
+
+    assert store.similarity_search("amd revenue", k=1)[0].id == "a"
+    results = store.similarity_search(
+        "amd revenue", k=3, filter={"user_id": "1", "source_file": {"$in": ["nvidia_10k.pdf"]}}
+    )
+    assert [doc.id for doc in results] == ["n"]
+
+
+def test_upsert_and_delete_by_id() -> None:
+    store = _store()
+    store.add_texts(["amd margins"], [{"source_file": "amd_10k.pdf"}], ids=["a"])
+    store.delete(["n"])
+
+    assert len(store) == 2
+    assert store.get_by_ids(["a"])[0].page_content == "amd margins"
+    docs = asyncio.run(store.as_retriever(search_kwargs={"k": 5}).ainvoke("amd margins"))
+    assert [doc.id for doc in docs][0] == "a"
+
+
+def test_hashing_embeddings_are_deterministic_and_lexical() -> None:
+    encoder = make_text_encoder("local/hashing?dim=128")
+    a, b, c = encoder.embed_documents(
+        ["NVIDIA data center revenue", "data center revenue at NVIDIA", "Intel foundry risks"]
+    )
+
+    assert len(a) == 128
+    assert a == encoder.embed_query("NVIDIA data center revenue")
+    assert np.dot(a, b) > np.dot(a, c)
+
+
+def test_scripted_model_calls_matching_tool_then_answers() -> None:
+    model = load_chat_model("local/scripted?tools=industry_analysis_tool")
+    bound = model.bind_tools([industry_analysis_tool, web_search_tool])
+    question = HumanMessage(content="Compare R&D spending across the industry")
+
+    first = bound.invoke([question])
+    [call] = first.tool_calls
+    final = bound.invoke(
+        [question, first, ToolMessage(content="docs", tool_call_id=call["id"])]
+    )
+
+    assert call["name"] == "industry_analysis_tool"
+    assert final.content and not final.tool_calls
+    assert not bound.invoke([HumanMessage(content="latest NVIDIA news")]).tool_calls
+
+
+def test_scripted_model_supports_structured_output() -> None:
+    class SearchQuery(BaseModel):
+        """Search the indexed documents for a query."""
+
+        query: str
+
+    model = load_chat_model("local/scripted").with_structured_output(SearchQuery)
+
+    assert model.invoke([HumanMessage(content="AMD margins")]).query == "AMD margins"
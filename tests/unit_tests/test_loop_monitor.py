@@ -0,0 +1,40 @@
+import asyncio
+import time
+
+from retrieval_graph import loop_monitor, telemetry
+
+
+@telemetry.instrument_node
+async def parse_cached_docs(state: dict, *, config: dict) -> dict:
+    time.sleep(0.2)
+    return {}
+
+
+@telemetry.instrument_node
+async def offloaded_parse(state: dict, *, config: dict) -> dict:
+    await asyncio.to_thread(time.sleep, 0.2)
+    return {}
+
+
+def test_stall_is_attributed_to_the_blocking_node() -> None:
+    async def run() -> list[loop_monitor.Stall]:
+        async with loop_monitor.monitor(threshold=0.05, interval=0.01) as monitor:
+            await asyncio.sleep(0.03)
+            await parse_cached_docs({}, config={})
+        return list(monitor.stalls)
+
+    stalls = asyncio.run(run())
+
+    assert len(stalls) == 1
+    assert stalls[0].duration >= 0.15
+    assert stalls[0].node == "parse_cached_docs"
+    assert stalls[0].location.startswith("parse_cached_docs (test_loop_monitor.py:")
+
+
+def test_offloaded_work_does_not_stall() -> None:
+    async def run() -> list[loop_monitor.Stall]:
+        async with loop_monitor.monitor(threshold=0.05, interval=0.01) as monitor:
+            await offloaded_parse({}, config={})
+        return list(monitor.stalls)
+
+    assert asyncio.run(run()) == []
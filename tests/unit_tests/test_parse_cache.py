@@ -0,0 +1,59 @@
+from langchain_core.documents import Document
+
+from retrieval_graph.blob_store import BlobStore
+from retrieval_graph.parse_cache import DEFAULT_PARSE_OPTIONS, ParseCache, pdf_cache_key
+
+
+def _pages(n: int) -> list[Document]:
+    return [
+        Document(page_content=f"page {i}", metadata={"page": i, "source_file": "a.pdf"})
+        for i in range(n)
+    ]
+
+
+def test_key_depends_on_pdf_bytes_and_options(tmp_path) -> None:
+    pdf = tmp_path / "a.pdf"
+    pdf.write_bytes(b"%PDF-1 original")
+    key = pdf_cache_key(pdf, DEFAULT_PARSE_OPTIONS)
+
+    assert pdf_cache_key(pdf, dict(DEFAULT_PARSE_OPTIONS)) == key
+    assert pdf_cache_key(pdf, {**DEFAULT_PARSE_OPTIONS, "split": "page"}) != key
+    pdf.write_bytes(b"%PDF-1 amended")
+    assert pdf_cache_key(pdf, DEFAULT_PARSE_OPTIONS) != key
+
+
+def test_put_then_get_streams_pages(tmp_path) -> None:
+    cache = ParseCache(tmp_path / "parsed", BlobStore(tmp_path / "blobs"))
+
+    assert cache.get("ab" * 32) is None
+    ref = cache.put("ab" * 32, iter(_pages(4)), source_file="a.pdf", options={})
+
+    assert cache.get("ab" * 32) == ref
+    pages = cache.iter_pages(ref)
+    assert next(pages) == _pages(1)[0]
+    assert cache.load_pages(ref) == _pages(4)
+
+
+def test_entry_without_blob_is_a_miss(tmp_path) -> None:
+    store = BlobStore(tmp_path / "blobs")
+    cache = ParseCache(tmp_path / "parsed", store)
+    ref = cache.put("cd" * 32, _pages(2), source_file="a.pdf", options={})
+
+    store.delete(ref)
+
+    assert cache.get("cd" * 32) is None
+
+
+def test_holding_reads_the_entries_once(tmp_path) -> None:
+    store = BlobStore(tmp_path / "blobs")
+    first = ParseCache(tmp_path / "parsed", store).put(
+        "ef" * 32, _pages(2), source_file="a.pdf", options={}
+    )
+    other = store.put_documents(_pages(3))
+    cache = ParseCache(tmp_path / "parsed", store)
+
+    assert cache.holding([first.key, other.key]) == {first.key}
+    for entry in (tmp_path / "parsed").glob("*/*.json"):
+        entry.write_text("unreadable")
+    second = cache.put("01" * 32, _pages(5), source_file="b.pdf", options={})
+    assert cache.holding([first.key, second.key, other.key]) == {first.key, second.key}
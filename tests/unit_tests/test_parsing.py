@@ -0,0 +1,139 @@
+import asyncio
+import importlib
+from pathlib import Path
+
+from langchain_core.documents import Document
+from PyPDF2 import PdfReader, PdfWriter
+
+from retrieval_graph import parsing
+from retrieval_graph.blob_store import BlobStore
+
+
+def _pdf(path: Path, pages: int) -> Path:
+    writer = PdfWriter()
+    for _ in range(pages):
+        writer.add_blank_page(width=200, height=200)
+    with open(path, "wb") as f:
+        writer.write(f)
+    return path
+
+
+class FlakyParser:
+    """Return one document per page, failing the first call for one range."""
+
+    def __init__(self) -> None:
+        self.active = self.peak = 0
+        self.failed: set[str] = set()
+
+    async def parse(self, path: Path, options: dict) -> list[Document]:
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        try:
+            await asyncio.sleep(0.01)
+            if path.name.startswith("pages-00011") and path.name not in self.failed:
+                self.failed.add(path.name)
+                raise ConnectionError("503 from parser")
+            pages = len(PdfReader(str(path)).pages)
+            if options["split"] == "none":
+                return [
+                    Document(
+                        page_content=path.stem,
+                        metadata={"total_pages": pages, "coordinates": [path.stem]},
+                    )
+                ]
+            return [
+                Document(page_content=f"{path.stem}:{n}", metadata={"page": n})
+                for n in range(1, pages + 1)
+            ]
+        finally:
+            self.active -= 1
+
+
+def test_ranges_parsed_concurrently_retried_and_renumbered(tmp_path) -> None:
+    pdf = _pdf(tmp_path / "nvidia_10k.pdf", 23)
+    parser = FlakyParser()
+
+    docs = asyncio.run(
+        parsing.parse_pdf_ranges(
+            pdf, parser, {"split": "page"}, max_concurrency=2, backoff=0.001
+        )
+    )
+
+    assert [doc.metadata["page"] for doc in docs] == list(range(1, 24))
+    assert docs[10].page_content == "pages-00011-00020:1"
+    assert {doc.metadata["source_file"] for doc in docs} == {"nvidia_10k.pdf"}
+    assert parser.failed == {"pages-00011-00020.pdf"}
+    assert parser.peak == 2
+
+
+def test_unsplit_parse_merges_into_one_document(tmp_path) -> None:
+    pdf = _pdf(tmp_path / "amd_10k.pdf", 23)
+
+    docs = asyncio.run(
+        parsing.parse_pdf_ranges(pdf, FlakyParser(), {"split": "none"}, backoff=0.001)
+    )
+
+    assert len(docs) == 1
+    assert docs[0].page_content == "pages-00001-00010pages-00011-00020pages-00021-00023"
+    assert docs[0].metadata["total_pages"] == 23
+    assert len(docs[0].metadata["coordinates"]) == 3
+
+
+def test_unsplittable_file_keeps_parser_page_count_and_metadata(tmp_path) -> None:
+    pdf = tmp_path / "broadcom_10k.pdf"
+    pdf.write_bytes(b"not a PDF PyPDF2 can read")
+
+    class WholeFileParser:
+        async def parse(self, path: Path, options: dict) -> list[Document]:
+            assert path == pdf
+            return [
+                Document(
+                    page_content="whole file",
+                    metadata={"total_pages": 140, "model": "document-parse-250116"},
+                )
+            ]
+
+    (doc,) = asyncio.run(
+        parsing.parse_pdf_ranges(pdf, WholeFileParser(), {"split": "none"})
+    )
+
+    assert doc.metadata == {
+        "total_pages": 140,
+        "model": "document-parse-250116",
+        "source_file": "broadcom_10k.pdf",
+    }
+
+
+def test_local_parser_stands_in_for_upstage(tmp_path) -> None:
+    pdf = _pdf(tmp_path / "intel_10k.pdf", 3)
+    parser = parsing.make_parser("local")
+
+    docs = asyncio.run(
+        parsing.parse_pdf_ranges(pdf, parser, {"split": "page"}, pages_per_range=2)
+    )
+
+    assert [doc.metadata["page"] for doc in docs] == [1, 2, 3]
+    assert isinstance(parser, parsing.LocalParser) and parser.calls == 2
+
+
+def test_parse_pdf_uses_configured_parser_and_parse_cache(tmp_path, monkeypatch) -> None:
+    docu_proc_graph = importlib.import_module("retrieval_graph.docu_proc_graph")
+    pdf = _pdf(tmp_path / "broadcom_10k.pdf", 12)
+    parser = parsing.LocalParser()
+    monkeypatch.setattr(parsing, "make_parser", lambda name: parser)
+    config = {
+        "configurable": {
+            "document_parser": "local",
+            "parse_cache_dir": str(tmp_path / "parsed"),
+            "blob_store_dir": str(tmp_path / "blobs"),
+            "ingestion_journal_path": str(tmp_path / "journal.db"),
+        }
+    }
+
+    first = asyncio.run(docu_proc_graph.parse_pdf(pdf, config))
+    second = asyncio.run(docu_proc_graph.parse_pdf(pdf, config))
+
+    assert first == second
+    assert parser.calls == 2  # two 10-page ranges, parsed once
+    (doc,) = BlobStore(tmp_path / "blobs").load_documents(first)
+    assert doc.metadata == {"total_pages": 12, "source_file": "broadcom_10k.pdf"}
@@ -0,0 +1,56 @@
+import asyncio
+import pstats
+
+from retrieval_graph import profiling, telemetry
+
+
+@telemetry.instrument_node
+async def format_context(state: dict, *, config: dict) -> dict:
+    return {"context": "\n".join(f"<doc>{i}</doc>" for i in range(2000))}
+
+
+@telemetry.instrument_node
+async def answer(state: dict, *, config: dict) -> dict:
+    return {"answer": sorted(str(i) for i in range(2000))[0]}
+
+
+async def run(config: dict) -> None:
+    await format_context({}, config=config)
+    await answer({}, config=config)
+
+
+def test_profile_run_writes_report_stacks_and_pstats(tmp_path) -> None:
+    with profiling.profile_run(tmp_path / "run"):
+        asyncio.run(run({}))
+
+    out = tmp_path / "run"
+    assert sorted(p.name for p in out.glob("*.pstats")) == [
+        "01-format_context.pstats",
+        "02-answer.pstats",
+    ]
+    report = (out / "report.txt").read_text()
+    assert "== 01 format_context:" in report
+    assert "Top allocations" in report
+    pstats.Stats(str(out / "02-answer.pstats"))
+
+    stacks = (out / "stacks.collapsed").read_text().splitlines()
+    assert stacks
+    for line in stacks:
+        frames, count = line.rsplit(" ", 1)
+        assert frames.split(";")[0] in {"format_context", "answer"}
+        assert int(count) > 0
+
+
+def test_profiling_enabled_by_configuration(tmp_path) -> None:
+    config = {
+        "configurable": {
+            "profiling_enabled": True,
+            "profile_dir": str(tmp_path),
+            "thread_id": "slow-question",
+        }
+    }
+    asyncio.run(run(config))
+    asyncio.run(run({"configurable": {"profile_dir": str(tmp_path), "thread_id": "off"}}))
+
+    assert len(list((tmp_path / "slow-question").glob("*.pstats"))) == 2
+    assert not (tmp_path / "off").exists()
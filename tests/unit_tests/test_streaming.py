@@ -0,0 +1,36 @@
+import asyncio
+from typing import AsyncIterator
+
+import pytest
+
+from retrieval_graph import streaming
+
+
+def test_buffered_applies_backpressure_and_propagates_errors() -> None:
+    produced: list[int] = []
+
+    async def source() -> AsyncIterator[int]:
+        for i in range(10):
+            produced.append(i)
+            yield i
+        raise ValueError("source failed")
+
+    async def consume() -> list[list[int]]:
+        items = streaming.buffered(source(), maxsize=2)
+        first = await items.__anext__()
+        await asyncio.sleep(0.01)
+        # One item taken, two queued and one blocked on the full queue.
+        assert first == 0 and len(produced) == 4
+        return [batch async for batch in streaming.batched(items, 4)]
+
+    with pytest.raises(ValueError, match="source failed"):
+        asyncio.run(consume())
+    assert len(produced) == 10
+
+
+def test_batched_and_aiter_blocking() -> None:
+    async def collect() -> list[list[int]]:
+        source = streaming.aiter_blocking(iter(range(5)))
+        return [batch async for batch in streaming.batched(source, 2)]
+
+    assert asyncio.run(collect()) == [[0, 1], [2, 3], [4]]
@@ -0,0 +1,41 @@
+import json
+import pickle
+from pathlib import Path
+
+from retrieval_graph.synthetic import generate_corpus, write_corpus
+
+NOSQL = Path(__file__).resolve().parents[2] / "nosql"
+
+
+def test_corpus_scale_and_naming() -> None:
+    filings = list(generate_corpus(companies=14, years=2, pages=10))
+
+    assert len(filings) == 28
+    assert filings[0].source_file == "nvidia_10k.pdf"
+    assert filings[1].source_file == "nvidia_2023_10k.pdf"
+    assert filings[-1].source_file == "company0013_2023_10k.pdf"
+
+
+def test_pages_are_deterministic_and_shaped_like_parsed_docs() -> None:
+    filing = next(generate_corpus(pages=50, seed=7))
+    pages = list(filing.pages())
+
+    assert len(pages) == 50
+    assert pages[20] == filing.page(21)
+    assert pages[20].metadata == {"page_number": 21, "source_file": "nvidia_10k.pdf"}
+    assert next(generate_corpus(pages=50, seed=8)).page(21) != pages[20]
+
+
+def test_sections_match_bundled_schema(tmp_path) -> None:
+    bundled = json.loads((NOSQL / "amd_10k_sections.json").read_text())
+    written = write_corpus(tmp_path, generate_corpus(companies=2, pages=100))
+
+    sections = json.loads((tmp_path / "amd_10k_sections.json").read_text())
+    starts = [s["start_page_number"] for s in sections["sections"]]
+
+    assert len(written) == 4
+    assert sections.keys() == bundled.keys()
+    assert sections["sections"][0].keys() == bundled["sections"][0].keys()
+    assert starts == sorted(starts) and 1 <= starts[0] and starts[-1] <= 100
+    with open(tmp_path / "amd_10k_parsed_docs.pkl", "rb") as f:
+        assert len(pickle.load(f)) == 100
@@ -0,0 +1,88 @@
+import asyncio
+import io
+import json
+import logging
+
+import pytest
+
+from retrieval_graph import telemetry
+from retrieval_graph.caching import RetrievalCache
+
+
+@pytest.fixture
+def enabled():
+    telemetry.registry.reset()
+    telemetry.enable()
+    yield
+    telemetry.disable()
+    telemetry.registry.reset()
+
+
+def test_disabled_span_is_a_shared_noop() -> None:
+    telemetry.disable()
+
+    assert telemetry.span("search") is telemetry.span("embed", company="amd")
+    telemetry.increment("retrieval_graph_chunks_retrieved_total", 3)
+    assert "retrieval_graph_chunks_retrieved_total" not in telemetry.registry.counters
+
+
+def test_instrumented_node_records_nested_spans(enabled) -> None:
+    @telemetry.instrument_node
+    async def retrieve(state: dict, *, config: dict) -> dict:
+        assert telemetry.current_node.get() == "retrieve"
+        with telemetry.span("search", company="amd_10k.pdf"):
+            telemetry.increment("retrieval_graph_chunks_retrieved_total", 2, company="amd_10k.pdf")
+        return {}
+
+    asyncio.run(retrieve({}, config={}))
+    text = telemetry.render_prometheus()
+
+    assert 'retrieval_graph_span_seconds_count{node="retrieve",span="node"} 1' in text
+    assert 'retrieval_graph_span_seconds_count{company="amd_10k.pdf",span="search"} 1' in text
+    assert 'retrieval_graph_chunks_retrieved_total{company="amd_10k.pdf"} 2' in text
+    assert telemetry.current_node.get() is None
+
+
+def test_span_errors_are_counted(enabled) -> None:
+    with pytest.raises(RuntimeError):
+        with telemetry.span("tool", tool="web_search_tool"):
+            raise RuntimeError("boom")
+
+    text = telemetry.render_prometheus()
+
+    assert 'retrieval_graph_span_errors_total{span="tool",tool="web_search_tool"} 1' in text
+
+
+def test_label_values_are_escaped(enabled) -> None:
+    telemetry.increment("retrieval_graph_tool_calls_total", query='Is "AI" up?\\\n')
+
+    text = telemetry.render_prometheus()
+
+    assert 'retrieval_graph_tool_calls_total{query="Is \\"AI\\" up?\\\\\\n"} 1' in text
+
+
+def test_cache_stats_are_exported_as_gauges() -> None:
+    cache = RetrievalCache()
+    telemetry.register_cache("unit", cache)
+
+    text = telemetry.render_prometheus()
+
+    assert 'retrieval_graph_cache_entries{cache="unit"} 0' in text
+    assert "# TYPE retrieval_graph_cache_hit_ratio gauge" in text
+
+
+def test_json_formatter_emits_span_fields(enabled) -> None:
+    stream = io.StringIO()
+    handler = telemetry.configure_json_logging(stream, level=logging.DEBUG)
+    try:
+        with telemetry.span("llm", model="upstage/solar-pro2"):
+            pass
+    finally:
+        logging.getLogger("retrieval_graph").removeHandler(handler)
+
+    record = json.loads(stream.getvalue().splitlines()[-1])
+
+    assert record["span"] == "llm"
+    assert record["labels"] == {"model": "upstage/solar-pro2"}
+    assert record["status"] == "ok"
+    assert record["parent_id"] is None
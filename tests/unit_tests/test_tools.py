@@ -0,0 +1,123 @@
+import asyncio
+from contextlib import nullcontext
+
+from langchain_core.documents import Document
+from langchain_core.messages import AIMessage
+from langchain_core.runnables import RunnableConfig
+from langchain_core.tools import tool
+from langgraph.prebuilt import ToolNode
+
+from retrieval_graph import retrieval, telemetry, tools
+from retrieval_graph.caching import bump_index_generation
+from retrieval_graph.tools import IncompleteResult, cached_tool, tool_cache
+
+calls: list[str] = []
+
+
+@tool
+async def web_search_tool(query: str) -> str:
+    """Stand-in for the web search tool."""
+    calls.append(query)
+    if query == "fail":
+        return IncompleteResult("Error performing web search: boom")
+    return f"results for {query}"
+
+
+def _call(query: str, call_id: str) -> dict:
+    message = AIMessage(
+        content="",
+        tool_calls=[{"name": "web_search_tool", "args": {"query": query}, "id": call_id}],
+    )
+    return {"messages": [message]}
+
+
+def test_repeated_tool_calls_are_served_from_cache() -> None:
+    tool_cache.clear()
+    calls.clear()
+    node = ToolNode([cached_tool(web_search_tool)])
+
+    first = asyncio.run(node.ainvoke(_call("NVIDIA earnings", "1")))
+    second = asyncio.run(node.ainvoke(_call("  nvidia EARNINGS? ", "2")))
+
+    assert calls == ["NVIDIA earnings"]
+    assert second["messages"][0].content == first["messages"][0].content
+    assert second["messages"][0].tool_call_id == "2"
+
+
+def test_error_results_are_not_cached() -> None:
+    tool_cache.clear()
+    calls.clear()
+    node = ToolNode([cached_tool(web_search_tool)])
+
+    asyncio.run(node.ainvoke(_call("fail", "1")))
+    asyncio.run(node.ainvoke(_call("fail", "2")))
+
+    assert calls == ["fail", "fail"]
+
+
+@tool
+async def industry_analysis_tool(query: str, config: RunnableConfig = None) -> str:
+    """Stand-in for the industry analysis tool."""
+    calls.append(f"{telemetry.current_tool.get()}:{config['configurable']['thread_id']}")
+    return f"filings for {query}"
+
+
+def test_tool_gets_its_config_and_results_follow_the_index_generation(
+    tmp_path,
+) -> None:
+    tool_cache.clear()
+    calls.clear()
+    node = ToolNode([cached_tool(industry_analysis_tool)])
+    config = {
+        "configurable": {
+            "thread_id": "t1",
+            "index_generation_path": str(tmp_path / "generation"),
+        }
+    }
+
+    def run(call_id: str) -> str:
+        message = AIMessage(
+            content="",
+            tool_calls=[
+                {"name": "industry_analysis_tool", "args": {"query": "AI"}, "id": call_id}
+            ],
+        )
+        result = asyncio.run(node.ainvoke({"messages": [message]}, config))
+        return result["messages"][0].content
+
+    assert run("1") == run("2") == "filings for AI"
+    bump_index_generation(tmp_path / "generation")
+    run("3")
+
+    assert calls == ["industry_analysis_tool:t1", "industry_analysis_tool:t1"]
+
+
+def test_partial_industry_analysis_is_not_cached(tmp_path, monkeypatch) -> None:
+    tool_cache.clear()
+    searched: list[str] = []
+
+    async def asearch(retriever, query, config, *, filter, k):
+        searched.append(filter["source_file"])
+        if filter["source_file"] == "intel_10k.pdf":
+            raise ConnectionError("timeout")
+        return [Document(page_content=f"{query} at {filter['source_file']}")]
+
+    monkeypatch.setattr(retrieval, "make_retriever", lambda config: nullcontext())
+    monkeypatch.setattr(retrieval, "asearch", asearch)
+    node = ToolNode([cached_tool(tools.industry_analysis_tool)])
+    config = {
+        "configurable": {
+            "thread_id": "t2",
+            "index_generation_path": str(tmp_path / "generation"),
+        }
+    }
+    message = AIMessage(
+        content="",
+        tool_calls=[{"name": "industry_analysis_tool", "args": {"query": "AI"}, "id": "1"}],
+    )
+
+    first = asyncio.run(node.ainvoke({"messages": [message]}, config))
+    asyncio.run(node.ainvoke({"messages": [message]}, config))
+
+    assert "Retrieval failed for: intel_10k.pdf" in first["messages"][0].content
+    assert len(searched) == 8
@@ -0,0 +1,68 @@
+import asyncio
+
+from langchain_core.language_models.fake_chat_models import FakeMessagesListChatModel
+from langchain_core.messages import AIMessage
+
+from retrieval_graph import retrieval, telemetry, usage
+
+
+def reply(input_tokens: int, output_tokens: int) -> AIMessage:
+    return AIMessage(
+        content="ok",
+        usage_metadata={
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "total_tokens": input_tokens + output_tokens,
+        },
+    )
+
+
+@telemetry.instrument_node
+async def agent_reasoning(state: dict, *, config: dict) -> dict:
+    model = FakeMessagesListChatModel(responses=[reply(100, 20), reply(50, 5)])
+    await model.ainvoke("first", config)
+    token = telemetry.current_tool.set("industry_analysis_tool")
+    try:
+        await model.ainvoke("second", config)
+    finally:
+        telemetry.current_tool.reset(token)
+    usage.record_embedding("upstage/embedding-query", ["x" * 10, "y" * 4])
+    return {}
+
+
+def test_usage_attributed_to_node_tool_and_thread() -> None:
+    usage.ledger.reset()
+    usage.set_prices({"FakeMessagesListChatModel": {"input": 1.0, "output": 2.0}})
+    try:
+        asyncio.run(agent_reasoning({}, config={"configurable": {"thread_id": "t1"}}))
+        asyncio.run(agent_reasoning({}, config={"configurable": {"thread_id": "t2"}}))
+        summary = usage.thread_usage({"configurable": {"thread_id": "t1"}})
+    finally:
+        usage.set_prices({})
+
+    assert summary["total"]["calls"] == 3
+    assert summary["total"]["input_tokens"] == 150
+    assert summary["total"]["output_tokens"] == 25
+    # ceil(10 / 4) + ceil(4 / 4)
+    assert summary["total"]["embedding_tokens"] == 4
+    assert summary["total"]["cost_usd"] == round((150 * 1.0 + 25 * 2.0) / 1e6, 6)
+    assert set(summary["by_node"]) == {"agent_reasoning"}
+    assert summary["by_tool"]["industry_analysis_tool"]["input_tokens"] == 50
+    assert summary["by_tool"]["-"]["input_tokens"] == 100
+    assert summary["by_model"]["upstage/embedding-query"]["embedding_tokens"] == 4
+
+    assert usage.ledger.summary()["total"]["input_tokens"] == 300
+    assert usage.thread_usage({}) == {}
+    usage.ledger.reset()
+
+
+def test_embedding_tokens_recorded_with_telemetry_disabled(monkeypatch) -> None:
+    monkeypatch.setattr(telemetry, "_enabled", False)
+    usage.ledger.reset()
+    embeddings = retrieval.make_embeddings("local/hashing?dim=16")
+
+    asyncio.run(embeddings.aembed_documents(["x" * 10, "y" * 4]))
+    embeddings.embed_query("z" * 8)
+
+    assert usage.ledger.summary()["total"]["embedding_tokens"] == 4 + 2
+    usage.ledger.reset()